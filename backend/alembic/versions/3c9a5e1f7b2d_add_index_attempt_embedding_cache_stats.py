@@ -0,0 +1,37 @@
+"""add index attempt embedding cache stats
+
+Revision ID: 3c9a5e1f7b2d
+Revises: 8818cf73fa1a
+Create Date: 2025-09-08 10:21:44.118203
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3c9a5e1f7b2d"
+down_revision = "8818cf73fa1a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "index_attempt",
+        sa.Column(
+            "embedding_cache_hits", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+    op.add_column(
+        "index_attempt",
+        sa.Column(
+            "embedding_cache_misses", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("index_attempt", "embedding_cache_misses")
+    op.drop_column("index_attempt", "embedding_cache_hits")
@@ -0,0 +1,30 @@
+"""add document content hashes
+
+Revision ID: 5f2b8d0c4a61
+Revises: 3c9a5e1f7b2d
+Create Date: 2025-09-09 14:02:17.530862
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "5f2b8d0c4a61"
+down_revision = "3c9a5e1f7b2d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("document", sa.Column("content_hash", sa.String(), nullable=True))
+    op.add_column(
+        "document",
+        sa.Column("chunk_content_hashes", postgresql.JSONB(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("document", "chunk_content_hashes")
+    op.drop_column("document", "content_hash")
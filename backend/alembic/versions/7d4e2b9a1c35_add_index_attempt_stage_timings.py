@@ -0,0 +1,38 @@
+"""add index attempt stage timings
+
+Revision ID: 7d4e2b9a1c35
+Revises: 5f2b8d0c4a61
+Create Date: 2025-09-10 11:37:52.204716
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7d4e2b9a1c35"
+down_revision = "5f2b8d0c4a61"
+branch_labels = None
+depends_on = None
+
+
+_STAGE_TIMING_COLUMNS = [
+    "chunking_seconds",
+    "embedding_seconds",
+    "vector_db_write_seconds",
+    "docprocessing_seconds",
+]
+
+
+def upgrade() -> None:
+    for column in _STAGE_TIMING_COLUMNS:
+        op.add_column(
+            "index_attempt",
+            sa.Column(column, sa.Float(), nullable=False, server_default="0"),
+        )
+
+
+def downgrade() -> None:
+    for column in reversed(_STAGE_TIMING_COLUMNS):
+        op.drop_column("index_attempt", column)
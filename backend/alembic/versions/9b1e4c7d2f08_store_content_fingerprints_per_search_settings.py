@@ -0,0 +1,46 @@
+"""store content fingerprints per search settings
+
+Revision ID: 9b1e4c7d2f08
+Revises: 7d4e2b9a1c35
+Create Date: 2025-09-12 09:21:44.318207
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "9b1e4c7d2f08"
+down_revision = "7d4e2b9a1c35"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "document_content_fingerprint",
+        sa.Column("document_id", sa.String(), nullable=False),
+        sa.Column("search_settings_id", sa.Integer(), nullable=False),
+        sa.Column("content_hash", sa.String(), nullable=False),
+        sa.Column("chunk_content_hashes", postgresql.JSONB(), nullable=False),
+        sa.ForeignKeyConstraint(["document_id"], ["document.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["search_settings_id"], ["search_settings.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("document_id", "search_settings_id"),
+    )
+
+    # the fingerprints stored on the document can't be attributed to search settings,
+    # documents are fully re-indexed once instead
+    op.drop_column("document", "chunk_content_hashes")
+    op.drop_column("document", "content_hash")
+
+
+def downgrade() -> None:
+    op.add_column("document", sa.Column("content_hash", sa.String(), nullable=True))
+    op.add_column(
+        "document",
+        sa.Column("chunk_content_hashes", postgresql.JSONB(), nullable=True),
+    )
+    op.drop_table("document_content_fingerprint")
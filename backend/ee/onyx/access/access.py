@@ -9,6 +9,7 @@ from onyx.access.access import (
     _get_access_for_documents as get_access_for_documents_without_groups,
 )
 from onyx.access.access import _get_acl_for_user as get_acl_for_user_without_groups
+from onyx.access.access import get_null_document_access
 from onyx.access.models import DocumentAccess
 from onyx.access.utils import prefix_external_group
 from onyx.access.utils import prefix_user_group
@@ -21,23 +22,6 @@ from onyx.utils.logger import setup_logger
 logger = setup_logger()
 
 
-def _get_access_for_document(
-    document_id: str,
-    db_session: Session,
-) -> DocumentAccess:
-    id_to_access = _get_access_for_documents([document_id], db_session)
-    if len(id_to_access) == 0:
-        return DocumentAccess.build(
-            user_emails=[],
-            user_groups=[],
-            external_user_emails=[],
-            external_user_group_ids=[],
-            is_public=False,
-        )
-
-    return next(iter(id_to_access.values()))
-
-
 def _get_access_for_documents(
     document_ids: list[str],
     db_session: Session,
@@ -67,12 +51,18 @@ def _get_access_for_documents(
 
     all_public_ext_u_group_ids = set(fetch_public_external_group_ids(db_session))
 
-    access_map = {}
+    access_map: dict[str, DocumentAccess] = {}
     for document_id, non_ee_access in non_ee_access_dict.items():
-        document = doc_id_map[document_id]
+        document = doc_id_map.get(document_id)
+        if document is None:
+            # not indexed yet, the non EE access is already the least permissive one
+            access_map[document_id] = non_ee_access
+            continue
+
         source = doc_id_to_source_map.get(document_id)
         if source is None:
             logger.error(f"Document {document_id} has no source")
+            access_map[document_id] = get_null_document_access()
             continue
 
         perm_sync_config = get_source_perm_sync_config(source)
@@ -1,5 +1,3 @@
-from typing import cast
-
 from redis import Redis
 from sqlalchemy.orm import Session
 
@@ -41,7 +39,7 @@ def monitor_usergroup_taskset(
     if initial_count is None:
         return
 
-    count = cast(int, r.scard(rug.taskset_key))
+    count = rug.get_remaining()
     task_logger.info(
         f"User group sync progress: usergroup_id={usergroup_id} remaining={count} initial={initial_count}"
     )
@@ -30,6 +30,7 @@ from onyx.db.models import UserGroup
 from onyx.db.models import UserGroup__ConnectorCredentialPair
 from onyx.db.models import UserRole
 from onyx.db.users import fetch_user_by_id
+from onyx.llm.provider_cache import invalidate_llm_provider_cache
 from onyx.utils.logger import setup_logger
 
 logger = setup_logger()
@@ -701,6 +702,8 @@ def prepare_user_group_for_deletion(db_session: Session, user_group_id: int) ->
     db_user_group.is_up_to_date = False
     db_user_group.is_up_for_deletion = True
     db_session.commit()
+    # the group is no longer part of the groups of the LLM providers
+    invalidate_llm_provider_cache()
 
 
 def delete_user_group(db_session: Session, user_group: UserGroup) -> None:
@@ -24,6 +24,7 @@ from onyx.db.llm import update_default_provider
 from onyx.db.llm import upsert_llm_provider
 from onyx.db.models import Tool
 from onyx.db.persona import upsert_persona
+from onyx.llm.provider_cache import invalidate_llm_provider_cache
 from onyx.server.features.persona.models import PersonaUpsertRequest
 from onyx.server.manage.llm.models import LLMProviderUpsertRequest
 from onyx.server.settings.models import Settings
@@ -126,6 +127,7 @@ def _seed_llms(
         update_default_provider(
             provider_id=seeded_providers[0].id, db_session=db_session
         )
+        invalidate_llm_provider_cache()
 
 
 def _seed_personas(db_session: Session, personas: list[PersonaUpsertRequest]) -> None:
@@ -43,6 +43,7 @@ from onyx.llm.llm_provider_options import ANTHROPIC_VISIBLE_MODEL_NAMES
 from onyx.llm.llm_provider_options import OPEN_AI_MODEL_NAMES
 from onyx.llm.llm_provider_options import OPEN_AI_VISIBLE_MODEL_NAMES
 from onyx.llm.llm_provider_options import OPENAI_PROVIDER_NAME
+from onyx.llm.provider_cache import invalidate_llm_provider_cache
 from onyx.server.manage.embedding.models import CloudEmbeddingProviderCreationRequest
 from onyx.server.manage.llm.models import LLMProviderUpsertRequest
 from onyx.server.manage.llm.models import ModelConfigurationUpsertRequest
@@ -285,6 +286,7 @@ def configure_default_api_keys(db_session: Session) -> None:
         try:
             full_provider = upsert_llm_provider(anthropic_provider, db_session)
             update_default_provider(full_provider.id, db_session)
+            invalidate_llm_provider_cache()
         except Exception as e:
             logger.error(f"Failed to configure Anthropic provider: {e}")
     else:
@@ -312,6 +314,7 @@ def configure_default_api_keys(db_session: Session) -> None:
         try:
             full_provider = upsert_llm_provider(openai_provider, db_session)
             update_default_provider(full_provider.id, db_session)
+            invalidate_llm_provider_cache()
         except Exception as e:
             logger.error(f"Failed to configure OpenAI provider: {e}")
     else:
@@ -1,5 +1,7 @@
 import asyncio
 import time
+from collections.abc import Callable
+from functools import partial
 from typing import Any
 from typing import Optional
 
@@ -10,8 +12,14 @@ from litellm.exceptions import RateLimitError
 from sentence_transformers import CrossEncoder  # type: ignore
 from sentence_transformers import SentenceTransformer  # type: ignore
 
+from model_server.onnx_backend import get_inference_backend
+from model_server.onnx_backend import InferenceBackend
+from model_server.onnx_backend import load_onnx_model
 from model_server.utils import simple_log_function_time
 from onyx.utils.logger import setup_logger
+from shared_configs.configs import EMBEDDING_LENGTH_BUCKET_TOKEN_BUDGET
+from shared_configs.configs import EMBEDDING_MICRO_BATCH_MAX_TEXTS
+from shared_configs.configs import EMBEDDING_MICRO_BATCH_WINDOW_MS
 from shared_configs.configs import INDEXING_ONLY
 from shared_configs.enums import EmbedTextType
 from shared_configs.model_server_models import Embedding
@@ -42,15 +50,24 @@ def get_embedding_model(
     global _GLOBAL_MODELS_DICT  # A dictionary to store models
 
     if model_name not in _GLOBAL_MODELS_DICT:
-        logger.notice(f"Loading {model_name}")
+        backend = get_inference_backend(model_name)
+        logger.notice(f"Loading {model_name} with the {backend.value} backend")
         # Some model architectures that aren't built into the Transformers or Sentence
         # Transformer need to be downloaded to be loaded locally. This does not mean
         # data is sent to remote servers for inference, however the remote code can
         # be fairly arbitrary so only use trusted models
-        model = SentenceTransformer(
-            model_name_or_path=model_name,
-            trust_remote_code=True,
-        )
+        if backend == InferenceBackend.TORCH:
+            model = SentenceTransformer(
+                model_name_or_path=model_name,
+                trust_remote_code=True,
+            )
+        else:
+            model = load_onnx_model(
+                SentenceTransformer,
+                model_name,
+                quantize=backend == InferenceBackend.ONNX_INT8,
+                trust_remote_code=True,
+            )
         model.max_seq_length = max_context_length
         _GLOBAL_MODELS_DICT[model_name] = model
     elif max_context_length != _GLOBAL_MODELS_DICT[model_name].max_seq_length:
@@ -64,8 +81,16 @@ def get_local_reranking_model(
 ) -> CrossEncoder:
     global _RERANK_MODEL
     if _RERANK_MODEL is None:
-        logger.notice(f"Loading {model_name}")
-        model = CrossEncoder(model_name)
+        backend = get_inference_backend(model_name)
+        logger.notice(f"Loading {model_name} with the {backend.value} backend")
+        if backend == InferenceBackend.TORCH:
+            model = CrossEncoder(model_name)
+        else:
+            model = load_onnx_model(
+                CrossEncoder,
+                model_name,
+                quantize=backend == InferenceBackend.ONNX_INT8,
+            )
         _RERANK_MODEL = model
     return _RERANK_MODEL
 
@@ -74,13 +99,22 @@ ENCODING_RETRIES = 3
 ENCODING_RETRY_DELAY = 0.1
 
 
-def _concurrent_embedding(
-    texts: list[str], model: "SentenceTransformer", normalize_embeddings: bool
+# Upper bounds (in tokens) of the length buckets, texts longer than the last bound share
+# a final bucket bounded by the max sequence length of the model
+_LENGTH_BUCKET_BOUNDS = (32, 64, 128, 256)
+
+
+def _encode_with_retries(
+    texts: list[str],
+    model: "SentenceTransformer",
+    normalize_embeddings: bool,
+    **encode_kwargs: Any,
 ) -> Any:
-    """Synchronous wrapper for concurrent_embedding to use with run_in_executor."""
     for _ in range(ENCODING_RETRIES):
         try:
-            return model.encode(texts, normalize_embeddings=normalize_embeddings)
+            return model.encode(
+                texts, normalize_embeddings=normalize_embeddings, **encode_kwargs
+            )
         except RuntimeError as e:
             # There is a concurrency bug in the SentenceTransformer library that causes
             # the model to fail to encode texts. It's pretty rare and we want to allow
@@ -88,7 +122,142 @@ def _concurrent_embedding(
             # "RuntimeError: Already borrowed" and occurs in the transformers library)
             logger.error(f"Error encoding texts, retrying: {e}")
             time.sleep(ENCODING_RETRY_DELAY)
-    return model.encode(texts, normalize_embeddings=normalize_embeddings)
+    return model.encode(
+        texts, normalize_embeddings=normalize_embeddings, **encode_kwargs
+    )
+
+
+def _bucket_by_token_length(
+    texts: list[str], model: "SentenceTransformer"
+) -> dict[int, list[int]]:
+    """Groups the indices of the texts by the upper bound of their token length
+    bucket."""
+    max_seq_length = model.max_seq_length
+    token_lengths = [
+        len(input_ids)
+        for input_ids in model.tokenizer(
+            texts, truncation=True, max_length=max_seq_length
+        )["input_ids"]
+    ]
+
+    buckets: dict[int, list[int]] = {}
+    for idx, token_length in enumerate(token_lengths):
+        bound = next(
+            (bound for bound in _LENGTH_BUCKET_BOUNDS if token_length <= bound),
+            max_seq_length,
+        )
+        buckets.setdefault(min(bound, max_seq_length), []).append(idx)
+    return buckets
+
+
+def _concurrent_embedding(
+    texts: list[str], model: "SentenceTransformer", normalize_embeddings: bool
+) -> Any:
+    """Synchronous wrapper for concurrent_embedding to use with run_in_executor.
+
+    With length bucketing enabled, texts of similar token length are encoded together
+    with a batch size that fits the token budget and the embeddings are put back in
+    the original order."""
+    if EMBEDDING_LENGTH_BUCKET_TOKEN_BUDGET <= 0 or len(texts) <= 1:
+        return _encode_with_retries(texts, model, normalize_embeddings)
+
+    embeddings: list[Any] = [None] * len(texts)
+    for bound, indices in sorted(_bucket_by_token_length(texts, model).items()):
+        bucket_embeddings = _encode_with_retries(
+            [texts[idx] for idx in indices],
+            model,
+            normalize_embeddings,
+            batch_size=max(1, EMBEDDING_LENGTH_BUCKET_TOKEN_BUDGET // bound),
+        )
+        for idx, embedding in zip(indices, bucket_embeddings):
+            embeddings[idx] = embedding
+    return embeddings
+
+
+class _PendingEmbeddingBatch:
+    def __init__(self) -> None:
+        self.requests: list[tuple[list[str], asyncio.Future[list[Any]]]] = []
+        self.num_texts = 0
+        self.full = asyncio.Event()
+
+
+class EmbeddingMicroBatcher:
+    """Merges small concurrent embedding requests with the same key (model and
+    settings) into a single forward pass. The first request of a batch waits for up
+    to window_seconds (or until max_texts texts are pending) before the batch runs."""
+
+    def __init__(self, window_seconds: float, max_texts: int) -> None:
+        self.window_seconds = window_seconds
+        self.max_texts = max_texts
+        self._pending: dict[tuple, _PendingEmbeddingBatch] = {}
+        # keeps the batch tasks referenced until they are done
+        self._tasks: set[asyncio.Task] = set()
+
+    async def embed(
+        self,
+        key: tuple,
+        texts: list[str],
+        encode: Callable[[list[str]], Any],
+    ) -> list[Any]:
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingEmbeddingBatch()
+            task = asyncio.create_task(self._run_batch(key, batch, encode))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        future: asyncio.Future[list[Any]] = asyncio.get_running_loop().create_future()
+        batch.requests.append((texts, future))
+        batch.num_texts += len(texts)
+        if batch.num_texts >= self.max_texts:
+            # later requests start a new batch
+            self._pending.pop(key, None)
+            batch.full.set()
+
+        return await future
+
+    async def _run_batch(
+        self,
+        key: tuple,
+        batch: _PendingEmbeddingBatch,
+        encode: Callable[[list[str]], Any],
+    ) -> None:
+        try:
+            await asyncio.wait_for(batch.full.wait(), timeout=self.window_seconds)
+        except asyncio.TimeoutError:
+            pass
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+
+        texts = [text for request_texts, _ in batch.requests for text in request_texts]
+        try:
+            embeddings = await asyncio.get_running_loop().run_in_executor(
+                None, encode, texts
+            )
+        except Exception as e:
+            for _, future in batch.requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.debug(
+            f"Embedded {len(texts)} texts from {len(batch.requests)} merged requests"
+        )
+        start = 0
+        for request_texts, future in batch.requests:
+            if not future.done():
+                future.set_result(list(embeddings[start : start + len(request_texts)]))
+            start += len(request_texts)
+
+
+_MICRO_BATCHER: EmbeddingMicroBatcher | None = (
+    EmbeddingMicroBatcher(
+        window_seconds=EMBEDDING_MICRO_BATCH_WINDOW_MS / 1000,
+        max_texts=EMBEDDING_MICRO_BATCH_MAX_TEXTS,
+    )
+    if EMBEDDING_MICRO_BATCH_WINDOW_MS > 0
+    else None
+)
 
 
 @simple_log_function_time()
@@ -127,13 +296,25 @@ async def embed_text(
         local_model = get_embedding_model(
             model_name=model_name, max_context_length=max_context_length
         )
-        # Run CPU-bound embedding in a thread pool
-        embeddings_vectors = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: _concurrent_embedding(
-                prefixed_texts, local_model, normalize_embeddings
-            ),
+        encode = partial(
+            _concurrent_embedding,
+            model=local_model,
+            normalize_embeddings=normalize_embeddings,
         )
+        if (
+            _MICRO_BATCHER is not None
+            and len(prefixed_texts) < _MICRO_BATCHER.max_texts
+        ):
+            embeddings_vectors = await _MICRO_BATCHER.embed(
+                key=(model_name, max_context_length, normalize_embeddings),
+                texts=prefixed_texts,
+                encode=encode,
+            )
+        else:
+            # Run CPU-bound embedding in a thread pool
+            embeddings_vectors = await asyncio.get_event_loop().run_in_executor(
+                None, lambda: encode(prefixed_texts)
+            )
         embeddings = [
             embedding if isinstance(embedding, list) else embedding.tolist()
             for embedding in embeddings_vectors
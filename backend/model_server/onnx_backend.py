@@ -0,0 +1,103 @@
+from enum import Enum
+from pathlib import Path
+from typing import Any
+from typing import TYPE_CHECKING
+from typing import TypeVar
+
+from onyx.utils.logger import setup_logger
+from shared_configs.configs import MODEL_SERVER_DEFAULT_INFERENCE_BACKEND
+from shared_configs.configs import MODEL_SERVER_INFERENCE_BACKENDS
+from shared_configs.configs import ONNX_MODEL_CACHE_DIR
+from shared_configs.configs import ONNX_NUM_THREADS
+from shared_configs.configs import ONNX_QUANTIZATION_CONFIG
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder  # type: ignore
+    from sentence_transformers import SentenceTransformer  # type: ignore
+
+logger = setup_logger()
+
+ModelT = TypeVar("ModelT", "SentenceTransformer", "CrossEncoder")
+
+
+class InferenceBackend(str, Enum):
+    TORCH = "torch"
+    ONNX = "onnx"
+    # ONNX with dynamic int8 quantization of the weights
+    ONNX_INT8 = "onnx-int8"
+
+
+def parse_inference_backends(backends: str) -> dict[str, InferenceBackend]:
+    """Parses a comma separated list of <model name>=<backend> entries."""
+    model_to_backend: dict[str, InferenceBackend] = {}
+    for entry in backends.split(","):
+        if not entry.strip():
+            continue
+        model_name, _, backend = entry.rpartition("=")
+        model_to_backend[model_name.strip()] = InferenceBackend(backend.strip())
+    return model_to_backend
+
+
+_MODEL_TO_INFERENCE_BACKEND = parse_inference_backends(MODEL_SERVER_INFERENCE_BACKENDS)
+_DEFAULT_INFERENCE_BACKEND = InferenceBackend(MODEL_SERVER_DEFAULT_INFERENCE_BACKEND)
+
+
+def get_inference_backend(model_name: str) -> InferenceBackend:
+    return _MODEL_TO_INFERENCE_BACKEND.get(model_name, _DEFAULT_INFERENCE_BACKEND)
+
+
+def _build_onnx_model_kwargs(file_name: str) -> dict[str, Any]:
+    import onnxruntime as ort  # type: ignore
+
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if ONNX_NUM_THREADS > 0:
+        session_options.intra_op_num_threads = ONNX_NUM_THREADS
+
+    return {
+        "file_name": file_name,
+        "provider": "CPUExecutionProvider",
+        "session_options": session_options,
+    }
+
+
+def load_onnx_model(
+    model_cls: type[ModelT],
+    model_name: str,
+    quantize: bool = False,
+    **kwargs: Any,
+) -> ModelT:
+    """Loads a SentenceTransformer or CrossEncoder through ONNX Runtime. The first
+    load exports the model to ONNX (and quantizes it if requested) into
+    ONNX_MODEL_CACHE_DIR, later loads reuse the exported model."""
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    export_dir = (
+        Path(ONNX_MODEL_CACHE_DIR) / model_cls.__name__ / model_name.replace("/", "__")
+    )
+    file_name = (
+        f"onnx/model_qint8_{ONNX_QUANTIZATION_CONFIG}.onnx"
+        if quantize
+        else "onnx/model.onnx"
+    )
+
+    if not (export_dir / file_name).exists():
+        quantization = (
+            f" with {ONNX_QUANTIZATION_CONFIG} int8 quantization" if quantize else ""
+        )
+        logger.notice(f"Exporting {model_name} to ONNX{quantization}")
+        model = model_cls(model_name, backend="onnx", **kwargs)
+        model.save_pretrained(str(export_dir))
+        if quantize:
+            export_dynamic_quantized_onnx_model(
+                model,
+                quantization_config=ONNX_QUANTIZATION_CONFIG,
+                model_name_or_path=str(export_dir),
+            )
+
+    return model_cls(
+        str(export_dir),
+        backend="onnx",
+        model_kwargs=_build_onnx_model_kwargs(file_name),
+        **kwargs,
+    )
@@ -36,21 +36,20 @@ def document_batch_to_ids(
         yield {doc.id for doc in doc_list}
 
 
-def extract_ids_from_runnable_connector(
+def iterate_ids_from_runnable_connector(
     runnable_connector: BaseConnector,
     callback: IndexingHeartbeatInterface | None = None,
-) -> set[str]:
+) -> Generator[set[str], None, None]:
     """
+    Yields the document IDs of the source in batches, as they are retrieved.
     If the SlimConnector hasnt been implemented for the given connector, just pull
     all docs using the load_from_state and grab out the IDs.
 
     Optionally, a callback can be passed to handle the length of each document batch.
     """
-    all_connector_doc_ids: set[str] = set()
-
     if isinstance(runnable_connector, SlimConnector):
         for metadata_batch in runnable_connector.retrieve_all_slim_documents():
-            all_connector_doc_ids.update({doc.id for doc in metadata_batch})
+            yield {doc.id for doc in metadata_batch}
 
     doc_batch_id_generator = None
 
@@ -92,11 +91,23 @@ def extract_ids_from_runnable_connector(
                     "extract_ids_from_runnable_connector: Stop signal detected"
                 )
 
-        all_connector_doc_ids.update(doc_batch_processing_func(doc_batch_ids))
+        yield doc_batch_processing_func(doc_batch_ids)
 
         if callback:
             callback.progress("extract_ids_from_runnable_connector", len(doc_batch_ids))
 
+
+def extract_ids_from_runnable_connector(
+    runnable_connector: BaseConnector,
+    callback: IndexingHeartbeatInterface | None = None,
+) -> set[str]:
+    """Returns all document IDs of the source, see iterate_ids_from_runnable_connector."""
+    all_connector_doc_ids: set[str] = set()
+    for doc_batch_ids in iterate_ids_from_runnable_connector(
+        runnable_connector, callback
+    ):
+        all_connector_doc_ids.update(doc_batch_ids)
+
     return all_connector_doc_ids
 
 
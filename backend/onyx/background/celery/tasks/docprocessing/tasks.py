@@ -37,9 +37,14 @@ from onyx.background.indexing.checkpointing_utils import (
 )
 from onyx.background.indexing.index_attempt_utils import cleanup_index_attempts
 from onyx.background.indexing.index_attempt_utils import get_old_index_attempts
+from onyx.configs.app_configs import DOCPROCESSING_PIPELINE_SUB_BATCH_SIZE
 from onyx.configs.app_configs import MANAGED_VESPA
+from onyx.configs.app_configs import REPROJECT_EMBEDDINGS_BATCH_SIZE
+from onyx.configs.app_configs import REPROJECT_EMBEDDINGS_FOR_INDEX_SWAPS
+from onyx.configs.app_configs import REPROJECT_EMBEDDINGS_SOFT_TIME_LIMIT
 from onyx.configs.app_configs import VESPA_CLOUD_CERT_PATH
 from onyx.configs.app_configs import VESPA_CLOUD_KEY_PATH
+from onyx.configs.app_configs import VESPA_STREAMING_FEED_FOR_BACKFILLS
 from onyx.configs.constants import CELERY_GENERIC_BEAT_LOCK_TIMEOUT
 from onyx.configs.constants import CELERY_INDEXING_LOCK_TIMEOUT
 from onyx.configs.constants import OnyxCeleryPriority
@@ -60,14 +65,19 @@ from onyx.db.connector_credential_pair import (
 )
 from onyx.db.connector_credential_pair import get_connector_credential_pair_from_id
 from onyx.db.connector_credential_pair import set_cc_pair_repeated_error_state
+from onyx.db.document import iterate_sorted_document_ids_for_connector_credential_pair
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.engine.time_utils import get_db_current_time
 from onyx.db.enums import ConnectorCredentialPairStatus
 from onyx.db.enums import IndexingMode
 from onyx.db.enums import IndexingStatus
+from onyx.db.enums import IndexModelStatus
 from onyx.db.index_attempt import create_index_attempt_error
+from onyx.db.index_attempt import create_reprojected_index_attempt
 from onyx.db.index_attempt import get_index_attempt
 from onyx.db.index_attempt import get_index_attempt_errors_for_cc_pair
+from onyx.db.index_attempt import get_last_attempt_for_cc_pair
+from onyx.db.index_attempt import get_last_successful_attempt_for_cc_pair
 from onyx.db.index_attempt import IndexAttemptError
 from onyx.db.index_attempt import mark_attempt_canceled
 from onyx.db.index_attempt import mark_attempt_failed
@@ -82,11 +92,14 @@ from onyx.db.search_settings import get_current_search_settings
 from onyx.db.search_settings import get_secondary_search_settings
 from onyx.db.swap_index import check_and_perform_index_swap
 from onyx.document_index.factory import get_default_document_index
+from onyx.document_index.vespa.reprojection import can_reproject_embeddings
+from onyx.document_index.vespa.reprojection import reproject_documents
 from onyx.file_store.document_batch_storage import DocumentBatchStorage
 from onyx.file_store.document_batch_storage import get_document_batch_storage
 from onyx.httpx.httpx_pool import HttpxPool
 from onyx.indexing.embedder import DefaultIndexingEmbedder
 from onyx.indexing.indexing_pipeline import run_indexing_pipeline
+from onyx.indexing.pipelined_indexing import run_pipelined_indexing_pipeline
 from onyx.natural_language_processing.search_nlp_models import EmbeddingModel
 from onyx.natural_language_processing.search_nlp_models import (
     InformationContentClassificationModel,
@@ -99,6 +112,7 @@ from onyx.redis.redis_pool import redis_lock_dump
 from onyx.redis.redis_pool import SCAN_ITER_COUNT_DEFAULT
 from onyx.redis.redis_utils import is_fence
 from onyx.server.runtime.onyx_runtime import OnyxRuntime
+from onyx.utils.batching import batch_generator
 from onyx.utils.logger import setup_logger
 from onyx.utils.middleware import make_randomized_onyx_request_id
 from onyx.utils.telemetry import optional_telemetry
@@ -701,6 +715,112 @@ def _kickoff_indexing_tasks(
     return tasks_created
 
 
+def _reprojection_lock_name(cc_pair_id: int, search_settings_id: int) -> str:
+    return (
+        f"{OnyxRedisLocks.REPROJECT_EMBEDDINGS_LOCK_PREFIX}"
+        f"_{cc_pair_id}_{search_settings_id}"
+    )
+
+
+def _reprojection_queued_key(cc_pair_id: int, search_settings_id: int) -> str:
+    return (
+        f"{OnyxRedisLocks.REPROJECT_EMBEDDINGS_QUEUED_PREFIX}"
+        f"_{cc_pair_id}_{search_settings_id}"
+    )
+
+
+def _reprojection_failed_key(cc_pair_id: int, search_settings_id: int) -> str:
+    return (
+        f"{OnyxRedisLocks.REPROJECT_EMBEDDINGS_FAILED_PREFIX}"
+        f"_{cc_pair_id}_{search_settings_id}"
+    )
+
+
+# long enough to outlive the regular reindex of the cc pair that replaces it
+REPROJECT_EMBEDDINGS_FAILED_TTL = 7 * 24 * 60 * 60
+
+
+def _kickoff_reprojection_tasks(
+    celery_app: Celery,
+    db_session: Session,
+    current_search_settings: SearchSettings,
+    secondary_search_settings: SearchSettings,
+    cc_pair_ids: list[int],
+    redis_client: Redis,
+    lock_beat: RedisLock,
+    tenant_id: str,
+) -> tuple[int, list[int]]:
+    """Kick off tasks building the secondary index of the cc pairs out of the embeddings
+    in the current index (see can_reproject_embeddings).
+
+    Returns the number of tasks created and the cc pairs that have nothing to copy in
+    the current index yet or whose reprojection failed, these need to be indexed the
+    regular way.
+    """
+    tasks_created = 0
+    cc_pair_ids_to_index: list[int] = []
+
+    for cc_pair_id in cc_pair_ids:
+        lock_beat.reacquire()
+
+        if active_indexing_attempt(
+            cc_pair_id=cc_pair_id,
+            search_settings_id=secondary_search_settings.id,
+            db_session=db_session,
+        ):
+            # a regular attempt was started before, let it finish
+            cc_pair_ids_to_index.append(cc_pair_id)
+            continue
+
+        last_attempt = get_last_attempt_for_cc_pair(
+            cc_pair_id=cc_pair_id,
+            search_settings_id=secondary_search_settings.id,
+            db_session=db_session,
+        )
+        if last_attempt and last_attempt.status == IndexingStatus.SUCCESS:
+            continue
+
+        if redis_client.exists(
+            _reprojection_failed_key(cc_pair_id, secondary_search_settings.id)
+        ):
+            cc_pair_ids_to_index.append(cc_pair_id)
+            continue
+
+        if not get_last_successful_attempt_for_cc_pair(
+            cc_pair_id=cc_pair_id,
+            search_settings_id=current_search_settings.id,
+            db_session=db_session,
+        ):
+            cc_pair_ids_to_index.append(cc_pair_id)
+            continue
+
+        queued_key = _reprojection_queued_key(cc_pair_id, secondary_search_settings.id)
+        if redis_client.exists(queued_key) or redis_client.exists(
+            _reprojection_lock_name(cc_pair_id, secondary_search_settings.id)
+        ):
+            continue
+
+        redis_client.set(queued_key, 1, ex=CELERY_INDEXING_LOCK_TIMEOUT)
+        celery_app.send_task(
+            OnyxCeleryTask.REPROJECT_EMBEDDINGS_TASK,
+            kwargs=dict(
+                cc_pair_id=cc_pair_id,
+                search_settings_id=secondary_search_settings.id,
+                tenant_id=tenant_id,
+            ),
+            queue=OnyxCeleryQueues.DOCPROCESSING,
+            priority=OnyxCeleryPriority.MEDIUM,
+        )
+        task_logger.info(
+            f"Embedding reprojection queued: "
+            f"cc_pair={cc_pair_id} "
+            f"search_settings={secondary_search_settings.id}"
+        )
+        tasks_created += 1
+
+    return tasks_created, cc_pair_ids_to_index
+
+
 @shared_task(
     name=OnyxCeleryTask.CHECK_FOR_INDEXING,
     soft_time_limit=300,
@@ -860,6 +980,25 @@ def check_for_indexing(self: Task, *, tenant_id: str) -> int | None:
                 and secondary_search_settings.background_reindex_enabled
                 and secondary_cc_pair_ids
             ):
+                # if only the storage of the embeddings changes, the secondary index
+                # is built out of the current one instead of re-embedding everything
+                if REPROJECT_EMBEDDINGS_FOR_INDEX_SWAPS and can_reproject_embeddings(
+                    current_search_settings, secondary_search_settings
+                ):
+                    reprojection_tasks_created, secondary_cc_pair_ids = (
+                        _kickoff_reprojection_tasks(
+                            celery_app=self.app,
+                            db_session=db_session,
+                            current_search_settings=current_search_settings,
+                            secondary_search_settings=secondary_search_settings,
+                            cc_pair_ids=secondary_cc_pair_ids,
+                            redis_client=redis_client,
+                            lock_beat=lock_beat,
+                            tenant_id=tenant_id,
+                        )
+                    )
+                    tasks_created += reprojection_tasks_created
+
                 tasks_created += _kickoff_indexing_tasks(
                     celery_app=self.app,
                     db_session=db_session,
@@ -1348,10 +1487,17 @@ def _docprocessing_task(
                 InformationContentClassificationModel()
             )
 
+            # backfills of upcoming search settings and full reindexes write every
+            # chunk of the connector, these go through the streaming feed
+            is_backfill = (
+                index_attempt.search_settings.status == IndexModelStatus.FUTURE
+                or bool(index_attempt.from_beginning)
+            )
             document_index = get_default_document_index(
                 index_attempt.search_settings,
                 None,
                 httpx_client=HttpxPool.get("vespa"),
+                streaming_feed=VESPA_STREAMING_FEED_FOR_BACKFILLS and is_backfill,
             )
 
             # Set up metadata for this batch
@@ -1360,6 +1506,7 @@ def _docprocessing_task(
                 connector_id=index_attempt.connector_credential_pair.connector.id,
                 credential_id=index_attempt.connector_credential_pair.credential.id,
                 request_id=make_randomized_onyx_request_id("DIP"),
+                search_settings_id=index_attempt.search_settings.id,
                 structured_id=f"{tenant_id}:{cc_pair_id}:{index_attempt_id}:{batch_num}",
                 batch_num=batch_num,
             )
@@ -1370,16 +1517,30 @@ def _docprocessing_task(
             )
 
             # real work happens here!
-            index_pipeline_result = run_indexing_pipeline(
-                embedder=embedding_model,
-                information_content_classification_model=information_content_classification_model,
-                document_index=document_index,
-                ignore_time_skip=True,  # Documents are already filtered during extraction
-                db_session=db_session,
-                tenant_id=tenant_id,
-                document_batch=documents,
-                index_attempt_metadata=index_attempt_metadata,
-            )
+            if 0 < DOCPROCESSING_PIPELINE_SUB_BATCH_SIZE < len(documents):
+                # chunking, embedding and writing of sub-batches overlap
+                index_pipeline_result = run_pipelined_indexing_pipeline(
+                    embedder=embedding_model,
+                    information_content_classification_model=information_content_classification_model,
+                    document_index=document_index,
+                    ignore_time_skip=True,  # Documents are already filtered during extraction
+                    db_session=db_session,
+                    tenant_id=tenant_id,
+                    document_batch=documents,
+                    index_attempt_metadata=index_attempt_metadata,
+                    sub_batch_size=DOCPROCESSING_PIPELINE_SUB_BATCH_SIZE,
+                )
+            else:
+                index_pipeline_result = run_indexing_pipeline(
+                    embedder=embedding_model,
+                    information_content_classification_model=information_content_classification_model,
+                    document_index=document_index,
+                    ignore_time_skip=True,  # Documents are already filtered during extraction
+                    db_session=db_session,
+                    tenant_id=tenant_id,
+                    document_batch=documents,
+                    index_attempt_metadata=index_attempt_metadata,
+                )
 
         # Update batch completion and document counts atomically using database coordination
 
@@ -1390,6 +1551,12 @@ def _docprocessing_task(
                 total_docs_indexed=index_pipeline_result.total_docs,
                 new_docs_indexed=index_pipeline_result.new_docs,
                 total_chunks=index_pipeline_result.total_chunks,
+                embedding_cache_hits=index_pipeline_result.embedding_cache_hits,
+                embedding_cache_misses=index_pipeline_result.embedding_cache_misses,
+                chunking_seconds=index_pipeline_result.chunking_seconds,
+                embedding_seconds=index_pipeline_result.embedding_seconds,
+                vector_db_write_seconds=index_pipeline_result.vector_db_write_seconds,
+                docprocessing_seconds=index_pipeline_result.total_seconds,
             )
 
             _resolve_indexing_document_errors(
@@ -1455,6 +1622,12 @@ def _docprocessing_task(
             f"docs={len(documents)} "
             f"chunks={index_pipeline_result.total_chunks} "
             f"failures={len(index_pipeline_result.failures)} "
+            f"embedding_cache_hits={index_pipeline_result.embedding_cache_hits} "
+            f"embedding_cache_misses={index_pipeline_result.embedding_cache_misses} "
+            f"chunking={index_pipeline_result.chunking_seconds:.2f}s "
+            f"embedding={index_pipeline_result.embedding_seconds:.2f}s "
+            f"vector_db_write={index_pipeline_result.vector_db_write_seconds:.2f}s "
+            f"pipeline={index_pipeline_result.total_seconds:.2f}s "
             f"elapsed={elapsed_time:.2f}s"
         )
 
@@ -1469,3 +1642,142 @@ def _docprocessing_task(
     finally:
         if per_batch_lock and per_batch_lock.owned():
             per_batch_lock.release()
+
+
+@shared_task(
+    name=OnyxCeleryTask.REPROJECT_EMBEDDINGS_TASK,
+    soft_time_limit=REPROJECT_EMBEDDINGS_SOFT_TIME_LIMIT,
+    bind=True,
+)
+def reproject_embeddings_task(
+    self: Task,
+    *,
+    cc_pair_id: int,
+    search_settings_id: int,
+    tenant_id: str,
+) -> None:
+    """Builds the secondary index for a cc pair out of the embeddings in the current
+    index, without chunking or embedding anything (see can_reproject_embeddings).
+
+    On success an index attempt is recorded for the secondary search settings, so the
+    swap happens through check_and_perform_index_swap like for a regular reindex.
+    Documents changed after the copied index attempt are picked up by the attempts
+    that follow it. If the reprojection fails or runs out of time, the cc pair is
+    indexed the regular way instead.
+    """
+    start = time.monotonic()
+
+    redis_client = get_redis_client()
+    lock: RedisLock = redis_client.lock(
+        _reprojection_lock_name(cc_pair_id, search_settings_id),
+        timeout=CELERY_INDEXING_LOCK_TIMEOUT,
+    )
+    if not lock.acquire(blocking=False):
+        return
+
+    num_docs = 0
+    num_chunks = 0
+    try:
+        with get_session_with_current_tenant() as db_session:
+            cc_pair = get_connector_credential_pair_from_id(db_session, cc_pair_id)
+            current_search_settings = get_current_search_settings(db_session)
+            secondary_search_settings = get_secondary_search_settings(db_session)
+            if (
+                not cc_pair
+                or not secondary_search_settings
+                or secondary_search_settings.id != search_settings_id
+                or not can_reproject_embeddings(
+                    current_search_settings, secondary_search_settings
+                )
+            ):
+                task_logger.info(
+                    f"Skipping embedding reprojection, the search settings changed: "
+                    f"cc_pair={cc_pair_id} "
+                    f"search_settings={search_settings_id}"
+                )
+                return
+
+            # everything indexed into the current index up to this attempt is copied
+            source_attempt = get_last_successful_attempt_for_cc_pair(
+                cc_pair_id=cc_pair_id,
+                search_settings_id=current_search_settings.id,
+                db_session=db_session,
+            )
+            if not source_attempt:
+                return
+
+            poll_range_start = source_attempt.poll_range_start
+            poll_range_end = source_attempt.poll_range_end
+            time_started = get_db_current_time(db_session)
+            source_index_name = current_search_settings.index_name
+            target_index_name = secondary_search_settings.index_name
+            dim = secondary_search_settings.final_embedding_dim
+            connector_id = cc_pair.connector_id
+            credential_id = cc_pair.credential_id
+
+        with get_session_with_current_tenant() as db_session:
+            for document_ids in batch_generator(
+                iterate_sorted_document_ids_for_connector_credential_pair(
+                    db_session, connector_id, credential_id
+                ),
+                REPROJECT_EMBEDDINGS_BATCH_SIZE,
+            ):
+                lock.reacquire()
+
+                results = reproject_documents(
+                    document_ids=document_ids,
+                    source_index_name=source_index_name,
+                    target_index_name=target_index_name,
+                    dim=dim,
+                    tenant_id=tenant_id,
+                )
+                failures = [result for result in results if not result.success]
+                if failures:
+                    raise RuntimeError(
+                        f"Failed to write {len(failures)} reprojected chunks to "
+                        f"{target_index_name}, e.g. document={failures[0].document_id} "
+                        f"status={failures[0].status_code} error={failures[0].error}"
+                    )
+
+                num_docs += len(document_ids)
+                num_chunks += len(results)
+
+        with get_session_with_current_tenant() as db_session:
+            attempt_id = create_reprojected_index_attempt(
+                connector_credential_pair_id=cc_pair_id,
+                search_settings_id=search_settings_id,
+                poll_range_start=poll_range_start,
+                poll_range_end=poll_range_end,
+                docs_indexed=num_docs,
+                time_started=time_started,
+                db_session=db_session,
+            )
+
+        task_logger.info(
+            f"Embedding reprojection finished: "
+            f"cc_pair={cc_pair_id} "
+            f"search_settings={search_settings_id} "
+            f"index_attempt={attempt_id} "
+            f"docs={num_docs} "
+            f"chunks={num_chunks} "
+            f"elapsed={time.monotonic() - start:.2f}s"
+        )
+    except Exception as e:
+        # SoftTimeLimitExceeded included
+        task_logger.exception(
+            f"Embedding reprojection failed, falling back to regular indexing: "
+            f"cc_pair={cc_pair_id} "
+            f"search_settings={search_settings_id} "
+            f"docs={num_docs} "
+            f"timed_out={isinstance(e, SoftTimeLimitExceeded)}"
+        )
+        redis_client.set(
+            _reprojection_failed_key(cc_pair_id, search_settings_id),
+            1,
+            ex=REPROJECT_EMBEDDINGS_FAILED_TTL,
+        )
+        raise
+    finally:
+        redis_client.delete(_reprojection_queued_key(cc_pair_id, search_settings_id))
+        if lock.owned():
+            lock.release()
@@ -11,6 +11,7 @@ from onyx.configs.constants import OnyxCeleryTask
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.models import LLMProvider
 from onyx.db.models import ModelConfiguration
+from onyx.llm.provider_cache import invalidate_llm_provider_cache
 
 
 def _process_model_list_response(model_list_json: Any) -> list[str]:
@@ -134,6 +135,7 @@ def check_for_llm_model_update(self: Task, *, tenant_id: str) -> bool | None:
             )
             default_provider.fast_default_model_name = available_models[0]
         db_session.commit()
+        invalidate_llm_provider_cache()
 
         if added_models or removed_models:
             task_logger.info("Updated model list for default provider.")
@@ -1,4 +1,5 @@
 import time
+from collections.abc import Iterator
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
@@ -21,10 +22,12 @@ from onyx.background.celery.celery_redis import celery_get_queue_length
 from onyx.background.celery.celery_redis import celery_get_queued_task_ids
 from onyx.background.celery.celery_redis import celery_get_unacked_task_ids
 from onyx.background.celery.celery_utils import extract_ids_from_runnable_connector
+from onyx.background.celery.celery_utils import iterate_ids_from_runnable_connector
 from onyx.background.celery.tasks.beat_schedule import CLOUD_BEAT_MULTIPLIER_DEFAULT
 from onyx.background.celery.tasks.docprocessing.utils import IndexingCallbackBase
 from onyx.configs.app_configs import ALLOW_SIMULTANEOUS_PRUNING
 from onyx.configs.app_configs import JOB_TIMEOUT
+from onyx.configs.app_configs import PRUNING_MAX_IDS_IN_MEMORY
 from onyx.configs.constants import CELERY_GENERIC_BEAT_LOCK_TIMEOUT
 from onyx.configs.constants import CELERY_PRUNING_LOCK_TIMEOUT
 from onyx.configs.constants import CELERY_TASK_WAIT_FOR_FENCE_TIMEOUT
@@ -36,12 +39,16 @@ from onyx.configs.constants import OnyxRedisConstants
 from onyx.configs.constants import OnyxRedisLocks
 from onyx.configs.constants import OnyxRedisSignals
 from onyx.connectors.factory import instantiate_connector
+from onyx.connectors.interfaces import BaseConnector
 from onyx.connectors.models import InputType
 from onyx.db.connector import mark_ccpair_as_pruned
 from onyx.db.connector_credential_pair import get_connector_credential_pair
 from onyx.db.connector_credential_pair import get_connector_credential_pair_from_id
 from onyx.db.connector_credential_pair import get_connector_credential_pairs
 from onyx.db.document import get_documents_for_connector_credential_pair
+from onyx.db.document import (
+    iterate_sorted_document_ids_for_connector_credential_pair,
+)
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.enums import ConnectorCredentialPairStatus
 from onyx.db.enums import SyncStatus
@@ -57,6 +64,9 @@ from onyx.redis.redis_pool import get_redis_client
 from onyx.redis.redis_pool import get_redis_replica_client
 from onyx.server.runtime.onyx_runtime import OnyxRuntime
 from onyx.server.utils import make_short_id
+from onyx.utils.batching import batch_generator
+from onyx.utils.external_sort import ExternalSortedStrings
+from onyx.utils.external_sort import sorted_difference
 from onyx.utils.logger import format_error_for_logging
 from onyx.utils.logger import LoggerContextVars
 from onyx.utils.logger import pruning_ctx
@@ -65,6 +75,9 @@ from shared_configs.configs import MULTI_TENANT
 
 logger = setup_logger()
 
+# number of indexed ids diffed between progress reports in the streaming pruning diff
+PRUNING_DIFF_PROGRESS_INTERVAL = 10_000
+
 
 def _get_pruning_block_expiration() -> int:
     """
@@ -389,6 +402,149 @@ def try_creating_prune_generator_task(
     return payload_id
 
 
+def _generate_prune_tasks_in_memory(
+    runnable_connector: BaseConnector,
+    callback: PruneCallback,
+    redis_connector: RedisConnector,
+    celery_app: Celery,
+    db_session: Session,
+    cc_pair: ConnectorCredentialPair,
+) -> int | None:
+    """Diffs the source and indexed document ids as in-memory sets. Returns the number
+    of tasks generated, or None if the cc pair no longer exists."""
+    # a list of docs in the source
+    all_connector_doc_ids: set[str] = extract_ids_from_runnable_connector(
+        runnable_connector, callback
+    )
+
+    # a list of docs in our local index
+    all_indexed_document_ids = {
+        doc.id
+        for doc in get_documents_for_connector_credential_pair(
+            db_session=db_session,
+            connector_id=cc_pair.connector_id,
+            credential_id=cc_pair.credential_id,
+        )
+    }
+
+    # generate list of docs to remove (no longer in the source)
+    doc_ids_to_remove = list(all_indexed_document_ids - all_connector_doc_ids)
+
+    task_logger.info(
+        "Pruning set collected: "
+        f"cc_pair={cc_pair.id} "
+        f"connector_source={cc_pair.connector.source} "
+        f"docs_to_remove={len(doc_ids_to_remove)}"
+    )
+
+    task_logger.info(
+        f"RedisConnector.prune.generate_tasks starting. cc_pair={cc_pair.id}"
+    )
+    tasks_generated = redis_connector.prune.generate_tasks(
+        set(doc_ids_to_remove), celery_app, db_session, None
+    )
+    if tasks_generated is None:
+        return None
+
+    task_logger.info(
+        "RedisConnector.prune.generate_tasks finished. "
+        f"cc_pair={cc_pair.id} tasks_generated={tasks_generated}"
+    )
+    return tasks_generated
+
+
+def _generate_prune_tasks_streaming(
+    runnable_connector: BaseConnector,
+    callback: PruneCallback,
+    redis_connector: RedisConnector,
+    celery_app: Celery,
+    db_session: Session,
+    cc_pair: ConnectorCredentialPair,
+) -> int | None:
+    """Memory bounded version of the pruning diff. The source document ids are spilled
+    to sorted runs on disk once more than PRUNING_MAX_IDS_IN_MEMORY are collected. The
+    indexed ids are streamed from Postgres in the same order and the docs to remove are
+    found with a single merge pass, then pruned in batches of PRUNING_MAX_IDS_IN_MEMORY.
+    Returns the number of tasks generated, or None if the cc pair no longer exists."""
+    with (
+        ExternalSortedStrings(PRUNING_MAX_IDS_IN_MEMORY) as connector_doc_ids,
+        ExternalSortedStrings(PRUNING_MAX_IDS_IN_MEMORY) as doc_ids_to_remove,
+    ):
+        num_connector_doc_ids = 0
+        for doc_batch_ids in iterate_ids_from_runnable_connector(
+            runnable_connector, callback
+        ):
+            connector_doc_ids.add_many(doc_batch_ids)
+            num_connector_doc_ids += len(doc_batch_ids)
+
+        task_logger.info(
+            "Pruning source ids collected: "
+            f"cc_pair={cc_pair.id} "
+            f"source_ids={num_connector_doc_ids} "
+            f"sorted_runs={connector_doc_ids.num_runs}"
+        )
+
+        num_indexed = 0
+        num_to_remove = 0
+        indexed_doc_ids = iterate_sorted_document_ids_for_connector_credential_pair(
+            db_session=db_session,
+            connector_id=cc_pair.connector_id,
+            credential_id=cc_pair.credential_id,
+        )
+
+        def _count_indexed(doc_ids: Iterator[str]) -> Iterator[str]:
+            nonlocal num_indexed
+            for doc_id in doc_ids:
+                num_indexed += 1
+                if num_indexed % PRUNING_DIFF_PROGRESS_INTERVAL == 0:
+                    if callback.should_stop():
+                        raise RuntimeError(
+                            "_generate_prune_tasks_streaming: Stop signal detected"
+                        )
+                    callback.progress(
+                        "_generate_prune_tasks_streaming",
+                        PRUNING_DIFF_PROGRESS_INTERVAL,
+                    )
+                yield doc_id
+
+        for doc_id in sorted_difference(
+            _count_indexed(indexed_doc_ids), connector_doc_ids
+        ):
+            doc_ids_to_remove.add_many([doc_id])
+            num_to_remove += 1
+
+        task_logger.info(
+            "Pruning set collected: "
+            f"cc_pair={cc_pair.id} "
+            f"connector_source={cc_pair.connector.source} "
+            f"indexed_docs={num_indexed} "
+            f"docs_to_remove={num_to_remove}"
+        )
+
+        task_logger.info(
+            f"RedisConnector.prune.generate_tasks starting. cc_pair={cc_pair.id}"
+        )
+        tasks_generated = 0
+        for doc_id_batch in batch_generator(
+            doc_ids_to_remove, PRUNING_MAX_IDS_IN_MEMORY
+        ):
+            batch_tasks_generated = redis_connector.prune.generate_tasks(
+                set(doc_id_batch), celery_app, db_session, None
+            )
+            if batch_tasks_generated is None:
+                return None
+
+            tasks_generated += batch_tasks_generated
+            callback.progress("_generate_prune_tasks_streaming", len(doc_id_batch))
+
+        task_logger.info(
+            "RedisConnector.prune.generate_tasks finished. "
+            f"cc_pair={cc_pair.id} tasks_generated={tasks_generated}"
+        )
+
+    return tasks_generated
+
+
 @shared_task(
     name=OnyxCeleryTask.CONNECTOR_PRUNING_GENERATOR_TASK,
     acks_late=False,
@@ -525,45 +681,27 @@ def connector_pruning_generator_task(
                 r,
             )
 
-            # a list of docs in the source
-            all_connector_doc_ids: set[str] = extract_ids_from_runnable_connector(
-                runnable_connector, callback
-            )
-
-            # a list of docs in our local index
-            all_indexed_document_ids = {
-                doc.id
-                for doc in get_documents_for_connector_credential_pair(
+            if PRUNING_MAX_IDS_IN_MEMORY > 0:
+                tasks_generated = _generate_prune_tasks_streaming(
+                    runnable_connector=runnable_connector,
+                    callback=callback,
+                    redis_connector=redis_connector,
+                    celery_app=self.app,
                     db_session=db_session,
-                    connector_id=connector_id,
-                    credential_id=credential_id,
+                    cc_pair=cc_pair,
+                )
+            else:
+                tasks_generated = _generate_prune_tasks_in_memory(
+                    runnable_connector=runnable_connector,
+                    callback=callback,
+                    redis_connector=redis_connector,
+                    celery_app=self.app,
+                    db_session=db_session,
+                    cc_pair=cc_pair,
                 )
-            }
-
-            # generate list of docs to remove (no longer in the source)
-            doc_ids_to_remove = list(all_indexed_document_ids - all_connector_doc_ids)
-
-            task_logger.info(
-                "Pruning set collected: "
-                f"cc_pair={cc_pair_id} "
-                f"connector_source={cc_pair.connector.source} "
-                f"docs_to_remove={len(doc_ids_to_remove)}"
-            )
-
-            task_logger.info(
-                f"RedisConnector.prune.generate_tasks starting. cc_pair={cc_pair_id}"
-            )
-            tasks_generated = redis_connector.prune.generate_tasks(
-                set(doc_ids_to_remove), self.app, db_session, None
-            )
             if tasks_generated is None:
                 return None
 
-            task_logger.info(
-                "RedisConnector.prune.generate_tasks finished. "
-                f"cc_pair={cc_pair_id} tasks_generated={tasks_generated}"
-            )
-
             redis_connector.prune.generator_complete = tasks_generated
     except Exception as e:
         task_logger.exception(
@@ -9,7 +9,7 @@ from celery.exceptions import SoftTimeLimitExceeded
 from redis import Redis
 from tenacity import RetryError
 
-from onyx.access.access import get_access_for_document
+from onyx.access.access import get_access_for_documents
 from onyx.background.celery.apps.app_base import task_logger
 from onyx.background.celery.tasks.shared.RetryDocumentIndex import RetryDocumentIndex
 from onyx.configs.constants import ONYX_CELERY_BEAT_HEARTBEAT_KEY
@@ -142,9 +142,9 @@ def document_by_cc_pair_cleanup_task(
 
                 # the below functions do not include cc_pairs being deleted.
                 # i.e. they will correctly omit access for the current cc_pair
-                doc_access = get_access_for_document(
-                    document_id=document_id, db_session=db_session
-                )
+                doc_access = get_access_for_documents(
+                    document_ids=[document_id], db_session=db_session
+                )[document_id]
 
                 doc_sets = fetch_document_sets_for_document(document_id, db_session)
                 update_doc_sets: set[str] = set(doc_sets)
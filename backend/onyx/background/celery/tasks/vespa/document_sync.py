@@ -8,6 +8,7 @@ from redis.lock import Lock as RedisLock
 from sqlalchemy.orm import Session
 
 from onyx.configs.app_configs import DB_YIELD_PER_DEFAULT
+from onyx.configs.app_configs import VESPA_SYNC_BATCH_SIZE
 from onyx.configs.constants import CELERY_VESPA_SYNC_BEAT_LOCK_TIMEOUT
 from onyx.configs.constants import OnyxCeleryPriority
 from onyx.configs.constants import OnyxCeleryQueues
@@ -66,6 +67,40 @@ def reset_document_sync(r: Redis) -> None:
     r.delete(DOCUMENT_SYNC_FENCE_KEY)
 
 
+def _send_document_sync_task(
+    r: Redis,
+    celery_app: Celery,
+    document_ids: list[str],
+    tenant_id: str,
+) -> None:
+    # Create a unique task ID
+    custom_task_id = f"{DOCUMENT_SYNC_PREFIX}_{uuid4()}"
+
+    # Add to the tracking taskset in Redis BEFORE creating the celery task
+    r.sadd(DOCUMENT_SYNC_TASKSET_KEY, custom_task_id)
+
+    # Create the Celery task
+    if len(document_ids) == 1:
+        celery_app.send_task(
+            OnyxCeleryTask.VESPA_METADATA_SYNC_TASK,
+            kwargs=dict(document_id=document_ids[0], tenant_id=tenant_id),
+            queue=OnyxCeleryQueues.VESPA_METADATA_SYNC,
+            task_id=custom_task_id,
+            priority=OnyxCeleryPriority.MEDIUM,
+            ignore_result=True,
+        )
+        return
+
+    celery_app.send_task(
+        OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK,
+        kwargs=dict(document_ids=document_ids, tenant_id=tenant_id),
+        queue=OnyxCeleryQueues.VESPA_METADATA_SYNC,
+        task_id=custom_task_id,
+        priority=OnyxCeleryPriority.MEDIUM,
+        ignore_result=True,
+    )
+
+
 def generate_document_sync_tasks(
     r: Redis,
     max_tasks: int,
@@ -73,8 +108,10 @@ def generate_document_sync_tasks(
     db_session: Session,
     lock: RedisLock,
     tenant_id: str,
+    batch_size: int = VESPA_SYNC_BATCH_SIZE,
 ) -> tuple[int, int]:
-    """Generate sync tasks for all documents that need syncing.
+    """Generate sync tasks for all documents that need syncing. Each task syncs up to
+    batch_size documents.
 
     Args:
         r: Redis client
@@ -83,6 +120,7 @@ def generate_document_sync_tasks(
         db_session: Database session
         lock: Redis lock for coordination
         tenant_id: Tenant identifier
+        batch_size: Number of documents per task
 
     Returns:
         tuple[int, int]: (tasks_generated, total_docs_found)
@@ -90,6 +128,7 @@ def generate_document_sync_tasks(
     last_lock_time = time.monotonic()
     num_tasks_sent = 0
     num_docs = 0
+    doc_id_batch: list[str] = []
 
     # Get all documents that need syncing
     stmt = construct_document_id_select_by_needs_sync()
@@ -104,28 +143,21 @@ def generate_document_sync_tasks(
             last_lock_time = current_time
 
         num_docs += 1
+        doc_id_batch.append(doc_id)
+        if len(doc_id_batch) < batch_size:
+            continue
 
-        # Create a unique task ID
-        custom_task_id = f"{DOCUMENT_SYNC_PREFIX}_{uuid4()}"
-
-        # Add to the tracking taskset in Redis BEFORE creating the celery task
-        r.sadd(DOCUMENT_SYNC_TASKSET_KEY, custom_task_id)
-
-        # Create the Celery task
-        celery_app.send_task(
-            OnyxCeleryTask.VESPA_METADATA_SYNC_TASK,
-            kwargs=dict(document_id=doc_id, tenant_id=tenant_id),
-            queue=OnyxCeleryQueues.VESPA_METADATA_SYNC,
-            task_id=custom_task_id,
-            priority=OnyxCeleryPriority.MEDIUM,
-            ignore_result=True,
-        )
-
+        _send_document_sync_task(r, celery_app, doc_id_batch, tenant_id)
+        doc_id_batch = []
         num_tasks_sent += 1
 
         if num_tasks_sent >= max_tasks:
             break
 
+    if doc_id_batch:
+        _send_document_sync_task(r, celery_app, doc_id_batch, tenant_id)
+        num_tasks_sent += 1
+
     return num_tasks_sent, num_docs
 
 
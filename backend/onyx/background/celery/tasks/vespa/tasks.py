@@ -14,7 +14,7 @@ from redis.lock import Lock as RedisLock
 from sqlalchemy.orm import Session
 from tenacity import RetryError
 
-from onyx.access.access import get_access_for_document
+from onyx.access.access import get_access_for_documents
 from onyx.background.celery.apps.app_base import task_logger
 from onyx.background.celery.tasks.shared.RetryDocumentIndex import RetryDocumentIndex
 from onyx.background.celery.tasks.shared.tasks import LIGHT_SOFT_TIME_LIMIT
@@ -28,16 +28,20 @@ from onyx.background.celery.tasks.vespa.document_sync import (
     try_generate_stale_document_sync_tasks,
 )
 from onyx.configs.app_configs import JOB_TIMEOUT
+from onyx.configs.app_configs import VESPA_SYNC_BATCH_MAX_WORKERS
 from onyx.configs.app_configs import VESPA_SYNC_MAX_TASKS
 from onyx.configs.constants import CELERY_VESPA_SYNC_BEAT_LOCK_TIMEOUT
 from onyx.configs.constants import OnyxCeleryTask
 from onyx.configs.constants import OnyxRedisConstants
 from onyx.configs.constants import OnyxRedisLocks
 from onyx.db.document import get_document
+from onyx.db.document import get_documents_by_ids
 from onyx.db.document import mark_document_as_synced
+from onyx.db.document import mark_documents_as_synced
 from onyx.db.document_set import delete_document_set
 from onyx.db.document_set import fetch_document_sets
 from onyx.db.document_set import fetch_document_sets_for_document
+from onyx.db.document_set import fetch_document_sets_for_documents
 from onyx.db.document_set import get_document_set_by_id
 from onyx.db.document_set import mark_document_set_as_synced
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
@@ -58,6 +62,7 @@ from onyx.redis.redis_pool import get_redis_replica_client
 from onyx.redis.redis_pool import redis_lock_dump
 from onyx.redis.redis_usergroup import RedisUserGroup
 from onyx.utils.logger import setup_logger
+from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
 from onyx.utils.variable_functionality import fetch_versioned_implementation
 from onyx.utils.variable_functionality import (
     fetch_versioned_implementation_with_fallback,
@@ -67,6 +72,10 @@ from onyx.utils.variable_functionality import noop_fallback
 
 logger = setup_logger()
 
+# a batch syncs many documents, give it more time than a single document sync
+VESPA_METADATA_SYNC_BATCH_SOFT_TIME_LIMIT = 300
+VESPA_METADATA_SYNC_BATCH_TIME_LIMIT = VESPA_METADATA_SYNC_BATCH_SOFT_TIME_LIMIT + 15
+
 
 # celery auto associates tasks created inside another task,
 # which bloats the result metadata considerably. trail=False prevents this.
@@ -256,7 +265,7 @@ def try_generate_document_set_sync_tasks(
     if result is None:
         return None
 
-    tasks_generated = result[0]
+    tasks_generated, docs_to_sync = result
     # Currently we are allowing the sync to proceed with 0 tasks.
     # It's possible for sets/groups to be generated initially with no entries
     # and they still need to be marked as up to date.
@@ -265,7 +274,8 @@ def try_generate_document_set_sync_tasks(
 
     task_logger.info(
         f"RedisDocumentSet.generate_tasks finished. "
-        f"document_set={document_set.id} tasks_generated={tasks_generated}"
+        f"document_set={document_set.id} tasks_generated={tasks_generated} "
+        f"docs_to_sync={docs_to_sync}"
     )
 
     # create before setting fence to avoid race condition where the monitoring
@@ -279,8 +289,9 @@ def try_generate_document_set_sync_tasks(
     except Exception:
         task_logger.exception("insert_sync_record exceptioned.")
 
-    # set this only after all tasks have been added
-    rds.set_fence(tasks_generated)
+    # set this only after all tasks have been added. The progress is tracked in
+    # documents, the tasks sync batches of documents.
+    rds.set_fence(docs_to_sync)
     return tasks_generated
 
 
@@ -332,7 +343,7 @@ def try_generate_user_group_sync_tasks(
     if result is None:
         return None
 
-    tasks_generated = result[0]
+    tasks_generated, docs_to_sync = result
     # Currently we are allowing the sync to proceed with 0 tasks.
     # It's possible for sets/groups to be generated initially with no entries
     # and they still need to be marked as up to date.
@@ -341,7 +352,8 @@ def try_generate_user_group_sync_tasks(
 
     task_logger.info(
         f"RedisUserGroup.generate_tasks finished. "
-        f"usergroup={usergroup.id} tasks_generated={tasks_generated}"
+        f"usergroup={usergroup.id} tasks_generated={tasks_generated} "
+        f"docs_to_sync={docs_to_sync}"
     )
 
     # create before setting fence to avoid race condition where the monitoring
@@ -355,8 +367,9 @@ def try_generate_user_group_sync_tasks(
     except Exception:
         task_logger.exception("insert_sync_record exceptioned.")
 
-    # set this only after all tasks have been added
-    rug.set_fence(tasks_generated)
+    # set this only after all tasks have been added. The progress is tracked in
+    # documents, the tasks sync batches of documents.
+    rug.set_fence(docs_to_sync)
 
     return tasks_generated
 
@@ -394,7 +407,7 @@ def monitor_document_set_taskset(
     if initial_count is None:
         return
 
-    count = cast(int, r.scard(rds.taskset_key))
+    count = rds.get_remaining()
     task_logger.info(
         f"Document set sync progress: document_set={document_set_id} "
         f"remaining={count} initial={initial_count}"
@@ -482,9 +495,9 @@ def vespa_metadata_sync_task(self: Task, document_id: str, *, tenant_id: str) ->
                 update_doc_sets: set[str] = set(doc_sets)
 
                 # User group sync
-                doc_access = get_access_for_document(
-                    document_id=document_id, db_session=db_session
-                )
+                doc_access = get_access_for_documents(
+                    document_ids=[document_id], db_session=db_session
+                )[document_id]
 
                 fields = VespaDocumentFields(
                     document_sets=update_doc_sets,
@@ -568,3 +581,170 @@ def vespa_metadata_sync_task(self: Task, document_id: str, *, tenant_id: str) ->
         )
 
     return completion_status == OnyxCeleryTaskCompletionStatus.SUCCEEDED
+
+
+def _update_single_or_exception(
+    retry_index: RetryDocumentIndex,
+    document_id: str,
+    tenant_id: str,
+    chunk_count: int | None,
+    fields: VespaDocumentFields,
+) -> int | Exception:
+    """Returns the number of chunks updated, or the exception raised by the update."""
+    try:
+        return retry_index.update_single(
+            document_id,
+            tenant_id=tenant_id,
+            chunk_count=chunk_count,
+            fields=fields,
+            user_fields=None,
+        )
+    except Exception as e:
+        return e
+
+
+def _is_non_retryable_sync_exception(ex: Exception) -> bool:
+    e: BaseException | None = ex
+    if isinstance(ex, RetryError):
+        e = ex.last_attempt.exception()
+
+    return (
+        isinstance(e, httpx.HTTPStatusError)
+        and e.response.status_code == HTTPStatus.BAD_REQUEST
+    )
+
+
+@shared_task(
+    name=OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK,
+    bind=True,
+    soft_time_limit=VESPA_METADATA_SYNC_BATCH_SOFT_TIME_LIMIT,
+    time_limit=VESPA_METADATA_SYNC_BATCH_TIME_LIMIT,
+    max_retries=3,
+)
+def vespa_metadata_sync_batch_task(
+    self: Task, document_ids: list[str], *, tenant_id: str
+) -> bool:
+    """Batched version of vespa_metadata_sync_task. Document sets, access and
+    boost/hidden are loaded for the whole batch at once and the Vespa updates are sent
+    concurrently. Like the single document task, each document is only marked as synced
+    after its Vespa update succeeded. Documents that failed with a retryable error are
+    retried as a smaller batch."""
+    start = time.monotonic()
+
+    completion_status = OnyxCeleryTaskCompletionStatus.UNDEFINED
+    failed_doc_ids: list[str] = []
+
+    try:
+        with get_session_with_current_tenant() as db_session:
+            active_search_settings = get_active_search_settings(db_session)
+            doc_index = get_default_document_index(
+                search_settings=active_search_settings.primary,
+                secondary_search_settings=active_search_settings.secondary,
+                httpx_client=HttpxPool.get("vespa"),
+            )
+
+            retry_index = RetryDocumentIndex(doc_index)
+
+            docs = get_documents_by_ids(db_session, document_ids)
+            doc_id_to_doc_sets = dict(
+                fetch_document_sets_for_documents([doc.id for doc in docs], db_session)
+            )
+            doc_id_to_access = get_access_for_documents(
+                document_ids=[doc.id for doc in docs], db_session=db_session
+            )
+
+            found_doc_ids = {doc.id for doc in docs}
+            for document_id in document_ids:
+                if document_id not in found_doc_ids:
+                    task_logger.info(f"doc={document_id} action=no_operation")
+
+            # update Vespa. OK if doc doesn't exist.
+            results = run_functions_tuples_in_parallel(
+                [
+                    (
+                        _update_single_or_exception,
+                        (
+                            retry_index,
+                            doc.id,
+                            tenant_id,
+                            doc.chunk_count,
+                            VespaDocumentFields(
+                                document_sets=set(doc_id_to_doc_sets.get(doc.id, [])),
+                                access=doc_id_to_access[doc.id],
+                                boost=doc.boost,
+                                hidden=doc.hidden,
+                            ),
+                        ),
+                    )
+                    for doc in docs
+                ],
+                max_workers=VESPA_SYNC_BATCH_MAX_WORKERS,
+            )
+
+            synced_doc_ids: list[str] = []
+            chunks_affected = 0
+            for doc, result in zip(docs, results):
+                if not isinstance(result, Exception):
+                    synced_doc_ids.append(doc.id)
+                    chunks_affected += result
+                    continue
+
+                if _is_non_retryable_sync_exception(result):
+                    task_logger.error(
+                        f"Non-retryable HTTPStatusError: doc={doc.id} exception={result}"
+                    )
+                    continue
+
+                task_logger.warning(
+                    f"vespa_metadata_sync_batch_task update failed: doc={doc.id} "
+                    f"exception={result!r}"
+                )
+                failed_doc_ids.append(doc.id)
+
+            # update db last. Worst case = we crash right before this and
+            # the sync might repeat again later
+            mark_documents_as_synced(synced_doc_ids, db_session)
+
+            elapsed = time.monotonic() - start
+            task_logger.info(
+                f"docs={len(document_ids)} "
+                f"synced={len(synced_doc_ids)} "
+                f"failed={len(failed_doc_ids)} "
+                f"action=sync "
+                f"chunks={chunks_affected} "
+                f"elapsed={elapsed:.2f}"
+            )
+            completion_status = OnyxCeleryTaskCompletionStatus.SUCCEEDED
+    except SoftTimeLimitExceeded:
+        task_logger.info(
+            f"SoftTimeLimitExceeded exception. num_docs={len(document_ids)}"
+        )
+        completion_status = OnyxCeleryTaskCompletionStatus.SOFT_TIME_LIMIT
+    except Exception:
+        task_logger.exception(
+            f"vespa_metadata_sync_batch_task exceptioned: num_docs={len(document_ids)}"
+        )
+        failed_doc_ids = document_ids
+
+    if failed_doc_ids:
+        completion_status = OnyxCeleryTaskCompletionStatus.RETRYABLE_EXCEPTION
+        if self.max_retries is not None and self.request.retries >= self.max_retries:
+            completion_status = OnyxCeleryTaskCompletionStatus.NON_RETRYABLE_EXCEPTION
+        else:
+            task_logger.info(
+                f"vespa_metadata_sync_batch_task retrying: "
+                f"num_docs={len(failed_doc_ids)} retries={self.request.retries}"
+            )
+            # Exponential backoff from 2^4 to 2^6 ... i.e. 16, 32, 64
+            countdown = 2 ** (self.request.retries + 4)
+            # this will raise a celery exception
+            self.retry(
+                kwargs=dict(document_ids=failed_doc_ids, tenant_id=tenant_id),
+                countdown=countdown,
+            )
+
+    task_logger.info(
+        f"vespa_metadata_sync_batch_task completed: "
+        f"status={completion_status.value} num_docs={len(document_ids)}"
+    )
+    return completion_status == OnyxCeleryTaskCompletionStatus.SUCCEEDED
@@ -414,6 +414,7 @@ def _run_indexing(
         attempt_id=index_attempt_id,
         connector_id=ctx.connector_id,
         credential_id=ctx.credential_id,
+        search_settings_id=index_attempt_start.search_settings_id,
     )
 
     total_failures = 0
@@ -17,6 +17,43 @@ def in_code_block(llm_text: str) -> bool:
     return count % 2 != 0
 
 
+class CodeBlockTracker:
+    """Incremental version of `in_code_block` over a stream of tokens, so that the
+    whole output doesn't have to be kept and recounted for every token.
+
+    `str.count` counts a run of n backticks as n // 3 triple backticks, so it is
+    enough to keep the number of triple backticks in the finished runs and the length
+    of the run of backticks at the end of the stream, which the next token may extend.
+    """
+
+    def __init__(self) -> None:
+        self.closed_count = 0  # triple backticks in runs that can't grow anymore
+        self.trailing_run = 0  # backticks at the end of the stream so far
+
+    def feed(self, token: str) -> None:
+        if "`" not in token:
+            if token:
+                self.closed_count += self.trailing_run // 3
+                self.trailing_run = 0
+            return
+
+        stripped = token.lstrip("`")
+        if not stripped:
+            self.trailing_run += len(token)
+            return
+
+        # the leading backticks extend the current run, which the token then ends
+        self.closed_count += (self.trailing_run + len(token) - len(stripped)) // 3
+        middle = stripped.rstrip("`")
+        # runs in the middle are delimited by other characters on both sides
+        self.closed_count += middle.count(TRIPLE_BACKTICK)
+        self.trailing_run = len(stripped) - len(middle)
+
+    @property
+    def in_code_block(self) -> bool:
+        return (self.closed_count + self.trailing_run // 3) % 2 != 0
+
+
 class CitationProcessor:
     def __init__(
         self,
@@ -31,7 +68,7 @@ class CitationProcessor:
         self.max_citation_num = len(context_docs)
         self.stop_stream = stop_stream
 
-        self.llm_out = ""  # entire output so far
+        self.code_block_tracker = CodeBlockTracker()  # code blocks of the output
         self.curr_segment = ""  # tokens held for citation processing
         self.hold = ""  # tokens held for stop token processing
 
@@ -41,6 +78,9 @@ class CitationProcessor:
 
         # '[', '[[', '[1', '[[1', '[1,', '[1, ', '[1,2', '[1, 2,', etc.
         self.possible_citation_pattern = re.compile(r"(\[+(?:\d+,? ?)*$)")
+        # a possible citation is made of these only ($ also matches before a final
+        # newline), so only the end of the segment made of them has to be searched
+        self.possible_citation_chars = "[0123456789, \n"
 
         # group 1: '[[1]]', [[2]], etc.
         # group 2: '[1]', '[1, 2]', '[1,2,16]', etc.
@@ -65,7 +105,7 @@ class CitationProcessor:
             self.hold = ""
 
         self.curr_segment += token
-        self.llm_out += token
+        self.code_block_tracker.feed(token)
 
         # Handle code blocks without language tags
         if "`" in self.curr_segment:
@@ -73,16 +113,22 @@ class CitationProcessor:
                 pass
             elif "```" in self.curr_segment:
                 piece_that_comes_after = self.curr_segment.split("```")[1][0]
-                if piece_that_comes_after == "\n" and in_code_block(self.llm_out):
+                if (
+                    piece_that_comes_after == "\n"
+                    and self.code_block_tracker.in_code_block
+                ):
                     self.curr_segment = self.curr_segment.replace("```", "```plaintext")
 
         citation_matches = list(self.citation_pattern.finditer(self.curr_segment))
         possible_citation_found = bool(
-            re.search(self.possible_citation_pattern, self.curr_segment)
+            self.possible_citation_pattern.search(
+                self.curr_segment,
+                len(self.curr_segment.rstrip(self.possible_citation_chars)),
+            )
         )
 
         result = ""
-        if citation_matches and not in_code_block(self.llm_out):
+        if citation_matches and not self.code_block_tracker.in_code_block:
             match_idx = 0
             for match in citation_matches:
                 match_span = match.span()
@@ -184,7 +230,7 @@ class CitationProcessorGraph:
         self.max_citation_num = len(context_docs)
         self.stop_stream = stop_stream
 
-        self.llm_out = ""  # entire output so far
+        self.code_block_tracker = CodeBlockTracker()  # code blocks of the output
         self.curr_segment = ""  # tokens held for citation processing
         self.hold = ""  # tokens held for stop token processing
 
@@ -195,6 +241,7 @@ class CitationProcessorGraph:
         # '[', '[[', '[1', '[[1', '[1,', '[1, ', '[1,2', '[1, 2,', etc.
         # Also supports '[D1', '[D1, D3' type patterns
         self.possible_citation_pattern = re.compile(r"(\[+(?:(?:\d+|D\d+),? ?)*$)")
+        self.possible_citation_chars = "[0123456789, D\n"
 
         # group 1: '[[1]]', [[2]], etc.
         # group 2: '[1]', '[1, 2]', '[1,2,16]', etc.
@@ -221,7 +268,7 @@ class CitationProcessorGraph:
             self.hold = ""
 
         self.curr_segment += token
-        self.llm_out += token
+        self.code_block_tracker.feed(token)
 
         # Handle code blocks without language tags
         if "`" in self.curr_segment:
@@ -229,16 +276,22 @@ class CitationProcessorGraph:
                 pass
             elif "```" in self.curr_segment:
                 piece_that_comes_after = self.curr_segment.split("```")[1][0]
-                if piece_that_comes_after == "\n" and in_code_block(self.llm_out):
+                if (
+                    piece_that_comes_after == "\n"
+                    and self.code_block_tracker.in_code_block
+                ):
                     self.curr_segment = self.curr_segment.replace("```", "```plaintext")
 
         citation_matches = list(self.citation_pattern.finditer(self.curr_segment))
         possible_citation_found = bool(
-            re.search(self.possible_citation_pattern, self.curr_segment)
+            self.possible_citation_pattern.search(
+                self.curr_segment,
+                len(self.curr_segment.rstrip(self.possible_citation_chars)),
+            )
         )
 
         result = ""
-        if citation_matches and not in_code_block(self.llm_out):
+        if citation_matches and not self.code_block_tracker.in_code_block:
             match_idx = 0
             citation_infos = []
             for match in citation_matches:
@@ -372,8 +425,10 @@ class StreamExtractionProcessor:
             return self.inside_extraction
 
         # Check if we might be in the middle of a tag
-        if self._might_be_partial_tag(self.buffer):
-            # Hold buffer, might be incomplete tag - return current state
+        partial_tag = self._partial_tag(self.buffer)
+        if partial_tag:
+            # Hold only the incomplete tag, a complete tag can't start before it
+            self.buffer = partial_tag
             return self.inside_extraction
 
         # No complete or potential tags found, return current state
@@ -383,14 +438,18 @@ class StreamExtractionProcessor:
 
     def _might_be_partial_tag(self, text: str) -> bool:
         """Check if text might be the start of an opening or closing extraction tag"""
-        # Check for partial start tag
-        for i in range(1, len(self.start_tag) + 1):
-            if text.endswith(self.start_tag[:i]):
-                return True
-
-        # Check for partial end tag
-        for i in range(1, len(self.end_tag) + 1):
-            if text.endswith(self.end_tag[:i]):
-                return True
-
-        return False
+        return bool(self._partial_tag(text))
+
+    def _partial_tag(self, text: str) -> str:
+        """The longest end of text that is the start of an opening or closing
+        extraction tag, empty if there is none"""
+        # both tags start with '<', only the '<'s in the last tag length of the text
+        # can start one
+        tail = text[-max(len(self.start_tag), len(self.end_tag)) :]
+        tag_start = tail.find("<")
+        while tag_start != -1:
+            partial = tail[tag_start:]
+            if self.start_tag.startswith(partial) or self.end_tag.startswith(partial):
+                return partial
+            tag_start = tail.find("<", tag_start + 1)
+        return ""
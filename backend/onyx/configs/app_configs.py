@@ -358,6 +358,13 @@ CELERY_WORKER_KG_PROCESSING_CONCURRENCY = int(
 # The maximum number of tasks that can be queued up to sync to Vespa in a single pass
 VESPA_SYNC_MAX_TASKS = 8192
 
+# Number of documents synced to Vespa by each metadata sync task. Each batch is loaded
+# from Postgres in a few set based queries and its updates are sent to Vespa concurrently.
+# Set to 1 to go back to one task per document.
+VESPA_SYNC_BATCH_SIZE = int(os.environ.get("VESPA_SYNC_BATCH_SIZE") or 256)
+# Max concurrent Vespa partial updates within a single metadata sync batch
+VESPA_SYNC_BATCH_MAX_WORKERS = int(os.environ.get("VESPA_SYNC_BATCH_MAX_WORKERS") or 16)
+
 DB_YIELD_PER_DEFAULT = 64
 
 #####
@@ -548,6 +555,12 @@ MAX_PRUNING_DOCUMENT_RETRIEVAL_PER_MINUTE = int(
     os.environ.get("MAX_PRUNING_DOCUMENT_RETRIEVAL_PER_MINUTE", 0)
 )
 
+# Max number of document ids held in memory when computing which documents to prune.
+# Above it, the source document ids are spilled to sorted temporary files and diffed
+# against the indexed ids with a merge, so memory stays bounded for very large cc pairs.
+# 0 keeps all ids in memory.
+PRUNING_MAX_IDS_IN_MEMORY = int(os.environ.get("PRUNING_MAX_IDS_IN_MEMORY") or 0)
+
 # comma delimited list of zendesk article labels to skip indexing for
 ZENDESK_CONNECTOR_SKIP_ARTICLE_LABELS = os.environ.get(
     "ZENDESK_CONNECTOR_SKIP_ARTICLE_LABELS", ""
@@ -588,6 +601,31 @@ LARGE_CHUNK_RATIO = 4
 # Include the document level metadata in each chunk. If the metadata is too long, then it is thrown out
 # We don't want the metadata to overwhelm the actual contents of the chunk
 SKIP_METADATA_IN_CHUNK = os.environ.get("SKIP_METADATA_IN_CHUNK", "").lower() == "true"
+# Tokenize every section once (with character offsets) and derive chunk, blurb and
+# mini-chunk boundaries from the offsets instead of re-tokenizing every candidate span.
+# Token counts at sentence boundaries can differ slightly from tokenizing each sentence
+# on its own, see scripts/chunker_benchmark.py
+CHUNK_WITH_TOKEN_OFFSETS = (
+    os.environ.get("CHUNK_WITH_TOKEN_OFFSETS", "").lower() == "true"
+)
+# Number of worker processes used to chunk the documents of an indexing batch in
+# parallel, 0 chunks in the indexing thread itself. With a pool, the chunks of finished
+# documents are embedded once at least CHUNKING_STREAM_MIN_CHUNKS are available, while
+# the rest of the batch is still being chunked
+CHUNKING_PROCESS_POOL_SIZE = int(os.environ.get("CHUNKING_PROCESS_POOL_SIZE") or 0)
+CHUNKING_STREAM_MIN_CHUNKS = int(os.environ.get("CHUNKING_STREAM_MIN_CHUNKS") or 64)
+# Splits every docprocessing batch into sub-batches of this many documents that go
+# through the indexing pipeline stages concurrently: while one sub-batch is written to
+# the document index, the next one is embedded and the one after that is chunked.
+# 0 indexes the whole batch sequentially
+DOCPROCESSING_PIPELINE_SUB_BATCH_SIZE = int(
+    os.environ.get("DOCPROCESSING_PIPELINE_SUB_BATCH_SIZE") or 0
+)
+# Max number of sub-batches waiting for the next pipeline stage before the previous
+# stage blocks
+DOCPROCESSING_PIPELINE_QUEUE_SIZE = int(
+    os.environ.get("DOCPROCESSING_PIPELINE_QUEUE_SIZE") or 1
+)
 # Timeout to wait for job's last update before killing it, in hours
 CLEANUP_INDEXING_JOBS_TIMEOUT = int(
     os.environ.get("CLEANUP_INDEXING_JOBS_TIMEOUT") or 3
@@ -608,6 +646,24 @@ INDEXING_EMBEDDING_MODEL_NUM_THREADS = int(
     os.environ.get("INDEXING_EMBEDDING_MODEL_NUM_THREADS") or 8
 )
 
+# Content-addressed cache of passage embeddings so that re-indexing unchanged text
+# (re-index, prune refresh, search settings swap) does not hit the embedding model again.
+# Supported backends: "sqlite" (local on-disk). Empty disables the cache.
+EMBEDDING_CACHE_BACKEND = os.environ.get("EMBEDDING_CACHE_BACKEND", "").lower()
+EMBEDDING_CACHE_DIR = (
+    os.environ.get("EMBEDDING_CACHE_DIR") or "/tmp/onyx/embedding_cache"
+)
+# Upper bound for the on-disk size of the cached vectors, least recently used entries
+# are evicted once this is exceeded
+EMBEDDING_CACHE_MAX_SIZE_MB = int(os.environ.get("EMBEDDING_CACHE_MAX_SIZE_MB") or 2048)
+
+# Persist content fingerprints per document / chunk so that documents whose content did
+# not change (only their timestamp did) skip chunking / embedding / rewriting in Vespa
+# and only get a metadata update. Changed documents only rewrite the changed chunks.
+ENABLE_CONTENT_FINGERPRINT_SKIP = (
+    os.environ.get("ENABLE_CONTENT_FINGERPRINT_SKIP", "true").lower() == "true"
+)
+
 # During an indexing attempt, specifies the number of batches which are allowed to
 # exception without aborting the attempt.
 INDEXING_EXCEPTION_LIMIT = int(os.environ.get("INDEXING_EXCEPTION_LIMIT") or 0)
@@ -689,6 +745,47 @@ CUSTOM_ANSWER_VALIDITY_CONDITIONS = json.loads(
 
 VESPA_REQUEST_TIMEOUT = int(os.environ.get("VESPA_REQUEST_TIMEOUT") or "15")
 
+# Max concurrent Vespa feed requests (index / update / delete) per process. The limit is
+# lowered automatically while Vespa answers with 429 / 503 and recovers as requests succeed.
+VESPA_FEED_MAX_IN_FLIGHT = int(os.environ.get("VESPA_FEED_MAX_IN_FLIGHT") or 32)
+# Number of times a feed request throttled by Vespa (429 / 503) is retried with backoff
+VESPA_FEED_THROTTLE_RETRIES = int(os.environ.get("VESPA_FEED_THROTTLE_RETRIES") or 5)
+# Index attempts backfilling new search settings or reindexing from the beginning feed
+# Vespa through the streaming feed: many concurrent operations of an asyncio client
+# rather than one thread per request
+VESPA_STREAMING_FEED_FOR_BACKFILLS = (
+    os.environ.get("VESPA_STREAMING_FEED_FOR_BACKFILLS", "").lower() == "true"
+)
+# Max operations in flight on the streaming feed
+VESPA_STREAMING_FEED_CONCURRENCY = int(
+    os.environ.get("VESPA_STREAMING_FEED_CONCURRENCY") or 256
+)
+# Set if the Vespa container accepts HTTP/2 over plain http (h2c with prior knowledge),
+# the streaming feed then multiplexes its operations over a single connection. HTTP/2
+# is otherwise only negotiated over TLS (managed Vespa), without it the streaming feed
+# opens one HTTP/1.1 connection per operation in flight.
+VESPA_STREAMING_FEED_H2C = (
+    os.environ.get("VESPA_STREAMING_FEED_H2C", "").lower() == "true"
+)
+# Number of parallel visitors used for scans over a whole index, each visits a
+# disjoint slice of the index
+VESPA_VISIT_SLICES = int(os.environ.get("VESPA_VISIT_SLICES") or 8)
+# For search settings swaps that keep the embeddings themselves (only their precision
+# changes, or a smaller reduced_dimension of a Matryoshka model), build the new index
+# out of the vectors stored in the current index instead of re-embedding everything
+REPROJECT_EMBEDDINGS_FOR_INDEX_SWAPS = (
+    os.environ.get("REPROJECT_EMBEDDINGS_FOR_INDEX_SWAPS") or "true"
+).lower() == "true"
+# Number of documents visited in parallel when re-projecting embeddings
+REPROJECT_EMBEDDINGS_BATCH_SIZE = int(
+    os.environ.get("REPROJECT_EMBEDDINGS_BATCH_SIZE") or 64
+)
+# Cc pairs whose embeddings are not re-projected within this time are indexed the
+# regular way instead
+REPROJECT_EMBEDDINGS_SOFT_TIME_LIMIT = int(
+    os.environ.get("REPROJECT_EMBEDDINGS_SOFT_TIME_LIMIT") or 6 * 60 * 60
+)
+
 SYSTEM_RECURSION_LIMIT = int(os.environ.get("SYSTEM_RECURSION_LIMIT") or "1000")
 
 PARSE_WITH_TRAFILATURA = os.environ.get("PARSE_WITH_TRAFILATURA", "").lower() == "true"
@@ -107,3 +107,41 @@ USE_SEMANTIC_KEYWORD_EXPANSIONS_BASIC_SEARCH = (
 )
 
 USE_DIV_CON_AGENT = os.environ.get("USE_DIV_CON_AGENT", "false").lower() == "true"
+
+# Cache of query embeddings (keyed by search settings, model, prefix and query text) so
+# that repeated queries (e.g. Slack bot FAQs, chat retries) skip the embedding model.
+# The in-process cache holds up to QUERY_EMBEDDING_CACHE_SIZE entries, 0 disables it.
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE") or 1024)
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = int(
+    os.environ.get("QUERY_EMBEDDING_CACHE_TTL_SECONDS") or 60 * 60
+)
+# Also share the cached query embeddings between all API server replicas through Redis
+QUERY_EMBEDDING_CACHE_USE_REDIS = (
+    os.environ.get("QUERY_EMBEDDING_CACHE_USE_REDIS", "").lower() == "true"
+)
+
+# Deadline for the retrieval sub-queries (query rephrasings) run by retrieve_chunks.
+# Rephrasings still running after this many seconds are dropped and the results that
+# arrived are returned. The original query is always waited on. 0 waits on everything.
+RETRIEVAL_SUBQUERY_DEADLINE_SECONDS = float(
+    os.environ.get("RETRIEVAL_SUBQUERY_DEADLINE_SECONDS") or 0
+)
+
+# Cache of the responses of temperature 0 secondary LLM flows (keyed by flow, model and
+# the full prompt) so that the same call (e.g. Slack bot retries, regenerations, the
+# same question asked by many users) is not sent to the LLM again. Flows opt in through
+# LLM_RESPONSE_CACHE_FLOWS, a comma separated list of flows (e.g. "time_filter").
+# The in-process cache holds up to LLM_RESPONSE_CACHE_SIZE entries, 0 disables it.
+LLM_RESPONSE_CACHE_FLOWS = [
+    flow.strip().lower()
+    for flow in (os.environ.get("LLM_RESPONSE_CACHE_FLOWS") or "").split(",")
+    if flow.strip()
+]
+LLM_RESPONSE_CACHE_SIZE = int(os.environ.get("LLM_RESPONSE_CACHE_SIZE") or 1024)
+LLM_RESPONSE_CACHE_TTL_SECONDS = int(
+    os.environ.get("LLM_RESPONSE_CACHE_TTL_SECONDS") or 60 * 60
+)
+# Also share the cached responses between all API server replicas through Redis
+LLM_RESPONSE_CACHE_USE_REDIS = (
+    os.environ.get("LLM_RESPONSE_CACHE_USE_REDIS", "").lower() == "true"
+)
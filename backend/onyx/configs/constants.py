@@ -378,6 +378,9 @@ class OnyxRedisLocks:
     CONNECTOR_EXTERNAL_GROUP_SYNC_LOCK_PREFIX = "da_lock:connector_external_group_sync"
     PRUNING_LOCK_PREFIX = "da_lock:pruning"
     INDEXING_METADATA_PREFIX = "da_metadata:indexing"
+    REPROJECT_EMBEDDINGS_LOCK_PREFIX = "da_lock:reproject_embeddings"
+    REPROJECT_EMBEDDINGS_QUEUED_PREFIX = "da_metadata:reproject_embeddings_queued"
+    REPROJECT_EMBEDDINGS_FAILED_PREFIX = "da_metadata:reproject_embeddings_failed"
 
     SLACK_BOT_LOCK = "da_lock:slack_bot"
     SLACK_BOT_HEARTBEAT_PREFIX = "da_heartbeat:slack_bot"
@@ -411,6 +414,10 @@ class OnyxRedisSignals:
 
 class OnyxRedisConstants:
     ACTIVE_FENCES = "active_fences"
+    # bumped whenever the LLM providers of a tenant are edited
+    LLM_PROVIDER_VERSION = "llm_provider_version"
+    # bumped whenever the KG entities of a tenant are clustered or reset
+    KG_ENTITY_VERSION = "kg_entity_version"
 
 
 class OnyxCeleryPriority(int, Enum):
@@ -485,10 +492,13 @@ class OnyxCeleryTask:
     # New split indexing tasks
     CONNECTOR_DOC_FETCHING_TASK = "connector_doc_fetching_task"
     DOCPROCESSING_TASK = "docprocessing_task"
+    # builds a secondary index out of the embeddings of the current one
+    REPROJECT_EMBEDDINGS_TASK = "reproject_embeddings_task"
 
     CONNECTOR_PRUNING_GENERATOR_TASK = "connector_pruning_generator_task"
     DOCUMENT_BY_CC_PAIR_CLEANUP_TASK = "document_by_cc_pair_cleanup_task"
     VESPA_METADATA_SYNC_TASK = "vespa_metadata_sync_task"
+    VESPA_METADATA_SYNC_BATCH_TASK = "vespa_metadata_sync_batch_task"
 
     # chat retention
     CHECK_TTL_MANAGEMENT_TASK = "check_ttl_management_task"
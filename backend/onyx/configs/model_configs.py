@@ -46,6 +46,27 @@ EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE") or 0) or None
 BATCH_SIZE_ENCODE_CHUNKS = EMBEDDING_BATCH_SIZE or 8
 # don't send over too many chunks at once, as sending too many could cause timeouts
 BATCH_SIZE_ENCODE_CHUNKS_FOR_API_EMBEDDING_SERVICES = EMBEDDING_BATCH_SIZE or 512
+# If set, texts are sorted by length and packed into batches of at most this many tokens
+# (in addition to the batch sizes above). For local models a batch counts as its longest
+# text times the number of texts since that is what the model pads the batch to.
+# 0 disables token budgeted batching.
+BATCH_TOKEN_BUDGET_ENCODE_CHUNKS = int(
+    os.environ.get("BATCH_TOKEN_BUDGET_ENCODE_CHUNKS") or 0
+)
+BATCH_TOKEN_BUDGET_ENCODE_CHUNKS_FOR_API_EMBEDDING_SERVICES = int(
+    os.environ.get("BATCH_TOKEN_BUDGET_ENCODE_CHUNKS_FOR_API_EMBEDDING_SERVICES") or 0
+)
+# Models trained with Matryoshka representation learning, their embeddings can be
+# shortened by dropping trailing dimensions and renormalizing. Only the OpenAI API
+# applies the reduced_dimension of the search settings, so only OpenAI models matter.
+MATRYOSHKA_EMBEDDING_MODELS = [
+    model_name.strip()
+    for model_name in (
+        os.environ.get("MATRYOSHKA_EMBEDDING_MODELS")
+        or "text-embedding-3-small,text-embedding-3-large"
+    ).split(",")
+    if model_name.strip()
+]
 # For score display purposes, only way is to know the expected ranges
 CROSS_ENCODER_RANGE_MAX = 1
 CROSS_ENCODER_RANGE_MIN = 0
@@ -315,6 +315,9 @@ class IndexAttemptMetadata(BaseModel):
     batch_num: int | None = None
     attempt_id: int | None = None
     request_id: str | None = None
+    # search settings of the index being written to, content fingerprints are only
+    # used / stored when set
+    search_settings_id: int | None = None
 
     # Work in progress: will likely contain metadata about cc pair / index attempt
     structured_id: str | None = None
@@ -0,0 +1,68 @@
+import hashlib
+from array import array
+
+from prometheus_client import Counter
+
+from onyx.configs.chat_configs import QUERY_EMBEDDING_CACHE_SIZE
+from onyx.configs.chat_configs import QUERY_EMBEDDING_CACHE_TTL_SECONDS
+from onyx.configs.chat_configs import QUERY_EMBEDDING_CACHE_USE_REDIS
+from onyx.db.models import SearchSettings
+from onyx.utils.tenant_ttl_cache import TenantTTLCache
+from shared_configs.model_server_models import Embedding
+
+query_embedding_cache_lookups = Counter(
+    "query_embedding_cache_lookups",
+    "Query embedding cache lookups by tier (local / redis) and result (hit / miss)",
+    ["tier", "result"],
+)
+
+
+def build_query_embedding_cache_key(query: str, search_settings: SearchSettings) -> str:
+    """Key of the embedding of a query under the given search settings. The search
+    settings id is part of the key so that switching search settings (even to the same
+    model) never serves embeddings cached for the previous settings. Whitespace in the
+    query is normalized since it does not change the embedding."""
+    normalized_query = " ".join(query.split())
+    query_hash = hashlib.sha256(normalized_query.encode("utf-8")).hexdigest()
+    provider = (
+        search_settings.provider_type.value if search_settings.provider_type else ""
+    )
+    return (
+        f"{search_settings.id}|{provider}|{search_settings.model_name}|"
+        f"{int(search_settings.normalize)}|{search_settings.reduced_dimension or ''}|"
+        f"{search_settings.query_prefix or ''}|{query_hash}"
+    )
+
+
+class QueryEmbeddingCache(TenantTTLCache[Embedding]):
+    """Cache of query embeddings, with Redis they are stored as float32 blobs."""
+
+    REDIS_KEY_PREFIX = "query_embedding:"
+
+    def serialize(self, value: Embedding) -> bytes:
+        return array("f", value).tobytes()
+
+    def deserialize(self, blob: bytes) -> Embedding:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def record_lookups(self, tier: str, num_hits: int, num_misses: int) -> None:
+        query_embedding_cache_lookups.labels(tier=tier, result="hit").inc(num_hits)
+        query_embedding_cache_lookups.labels(tier=tier, result="miss").inc(num_misses)
+
+
+_QUERY_EMBEDDING_CACHE: QueryEmbeddingCache | None = (
+    QueryEmbeddingCache(
+        max_size=QUERY_EMBEDDING_CACHE_SIZE,
+        ttl_seconds=QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+        use_redis=QUERY_EMBEDDING_CACHE_USE_REDIS,
+    )
+    if QUERY_EMBEDDING_CACHE_SIZE > 0
+    else None
+)
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache | None:
+    """Returns the process wide query embedding cache, or None if it is disabled."""
+    return _QUERY_EMBEDDING_CACHE
@@ -1,11 +1,16 @@
 import string
+import time
 from collections.abc import Callable
+from typing import Any
 from uuid import UUID
 
 import nltk  # type:ignore
+from prometheus_client import Counter
+from prometheus_client import Histogram
 from sqlalchemy.orm import Session
 
 from onyx.agents.agent_search.shared_graph_utils.models import QueryExpansionType
+from onyx.configs.chat_configs import RETRIEVAL_SUBQUERY_DEADLINE_SECONDS
 from onyx.context.search.enums import SearchType
 from onyx.context.search.models import ChunkMetric
 from onyx.context.search.models import IndexFilters
@@ -21,6 +26,7 @@ from onyx.context.search.preprocessing.preprocessing import HYBRID_ALPHA_KEYWORD
 from onyx.context.search.utils import get_query_embedding
 from onyx.context.search.utils import get_query_embeddings
 from onyx.context.search.utils import inference_section_from_chunks
+from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.search_settings import get_multilingual_expansion
 from onyx.document_index.interfaces import DocumentIndex
 from onyx.document_index.interfaces import VespaChunkRequest
@@ -32,7 +38,7 @@ from onyx.federated_connectors.federated_retrieval import (
 )
 from onyx.secondary_llm_flows.query_expansion import multilingual_query_expansion
 from onyx.utils.logger import setup_logger
-from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
+from onyx.utils.threadpool_concurrency import run_functions_tuples_with_deadline
 from onyx.utils.threadpool_concurrency import run_in_background
 from onyx.utils.threadpool_concurrency import TimeoutThread
 from onyx.utils.threadpool_concurrency import wait_on_background
@@ -41,6 +47,20 @@ from shared_configs.model_server_models import Embedding
 
 logger = setup_logger()
 
+retrieval_subquery_latency = Histogram(
+    "retrieval_subquery_latency_seconds",
+    "Latency of each retrieval sub-query run by retrieve_chunks",
+    ["kind"],
+)
+retrieval_subqueries_dropped = Counter(
+    "retrieval_subqueries_dropped",
+    "Retrieval sub-queries dropped because they missed the deadline",
+)
+retrieval_chunks_dropped = Counter(
+    "retrieval_chunks_dropped",
+    "Chunks returned by retrieval sub-queries after they were dropped by the deadline",
+)
+
 
 def _dedupe_chunks(
     chunks: list[InferenceChunkUncleaned],
@@ -92,13 +112,12 @@ def lemmatize_text(keywords: list[str]) -> list[str]:
     #     return keywords
 
 
-def combine_retrieval_results(
-    chunk_sets: list[list[InferenceChunk]],
-) -> list[InferenceChunk]:
-    all_chunks = [chunk for chunk_set in chunk_sets for chunk in chunk_set]
-
-    unique_chunks: dict[tuple[str, int], InferenceChunk] = {}
-    for chunk in all_chunks:
+def _merge_retrieval_results(
+    unique_chunks: dict[tuple[str, int], InferenceChunk],
+    chunk_set: list[InferenceChunk],
+) -> None:
+    """Adds the chunks to unique_chunks, keeping the highest score of duplicates."""
+    for chunk in chunk_set:
         key = (chunk.document_id, chunk.chunk_id)
         if key not in unique_chunks:
             unique_chunks[key] = chunk
@@ -109,6 +128,14 @@ def combine_retrieval_results(
         if stored_chunk_score < this_chunk_score:
             unique_chunks[key] = chunk
 
+
+def combine_retrieval_results(
+    chunk_sets: list[list[InferenceChunk]],
+) -> list[InferenceChunk]:
+    unique_chunks: dict[tuple[str, int], InferenceChunk] = {}
+    for chunk_set in chunk_sets:
+        _merge_retrieval_results(unique_chunks, chunk_set)
+
     sorted_chunks = sorted(
         unique_chunks.values(), key=lambda x: x.score or 0, reverse=True
     )
@@ -116,6 +143,32 @@ def combine_retrieval_results(
     return sorted_chunks
 
 
+def _timed_retrieval(
+    kind: str, func: Callable[..., list[InferenceChunk]], *args: Any
+) -> list[InferenceChunk]:
+    start = time.monotonic()
+    result = func(*args)
+    retrieval_subquery_latency.labels(kind=kind).observe(time.monotonic() - start)
+    return result
+
+
+def _on_late_retrieval_result(index: int, chunks: list[InferenceChunk]) -> None:
+    retrieval_chunks_dropped.inc(len(chunks))
+    logger.info(
+        f"Retrieval sub-query {index} returned {len(chunks)} chunks after the deadline"
+    )
+
+
+def _doc_index_retrieval_with_own_session(
+    query: SearchQuery,
+    document_index: DocumentIndex,
+) -> list[InferenceChunk]:
+    # sub-queries dropped at the deadline keep running after the caller moved on,
+    # so they must never share the caller's session
+    with get_session_with_current_tenant() as db_session:
+        return doc_index_retrieval(query, document_index, db_session)
+
+
 @log_function_time(print_only=True)
 def doc_index_retrieval(
     query: SearchQuery,
@@ -334,6 +387,9 @@ def retrieve_chunks(
 
     multilingual_expansion = get_multilingual_expansion(db_session)
     run_queries: list[tuple[Callable, tuple]] = []
+    # sub-queries that are always waited on, other ones (rephrasings) may be dropped
+    # if they miss the deadline
+    required_indices: set[int] = set()
 
     source_filters = (
         set(query.filters.source_type) if query.filters.source_type else None
@@ -348,7 +404,13 @@ def retrieve_chunks(
         for federated_retrieval_info in federated_retrieval_infos
     )
     for federated_retrieval_info in federated_retrieval_infos:
-        run_queries.append((federated_retrieval_info.retrieval_function, (query,)))
+        required_indices.add(len(run_queries))
+        run_queries.append(
+            (
+                _timed_retrieval,
+                ("federated", federated_retrieval_info.retrieval_function, query),
+            )
+        )
 
     # Normal retrieval
     normal_search_enabled = (source_filters is None) or (
@@ -358,7 +420,13 @@ def retrieve_chunks(
         not multilingual_expansion or "\n" in query.query or "\r" in query.query
     ):
         # Don't do query expansion on complex queries, rephrasings likely would not work well
-        run_queries.append((doc_index_retrieval, (query, document_index, db_session)))
+        required_indices.add(len(run_queries))
+        run_queries.append(
+            (
+                _timed_retrieval,
+                ("original", doc_index_retrieval, query, document_index, db_session),
+            )
+        )
     elif normal_search_enabled:
         simplified_queries = set()
 
@@ -368,30 +436,76 @@ def retrieve_chunks(
         )
         # Just to be extra sure, add the original query.
         query_rephrases.append(query.query)
-        for rephrase in set(query_rephrases):
+        unique_rephrases: list[str] = []
+        for rephrase in dict.fromkeys(query_rephrases):
             # Sometimes the model rephrases the query in the same language with minor changes
             # Avoid doing an extra search with the minor changes as this biases the results
             simplified_rephrase = _simplify_text(rephrase)
             if simplified_rephrase in simplified_queries:
                 continue
             simplified_queries.add(simplified_rephrase)
+            unique_rephrases.append(rephrase)
 
+        # embed all rephrasings up front, so that the sub-queries dropped at the
+        # deadline don't use the caller's session
+        rephrase_embeddings = get_query_embeddings(unique_rephrases, db_session)
+        for rephrase, rephrase_embedding in zip(unique_rephrases, rephrase_embeddings):
             q_copy = query.model_copy(
                 update={
                     "query": rephrase,
-                    # need to recompute for each rephrase
                     # note that `SearchQuery` is a frozen model, so we can't update
                     # it below
-                    "precomputed_query_embedding": None,
+                    "precomputed_query_embedding": rephrase_embedding,
                 },
                 deep=True,
             )
-            run_queries.append(
-                (doc_index_retrieval, (q_copy, document_index, db_session))
-            )
+            is_original = rephrase == query.query
+            if is_original:
+                required_indices.add(len(run_queries))
+                run_queries.append(
+                    (
+                        _timed_retrieval,
+                        (
+                            "original",
+                            doc_index_retrieval,
+                            q_copy,
+                            document_index,
+                            db_session,
+                        ),
+                    )
+                )
+            else:
+                run_queries.append(
+                    (
+                        _timed_retrieval,
+                        (
+                            "rephrase",
+                            _doc_index_retrieval_with_own_session,
+                            q_copy,
+                            document_index,
+                        ),
+                    )
+                )
 
-    parallel_search_results = run_functions_tuples_in_parallel(run_queries)
-    top_chunks = combine_retrieval_results(parallel_search_results)
+    # Merge the results as each sub-query returns, dropping the rephrasings that
+    # miss the deadline
+    unique_chunks: dict[tuple[str, int], InferenceChunk] = {}
+    finished = 0
+    for _, chunk_set in run_functions_tuples_with_deadline(
+        run_queries,
+        deadline=RETRIEVAL_SUBQUERY_DEADLINE_SECONDS or None,
+        required_indices=required_indices,
+        on_late_result=_on_late_retrieval_result,
+    ):
+        _merge_retrieval_results(unique_chunks, chunk_set)
+        finished += 1
+
+    if finished < len(run_queries):
+        retrieval_subqueries_dropped.inc(len(run_queries) - finished)
+
+    top_chunks = sorted(
+        unique_chunks.values(), key=lambda x: x.score or 0, reverse=True
+    )
 
     if not top_chunks:
         logger.warning(
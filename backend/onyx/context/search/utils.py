@@ -12,6 +12,10 @@ from onyx.context.search.models import InferenceSection
 from onyx.context.search.models import SavedSearchDoc
 from onyx.context.search.models import SavedSearchDocWithContent
 from onyx.context.search.models import SearchDoc
+from onyx.context.search.query_embedding_cache import (
+    build_query_embedding_cache_key,
+)
+from onyx.context.search.query_embedding_cache import get_query_embedding_cache
 from onyx.db.models import SearchDoc as DBSearchDoc
 from onyx.db.search_settings import get_current_search_settings
 from onyx.natural_language_processing.search_nlp_models import EmbeddingModel
@@ -172,15 +176,32 @@ def remove_stop_words_and_punctuation(keywords: list[str]) -> list[str]:
 def get_query_embeddings(queries: list[str], db_session: Session) -> list[Embedding]:
     search_settings = get_current_search_settings(db_session)
 
-    model = EmbeddingModel.from_db_model(
-        search_settings=search_settings,
-        # The below are globally set, this flow always uses the indexing one
-        server_host=MODEL_SERVER_HOST,
-        server_port=MODEL_SERVER_PORT,
-    )
+    cache = get_query_embedding_cache()
+    keys = [
+        build_query_embedding_cache_key(query, search_settings) for query in queries
+    ]
+    key_to_embedding = cache.get_many(keys) if cache is not None else {}
+
+    key_to_missing_query = {
+        key: query for key, query in zip(keys, queries) if key not in key_to_embedding
+    }
+    if key_to_missing_query:
+        model = EmbeddingModel.from_db_model(
+            search_settings=search_settings,
+            # The below are globally set, this flow always uses the indexing one
+            server_host=MODEL_SERVER_HOST,
+            server_port=MODEL_SERVER_PORT,
+        )
+
+        new_embeddings = model.encode(
+            list(key_to_missing_query.values()), text_type=EmbedTextType.QUERY
+        )
+        new_key_to_embedding = dict(zip(key_to_missing_query, new_embeddings))
+        if cache is not None:
+            cache.put_many(new_key_to_embedding)
+        key_to_embedding.update(new_key_to_embedding)
 
-    query_embedding = model.encode(queries, text_type=EmbedTextType.QUERY)
-    return query_embedding
+    return [key_to_embedding[key] for key in keys]
 
 
 def get_query_embedding(query: str, db_session: Session) -> Embedding:
@@ -23,6 +23,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy.sql.expression import null
 
 from onyx.agents.agent_search.kb_search.models import KGEntityDocInfo
+from onyx.configs.app_configs import DB_YIELD_PER_DEFAULT
 from onyx.configs.constants import DEFAULT_BOOST
 from onyx.configs.constants import DocumentSource
 from onyx.configs.kg_configs import KG_SIMPLE_ANSWER_MAX_DISPLAYED_SOURCES
@@ -40,6 +41,7 @@ from onyx.db.models import Credential
 from onyx.db.models import Document
 from onyx.db.models import Document as DbDocument
 from onyx.db.models import DocumentByConnectorCredentialPair
+from onyx.db.models import DocumentContentFingerprint
 from onyx.db.models import KGEntity
 from onyx.db.models import KGRelationship
 from onyx.db.models import User
@@ -163,6 +165,24 @@ def get_document_ids_for_connector_credential_pair(
     return list(db_session.execute(doc_ids_stmt).scalars().all())
 
 
+def iterate_sorted_document_ids_for_connector_credential_pair(
+    db_session: Session, connector_id: int, credential_id: int
+) -> Generator[str, None, None]:
+    """Streams the document ids of the cc pair sorted by code point ("C" collation),
+    without loading them all into memory."""
+    doc_ids_stmt = (
+        select(DocumentByConnectorCredentialPair.id)
+        .where(
+            and_(
+                DocumentByConnectorCredentialPair.connector_id == connector_id,
+                DocumentByConnectorCredentialPair.credential_id == credential_id,
+            )
+        )
+        .order_by(DocumentByConnectorCredentialPair.id.collate("C"))
+    )
+    yield from db_session.scalars(doc_ids_stmt).yield_per(DB_YIELD_PER_DEFAULT)
+
+
 def get_documents_for_connector_credential_pair_limited_columns(
     db_session: Session,
     connector_id: int,
@@ -296,26 +316,6 @@ def get_document_counts_for_cc_pairs_parallel(
         return get_document_counts_for_cc_pairs(db_session, cc_pairs)
 
 
-def get_access_info_for_document(
-    db_session: Session,
-    document_id: str,
-) -> tuple[str, list[str | None], bool] | None:
-    """Gets access info for a single document by calling the get_access_info_for_documents function
-    and passing a list with a single document ID.
-    Args:
-        db_session (Session): The database session to use.
-        document_id (str): The document ID to fetch access info for.
-    Returns:
-        Optional[Tuple[str, List[str | None], bool]]: A tuple containing the document ID, a list of user emails,
-        and a boolean indicating if the document is globally public, or None if no results are found.
-    """
-    results = get_access_info_for_documents(db_session, [document_id])
-    if not results:
-        return None
-
-    return results[0]
-
-
 def get_access_info_for_documents(
     db_session: Session,
     document_ids: list[str],
@@ -527,6 +527,72 @@ def update_docs_chunk_count__no_commit(
         doc.chunk_count = doc_id_to_chunk_count[doc.id]
 
 
+def fetch_content_fingerprints(
+    document_ids: list[str],
+    search_settings_id: int,
+    db_session: Session,
+) -> dict[str, DocumentContentFingerprint]:
+    """Returns document id -> the fingerprints stored for the given search settings.
+    Documents without stored fingerprints are left out."""
+    if not document_ids:
+        return {}
+
+    stmt = select(DocumentContentFingerprint).where(
+        DocumentContentFingerprint.document_id.in_(document_ids),
+        DocumentContentFingerprint.search_settings_id == search_settings_id,
+    )
+    return {
+        fingerprint.document_id: fingerprint for fingerprint in db_session.scalars(stmt)
+    }
+
+
+def update_content_fingerprints__no_commit(
+    search_settings_id: int,
+    doc_id_to_content_hash: dict[str, str | None],
+    doc_id_to_chunk_content_hashes: dict[str, dict[str, str] | None],
+    db_session: Session,
+) -> None:
+    """Sets the content fingerprints of the given documents for the search settings.
+    None clears them, which forces a full re-index of the document the next time it is
+    seen."""
+    cleared_doc_ids = [
+        doc_id
+        for doc_id, content_hash in doc_id_to_content_hash.items()
+        if content_hash is None
+    ]
+    if cleared_doc_ids:
+        db_session.execute(
+            delete(DocumentContentFingerprint).where(
+                DocumentContentFingerprint.document_id.in_(cleared_doc_ids),
+                DocumentContentFingerprint.search_settings_id == search_settings_id,
+            )
+        )
+
+    rows = [
+        {
+            "document_id": doc_id,
+            "search_settings_id": search_settings_id,
+            "content_hash": content_hash,
+            "chunk_content_hashes": doc_id_to_chunk_content_hashes.get(doc_id) or {},
+        }
+        for doc_id, content_hash in sorted(doc_id_to_content_hash.items())
+        if content_hash is not None
+    ]
+    if not rows:
+        return
+
+    insert_stmt = insert(DocumentContentFingerprint).values(rows)
+    db_session.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["document_id", "search_settings_id"],
+            set_={
+                "content_hash": insert_stmt.excluded.content_hash,
+                "chunk_content_hashes": insert_stmt.excluded.chunk_content_hashes,
+            },
+        )
+    )
+
+
 def mark_document_as_modified(
     document_id: str,
     db_session: Session,
@@ -552,6 +618,20 @@ def mark_document_as_synced(document_id: str, db_session: Session) -> None:
     db_session.commit()
 
 
+def mark_documents_as_synced(document_ids: list[str], db_session: Session) -> None:
+    """Bulk version of mark_document_as_synced. Unknown document ids are ignored."""
+    if not document_ids:
+        return
+
+    stmt = (
+        update(DbDocument)
+        .where(DbDocument.id.in_(document_ids))
+        .values(last_synced=datetime.now(timezone.utc))
+    )
+    db_session.execute(stmt)
+    db_session.commit()
+
+
 def delete_document_by_connector_credential_pair__no_commit(
     db_session: Session,
     document_id: str,
@@ -663,6 +743,11 @@ def delete_documents_complete__no_commit(
     )
 
     delete_documents_by_connector_credential_pair__no_commit(db_session, document_ids)
+    db_session.execute(
+        delete(DocumentContentFingerprint).where(
+            DocumentContentFingerprint.document_id.in_(document_ids)
+        )
+    )
     delete_document_feedback_for_documents__no_commit(
         document_ids=document_ids, db_session=db_session
     )
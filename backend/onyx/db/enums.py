@@ -131,3 +131,13 @@ class EmbeddingPrecision(str, PyEnum):
     # good reason to specify anything else
     BFLOAT16 = "bfloat16"
     FLOAT = "float"
+    # the approximate nearest neighbor index is built on binarized embeddings
+    # (1 bit per dimension), full precision embeddings are kept on disk to rescore
+    BINARY = "binary"
+
+    @property
+    def vespa_tensor_type(self) -> str:
+        """Cell type of the full precision embedding tensors in Vespa"""
+        if self == EmbeddingPrecision.BINARY:
+            return EmbeddingPrecision.FLOAT.value
+        return self.value
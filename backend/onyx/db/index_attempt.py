@@ -54,6 +54,23 @@ def get_last_attempt_for_cc_pair(
     )
 
 
+def get_last_successful_attempt_for_cc_pair(
+    cc_pair_id: int,
+    search_settings_id: int,
+    db_session: Session,
+) -> IndexAttempt | None:
+    return (
+        db_session.query(IndexAttempt)
+        .filter(
+            IndexAttempt.connector_credential_pair_id == cc_pair_id,
+            IndexAttempt.search_settings_id == search_settings_id,
+            IndexAttempt.status == IndexingStatus.SUCCESS,
+        )
+        .order_by(IndexAttempt.time_updated.desc())
+        .first()
+    )
+
+
 def get_recent_completed_attempts_for_cc_pair(
     cc_pair_id: int,
     search_settings_id: int,
@@ -182,6 +199,35 @@ def mock_successful_index_attempt(
     return new_attempt.id
 
 
+def create_reprojected_index_attempt(
+    connector_credential_pair_id: int,
+    search_settings_id: int,
+    poll_range_start: datetime | None,
+    poll_range_end: datetime | None,
+    docs_indexed: int,
+    time_started: datetime,
+    db_session: Session,
+) -> int:
+    """Records an index built out of the embeddings of another index as a successful
+    attempt. It should cover the poll range of the last successful attempt of the copied
+    index, so later attempts pick up everything that changed since."""
+    new_attempt = IndexAttempt(
+        connector_credential_pair_id=connector_credential_pair_id,
+        search_settings_id=search_settings_id,
+        from_beginning=True,
+        status=IndexingStatus.SUCCESS,
+        total_docs_indexed=docs_indexed,
+        new_docs_indexed=docs_indexed,
+        poll_range_start=poll_range_start,
+        poll_range_end=poll_range_end,
+        time_started=time_started,
+    )
+    db_session.add(new_attempt)
+    db_session.commit()
+
+    return new_attempt.id
+
+
 def get_in_progress_index_attempts(
     connector_id: int | None,
     db_session: Session,
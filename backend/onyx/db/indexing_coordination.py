@@ -155,6 +155,12 @@ class IndexingCoordination:
         total_docs_indexed: int,
         new_docs_indexed: int,
         total_chunks: int,
+        embedding_cache_hits: int = 0,
+        embedding_cache_misses: int = 0,
+        chunking_seconds: float = 0.0,
+        embedding_seconds: float = 0.0,
+        vector_db_write_seconds: float = 0.0,
+        docprocessing_seconds: float = 0.0,
     ) -> tuple[int, int | None]:
         """
         Update batch completion and document counts atomically.
@@ -179,6 +185,24 @@ class IndexingCoordination:
             # New coordination updates
             attempt.completed_batches = (attempt.completed_batches or 0) + 1
             attempt.total_chunks = (attempt.total_chunks or 0) + total_chunks
+            attempt.embedding_cache_hits = (
+                attempt.embedding_cache_hits or 0
+            ) + embedding_cache_hits
+            attempt.embedding_cache_misses = (
+                attempt.embedding_cache_misses or 0
+            ) + embedding_cache_misses
+            attempt.chunking_seconds = (
+                attempt.chunking_seconds or 0
+            ) + chunking_seconds
+            attempt.embedding_seconds = (
+                attempt.embedding_seconds or 0
+            ) + embedding_seconds
+            attempt.vector_db_write_seconds = (
+                attempt.vector_db_write_seconds or 0
+            ) + vector_db_write_seconds
+            attempt.docprocessing_seconds = (
+                attempt.docprocessing_seconds or 0
+            ) + docprocessing_seconds
 
             db_session.commit()
 
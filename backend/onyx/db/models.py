@@ -643,6 +643,31 @@ class Document(Base):
     )
 
 
+class DocumentContentFingerprint(Base):
+    """Fingerprints of the content of a document as last indexed into the document index
+    of the search settings (see onyx.indexing.content_fingerprint), used to skip
+    re-indexing unchanged documents / chunks. Kept per search settings since the primary
+    and the secondary index are indexed independently during an index swap."""
+
+    __tablename__ = "document_content_fingerprint"
+
+    document_id: Mapped[str] = mapped_column(
+        NullFilteredString,
+        ForeignKey("document.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    search_settings_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("search_settings.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    content_hash: Mapped[str] = mapped_column(String, nullable=False)
+    # chunk key (chunk id, or "large_<id>" for large chunks) -> chunk fingerprint
+    chunk_content_hashes: Mapped[dict[str, str]] = mapped_column(
+        postgresql.JSONB(), nullable=False
+    )
+
+
 class KGEntityType(Base):
     __tablename__ = "kg_entity_type"
 
@@ -1718,6 +1743,16 @@ class IndexAttempt(Base):
     # TODO: unused, remove this column
     total_failures_batch_level: Mapped[int] = mapped_column(Integer, default=0)
     total_chunks: Mapped[int] = mapped_column(Integer, default=0)
+    # number of embeddings served from / missing in the embedding cache
+    embedding_cache_hits: Mapped[int] = mapped_column(Integer, default=0)
+    embedding_cache_misses: Mapped[int] = mapped_column(Integer, default=0)
+    # busy time of each docprocessing stage summed over the batches, and the total time
+    # spent processing the batches. The stages overlap when batches are pipelined, so
+    # stage seconds / docprocessing seconds is the utilization of that stage
+    chunking_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    embedding_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    vector_db_write_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    docprocessing_seconds: Mapped[float] = mapped_column(Float, default=0.0)
 
     # Progress tracking for stall detection
     last_progress_time: Mapped[datetime.datetime | None] = mapped_column(
@@ -9,6 +9,7 @@ from onyx.context.search.models import SavedSearchSettings
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.llm import fetch_embedding_provider
 from onyx.db.models import CloudEmbeddingProvider
+from onyx.db.models import DocumentContentFingerprint
 from onyx.db.models import IndexAttempt
 from onyx.db.models import IndexModelStatus
 from onyx.db.models import SearchSettings
@@ -249,6 +250,13 @@ def update_search_settings_status(
     search_settings: SearchSettings, new_status: IndexModelStatus, db_session: Session
 ) -> None:
     search_settings.status = new_status
+    if new_status == IndexModelStatus.PAST:
+        # the index of past search settings is removed, its fingerprints are of no use
+        db_session.execute(
+            delete(DocumentContentFingerprint).where(
+                DocumentContentFingerprint.search_settings_id == search_settings.id
+            )
+        )
     db_session.commit()
 
 
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 
 from onyx.configs.app_configs import VESPA_NUM_ATTEMPTS_ON_STARTUP
 from onyx.configs.constants import KV_REINDEX_KEY
+from onyx.context.search.query_embedding_cache import get_query_embedding_cache
 from onyx.db.connector_credential_pair import get_connector_credential_pairs
 from onyx.db.connector_credential_pair import resync_cc_pair
 from onyx.db.document import delete_all_documents_for_connector_credential_pair
@@ -74,6 +75,12 @@ def _perform_index_swap(
         db_session=db_session,
     )
 
+    # cached query embeddings are keyed by search settings id, so other processes
+    # stop using the old ones on their own. Free this process's copies right away.
+    query_embedding_cache = get_query_embedding_cache()
+    if query_embedding_cache is not None:
+        query_embedding_cache.clear()
+
     # remove the old index from the vector db
     document_index = get_default_document_index(secondary_search_settings, None)
 
@@ -1,6 +1,7 @@
 import httpx
 from sqlalchemy.orm import Session
 
+from onyx.db.enums import EmbeddingPrecision
 from onyx.db.models import SearchSettings
 from onyx.db.search_settings import get_current_search_settings
 from onyx.document_index.interfaces import DocumentIndex
@@ -12,6 +13,7 @@ def get_default_document_index(
     search_settings: SearchSettings,
     secondary_search_settings: SearchSettings | None,
     httpx_client: httpx.Client | None = None,
+    streaming_feed: bool = False,
 ) -> DocumentIndex:
     """Primary index is the index that is used for querying/updating etc.
     Secondary index is for when both the currently used index and the upcoming
@@ -31,6 +33,10 @@ def get_default_document_index(
         secondary_large_chunks_enabled=secondary_large_chunks_enabled,
         multitenant=MULTI_TENANT,
         httpx_client=httpx_client,
+        streaming_feed=streaming_feed,
+        binary_quantization=(
+            search_settings.embedding_precision == EmbeddingPrecision.BINARY
+        ),
     )
 
 
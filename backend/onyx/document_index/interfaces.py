@@ -128,11 +128,12 @@ class UpdateRequest:
     """
 
     minimal_document_indexing_info: list[MinimalDocumentIndexingInfo]
-    # all other fields except these 4 will always be left alone by the update request
+    # all other fields except these 5 will always be left alone by the update request
     access: DocumentAccess | None = None
     document_sets: set[str] | None = None
     boost: float | None = None
     hidden: bool | None = None
+    doc_updated_at: datetime | None = None
 
 
 class Verifiable(abc.ABC):
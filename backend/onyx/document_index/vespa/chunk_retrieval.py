@@ -1,7 +1,12 @@
 import json
+import queue
 import string
+import threading
 from collections.abc import Callable
+from collections.abc import Generator
+from collections.abc import Iterator
 from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from datetime import timezone
 from typing import Any
@@ -12,6 +17,7 @@ from retry import retry
 
 from onyx.configs.app_configs import LOG_VESPA_TIMING_INFORMATION
 from onyx.configs.app_configs import VESPA_LANGUAGE_OVERRIDE
+from onyx.configs.app_configs import VESPA_VISIT_SLICES
 from onyx.context.search.models import IndexFilters
 from onyx.context.search.models import InferenceChunkUncleaned
 from onyx.document_index.interfaces import VespaChunkRequest
@@ -157,6 +163,38 @@ def _vespa_hit_to_inference_chunk(
     )
 
 
+def _iter_visit_pages(
+    http_client: httpx.Client, url: str, params: dict[str, Any]
+) -> Iterator[list[dict]]:
+    """Follows the continuation tokens of a visit, yielding the documents of each
+    page. Pages may be empty, the visit is done when there is no continuation left."""
+    params = dict(params)
+    while True:
+        try:
+            filtered_params = {k: v for k, v in params.items() if v is not None}
+            response = http_client.get(url, params=filtered_params)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            error_base = "Failed to query Vespa"
+            logger.error(
+                f"{error_base}:\n"
+                f"Request URL: {e.request.url}\n"
+                f"Request Headers: {e.request.headers}\n"
+                f"Request Payload: {params}\n"
+                f"Exception: {str(e)}"
+            )
+            raise httpx.HTTPError(error_base) from e
+
+        response_data = response.json()
+        yield response_data.get("documents", [])
+
+        # Check for continuation token to handle pagination
+        if "continuation" in response_data and response_data["continuation"]:
+            params["continuation"] = response_data["continuation"]
+        else:
+            break  # Exit loop if no continuation token
+
+
 def get_chunks_via_visit_api(
     chunk_request: VespaChunkRequest,
     index_name: str,
@@ -180,7 +218,8 @@ def get_chunks_via_visit_api(
     ):
         field_set_list.append(acl_fieldset_entry)
 
-    if MULTI_TENANT:
+    # without a field set all document fields are returned, tenant_id included
+    if field_set_list and MULTI_TENANT:
         tenant_id_fieldset_entry = f"{TENANT_ID}"
         if tenant_id_fieldset_entry not in field_set_list:
             field_set_list.append(tenant_id_fieldset_entry)
@@ -217,28 +256,9 @@ def get_chunks_via_visit_api(
     }
 
     document_chunks: list[dict] = []
-    while True:
-        try:
-            filtered_params = {k: v for k, v in params.items() if v is not None}
-            with get_vespa_http_client() as http_client:
-                response = http_client.get(url, params=filtered_params)
-                response.raise_for_status()
-        except httpx.HTTPError as e:
-            error_base = "Failed to query Vespa"
-            logger.error(
-                f"{error_base}:\n"
-                f"Request URL: {e.request.url}\n"
-                f"Request Headers: {e.request.headers}\n"
-                f"Request Payload: {params}\n"
-                f"Exception: {str(e)}"
-            )
-            raise httpx.HTTPError(error_base) from e
-
-        # Check if the response contains any documents
-        response_data = response.json()
-
-        if "documents" in response_data:
-            for document in response_data["documents"]:
+    with get_vespa_http_client() as http_client:
+        for documents in _iter_visit_pages(http_client, url, params):
+            for document in documents:
                 if filters.access_control_list:
                     document_acl = document["fields"].get(ACCESS_CONTROL_LIST)
                     if not document_acl or not any(
@@ -261,13 +281,83 @@ def get_chunks_via_visit_api(
 
                 document_chunks.append(document)
 
-        # Check for continuation token to handle pagination
-        if "continuation" in response_data and response_data["continuation"]:
-            params["continuation"] = response_data["continuation"]
+    return document_chunks
+
+
+def visit_vespa_chunks(
+    index_name: str,
+    tenant_id: str | None,
+    selection: str | None = None,
+    field_names: list[str] | None = None,
+    slices: int = VESPA_VISIT_SLICES,
+) -> Generator[list[dict], None, None]:
+    """Scans the index with `slices` parallel visitors, each of them visiting a
+    disjoint slice of the index (Vespa's slices/sliceId), and yields the visited chunks
+    in batches as the pages of the visitors come in.
+
+    `selection` is a document selection over the index, e.g.
+    "{index_name}.source_type=='slack'". Chunks come back as the visit API returns
+    them, with the Vespa document id under "id" and the requested fields under
+    "fields". Closing the generator early stops the visitors."""
+    url = DOCUMENT_ID_ENDPOINT.format(index_name=index_name)
+
+    selections = [f"({selection})"] if selection else []
+    if MULTI_TENANT:
+        if not tenant_id:
+            raise ValueError("Tenant ID is required for multi-tenant")
+        selections.append(f"{index_name}.tenant_id=='{tenant_id}'")
+
+    params: dict[str, Any] = {
+        "selection": " and ".join(selections) or None,
+        "continuation": None,
+        "wantedDocumentCount": 1_000,
+        "fieldSet": f"{index_name}:" + ",".join(field_names) if field_names else None,
+        "slices": slices,
+    }
+
+    # a page, None once a visitor is done, or the exception a visitor failed with
+    pages: queue.Queue[list[dict] | Exception | None] = queue.Queue(maxsize=slices)
+    stop = threading.Event()
+
+    def _put(item: list[dict] | Exception | None) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _visit_slice(slice_id: int) -> None:
+        try:
+            with get_vespa_http_client() as http_client:
+                for documents in _iter_visit_pages(
+                    http_client, url, {**params, "sliceId": slice_id}
+                ):
+                    if documents and not _put(documents):
+                        return
+        except Exception as e:
+            _put(e)
         else:
-            break  # Exit loop if no continuation token
+            _put(None)
 
-    return document_chunks
+    with ThreadPoolExecutor(max_workers=slices) as executor:
+        for slice_id in range(slices):
+            executor.submit(_visit_slice, slice_id)
+
+        try:
+            remaining_slices = slices
+            while remaining_slices:
+                item = pages.get()
+                if item is None:
+                    remaining_slices -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            # also releases visitors blocked on a full queue
+            stop.set()
 
 
 # TODO(rkuo): candidate for removal if not being used
@@ -4,8 +4,8 @@ from uuid import UUID
 import httpx
 from retry import retry
 
+from onyx.document_index.vespa.feed_client import get_vespa_feed_client
 from onyx.document_index.vespa_constants import DOCUMENT_ID_ENDPOINT
-from onyx.document_index.vespa_constants import NUM_THREADS
 from onyx.utils.logger import setup_logger
 
 logger = setup_logger()
@@ -14,9 +14,11 @@ logger = setup_logger()
 CONTENT_SUMMARY = "content_summary"
 
 
-@retry(tries=10, delay=1, backoff=2)
+# throttled requests are already retried by the feed client, which also backs off the
+# number of requests in flight. Only connection level failures are retried here.
+@retry(exceptions=httpx.TransportError, tries=10, delay=1, backoff=2)
 def _retryable_http_delete(http_client: httpx.Client, url: str) -> None:
-    res = http_client.delete(url)
+    res = get_vespa_feed_client().request("delete", http_client, "DELETE", url)
     res.raise_for_status()
 
 
@@ -39,23 +41,15 @@ def delete_vespa_chunks(
     http_client: httpx.Client,
     executor: concurrent.futures.ThreadPoolExecutor | None = None,
 ) -> None:
-    external_executor = True
-
     if not executor:
-        external_executor = False
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS)
-
-    try:
-        chunk_deletion_future = {
-            executor.submit(
-                _delete_vespa_chunk, doc_chunk_id, index_name, http_client
-            ): doc_chunk_id
-            for doc_chunk_id in doc_chunk_ids
-        }
-        for future in concurrent.futures.as_completed(chunk_deletion_future):
-            # Will raise exception if the deletion raised an exception
-            future.result()
-
-    finally:
-        if not external_executor:
-            executor.shutdown(wait=True)
+        executor = get_vespa_feed_client().executor
+
+    chunk_deletion_future = {
+        executor.submit(
+            _delete_vespa_chunk, doc_chunk_id, index_name, http_client
+        ): doc_chunk_id
+        for doc_chunk_id in doc_chunk_ids
+    }
+    for future in concurrent.futures.as_completed(chunk_deletion_future):
+        # Will raise exception if the deletion raised an exception
+        future.result()
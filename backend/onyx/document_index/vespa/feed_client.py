@@ -0,0 +1,211 @@
+import concurrent.futures
+import os
+import random
+import threading
+import time
+from http import HTTPStatus
+from typing import Any
+
+import httpx
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+
+from onyx.configs.app_configs import VESPA_FEED_MAX_IN_FLIGHT
+from onyx.configs.app_configs import VESPA_FEED_THROTTLE_RETRIES
+from onyx.document_index.vespa.shared_utils.utils import get_vespa_http_client
+from onyx.document_index.vespa_constants import NUM_THREADS
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# statuses Vespa uses to signal that the feed should slow down
+THROTTLE_STATUSES = {
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+}
+_BACKOFF_BASE_SECONDS = 0.5
+_BACKOFF_MAX_SECONDS = 30.0
+
+vespa_feed_requests = Counter(
+    "vespa_feed_requests",
+    "Vespa feed requests sent, by operation and response status",
+    ["op", "status"],
+)
+vespa_feed_request_latency = Histogram(
+    "vespa_feed_request_latency_seconds",
+    "Latency of each Vespa feed request",
+    ["op"],
+)
+vespa_feed_retries = Counter(
+    "vespa_feed_retries",
+    "Vespa feed requests retried because Vespa throttled them",
+    ["op"],
+)
+vespa_feed_in_flight_limit = Gauge(
+    "vespa_feed_in_flight_limit",
+    "Current adaptive limit of concurrent Vespa feed requests",
+)
+
+
+class AdaptiveConcurrencyLimiter:
+    """Bounds the number of concurrent requests. The limit is halved every time the
+    server throttles a request and grows back by about one per limit's worth of
+    successful requests (AIMD), never going above max_limit or below 1."""
+
+    def __init__(self, max_limit: int) -> None:
+        if max_limit <= 0:
+            raise ValueError("max_limit must be positive")
+
+        self.max_limit = max_limit
+        self._limit = float(max_limit)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, throttled: bool) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self._limit = max(1.0, self._limit / 2)
+            else:
+                self._limit = min(
+                    float(self.max_limit), self._limit + 1 / max(self._limit, 1.0)
+                )
+            vespa_feed_in_flight_limit.set(self.limit)
+            self._condition.notify_all()
+
+
+def get_backoff_seconds(response: httpx.Response, attempt: int) -> float:
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), _BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+
+    backoff = min(_BACKOFF_BASE_SECONDS * 2**attempt, _BACKOFF_MAX_SECONDS)
+    # full jitter so that throttled threads don't all come back at once
+    return random.uniform(0, backoff)
+
+
+class VespaFeedClient:
+    """Process wide resources for writing to Vespa: a long lived thread pool, a shared
+    HTTP/2 client and a limit on the number of in flight feed requests which adapts
+    to throttling by Vespa.
+
+    Use get_vespa_feed_client() rather than creating one directly."""
+
+    def __init__(
+        self,
+        max_workers: int = NUM_THREADS,
+        max_in_flight: int = VESPA_FEED_MAX_IN_FLIGHT,
+        throttle_retries: int = VESPA_FEED_THROTTLE_RETRIES,
+    ) -> None:
+        self.max_workers = max_workers
+        self.throttle_retries = throttle_retries
+        self.limiter = AdaptiveConcurrencyLimiter(max_in_flight)
+
+        self._lock = threading.Lock()
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._http_client: httpx.Client | None = None
+
+    @property
+    def executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        """Shared thread pool for feed operations. Tasks running on it must not wait on
+        other tasks submitted to it, or they may deadlock once the pool is saturated."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="vespa_feed",
+                )
+            return self._executor
+
+    @property
+    def http_client(self) -> httpx.Client:
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = get_vespa_http_client(http2=True)
+            return self._http_client
+
+    def request(
+        self,
+        op: str,
+        http_client: httpx.Client,
+        method: str,
+        url: str,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Sends a feed request once a slot is available. Requests throttled by Vespa
+        are retried with backoff, the last response is returned either way so that the
+        caller handles errors as it would for any other response."""
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            throttled = False
+            start = time.monotonic()
+            try:
+                response = http_client.request(method, url, **kwargs)
+                throttled = response.status_code in THROTTLE_STATUSES
+            except Exception:
+                vespa_feed_requests.labels(op=op, status="error").inc()
+                raise
+            finally:
+                vespa_feed_request_latency.labels(op=op).observe(
+                    time.monotonic() - start
+                )
+                self.limiter.release(throttled)
+
+            vespa_feed_requests.labels(op=op, status=str(response.status_code)).inc()
+            if not throttled or attempt >= self.throttle_retries:
+                return response
+
+            backoff = get_backoff_seconds(response, attempt)
+            logger.debug(
+                f"Vespa throttled feed request: op={op} status={response.status_code} "
+                f"attempt={attempt + 1} backoff={backoff:.2f}s "
+                f"limit={self.limiter.limit}"
+            )
+            vespa_feed_retries.labels(op=op).inc()
+            attempt += 1
+            time.sleep(backoff)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+
+_feed_client: VespaFeedClient | None = None
+_feed_client_pid: int | None = None
+_feed_client_lock = threading.Lock()
+
+
+def get_vespa_feed_client() -> VespaFeedClient:
+    """Returns the feed client of the current process. A new one is created after a fork
+    since threads and connections are not carried over to the child process."""
+    global _feed_client, _feed_client_pid
+
+    with _feed_client_lock:
+        if _feed_client is None or _feed_client_pid != os.getpid():
+            _feed_client = VespaFeedClient()
+            _feed_client_pid = os.getpid()
+        return _feed_client
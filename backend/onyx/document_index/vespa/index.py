@@ -1,4 +1,5 @@
 import concurrent.futures
+import dataclasses
 import io
 import logging
 import os
@@ -46,13 +47,15 @@ from onyx.document_index.vespa.chunk_retrieval import (
     parallel_visit_api_retrieval,
 )
 from onyx.document_index.vespa.chunk_retrieval import query_vespa
+from onyx.document_index.vespa.chunk_retrieval import visit_vespa_chunks
 from onyx.document_index.vespa.deletion import delete_vespa_chunks
+from onyx.document_index.vespa.feed_client import get_vespa_feed_client
 from onyx.document_index.vespa.indexing_utils import BaseHTTPXClientContext
 from onyx.document_index.vespa.indexing_utils import batch_index_vespa_chunks
 from onyx.document_index.vespa.indexing_utils import check_for_final_chunk_existence
 from onyx.document_index.vespa.indexing_utils import clean_chunk_id_copy
 from onyx.document_index.vespa.indexing_utils import GlobalHTTPXClientContext
-from onyx.document_index.vespa.indexing_utils import TemporaryHTTPXClientContext
+from onyx.document_index.vespa.shared_utils.utils import binarize_embedding
 from onyx.document_index.vespa.shared_utils.utils import get_vespa_http_client
 from onyx.document_index.vespa.shared_utils.utils import (
     replace_invalid_doc_id_characters,
@@ -60,10 +63,13 @@ from onyx.document_index.vespa.shared_utils.utils import (
 from onyx.document_index.vespa.shared_utils.vespa_request_builders import (
     build_vespa_filters,
 )
+from onyx.document_index.vespa.streaming_feed import stream_index_vespa_chunks
 from onyx.document_index.vespa_constants import ACCESS_CONTROL_LIST
 from onyx.document_index.vespa_constants import BATCH_SIZE
 from onyx.document_index.vespa_constants import BOOST
 from onyx.document_index.vespa_constants import CONTENT_SUMMARY
+from onyx.document_index.vespa_constants import DOC_UPDATED_AT
+from onyx.document_index.vespa_constants import DOCUMENT_ID
 from onyx.document_index.vespa_constants import DOCUMENT_ID_ENDPOINT
 from onyx.document_index.vespa_constants import DOCUMENT_SETS
 from onyx.document_index.vespa_constants import HIDDEN
@@ -159,6 +165,28 @@ def in_memory_zip_from_file_bytes(file_contents: dict[str, bytes]) -> BinaryIO:
     return zip_buffer
 
 
+def _render_schema(
+    template: jinja2.Template,
+    schema_name: str,
+    dim: int,
+    embedding_precision: EmbeddingPrecision,
+) -> str:
+    binary_quantization = embedding_precision == EmbeddingPrecision.BINARY
+    if binary_quantization and dim % 8 != 0:
+        raise ValueError(
+            f"Binary embedding precision requires an embedding dimension that is a "
+            f"multiple of 8, got {dim} for {schema_name}"
+        )
+
+    return template.render(
+        multi_tenant=MULTI_TENANT,
+        schema_name=schema_name,
+        dim=dim,
+        embedding_precision=embedding_precision.vespa_tensor_type,
+        binary_quantization=binary_quantization,
+    )
+
+
 def _create_document_xml_lines(doc_names: list[str | None] | list[str]) -> str:
     doc_lines = [
         f'<document type="{doc_name}" mode="index" />'
@@ -195,7 +223,13 @@ class VespaIndex(DocumentIndex):
         secondary_large_chunks_enabled: bool | None,
         multitenant: bool = False,
         httpx_client: httpx.Client | None = None,
+        streaming_feed: bool = False,
+        binary_quantization: bool = False,
     ) -> None:
+        """streaming_feed: write chunks through the streaming feed (see
+        onyx.document_index.vespa.streaming_feed), meant for large backfills.
+        binary_quantization: the primary index uses the binary embedding precision,
+        nearest neighbor search then runs on the binarized embeddings."""
         self.index_name = index_name
         self.secondary_index_name = secondary_index_name
 
@@ -203,14 +237,18 @@ class VespaIndex(DocumentIndex):
         self.secondary_large_chunks_enabled = secondary_large_chunks_enabled
 
         self.multitenant = multitenant
+        self.streaming_feed = streaming_feed
+        self.binary_quantization = binary_quantization
 
         self.httpx_client_context: BaseHTTPXClientContext
 
         if httpx_client:
             self.httpx_client_context = GlobalHTTPXClientContext(httpx_client)
         else:
-            self.httpx_client_context = TemporaryHTTPXClientContext(
-                get_vespa_http_client
+            # reuse the connections of the process wide feed client rather than
+            # setting up a new HTTP/2 connection for every operation
+            self.httpx_client_context = GlobalHTTPXClientContext(
+                get_vespa_feed_client().http_client
             )
 
         self.index_to_large_chunks_enabled: dict[str, bool] = {}
@@ -290,11 +328,11 @@ class VespaIndex(DocumentIndex):
             template_str = schema_f.read()
 
         template = jinja_env.from_string(template_str)
-        schema = template.render(
-            multi_tenant=MULTI_TENANT,
+        schema = _render_schema(
+            template,
             schema_name=self.index_name,
             dim=primary_embedding_dim,
-            embedding_precision=primary_embedding_precision.value,
+            embedding_precision=primary_embedding_precision,
         )
 
         schema = add_ngrams_to_schema(schema) if needs_reindexing else schema
@@ -306,11 +344,11 @@ class VespaIndex(DocumentIndex):
             if secondary_index_embedding_precision is None:
                 raise ValueError("Secondary index embedding precision is required")
 
-            upcoming_schema = template.render(
-                multi_tenant=MULTI_TENANT,
+            upcoming_schema = _render_schema(
+                template,
                 schema_name=self.secondary_index_name,
                 dim=secondary_index_embedding_dim,
-                embedding_precision=secondary_index_embedding_precision.value,
+                embedding_precision=secondary_index_embedding_precision,
             )
 
             zip_dict[f"schemas/{schema_names[1]}.sd"] = upcoming_schema.encode("utf-8")
@@ -402,11 +440,11 @@ class VespaIndex(DocumentIndex):
                 f"Creating index: {index_name} with embedding dimension: {embedding_dim}"
             )
 
-            schema = schema_template.render(
-                multi_tenant=MULTI_TENANT,
+            schema = _render_schema(
+                schema_template,
                 schema_name=index_name,
                 dim=embedding_dim,
-                embedding_precision=embedding_precision.value,
+                embedding_precision=embedding_precision,
             )
 
             schema = add_ngrams_to_schema(schema) if needs_reindexing else schema
@@ -452,40 +490,62 @@ class VespaIndex(DocumentIndex):
 
         # NOTE: using `httpx` here since `requests` doesn't support HTTP2. This is beneficial for
         # indexing / updates / deletes since we have to make a large volume of requests.
-        with (
-            concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS) as executor,
-            self.httpx_client_context as http_client,
-        ):
+        executor = get_vespa_feed_client().executor
+        with self.httpx_client_context as http_client:
             # We require the start and end index for each document in order to
             # know precisely which chunks to delete. This information exists for
             # documents that have `chunk_count` in the database, but not for
             # `old_version` documents.
 
-            enriched_doc_infos: list[EnrichedDocumentIndexingInfo] = [
-                VespaIndex.enrich_basic_chunk_info(
-                    index_name=self.index_name,
-                    http_client=http_client,
-                    document_id=doc_id,
-                    previous_chunk_count=doc_id_to_previous_chunk_cnt.get(doc_id, 0),
-                    new_chunk_count=doc_id_to_new_chunk_cnt.get(doc_id, 0),
-                )
-                for doc_id in doc_id_to_new_chunk_cnt.keys()
-            ]
+            enriched_doc_infos = VespaIndex.enrich_basic_chunk_info_batch(
+                index_name=self.index_name,
+                http_client=http_client,
+                doc_id_to_previous_chunk_cnt=doc_id_to_previous_chunk_cnt,
+                doc_id_to_new_chunk_cnt=doc_id_to_new_chunk_cnt,
+                executor=executor,
+            )
 
             for cleaned_doc_info in enriched_doc_infos:
                 # If the document has previously indexed chunks, we know it previously existed
                 if cleaned_doc_info.chunk_end_index:
                     existing_docs.add(cleaned_doc_info.doc_id)
 
-            # Now, for each doc, we know exactly where to start and end our deletion
-            # So let's generate the chunk IDs for each chunk to delete
+            # Write the new chunks first. Chunk ids are deterministic, so they overwrite
+            # the previous chunks with the same ids in place and the document never
+            # goes missing from search while it is being re-indexed.
+            if self.streaming_feed:
+                self._stream_index_chunks(
+                    cleaned_chunks, new_document_id_to_original_document_id
+                )
+            else:
+                for chunk_batch in batch_generator(cleaned_chunks, BATCH_SIZE):
+                    batch_index_vespa_chunks(
+                        chunks=chunk_batch,
+                        index_name=self.index_name,
+                        http_client=http_client,
+                        multitenant=self.multitenant,
+                        executor=executor,
+                    )
+
+            # Then only delete what was not overwritten: the previous chunks beyond the
+            # new chunk count. Documents still using the old chunk id format are never
+            # overwritten by the new ids, so all of their previous chunks are deleted.
+            # Documents without a chunk count are mostly new documents though, only
+            # those where old format chunks were found have any to delete.
             chunks_to_delete = get_document_chunk_ids(
-                enriched_document_info_list=enriched_doc_infos,
+                enriched_document_info_list=[
+                    (
+                        dataclasses.replace(doc_info, chunk_start_index=0)
+                        if doc_info.old_version
+                        and doc_info.chunk_end_index > doc_info.chunk_start_index
+                        else doc_info
+                    )
+                    for doc_info in enriched_doc_infos
+                ],
                 tenant_id=tenant_id,
                 large_chunks_enabled=large_chunks_enabled,
             )
 
-            # Delete old Vespa documents
             for doc_chunk_ids_batch in batch_generator(chunks_to_delete, BATCH_SIZE):
                 delete_vespa_chunks(
                     doc_chunk_ids=doc_chunk_ids_batch,
@@ -494,15 +554,6 @@ class VespaIndex(DocumentIndex):
                     executor=executor,
                 )
 
-            for chunk_batch in batch_generator(cleaned_chunks, BATCH_SIZE):
-                batch_index_vespa_chunks(
-                    chunks=chunk_batch,
-                    index_name=self.index_name,
-                    http_client=http_client,
-                    multitenant=self.multitenant,
-                    executor=executor,
-                )
-
         all_cleaned_doc_ids = {chunk.source_document.id for chunk in cleaned_chunks}
 
         return {
@@ -513,6 +564,37 @@ class VespaIndex(DocumentIndex):
             for cleaned_doc_id in all_cleaned_doc_ids
         }
 
+    def _stream_index_chunks(
+        self,
+        cleaned_chunks: list[DocMetadataAwareIndexChunk],
+        new_document_id_to_original_document_id: dict[str, str],
+    ) -> None:
+        """Writes the chunks through the streaming feed. Raises if any chunk failed so
+        that, as with the per chunk feed, the caller can retry document by document."""
+        results = stream_index_vespa_chunks(
+            chunks=cleaned_chunks,
+            index_name=self.index_name,
+            multitenant=self.multitenant,
+        )
+        failed_results = [result for result in results if not result.success]
+        if not failed_results:
+            return
+
+        failed_doc_ids = sorted(
+            {
+                new_document_id_to_original_document_id.get(
+                    result.document_id, result.document_id
+                )
+                for result in failed_results
+            }
+        )
+        first_failure = failed_results[0]
+        raise RuntimeError(
+            f"Failed to stream {len(failed_results)} of {len(results)} chunks to Vespa "
+            f"for documents {failed_doc_ids[:10]}. First failure: "
+            f"status={first_failure.status_code} error={first_failure.error}"
+        )
+
     @classmethod
     def _apply_updates_batched(
         cls,
@@ -528,7 +610,10 @@ class VespaIndex(DocumentIndex):
             logger.debug(
                 f"Updating with request to {update.url} with body {update.update_request}"
             )
-            return http_client.put(
+            return get_vespa_feed_client().request(
+                "update",
+                http_client,
+                "PUT",
                 update.url,
                 headers={"Content-Type": "application/json"},
                 json=update.update_request,
@@ -537,26 +622,25 @@ class VespaIndex(DocumentIndex):
         # NOTE: using `httpx` here since `requests` doesn't support HTTP2. This is beneficient for
         # indexing / updates / deletes since we have to make a large volume of requests.
 
-        with (
-            concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS) as executor,
-            httpx_client as http_client,
-        ):
-            for update_batch in batch_generator(updates, batch_size):
-                future_to_document_id = {
-                    executor.submit(
-                        _update_chunk,
-                        update,
-                        http_client,
-                    ): update.document_id
-                    for update in update_batch
-                }
-                for future in concurrent.futures.as_completed(future_to_document_id):
-                    res = future.result()
-                    try:
-                        res.raise_for_status()
-                    except requests.HTTPError as e:
-                        failure_msg = f"Failed to update document: {future_to_document_id[future]}"
-                        raise requests.HTTPError(failure_msg) from e
+        executor = get_vespa_feed_client().executor
+        for update_batch in batch_generator(updates, batch_size):
+            future_to_document_id = {
+                executor.submit(
+                    _update_chunk,
+                    update,
+                    httpx_client,
+                ): update.document_id
+                for update in update_batch
+            }
+            for future in concurrent.futures.as_completed(future_to_document_id):
+                res = future.result()
+                try:
+                    res.raise_for_status()
+                except requests.HTTPError as e:
+                    failure_msg = (
+                        f"Failed to update document: {future_to_document_id[future]}"
+                    )
+                    raise requests.HTTPError(failure_msg) from e
 
     @classmethod
     def _apply_kg_chunk_updates_batched(
@@ -571,7 +655,10 @@ class VespaIndex(DocumentIndex):
         def _kg_update_chunk(
             update: KGVespaChunkUpdateRequest, http_client: httpx.Client
         ) -> httpx.Response:
-            return http_client.put(
+            return get_vespa_feed_client().request(
+                "kg_update",
+                http_client,
+                "PUT",
                 update.url,
                 headers={"Content-Type": "application/json"},
                 json=update.update_request,
@@ -580,26 +667,26 @@ class VespaIndex(DocumentIndex):
         # NOTE: using `httpx` here since `requests` doesn't support HTTP2. This is beneficient for
         # indexing / updates / deletes since we have to make a large volume of requests.
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
-            for update_batch in batch_generator(updates, batch_size):
-                future_to_document_id = {
-                    executor.submit(
-                        _kg_update_chunk,
-                        update,
-                        httpx_client,
-                    ): update.document_id
-                    for update in update_batch
-                }
-                for future in concurrent.futures.as_completed(future_to_document_id):
-                    res = future.result()
-                    try:
-                        res.raise_for_status()
-                    except requests.HTTPError as e:
-                        failure_msg = (
-                            f"Failed to update document {future_to_document_id[future]}\n"
-                            f"Response: {res.text}"
-                        )
-                        raise requests.HTTPError(failure_msg) from e
+        executor = get_vespa_feed_client().executor
+        for update_batch in batch_generator(updates, batch_size):
+            future_to_document_id = {
+                executor.submit(
+                    _kg_update_chunk,
+                    update,
+                    httpx_client,
+                ): update.document_id
+                for update in update_batch
+            }
+            for future in concurrent.futures.as_completed(future_to_document_id):
+                res = future.result()
+                try:
+                    res.raise_for_status()
+                except requests.HTTPError as e:
+                    failure_msg = (
+                        f"Failed to update document {future_to_document_id[future]}\n"
+                        f"Response: {res.text}"
+                    )
+                    raise requests.HTTPError(failure_msg) from e
 
     def update(self, update_requests: list[UpdateRequest], *, tenant_id: str) -> None:
         logger.debug(f"Updating {len(update_requests)} documents in Vespa")
@@ -613,7 +700,8 @@ class VespaIndex(DocumentIndex):
         update_start = time.monotonic()
 
         processed_updates_requests: list[_VespaUpdateRequest] = []
-        all_doc_chunk_ids: dict[str, list[UUID]] = {}
+        # index name -> document id -> chunk ids (including large chunks)
+        all_doc_chunk_ids: dict[str, dict[str, list[UUID]]] = {}
 
         # Fetch all chunks for each document ahead of time
         index_names = [self.index_name]
@@ -622,9 +710,13 @@ class VespaIndex(DocumentIndex):
 
         chunk_id_start_time = time.monotonic()
         with self.httpx_client_context as http_client:
-            for update_request in update_requests:
-                for doc_info in update_request.minimal_document_indexing_info:
-                    for index_name in index_names:
+            for index_name in index_names:
+                large_chunks_enabled = self.index_to_large_chunks_enabled.get(
+                    index_name, False
+                )
+                index_doc_chunk_ids = all_doc_chunk_ids.setdefault(index_name, {})
+                for update_request in update_requests:
+                    for doc_info in update_request.minimal_document_indexing_info:
                         doc_chunk_info = VespaIndex.enrich_basic_chunk_info(
                             index_name=index_name,
                             http_client=http_client,
@@ -632,12 +724,11 @@ class VespaIndex(DocumentIndex):
                             previous_chunk_count=doc_info.chunk_start_index,
                             new_chunk_count=0,
                         )
-                        doc_chunk_ids = get_document_chunk_ids(
+                        index_doc_chunk_ids[doc_info.doc_id] = get_document_chunk_ids(
                             enriched_document_info_list=[doc_chunk_info],
                             tenant_id=tenant_id,
-                            large_chunks_enabled=False,
+                            large_chunks_enabled=large_chunks_enabled,
                         )
-                        all_doc_chunk_ids[doc_info.doc_id] = doc_chunk_ids
 
         logger.debug(
             f"Took {time.monotonic() - chunk_id_start_time:.2f} seconds to fetch all Vespa chunk IDs"
@@ -662,20 +753,25 @@ class VespaIndex(DocumentIndex):
                 }
             if update_request.hidden is not None:
                 update_dict["fields"][HIDDEN] = {"assign": update_request.hidden}
+            if update_request.doc_updated_at is not None:
+                update_dict["fields"][DOC_UPDATED_AT] = {
+                    "assign": int(update_request.doc_updated_at.timestamp())
+                }
 
             if not update_dict["fields"]:
                 logger.error("Update request received but nothing to update")
                 continue
 
-            for doc_info in update_request.minimal_document_indexing_info:
-                for doc_chunk_id in all_doc_chunk_ids[doc_info.doc_id]:
-                    processed_updates_requests.append(
-                        _VespaUpdateRequest(
-                            document_id=doc_info.doc_id,
-                            url=f"{DOCUMENT_ID_ENDPOINT.format(index_name=self.index_name)}/{doc_chunk_id}",
-                            update_request=update_dict,
+            for index_name, index_doc_chunk_ids in all_doc_chunk_ids.items():
+                for doc_info in update_request.minimal_document_indexing_info:
+                    for doc_chunk_id in index_doc_chunk_ids[doc_info.doc_id]:
+                        processed_updates_requests.append(
+                            _VespaUpdateRequest(
+                                document_id=doc_info.doc_id,
+                                url=f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{doc_chunk_id}",
+                                update_request=update_dict,
+                            )
                         )
-                    )
 
         with self.httpx_client_context as httpx_client:
             self._apply_updates_batched(processed_updates_requests, httpx_client)
@@ -784,7 +880,10 @@ class VespaIndex(DocumentIndex):
         )
 
         try:
-            resp = http_client.put(
+            resp = get_vespa_feed_client().request(
+                "update",
+                http_client,
+                "PUT",
                 vespa_url,
                 headers={"Content-Type": "application/json"},
                 json=update_dict,
@@ -865,10 +964,8 @@ class VespaIndex(DocumentIndex):
         if self.secondary_index_name:
             index_names.append(self.secondary_index_name)
 
-        with (
-            self.httpx_client_context as http_client,
-            concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS) as executor,
-        ):
+        executor = get_vespa_feed_client().executor
+        with self.httpx_client_context as http_client:
             for (
                 index_name,
                 large_chunks_enabled,
@@ -949,11 +1046,19 @@ class VespaIndex(DocumentIndex):
         # Needs to be at least as much as the value set in Vespa schema config
         target_hits = max(10 * num_to_retrieve, 1000)
 
+        # with binary quantization, the nearest neighbors are found with the binarized
+        # embeddings and rescored with the full precision ones by the rank profile
+        embeddings_field, title_embedding_field, query_embedding_input = (
+            ("embeddings_binary", "title_embedding_binary", "query_embedding_binary")
+            if self.binary_quantization
+            else ("embeddings", "title_embedding", "query_embedding")
+        )
+
         yql = (
             YQL_BASE.format(index_name=self.index_name)
             + vespa_where_clauses
-            + f"(({{targetHits: {target_hits}}}nearestNeighbor(embeddings, query_embedding)) "
-            + f"or ({{targetHits: {target_hits}}}nearestNeighbor(title_embedding, query_embedding)) "
+            + f"(({{targetHits: {target_hits}}}nearestNeighbor({embeddings_field}, {query_embedding_input})) "
+            + f"or ({{targetHits: {target_hits}}}nearestNeighbor({title_embedding_field}, {query_embedding_input})) "
             + 'or ({grammar: "weakAnd"}userInput(@query)) '
             + f'or ({{defaultIndex: "{CONTENT_SUMMARY}"}}userInput(@query)))'
         )
@@ -985,6 +1090,10 @@ class VespaIndex(DocumentIndex):
             "ranking.profile": ranking_profile,
             "timeout": VESPA_TIMEOUT,
         }
+        if self.binary_quantization:
+            params["input.query(query_embedding_binary)"] = str(
+                binarize_embedding(query_embedding)
+            )
 
         return query_vespa(params)
 
@@ -1055,6 +1164,48 @@ class VespaIndex(DocumentIndex):
         )
         return enriched_doc_info
 
+    @classmethod
+    def enrich_basic_chunk_info_batch(
+        cls,
+        index_name: str,
+        http_client: httpx.Client,
+        doc_id_to_previous_chunk_cnt: dict[str, int],
+        doc_id_to_new_chunk_cnt: dict[str, int],
+        executor: concurrent.futures.Executor,
+    ) -> list[EnrichedDocumentIndexingInfo]:
+        """enrich_basic_chunk_info for every document of doc_id_to_new_chunk_cnt.
+        Documents with a known previous chunk count need no Vespa request. The ones
+        without a chunk count (never indexed, or indexed with the old chunk id format)
+        need a chunk existence probe, these probes run concurrently on the executor."""
+        futures: dict[str, concurrent.futures.Future[EnrichedDocumentIndexingInfo]] = {}
+        enriched_doc_infos: dict[str, EnrichedDocumentIndexingInfo] = {}
+        for doc_id, new_chunk_count in doc_id_to_new_chunk_cnt.items():
+            previous_chunk_count = doc_id_to_previous_chunk_cnt.get(doc_id, 0)
+            if previous_chunk_count is None:
+                futures[doc_id] = executor.submit(
+                    cls.enrich_basic_chunk_info,
+                    index_name=index_name,
+                    http_client=http_client,
+                    document_id=doc_id,
+                    previous_chunk_count=None,
+                    new_chunk_count=new_chunk_count,
+                )
+                continue
+
+            enriched_doc_infos[doc_id] = cls.enrich_basic_chunk_info(
+                index_name=index_name,
+                http_client=http_client,
+                document_id=doc_id,
+                previous_chunk_count=previous_chunk_count,
+                new_chunk_count=new_chunk_count,
+            )
+
+        for doc_id, future in futures.items():
+            enriched_doc_infos[doc_id] = future.result()
+
+        # keep the order of the input
+        return [enriched_doc_infos[doc_id] for doc_id in doc_id_to_new_chunk_cnt]
+
     @classmethod
     def delete_entries_by_tenant_id(
         cls,
@@ -1076,85 +1227,30 @@ class VespaIndex(DocumentIndex):
             f"Deleting entries with tenant_id: {tenant_id} from index: {index_name}"
         )
 
-        # Step 1: Retrieve all document IDs with the given tenant_id
-        document_ids = cls._get_all_document_ids_by_tenant_id(tenant_id, index_name)
+        # the index is scanned by parallel visitors, chunks are deleted as they come in
+        num_deleted = 0
+        for chunks in visit_vespa_chunks(
+            index_name=index_name,
+            tenant_id=tenant_id,
+            selection=f"{index_name}.tenant_id=='{tenant_id}'",
+            field_names=[DOCUMENT_ID],
+        ):
+            cls._apply_deletes_batched(
+                [
+                    _VespaDeleteRequest(
+                        # id:<namespace>:<document type>::<chunk uuid>
+                        document_id=chunk["id"].split("::", 1)[-1],
+                        index_name=index_name,
+                    )
+                    for chunk in chunks
+                ]
+            )
+            num_deleted += len(chunks)
 
-        if not document_ids:
+        if not num_deleted:
             logger.info(
                 f"No documents found with tenant_id: {tenant_id} in index: {index_name}"
             )
-            return
-
-        # Step 2: Delete documents in batches
-        delete_requests = [
-            _VespaDeleteRequest(document_id=doc_id, index_name=index_name)
-            for doc_id in document_ids
-        ]
-
-        cls._apply_deletes_batched(delete_requests)
-
-    @classmethod
-    def _get_all_document_ids_by_tenant_id(
-        cls, tenant_id: str, index_name: str
-    ) -> List[str]:
-        """
-        Retrieves all document IDs with the specified tenant_id, handling pagination.
-
-        Internal helper function for delete_entries_by_tenant_id.
-
-        Parameters:
-            tenant_id (str): The tenant ID to search for.
-            index_name (str): The name of the index to search in.
-
-        Returns:
-            List[str]: A list of document IDs matching the tenant_id.
-        """
-        offset = 0
-        limit = 1000  # Vespa's maximum hits per query
-        document_ids = []
-
-        logger.debug(
-            f"Starting document ID retrieval for tenant_id: {tenant_id} in index: {index_name}"
-        )
-
-        while True:
-            # Construct the query to fetch document IDs
-            query_params = {
-                "yql": f'select id from sources * where tenant_id contains "{tenant_id}";',
-                "offset": str(offset),
-                "hits": str(limit),
-                "timeout": "10s",
-                "format": "json",
-                "summary": "id",
-            }
-
-            url = f"{VESPA_APPLICATION_ENDPOINT}/search/"
-
-            logger.debug(
-                f"Querying for document IDs with tenant_id: {tenant_id}, offset: {offset}"
-            )
-
-            with get_vespa_http_client() as http_client:
-                response = http_client.get(url, params=query_params, timeout=None)
-                response.raise_for_status()
-
-                search_result = response.json()
-                hits = search_result.get("root", {}).get("children", [])
-
-                if not hits:
-                    break
-
-                for hit in hits:
-                    doc_id = hit.get("id")
-                    if doc_id:
-                        document_ids.append(doc_id)
-
-                offset += limit  # Move to the next page
-
-        logger.debug(
-            f"Retrieved {len(document_ids)} document IDs for tenant_id: {tenant_id}"
-        )
-        return document_ids
 
     @classmethod
     def _apply_deletes_batched(
@@ -1248,6 +1344,5 @@ class _VespaDeleteRequest:
         # Encode the document ID to ensure it's safe for use in the URL
         encoded_doc_id = urllib.parse.quote_plus(self.document_id)
         self.url = (
-            f"{VESPA_APPLICATION_ENDPOINT}/document/v1/"
-            f"{index_name}/{index_name}/docid/{encoded_doc_id}"
+            f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{encoded_doc_id}"
         )
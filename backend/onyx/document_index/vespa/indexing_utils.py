@@ -17,6 +17,7 @@ from onyx.connectors.cross_connector_utils.miscellaneous_utils import (
 from onyx.document_index.document_index_utils import get_uuid_from_chunk
 from onyx.document_index.document_index_utils import get_uuid_from_chunk_info_old
 from onyx.document_index.interfaces import MinimalDocumentIndexingInfo
+from onyx.document_index.vespa.feed_client import get_vespa_feed_client
 from onyx.document_index.vespa.shared_utils.utils import remove_invalid_unicode_chars
 from onyx.document_index.vespa.shared_utils.utils import (
     replace_invalid_doc_id_characters,
@@ -126,22 +127,14 @@ def get_existing_documents_from_chunks(
     return document_ids
 
 
-@retry(tries=5, delay=1, backoff=2)
-def _index_vespa_chunk(
-    chunk: DocMetadataAwareIndexChunk,
-    index_name: str,
-    http_client: httpx.Client,
-    multitenant: bool,
-) -> None:
-    json_header = {
-        "Content-Type": "application/json",
-    }
+def build_vespa_chunk_fields(
+    chunk: DocMetadataAwareIndexChunk, multitenant: bool
+) -> dict:
+    """Builds the Vespa document fields of a chunk, as sent by every feed path."""
     document = chunk.source_document
 
     # No minichunk documents in vespa, minichunk vectors are stored in the chunk itself
 
-    vespa_chunk_id = str(get_uuid_from_chunk(chunk))
-
     embeddings = chunk.embeddings
 
     embeddings_name_vector_map = {"full_chunk": embeddings.full_embedding}
@@ -217,10 +210,33 @@ def _index_vespa_chunk(
     if multitenant:
         if chunk.tenant_id:
             vespa_document_fields[TENANT_ID] = chunk.tenant_id
+
+    return vespa_document_fields
+
+
+@retry(tries=5, delay=1, backoff=2)
+def _index_vespa_chunk(
+    chunk: DocMetadataAwareIndexChunk,
+    index_name: str,
+    http_client: httpx.Client,
+    multitenant: bool,
+) -> None:
+    json_header = {
+        "Content-Type": "application/json",
+    }
+    document = chunk.source_document
+    vespa_chunk_id = str(get_uuid_from_chunk(chunk))
+    vespa_document_fields = build_vespa_chunk_fields(chunk, multitenant)
+
     vespa_url = f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{vespa_chunk_id}"
     logger.debug(f'Indexing to URL "{vespa_url}"')
-    res = http_client.post(
-        vespa_url, headers=json_header, json={"fields": vespa_document_fields}
+    res = get_vespa_feed_client().request(
+        "index",
+        http_client,
+        "POST",
+        vespa_url,
+        headers=json_header,
+        json={"fields": vespa_document_fields},
     )
     try:
         res.raise_for_status()
@@ -246,26 +262,18 @@ def batch_index_vespa_chunks(
     multitenant: bool,
     executor: concurrent.futures.ThreadPoolExecutor | None = None,
 ) -> None:
-    external_executor = True
-
     if not executor:
-        external_executor = False
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS)
+        executor = get_vespa_feed_client().executor
 
-    try:
-        chunk_index_future = {
-            executor.submit(
-                _index_vespa_chunk, chunk, index_name, http_client, multitenant
-            ): chunk
-            for chunk in chunks
-        }
-        for future in concurrent.futures.as_completed(chunk_index_future):
-            # Will raise exception if any indexing raised an exception
-            future.result()
-
-    finally:
-        if not external_executor:
-            executor.shutdown(wait=True)
+    chunk_index_future = {
+        executor.submit(
+            _index_vespa_chunk, chunk, index_name, http_client, multitenant
+        ): chunk
+        for chunk in chunks
+    }
+    for future in concurrent.futures.as_completed(chunk_index_future):
+        # Will raise exception if any indexing raised an exception
+        future.result()
 
 
 def clean_chunk_id_copy(
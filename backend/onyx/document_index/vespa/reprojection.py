@@ -0,0 +1,182 @@
+"""Builds the index of new search settings out of the embeddings stored in the current
+index, for swaps that keep the embeddings themselves and only change how they are
+stored: the embedding precision, or a smaller reduced_dimension of a Matryoshka model.
+
+The chunks of the current index are visited, their embeddings are truncated and
+renormalized to the new dimension and the chunks are written to the new index as they
+are, so nothing is chunked or embedded again."""
+
+import math
+from collections import defaultdict
+from collections.abc import Sequence
+from typing import Any
+
+from onyx.configs.app_configs import REPROJECT_EMBEDDINGS_BATCH_SIZE
+from onyx.configs.model_configs import MATRYOSHKA_EMBEDDING_MODELS
+from onyx.context.search.models import IndexFilters
+from onyx.db.enums import EmbeddingPrecision
+from onyx.db.models import SearchSettings
+from onyx.document_index.interfaces import VespaChunkRequest
+from onyx.document_index.vespa.chunk_retrieval import get_chunks_via_visit_api
+from onyx.document_index.vespa.shared_utils.utils import (
+    replace_invalid_doc_id_characters,
+)
+from onyx.document_index.vespa.streaming_feed import stream_feed_operations
+from onyx.document_index.vespa.streaming_feed import VESPA_NAMESPACE
+from onyx.document_index.vespa.streaming_feed import VespaFeedOperationResult
+from onyx.document_index.vespa_constants import EMBEDDINGS
+from onyx.document_index.vespa_constants import TITLE_EMBEDDING
+from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
+from shared_configs.enums import EmbeddingProvider
+
+
+def can_reproject_embeddings(
+    current_search_settings: SearchSettings, new_search_settings: SearchSettings
+) -> bool:
+    """Whether the index of the new search settings can be built from the embeddings
+    stored in the index of the current search settings."""
+    current = current_search_settings
+    new = new_search_settings
+
+    # the chunks and the texts that were embedded have to be the same
+    if (
+        current.model_name != new.model_name
+        or current.provider_type != new.provider_type
+        or current.normalize != new.normalize
+        or current.passage_prefix != new.passage_prefix
+        or current.multipass_indexing != new.multipass_indexing
+        or current.large_chunks_enabled != new.large_chunks_enabled
+        or current.enable_contextual_rag != new.enable_contextual_rag
+        or current.contextual_rag_llm_name != new.contextual_rag_llm_name
+        or current.contextual_rag_llm_provider != new.contextual_rag_llm_provider
+    ):
+        return False
+
+    # bfloat16 embeddings can't be turned back into full precision ones
+    bfloat16 = EmbeddingPrecision.BFLOAT16.value
+    if (
+        current.embedding_precision.vespa_tensor_type == bfloat16
+        and new.embedding_precision.vespa_tensor_type != bfloat16
+    ):
+        return False
+
+    if new.final_embedding_dim > current.final_embedding_dim:
+        return False
+    if new.final_embedding_dim < current.final_embedding_dim:
+        return (
+            new.provider_type == EmbeddingProvider.OPENAI
+            and new.model_name in MATRYOSHKA_EMBEDDING_MODELS
+        )
+
+    # if nothing about the stored embeddings changes, a full reindex was asked for
+    return current.embedding_precision != new.embedding_precision
+
+
+def project_embedding(embedding: Sequence[float], dim: int) -> list[float]:
+    """Truncates the embedding to its first `dim` dimensions and renormalizes it,
+    which is what the embedding would be if the model was asked for `dim` dimensions."""
+    if len(embedding) < dim:
+        raise ValueError(
+            f"Cannot project an embedding of dimension {len(embedding)} to {dim}"
+        )
+    if len(embedding) == dim:
+        return list(embedding)
+
+    truncated = list(embedding[:dim])
+    norm = math.sqrt(sum(value * value for value in truncated))
+    if not norm:
+        return truncated
+    return [value / norm for value in truncated]
+
+
+def _parse_mixed_tensor(tensor: Any) -> dict[str, list[float]]:
+    """Label -> values of a tensor<>(t{},x[dim]) in any of the JSON formats the
+    document API renders tensors in."""
+    if "cells" in tensor:
+        label_to_cells: dict[str, dict[int, float]] = defaultdict(dict)
+        for cell in tensor["cells"]:
+            address = cell["address"]
+            label_to_cells[address["t"]][int(address["x"])] = cell["value"]
+        return {
+            label: [cells[ind] for ind in sorted(cells)]
+            for label, cells in label_to_cells.items()
+        }
+
+    if "blocks" in tensor:
+        blocks = tensor["blocks"]
+        if isinstance(blocks, list):
+            return {block["address"]["t"]: block["values"] for block in blocks}
+        return dict(blocks)
+
+    # short value format, just the label -> values mapping
+    return {label: values for label, values in tensor.items() if label != "type"}
+
+
+def _parse_dense_tensor(tensor: Any) -> list[float]:
+    """Values of a tensor<>(x[dim]) in any of the JSON formats the document API
+    renders tensors in."""
+    if isinstance(tensor, list):
+        return tensor
+    if "values" in tensor:
+        return tensor["values"]
+    cells = {int(cell["address"]["x"]): cell["value"] for cell in tensor["cells"]}
+    return [cells[ind] for ind in sorted(cells)]
+
+
+def build_reprojected_put_operation(document: dict, index_name: str, dim: int) -> dict:
+    """Put operation writing a chunk visited in another index to `index_name`, with its
+    embeddings projected to `dim` dimensions."""
+    fields = dict(document["fields"])
+    if fields.get(EMBEDDINGS) is not None:
+        fields[EMBEDDINGS] = {
+            label: project_embedding(values, dim)
+            for label, values in _parse_mixed_tensor(fields[EMBEDDINGS]).items()
+        }
+    if fields.get(TITLE_EMBEDDING) is not None:
+        fields[TITLE_EMBEDDING] = project_embedding(
+            _parse_dense_tensor(fields[TITLE_EMBEDDING]), dim
+        )
+
+    # id:<namespace>:<document type>::<chunk uuid>, the chunk keeps its uuid
+    chunk_uuid = document["id"].split("::", 1)[1]
+    return {
+        "put": f"id:{VESPA_NAMESPACE}:{index_name}::{chunk_uuid}",
+        "fields": fields,
+    }
+
+
+def reproject_documents(
+    document_ids: list[str],
+    source_index_name: str,
+    target_index_name: str,
+    dim: int,
+    tenant_id: str,
+) -> list[VespaFeedOperationResult]:
+    """Copies all chunks (large chunks included) of the documents from the source
+    index to the target index, projecting their embeddings to `dim` dimensions.
+    Returns a result per chunk written."""
+    filters = IndexFilters(access_control_list=None, tenant_id=tenant_id)
+    visited_chunks: list[list[dict]] = run_functions_tuples_in_parallel(
+        [
+            (
+                get_chunks_via_visit_api,
+                (
+                    VespaChunkRequest(
+                        document_id=replace_invalid_doc_id_characters(document_id)
+                    ),
+                    source_index_name,
+                    filters,
+                    None,
+                    True,
+                ),
+            )
+            for document_id in document_ids
+        ],
+        max_workers=REPROJECT_EMBEDDINGS_BATCH_SIZE,
+    )
+
+    return stream_feed_operations(
+        build_reprojected_put_operation(chunk, target_index_name, dim)
+        for document_chunks in visited_chunks
+        for chunk in document_chunks
+    )
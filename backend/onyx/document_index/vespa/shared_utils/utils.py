@@ -62,6 +62,27 @@ def remove_invalid_unicode_chars(text: str) -> str:
     return _illegal_xml_chars_RE.sub("", text)
 
 
+def binarize_embedding(embedding: list[float]) -> list[int]:
+    """Packs the embedding into int8 values, 1 bit per dimension (1 if positive), the
+    first dimension being the most significant bit. Matches Vespa's
+    `binarize | pack_bits` so that the result can be compared against the binarized
+    embeddings of the index with the hamming distance."""
+    if len(embedding) % 8 != 0:
+        raise ValueError(
+            f"Embedding dimension must be a multiple of 8 to be binarized, "
+            f"got {len(embedding)}"
+        )
+
+    packed: list[int] = []
+    for start in range(0, len(embedding), 8):
+        byte = 0
+        for value in embedding[start : start + 8]:
+            byte = (byte << 1) | (1 if value > 0 else 0)
+        # to a signed int8
+        packed.append(byte - 256 if byte > 127 else byte)
+    return packed
+
+
 def get_vespa_http_client(no_timeout: bool = False, http2: bool = True) -> httpx.Client:
     """
     Configure and return an HTTP client for communicating with Vespa,
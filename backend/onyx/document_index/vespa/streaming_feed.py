@@ -0,0 +1,222 @@
+"""Feed path for large backfills (new search settings, reindexing everything).
+
+Chunks are turned into put operations of the Vespa JSON feed format (the JSONL consumed
+by `vespa feed` / vespa-feed-client) and streamed to /document/v1 as concurrent requests
+of an asyncio client, instead of one thread per request. Where HTTP/2 is available
+(TLS to managed Vespa, or h2c with VESPA_STREAMING_FEED_H2C) the requests are
+multiplexed over a single connection, otherwise each request in flight uses its own
+HTTP/1.1 connection.
+/document/v1 takes a single operation per request, this is how vespa-feed-client feeds
+a JSONL file as well. Operations are produced lazily and every operation gets its own
+result back."""
+
+import asyncio
+import json
+import time
+from collections.abc import Iterable
+from collections.abc import Iterator
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import cast
+
+import httpx
+
+from onyx.configs.app_configs import MANAGED_VESPA
+from onyx.configs.app_configs import VESPA_CLOUD_CERT_PATH
+from onyx.configs.app_configs import VESPA_CLOUD_KEY_PATH
+from onyx.configs.app_configs import VESPA_FEED_THROTTLE_RETRIES
+from onyx.configs.app_configs import VESPA_REQUEST_TIMEOUT
+from onyx.configs.app_configs import VESPA_STREAMING_FEED_CONCURRENCY
+from onyx.configs.app_configs import VESPA_STREAMING_FEED_H2C
+from onyx.document_index.document_index_utils import get_uuid_from_chunk
+from onyx.document_index.vespa.feed_client import get_backoff_seconds
+from onyx.document_index.vespa.feed_client import THROTTLE_STATUSES
+from onyx.document_index.vespa.feed_client import vespa_feed_request_latency
+from onyx.document_index.vespa.feed_client import vespa_feed_requests
+from onyx.document_index.vespa.feed_client import vespa_feed_retries
+from onyx.document_index.vespa.indexing_utils import build_vespa_chunk_fields
+from onyx.document_index.vespa_constants import DOCUMENT_ID
+from onyx.document_index.vespa_constants import DOCUMENT_ID_ENDPOINT
+from onyx.indexing.models import DocMetadataAwareIndexChunk
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# the document/v1 path used by the rest of Vespa indexing is /document/v1/default/...
+VESPA_NAMESPACE = "default"
+_METRICS_OP = "stream_index"
+
+
+@dataclass
+class VespaFeedOperationResult:
+    document_id: str
+    vespa_document_id: str
+    status_code: int | None
+    error: str | None = None
+    # protocol of the last response, e.g. "HTTP/2" or "HTTP/1.1"
+    http_version: str | None = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+def build_vespa_put_operation(
+    chunk: DocMetadataAwareIndexChunk, index_name: str, multitenant: bool
+) -> dict:
+    """A put operation of the Vespa JSON feed format for the chunk."""
+    return {
+        "put": f"id:{VESPA_NAMESPACE}:{index_name}::{get_uuid_from_chunk(chunk)}",
+        "fields": build_vespa_chunk_fields(chunk, multitenant),
+    }
+
+
+def iter_vespa_feed_jsonl(
+    chunks: Iterable[DocMetadataAwareIndexChunk], index_name: str, multitenant: bool
+) -> Iterator[str]:
+    """Yields one JSONL line per chunk, e.g. to be fed with `vespa feed`."""
+    for chunk in chunks:
+        yield json.dumps(build_vespa_put_operation(chunk, index_name, multitenant))
+
+
+def _get_operation_url(put_id: str) -> str:
+    # id:<namespace>:<document type>::<user specified id>
+    _, _, document_type, specific_id = put_id.split(":", 3)
+    specific_id = specific_id.removeprefix(":")
+    return f"{DOCUMENT_ID_ENDPOINT.format(index_name=document_type)}/{specific_id}"
+
+
+def _get_vespa_async_http_client(concurrency: int) -> httpx.AsyncClient:
+    # httpx only negotiates HTTP/2 over TLS (ALPN), over plain http it has to be
+    # told that the server speaks HTTP/2 (prior knowledge) or it uses HTTP/1.1
+    h2c = VESPA_STREAMING_FEED_H2C and not MANAGED_VESPA
+    return httpx.AsyncClient(
+        cert=(
+            cast(tuple[str, str], (VESPA_CLOUD_CERT_PATH, VESPA_CLOUD_KEY_PATH))
+            if MANAGED_VESPA
+            else None
+        ),
+        verify=False if not MANAGED_VESPA else True,
+        timeout=VESPA_REQUEST_TIMEOUT,
+        http1=not h2c,
+        http2=MANAGED_VESPA or h2c,
+        # with HTTP/2 all requests are multiplexed as streams of a single connection,
+        # with HTTP/1.1 every request in flight needs a connection of its own
+        limits=httpx.Limits(
+            max_connections=concurrency, max_keepalive_connections=concurrency
+        ),
+    )
+
+
+async def _send_operation(
+    http_client: httpx.AsyncClient,
+    operation: dict,
+    throttle_retries: int,
+) -> VespaFeedOperationResult:
+    put_id = operation["put"]
+    result = VespaFeedOperationResult(
+        document_id=operation["fields"].get(DOCUMENT_ID, ""),
+        vespa_document_id=put_id,
+        status_code=None,
+    )
+    url = _get_operation_url(put_id)
+
+    attempt = 0
+    while True:
+        start = time.monotonic()
+        try:
+            response = await http_client.post(
+                url,
+                headers={"Content-Type": "application/json"},
+                json={"fields": operation["fields"]},
+            )
+        except httpx.HTTPError as e:
+            vespa_feed_requests.labels(op=_METRICS_OP, status="error").inc()
+            result.error = str(e) or type(e).__name__
+            return result
+        finally:
+            vespa_feed_request_latency.labels(op=_METRICS_OP).observe(
+                time.monotonic() - start
+            )
+
+        vespa_feed_requests.labels(
+            op=_METRICS_OP, status=str(response.status_code)
+        ).inc()
+        result.status_code = response.status_code
+        result.http_version = response.http_version
+        if response.status_code in THROTTLE_STATUSES and attempt < throttle_retries:
+            vespa_feed_retries.labels(op=_METRICS_OP).inc()
+            backoff = get_backoff_seconds(response, attempt)
+            attempt += 1
+            await asyncio.sleep(backoff)
+            continue
+
+        if response.is_error:
+            result.error = response.text or HTTPStatus(response.status_code).phrase
+        return result
+
+
+async def _stream_feed(
+    operations: Iterable[dict],
+    concurrency: int,
+    throttle_retries: int,
+    http_client: httpx.AsyncClient | None = None,
+) -> list[VespaFeedOperationResult]:
+    results: list[VespaFeedOperationResult] = []
+    # all workers pull from the same lazily consumed iterator, so at most
+    # `concurrency` operations are materialized and in flight at a time
+    operations_iter = iter(operations)
+
+    async def _worker(client: httpx.AsyncClient) -> None:
+        for operation in operations_iter:
+            results.append(await _send_operation(client, operation, throttle_retries))
+
+    async def _run(client: httpx.AsyncClient) -> None:
+        await asyncio.gather(*(_worker(client) for _ in range(concurrency)))
+
+    if http_client is not None:
+        await _run(http_client)
+    else:
+        async with _get_vespa_async_http_client(concurrency) as client:
+            await _run(client)
+
+    return results
+
+
+def stream_feed_operations(
+    operations: Iterable[dict],
+    concurrency: int = VESPA_STREAMING_FEED_CONCURRENCY,
+    throttle_retries: int = VESPA_FEED_THROTTLE_RETRIES,
+    http_client: httpx.AsyncClient | None = None,
+) -> list[VespaFeedOperationResult]:
+    """Feeds put operations (see build_vespa_put_operation) to Vespa with up to
+    `concurrency` requests in flight. Never raises for a failed operation, check the
+    returned results instead."""
+    return asyncio.run(
+        _stream_feed(
+            operations,
+            concurrency=max(1, concurrency),
+            throttle_retries=throttle_retries,
+            http_client=http_client,
+        )
+    )
+
+
+def stream_index_vespa_chunks(
+    chunks: list[DocMetadataAwareIndexChunk],
+    index_name: str,
+    multitenant: bool,
+    concurrency: int = VESPA_STREAMING_FEED_CONCURRENCY,
+) -> list[VespaFeedOperationResult]:
+    start = time.monotonic()
+    results = stream_feed_operations(
+        (
+            build_vespa_put_operation(chunk, index_name, multitenant)
+            for chunk in chunks
+        ),
+        concurrency=concurrency,
+    )
+    logger.debug(
+        f"Streamed {len(results)} chunks to Vespa in {time.monotonic() - start:.2f}s"
+    )
+    return results
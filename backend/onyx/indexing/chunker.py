@@ -1,9 +1,20 @@
+import multiprocessing as mp
+import threading
+from bisect import bisect_left
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
 from typing import cast
 
+from chonkie import SentenceChunk
 from chonkie import SentenceChunker
 
 from onyx.configs.app_configs import AVERAGE_SUMMARY_EMBEDDINGS
 from onyx.configs.app_configs import BLURB_SIZE
+from onyx.configs.app_configs import CHUNK_WITH_TOKEN_OFFSETS
 from onyx.configs.app_configs import LARGE_CHUNK_RATIO
 from onyx.configs.app_configs import MINI_CHUNK_SIZE
 from onyx.configs.app_configs import SKIP_METADATA_IN_CHUNK
@@ -34,9 +45,18 @@ CHUNK_OVERLAP = 0
 # overwhelm the actual contents of the chunk
 MAX_METADATA_PERCENTAGE = 0.25
 CHUNK_MIN_CONTENT = 256
+# Number of distinct chunker configurations (e.g. primary and secondary index during a
+# model swap) that keep a chunking process pool alive at the same time
+_MAX_CHUNKING_POOLS = 2
 
 logger = setup_logger()
 
+_chunking_pools_lock = threading.Lock()
+_chunking_pools: "OrderedDict[str, ProcessPoolExecutor]" = OrderedDict()
+
+# Set in the chunking pool worker processes
+_worker_chunker: "Chunker | None" = None
+
 
 def _get_metadata_suffix_for_document_index(
     metadata: dict[str, str | list[str]], include_separator: bool = False
@@ -121,6 +141,101 @@ def generate_large_chunks(chunks: list[DocAwareChunk]) -> list[DocAwareChunk]:
     return large_chunks
 
 
+class TokenizedText:
+    """
+    A text along with the end offsets of its tokens. Allows counting the tokens of any
+    span of the text without tokenizing it again. A token is attributed to the span
+    that contains its last character.
+    """
+
+    def __init__(self, text: str, token_ends: list[int]) -> None:
+        self.text = text
+        self.token_ends = token_ends
+
+    def __len__(self) -> int:
+        return len(self.token_ends)
+
+    def count_tokens(self, start: int, end: int) -> int:
+        return bisect_right(self.token_ends, end) - bisect_right(self.token_ends, start)
+
+    def slice(self, start: int, end: int) -> "TokenizedText":
+        lo = bisect_right(self.token_ends, start)
+        hi = bisect_right(self.token_ends, end)
+        return TokenizedText(
+            self.text[start:end],
+            [token_end - start for token_end in self.token_ends[lo:hi]],
+        )
+
+    def append(
+        self, separator: "TokenizedText", other: "TokenizedText"
+    ) -> "TokenizedText":
+        separator_offset = len(self.text)
+        other_offset = separator_offset + len(separator.text)
+        return TokenizedText(
+            self.text + separator.text + other.text,
+            self.token_ends
+            + [token_end + separator_offset for token_end in separator.token_ends]
+            + [token_end + other_offset for token_end in other.token_ends],
+        )
+
+
+def _pack_sentences(
+    sentence_splitter: SentenceChunker,
+    tokenized: TokenizedText,
+    chunk_size: int,
+    chunk_overlap: int = 0,
+    max_chunks: int | None = None,
+) -> list[tuple[int, int]]:
+    """
+    Offset based equivalent of `SentenceChunker.chunk` in `text` mode: greedily packs
+    whole sentences into chunks of less than `chunk_size` tokens (at least one sentence
+    per chunk), each chunk starting with the last sentences of the previous one that
+    fit in `chunk_overlap` tokens. Sentence token counts come from the offsets of the
+    already tokenized text instead of tokenizing every sentence. Returns the (start,
+    end) character offsets of the chunks in the text.
+    """
+    if not tokenized.text.strip():
+        return []
+
+    # the splitter puts all sentences into one chunk, split exactly like the other
+    # splitters split them
+    sentence_chunks = sentence_splitter.chunk(tokenized.text)
+    if not sentence_chunks:
+        return []
+    sentences = cast(SentenceChunk, sentence_chunks[0]).sentences
+    sentence_starts = [sentence.start_index for sentence in sentences]
+    token_sums = [0] + [
+        bisect_right(tokenized.token_ends, sentence.end_index) for sentence in sentences
+    ]
+
+    spans: list[tuple[int, int]] = []
+    pos = 0
+    while pos < len(sentences) and (max_chunks is None or len(spans) < max_chunks):
+        split_idx = bisect_left(token_sums, token_sums[pos] + chunk_size) - 1
+        split_idx = max(min(split_idx, len(sentences)), pos + 1)
+        spans.append((sentence_starts[pos], sentences[split_idx - 1].end_index))
+
+        if chunk_overlap <= 0 or split_idx == len(sentences):
+            pos = split_idx
+            continue
+
+        # same as the splitter: the next chunk starts with as many of the last
+        # sentences of this one as fit in the overlap
+        overlap_tokens = 0
+        overlap_idx = split_idx - 1
+        while overlap_idx > pos and overlap_tokens < chunk_overlap:
+            sentence_tokens = token_sums[overlap_idx + 1] - token_sums[overlap_idx]
+            # +1 for the space, as counted by the splitter
+            next_tokens = overlap_tokens + sentence_tokens + 1
+            if next_tokens > chunk_overlap:
+                break
+            overlap_tokens = next_tokens
+            overlap_idx -= 1
+        pos = overlap_idx + 1
+
+    return spans
+
+
 class Chunker:
     """
     Chunks documents into smaller chunks for indexing.
@@ -138,9 +253,14 @@ class Chunker:
         chunk_overlap: int = CHUNK_OVERLAP,
         mini_chunk_size: int = MINI_CHUNK_SIZE,
         callback: IndexingHeartbeatInterface | None = None,
+        use_token_offsets: bool = CHUNK_WITH_TOKEN_OFFSETS,
+        process_pool_size: int = 0,
     ) -> None:
         self.include_metadata = include_metadata
+        self.blurb_size = blurb_size
         self.chunk_token_limit = chunk_token_limit
+        self.chunk_overlap = chunk_overlap
+        self.mini_chunk_size = mini_chunk_size
         self.enable_multipass = enable_multipass
         self.enable_large_chunks = enable_large_chunks
         self.enable_contextual_rag = enable_contextual_rag
@@ -153,39 +273,86 @@ class Chunker:
         )
         self.tokenizer = tokenizer
         self.callback = callback
+        self.use_token_offsets = use_token_offsets
+        self.process_pool_size = process_pool_size
+
+        self.section_separator_token_count = len(tokenizer.encode(SECTION_SEPARATOR))
+        self._tokenized_section_separator: TokenizedText | None = None
+        if use_token_offsets:
+            self._tokenized_section_separator = self._tokenize_with_offsets(
+                SECTION_SEPARATOR
+            )
+            if self._tokenized_section_separator is None:
+                logger.warning(
+                    "Tokenizer does not support offsets, chunking with token offsets is disabled"
+                )
+                self.use_token_offsets = False
 
         self.max_context = 0
         self.prompt_tokens = 0
 
+        self._init_splitters()
+
+    def _init_splitters(self) -> None:
+        tokenizer = self.tokenizer
+
         # Create a token counter function that returns the count instead of the tokens
         def token_counter(text: str) -> int:
             return len(tokenizer.encode(text))
 
         self.blurb_splitter = SentenceChunker(
             tokenizer_or_token_counter=token_counter,
-            chunk_size=blurb_size,
+            chunk_size=self.blurb_size,
             chunk_overlap=0,
             return_type="texts",
         )
 
         self.chunk_splitter = SentenceChunker(
             tokenizer_or_token_counter=token_counter,
-            chunk_size=chunk_token_limit,
-            chunk_overlap=chunk_overlap,
+            chunk_size=self.chunk_token_limit,
+            chunk_overlap=self.chunk_overlap,
             return_type="texts",
         )
 
         self.mini_chunk_splitter = (
             SentenceChunker(
                 tokenizer_or_token_counter=token_counter,
-                chunk_size=mini_chunk_size,
+                chunk_size=self.mini_chunk_size,
                 chunk_overlap=0,
                 return_type="texts",
             )
-            if enable_multipass
+            if self.enable_multipass
             else None
         )
 
+        # Only splits texts into sentences for _pack_sentences: no sentence counts as a
+        # token, so every text is a single chunk of all of its sentences
+        self.sentence_splitter = SentenceChunker(
+            tokenizer_or_token_counter=lambda text: 0,
+            chunk_size=1,
+            chunk_overlap=0,
+            return_type="chunks",
+        )
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The splitters wrap a local token counter and the heartbeat is tied to the
+        # indexing process, neither can be sent to a chunking pool worker
+        state = self.__dict__.copy()
+        for attr in (
+            "blurb_splitter",
+            "chunk_splitter",
+            "mini_chunk_splitter",
+            "sentence_splitter",
+            "callback",
+        ):
+            state.pop(attr, None)
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.callback = None
+        self._init_splitters()
+
     def _split_oversized_chunk(self, text: str, content_token_limit: int) -> list[str]:
         """
         Splits the text into smaller chunks based on token count to ensure
@@ -203,21 +370,50 @@ class Chunker:
             start = end
         return chunks
 
-    def _extract_blurb(self, text: str) -> str:
+    def _tokenize_with_offsets(self, text: str) -> TokenizedText | None:
+        """
+        Tokenizes the text once, keeping the token offsets. Returns None if the
+        tokenizer can't provide offsets for this text.
+        """
+        try:
+            offsets = self.tokenizer.encode_with_offsets(text)
+        except Exception:
+            logger.debug("Failed to tokenize text with offsets, falling back")
+            return None
+        return TokenizedText(text, [token_end for _, token_end in offsets])
+
+    def _extract_blurb(self, text: str, tokenized: TokenizedText | None = None) -> str:
         """
         Extract a short blurb from the text (first chunk of size `blurb_size`).
         """
-        # chunker is in `text` mode
-        texts = cast(list[str], self.blurb_splitter.chunk(text))
+        if tokenized is not None:
+            texts = [
+                tokenized.text[start:end]
+                for start, end in _pack_sentences(
+                    self.sentence_splitter, tokenized, self.blurb_size, max_chunks=1
+                )
+            ]
+        else:
+            # chunker is in `text` mode
+            texts = cast(list[str], self.blurb_splitter.chunk(text))
         if not texts:
             return ""
         return texts[0]
 
-    def _get_mini_chunk_texts(self, chunk_text: str) -> list[str] | None:
+    def _get_mini_chunk_texts(
+        self, chunk_text: str, tokenized: TokenizedText | None = None
+    ) -> list[str] | None:
         """
         For "multipass" mode: additional sub-chunks (mini-chunks) for use in certain embeddings.
         """
         if self.mini_chunk_splitter and chunk_text.strip():
+            if tokenized is not None:
+                return [
+                    tokenized.text[start:end]
+                    for start, end in _pack_sentences(
+                        self.sentence_splitter, tokenized, self.mini_chunk_size
+                    )
+                ]
             # chunker is in `text` mode
             return cast(list[str], self.mini_chunk_splitter.chunk(chunk_text))
         return None
@@ -234,14 +430,16 @@ class Chunker:
         metadata_suffix_semantic: str = "",
         metadata_suffix_keyword: str = "",
         image_file_id: str | None = None,
+        tokenized: TokenizedText | None = None,
     ) -> None:
         """
         Helper to create a new DocAwareChunk, append it to chunks_list.
+        If the tokenized text is passed, it is used to find the blurb / mini-chunks.
         """
         new_chunk = DocAwareChunk(
             source_document=document,
             chunk_id=len(chunks_list),
-            blurb=self._extract_blurb(text),
+            blurb=self._extract_blurb(text, tokenized),
             content=text,
             source_links=links or {0: ""},
             image_file_id=image_file_id,
@@ -249,7 +447,7 @@ class Chunker:
             title_prefix=title_prefix,
             metadata_suffix_semantic=metadata_suffix_semantic,
             metadata_suffix_keyword=metadata_suffix_keyword,
-            mini_chunk_texts=self._get_mini_chunk_texts(text),
+            mini_chunk_texts=self._get_mini_chunk_texts(text, tokenized),
             large_chunk_id=None,
             doc_summary="",
             chunk_context="",
@@ -273,6 +471,9 @@ class Chunker:
         chunks: list[DocAwareChunk] = []
         link_offsets: dict[int, str] = {}
         chunk_text = ""
+        # only tracked when chunking with token offsets, None if the current chunk
+        # contains a section that could not be tokenized with offsets
+        chunk_tokens: TokenizedText | None = None
 
         for section_idx, section in enumerate(sections):
             # Get section text and other attributes
@@ -301,9 +502,11 @@ class Chunker:
                         title_prefix=title_prefix,
                         metadata_suffix_semantic=metadata_suffix_semantic,
                         metadata_suffix_keyword=metadata_suffix_keyword,
+                        tokenized=chunk_tokens,
                     )
                     chunk_text = ""
                     link_offsets = {}
+                    chunk_tokens = None
 
                 # Create a chunk specifically for this image section
                 # (Using the text summary that was generated during processing)
@@ -321,7 +524,16 @@ class Chunker:
                 continue
 
             # CASE 2: Normal text section
-            section_token_count = len(self.tokenizer.encode(section_text))
+            section_tokens = (
+                self._tokenize_with_offsets(section_text)
+                if self.use_token_offsets
+                else None
+            )
+            section_token_count = (
+                len(section_tokens)
+                if section_tokens is not None
+                else len(self.tokenizer.encode(section_text))
+            )
 
             # If the section is large on its own, split it separately
             if section_token_count > content_token_limit:
@@ -335,17 +547,50 @@ class Chunker:
                         title_prefix,
                         metadata_suffix_semantic,
                         metadata_suffix_keyword,
+                        tokenized=chunk_tokens,
                     )
                     chunk_text = ""
                     link_offsets = {}
-
-                # chunker is in `text` mode
-                split_texts = cast(list[str], self.chunk_splitter.chunk(section_text))
-                for i, split_text in enumerate(split_texts):
+                    chunk_tokens = None
+
+                split_texts: list[str]
+                split_tokens: list[TokenizedText | None]
+                if section_tokens is not None:
+                    split_spans = _pack_sentences(
+                        self.sentence_splitter,
+                        section_tokens,
+                        self.chunk_token_limit,
+                        chunk_overlap=self.chunk_overlap,
+                    )
+                    split_texts = [
+                        section_tokens.text[start:end] for start, end in split_spans
+                    ]
+                    split_tokens = [
+                        section_tokens.slice(start, end) for start, end in split_spans
+                    ]
+                else:
+                    # chunker is in `text` mode
+                    split_texts = cast(
+                        list[str], self.chunk_splitter.chunk(section_text)
+                    )
+                    split_tokens = [None] * len(split_texts)
+
+                for i, (split_text, split_text_tokens) in enumerate(
+                    zip(split_texts, split_tokens)
+                ):
+                    split_token_count = (
+                        len(split_text_tokens)
+                        if split_text_tokens is not None
+                        else (
+                            len(self.tokenizer.encode(split_text))
+                            if STRICT_CHUNK_TOKEN_LIMIT
+                            else 0
+                        )
+                    )
                     # If even the split_text is bigger than strict limit, further split
                     if (
                         STRICT_CHUNK_TOKEN_LIMIT
-                        and len(self.tokenizer.encode(split_text)) > content_token_limit
+                        and split_token_count > content_token_limit
                     ):
                         smaller_chunks = self._split_oversized_chunk(
                             split_text, content_token_limit
@@ -371,19 +616,35 @@ class Chunker:
                             title_prefix=title_prefix,
                             metadata_suffix_semantic=metadata_suffix_semantic,
                             metadata_suffix_keyword=metadata_suffix_keyword,
+                            tokenized=split_text_tokens,
                         )
                 continue
 
             # If we can still fit this section into the current chunk, do so
-            current_token_count = len(self.tokenizer.encode(chunk_text))
+            current_token_count = (
+                len(chunk_tokens)
+                if chunk_tokens is not None
+                else len(self.tokenizer.encode(chunk_text))
+            )
             current_offset = len(shared_precompare_cleanup(chunk_text))
             next_section_tokens = (
-                len(self.tokenizer.encode(SECTION_SEPARATOR)) + section_token_count
+                self.section_separator_token_count + section_token_count
             )
 
             if next_section_tokens + current_token_count <= content_token_limit:
                 if chunk_text:
+                    chunk_tokens = (
+                        chunk_tokens.append(
+                            self._tokenized_section_separator, section_tokens
+                        )
+                        if chunk_tokens is not None
+                        and section_tokens is not None
+                        and self._tokenized_section_separator is not None
+                        else None
+                    )
                     chunk_text += SECTION_SEPARATOR
+                else:
+                    chunk_tokens = section_tokens
                 chunk_text += section_text
                 link_offsets[current_offset] = section_link_text
             else:
@@ -397,10 +658,12 @@ class Chunker:
                     title_prefix,
                     metadata_suffix_semantic,
                     metadata_suffix_keyword,
+                    tokenized=chunk_tokens,
                 )
                 # start a new chunk
                 link_offsets = {0: section_link_text}
                 chunk_text = section_text
+                chunk_tokens = section_tokens
 
         # finalize any leftover text chunk
         if chunk_text.strip() or not chunks:
@@ -413,6 +676,7 @@ class Chunker:
                 title_prefix,
                 metadata_suffix_semantic,
                 metadata_suffix_keyword,
+                tokenized=chunk_tokens,
             )
         return chunks
 
@@ -511,22 +775,121 @@ class Chunker:
 
         return normal_chunks
 
-    def chunk(self, documents: list[IndexingDocument]) -> list[DocAwareChunk]:
-        """
-        Takes in a list of documents and chunks them into smaller chunks for indexing
-        while persisting the document metadata.
+    def _process_pool_key(self) -> str:
+        return repr(
+            (
+                type(self.tokenizer).__name__,
+                self.tokenizer.model_name,
+                self.include_metadata,
+                self.blurb_size,
+                self.chunk_token_limit,
+                self.chunk_overlap,
+                self.mini_chunk_size,
+                self.enable_multipass,
+                self.enable_large_chunks,
+                self.enable_contextual_rag,
+                self.use_token_offsets,
+                self.process_pool_size,
+            )
+        )
 
-        Works with both standard Document objects and IndexingDocument objects with processed_sections.
+    def _submit_to_process_pool(
+        self, documents: list[IndexingDocument]
+    ) -> list[Future[list[DocAwareChunk]]]:
+        key = self._process_pool_key()
+        evicted_pools: list[ProcessPoolExecutor] = []
+        # submitting under the lock guarantees that a pool is never shut down before
+        # all the work handed to it has been queued
+        with _chunking_pools_lock:
+            pool = _chunking_pools.get(key)
+            if pool is None:
+                while len(_chunking_pools) >= _MAX_CHUNKING_POOLS:
+                    evicted_pools.append(_chunking_pools.popitem(last=False)[1])
+
+                logger.info(
+                    f"Starting chunking process pool with {self.process_pool_size} workers"
+                )
+                # spawn, forking a process with threads (celery, db pools) is unsafe
+                pool = ProcessPoolExecutor(
+                    max_workers=self.process_pool_size,
+                    mp_context=mp.get_context("spawn"),
+                    initializer=_init_chunking_worker,
+                    initargs=(self,),
+                )
+                _chunking_pools[key] = pool
+            _chunking_pools.move_to_end(key)
+
+            futures = [
+                pool.submit(_chunk_document_in_worker, document)
+                for document in documents
+            ]
+
+        # already queued work still completes
+        for evicted_pool in evicted_pools:
+            evicted_pool.shutdown(wait=False)
+
+        return futures
+
+    def chunk_stream(
+        self, documents: list[IndexingDocument]
+    ) -> Iterator[list[DocAwareChunk]]:
         """
-        final_chunks: list[DocAwareChunk] = []
+        Yields the chunks of each document, in the order of the documents, as soon as
+        that document is chunked. If a process pool size is set, the documents are
+        chunked in parallel in worker processes, the chunk ids are assigned per
+        document so the output is the same as chunking in this process.
+        """
+        # daemonic processes (e.g. the spawned indexing job processes) can't have
+        # children, chunk in process there
+        if (
+            self.process_pool_size > 0
+            and len(documents) > 1
+            and not mp.current_process().daemon
+        ):
+            futures = self._submit_to_process_pool(documents)
+            try:
+                for future in futures:
+                    if self.callback and self.callback.should_stop():
+                        raise RuntimeError("Chunker.chunk: Stop signal detected")
+
+                    chunks = future.result()
+                    if self.callback:
+                        self.callback.progress("Chunker.chunk", len(chunks))
+                    yield chunks
+            finally:
+                for future in futures:
+                    future.cancel()
+            return
+
         for document in documents:
             if self.callback and self.callback.should_stop():
                 raise RuntimeError("Chunker.chunk: Stop signal detected")
 
             chunks = self._handle_single_document(document)
-            final_chunks.extend(chunks)
-
             if self.callback:
                 self.callback.progress("Chunker.chunk", len(chunks))
+            yield chunks
+
+    def chunk(self, documents: list[IndexingDocument]) -> list[DocAwareChunk]:
+        """
+        Takes in a list of documents and chunks them into smaller chunks for indexing
+        while persisting the document metadata.
+
+        Works with both standard Document objects and IndexingDocument objects with processed_sections.
+        """
+        final_chunks: list[DocAwareChunk] = []
+        for chunks in self.chunk_stream(documents):
+            final_chunks.extend(chunks)
 
         return final_chunks
+
+
+def _init_chunking_worker(chunker: Chunker) -> None:
+    global _worker_chunker
+    _worker_chunker = chunker
+
+
+def _chunk_document_in_worker(document: IndexingDocument) -> list[DocAwareChunk]:
+    if _worker_chunker is None:
+        raise RuntimeError("Chunking worker was not initialized")
+    return _worker_chunker._handle_single_document(document)
@@ -0,0 +1,107 @@
+import hashlib
+import json
+from typing import Any
+
+from onyx.configs.llm_configs import get_image_extraction_and_analysis_enabled
+from onyx.connectors.models import Document
+from onyx.indexing.chunker import Chunker
+from onyx.indexing.embedder import IndexingEmbedder
+from onyx.indexing.models import DocAwareChunk
+
+# Bump whenever the way content is turned into chunks / Vespa fields changes in a way
+# that is not captured by the inputs below, this invalidates all stored fingerprints
+_FINGERPRINT_VERSION = 1
+
+# Document fields that end up in the chunks (and their Vespa fields). Notably excludes
+# doc_updated_at and external_access which are applied via metadata updates instead.
+_DOCUMENT_CONTENT_FIELDS = {
+    "id",
+    "sections",
+    "source",
+    "semantic_identifier",
+    "metadata",
+    "primary_owners",
+    "secondary_owners",
+    "title",
+}
+_DOCUMENT_HEADER_FIELDS = _DOCUMENT_CONTENT_FIELDS - {"sections"}
+
+
+def _hash_json(obj: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(obj, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def build_pipeline_signature(
+    *,
+    chunker: Chunker,
+    embedder: IndexingEmbedder,
+) -> str:
+    """Captures every indexing setting that changes the chunks / embeddings produced
+    for the exact same document. Part of every fingerprint so that changing any of them
+    invalidates the stored fingerprints. The index is not part of it, fingerprints are
+    stored per search settings instead."""
+    return _hash_json(
+        {
+            "version": _FINGERPRINT_VERSION,
+            "model_name": embedder.model_name,
+            "normalize": embedder.normalize,
+            "passage_prefix": embedder.passage_prefix,
+            "reduced_dimension": embedder.reduced_dimension,
+            "include_metadata": chunker.include_metadata,
+            "blurb_size": chunker.blurb_size,
+            "chunk_token_limit": chunker.chunk_token_limit,
+            "chunk_overlap": chunker.chunk_overlap,
+            "mini_chunk_size": chunker.mini_chunk_size,
+            "enable_multipass": chunker.enable_multipass,
+            "enable_large_chunks": chunker.enable_large_chunks,
+            "enable_contextual_rag": chunker.enable_contextual_rag,
+            "image_analysis": get_image_extraction_and_analysis_enabled(),
+        }
+    )
+
+
+def compute_document_fingerprint(document: Document, pipeline_signature: str) -> str:
+    return _hash_json(
+        {
+            "pipeline": pipeline_signature,
+            "document": document.model_dump(
+                mode="json", include=_DOCUMENT_CONTENT_FIELDS
+            ),
+        }
+    )
+
+
+def get_chunk_key(chunk: DocAwareChunk) -> str:
+    """Matches the naming used for the Vespa chunk ids."""
+    if chunk.large_chunk_id is not None:
+        return f"large_{chunk.large_chunk_id}"
+    return str(chunk.chunk_id)
+
+
+def compute_chunk_fingerprints(
+    chunks: list[DocAwareChunk], pipeline_signature: str
+) -> dict[str, dict[str, str]]:
+    """Returns document id -> chunk key -> fingerprint of everything that is written
+    to the index for that chunk (other than access / document set / boost metadata)."""
+    doc_id_to_header_hash: dict[str, str] = {}
+    doc_id_to_chunk_fingerprints: dict[str, dict[str, str]] = {}
+    for chunk in chunks:
+        document = chunk.source_document
+        if document.id not in doc_id_to_header_hash:
+            doc_id_to_header_hash[document.id] = _hash_json(
+                document.model_dump(mode="json", include=_DOCUMENT_HEADER_FIELDS)
+            )
+
+        doc_id_to_chunk_fingerprints.setdefault(document.id, {})[
+            get_chunk_key(chunk)
+        ] = _hash_json(
+            {
+                "pipeline": pipeline_signature,
+                "document": doc_id_to_header_hash[document.id],
+                "chunk": chunk.model_dump(mode="json", exclude={"source_document"}),
+            }
+        )
+
+    return doc_id_to_chunk_fingerprints
@@ -2,11 +2,17 @@ import time
 from abc import ABC
 from abc import abstractmethod
 from collections import defaultdict
+from collections.abc import Callable
 
+from onyx.configs.app_configs import LARGE_CHUNK_RATIO
+from onyx.configs.model_configs import DOC_EMBEDDING_CONTEXT_SIZE
 from onyx.connectors.models import ConnectorFailure
 from onyx.connectors.models import ConnectorStopSignal
 from onyx.connectors.models import DocumentFailure
 from onyx.db.models import SearchSettings
+from onyx.indexing.embedding_cache import build_embedding_cache_key
+from onyx.indexing.embedding_cache import EmbeddingCache
+from onyx.indexing.embedding_cache import get_default_embedding_cache
 from onyx.indexing.indexing_heartbeat import IndexingHeartbeatInterface
 from onyx.indexing.models import ChunkEmbedding
 from onyx.indexing.models import DocAwareChunk
@@ -51,6 +57,11 @@ class IndexingEmbedder(ABC):
         self.api_url = api_url
         self.api_version = api_version
         self.deployment_name = deployment_name
+        self.reduced_dimension = reduced_dimension
+
+        # Embedding cache statistics, accumulated over the lifetime of the embedder
+        self.cache_hits = 0
+        self.cache_misses = 0
 
         self.embedding_model = EmbeddingModel(
             model_name=model_name,
@@ -94,6 +105,7 @@ class DefaultIndexingEmbedder(IndexingEmbedder):
         deployment_name: str | None = None,
         reduced_dimension: int | None = None,
         callback: IndexingHeartbeatInterface | None = None,
+        embedding_cache: EmbeddingCache | None = None,
     ):
         super().__init__(
             model_name,
@@ -108,6 +120,57 @@ class DefaultIndexingEmbedder(IndexingEmbedder):
             reduced_dimension,
             callback,
         )
+        self.embedding_cache = embedding_cache
+
+    def _encode_with_cache(
+        self,
+        texts: list[str],
+        max_seq_length: int,
+        encode: Callable[[list[str]], list[Embedding]],
+    ) -> list[Embedding]:
+        """Looks up every text in the embedding cache and only sends the misses
+        (deduplicated) to the embedding model. Results are in the order of `texts`."""
+        if self.embedding_cache is None:
+            return encode(texts)
+
+        keys = [
+            build_embedding_cache_key(
+                text=text,
+                model_name=self.model_name,
+                normalize=self.normalize,
+                reduced_dimension=self.reduced_dimension,
+                passage_prefix=self.passage_prefix,
+                provider_type=self.provider_type,
+                max_seq_length=max_seq_length,
+            )
+            for text in texts
+        ]
+
+        try:
+            key_to_embedding = self.embedding_cache.get_many(list(set(keys)))
+        except Exception:
+            # the cache is purely an optimization, never fail indexing because of it
+            logger.exception("Failed to read from the embedding cache")
+            key_to_embedding = {}
+
+        miss_key_to_text: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in key_to_embedding:
+                miss_key_to_text[key] = text
+
+        self.cache_hits += len(texts) - len(miss_key_to_text)
+        self.cache_misses += len(miss_key_to_text)
+
+        if miss_key_to_text:
+            miss_embeddings = encode(list(miss_key_to_text.values()))
+            new_key_to_embedding = dict(zip(miss_key_to_text.keys(), miss_embeddings))
+            key_to_embedding.update(new_key_to_embedding)
+            try:
+                self.embedding_cache.put_many(new_key_to_embedding)
+            except Exception:
+                logger.exception("Failed to write to the embedding cache")
+
+        return [key_to_embedding[key] for key in keys]
 
     @log_function_time()
     def embed_chunks(
@@ -144,12 +207,20 @@ class DefaultIndexingEmbedder(IndexingEmbedder):
                     raise RuntimeError("Large chunk contains mini chunks")
                 flat_chunk_texts.extend(chunk.mini_chunk_texts)
 
-        embeddings = self.embedding_model.encode(
-            texts=flat_chunk_texts,
-            text_type=EmbedTextType.PASSAGE,
-            large_chunks_present=large_chunks_present,
-            tenant_id=tenant_id,
-            request_id=request_id,
+        embeddings = self._encode_with_cache(
+            flat_chunk_texts,
+            max_seq_length=(
+                DOC_EMBEDDING_CONTEXT_SIZE * LARGE_CHUNK_RATIO
+                if large_chunks_present
+                else DOC_EMBEDDING_CONTEXT_SIZE
+            ),
+            encode=lambda texts: self.embedding_model.encode(
+                texts=texts,
+                text_type=EmbedTextType.PASSAGE,
+                large_chunks_present=large_chunks_present,
+                tenant_id=tenant_id,
+                request_id=request_id,
+            ),
         )
 
         chunk_titles = {
@@ -164,11 +235,15 @@ class DefaultIndexingEmbedder(IndexingEmbedder):
         # Cache the Title embeddings to only have to do it once
         title_embed_dict: dict[str, Embedding] = {}
         if chunk_titles_list:
-            title_embeddings = self.embedding_model.encode(
+            title_embeddings = self._encode_with_cache(
                 chunk_titles_list,
-                text_type=EmbedTextType.PASSAGE,
-                tenant_id=tenant_id,
-                request_id=request_id,
+                max_seq_length=DOC_EMBEDDING_CONTEXT_SIZE,
+                encode=lambda titles: self.embedding_model.encode(
+                    titles,
+                    text_type=EmbedTextType.PASSAGE,
+                    tenant_id=tenant_id,
+                    request_id=request_id,
+                ),
             )
             title_embed_dict.update(
                 {
@@ -238,6 +313,7 @@ class DefaultIndexingEmbedder(IndexingEmbedder):
             deployment_name=search_settings.deployment_name,
             reduced_dimension=search_settings.reduced_dimension,
             callback=callback,
+            embedding_cache=get_default_embedding_cache(),
         )
 
 
@@ -0,0 +1,213 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC
+from abc import abstractmethod
+from array import array
+
+from onyx.configs.app_configs import EMBEDDING_CACHE_BACKEND
+from onyx.configs.app_configs import EMBEDDING_CACHE_DIR
+from onyx.configs.app_configs import EMBEDDING_CACHE_MAX_SIZE_MB
+from onyx.utils.logger import setup_logger
+from shared_configs.enums import EmbeddingProvider
+from shared_configs.model_server_models import Embedding
+
+logger = setup_logger()
+
+_SQLITE_CACHE_FILENAME = "embedding_cache.sqlite3"
+
+
+def build_embedding_cache_key(
+    *,
+    text: str,
+    model_name: str,
+    normalize: bool,
+    reduced_dimension: int | None,
+    passage_prefix: str | None,
+    provider_type: EmbeddingProvider | None,
+    max_seq_length: int,
+) -> str:
+    """Content addressed key for a single passage embedding. Anything that can change
+    the resulting vector for the exact same text must be part of the key."""
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    provider = provider_type.value if provider_type else ""
+    return (
+        f"{provider}|{model_name}|{int(normalize)}|{reduced_dimension or ''}|"
+        f"{max_seq_length}|{passage_prefix or ''}|{text_hash}"
+    )
+
+
+class EmbeddingCache(ABC):
+    """Maps content addressed keys (see `build_embedding_cache_key`) to embeddings.
+    Implementations must be safe to share between threads."""
+
+    @abstractmethod
+    def get_many(self, keys: list[str]) -> dict[str, Embedding]:
+        """Returns the cached embeddings for the keys that are present, missing
+        keys are simply not included in the result."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_many(self, key_to_embedding: dict[str, Embedding]) -> None:
+        raise NotImplementedError
+
+
+class SqliteEmbeddingCache(EmbeddingCache):
+    """Local on-disk cache. Vectors are stored as packed float32 blobs which is the
+    highest precision Vespa stores them at anyways.
+
+    Eviction is LRU, bounded by the total size of the stored vectors and enforced
+    after every write."""
+
+    def __init__(self, db_path: str, max_size_bytes: int) -> None:
+        self.db_path = db_path
+        self.max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # the docprocessing worker is multithreaded, all access goes through the lock
+        self._conn = sqlite3.connect(db_path, timeout=60.0, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding ("
+                "key TEXT PRIMARY KEY, "
+                "vector BLOB NOT NULL, "
+                "last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_embedding_last_access "
+                "ON embedding (last_access)"
+            )
+            # running totals maintained by triggers so that checking the size bound
+            # does not require a full table scan on every write
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_stats ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), "
+                "num_rows INTEGER NOT NULL, "
+                "total_size INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO embedding_stats (id, num_rows, total_size) "
+                "VALUES (0, 0, 0)"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS embedding_after_insert "
+                "AFTER INSERT ON embedding BEGIN "
+                "UPDATE embedding_stats SET num_rows = num_rows + 1, "
+                "total_size = total_size + LENGTH(NEW.vector) WHERE id = 0; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS embedding_after_delete "
+                "AFTER DELETE ON embedding BEGIN "
+                "UPDATE embedding_stats SET num_rows = num_rows - 1, "
+                "total_size = total_size - LENGTH(OLD.vector) WHERE id = 0; END"
+            )
+
+    @staticmethod
+    def _pack(embedding: Embedding) -> bytes:
+        return array("f", embedding).tobytes()
+
+    @staticmethod
+    def _unpack(blob: bytes) -> Embedding:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def get_many(self, keys: list[str]) -> dict[str, Embedding]:
+        if not keys:
+            return {}
+
+        found: dict[str, Embedding] = {}
+        now = time.time()
+        with self._lock, self._conn:
+            # stay well below SQLITE_MAX_VARIABLE_NUMBER
+            for start in range(0, len(keys), 500):
+                key_batch = keys[start : start + 500]
+                placeholders = ",".join("?" * len(key_batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embedding WHERE key IN ({placeholders})",
+                    key_batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = self._unpack(blob)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE embedding SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+
+        return found
+
+    def put_many(self, key_to_embedding: dict[str, Embedding]) -> None:
+        if not key_to_embedding:
+            return
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                # keys are content addressed, an existing row already holds the
+                # same vector
+                "INSERT OR IGNORE INTO embedding (key, vector, last_access) "
+                "VALUES (?, ?, ?)",
+                [
+                    (key, self._pack(embedding), now)
+                    for key, embedding in key_to_embedding.items()
+                ],
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Must be called while holding the lock and inside a transaction."""
+        num_rows, total_size = self._conn.execute(
+            "SELECT num_rows, total_size FROM embedding_stats WHERE id = 0"
+        ).fetchone()
+        if total_size <= self.max_size_bytes:
+            return
+
+        # Vectors of a single model all have the same size, so the average size is
+        # a good estimate of how many rows must go
+        avg_size = total_size / max(num_rows, 1)
+        num_to_evict = math.ceil((total_size - self.max_size_bytes) / avg_size)
+
+        self._conn.execute(
+            "DELETE FROM embedding WHERE key IN ("
+            "SELECT key FROM embedding ORDER BY last_access ASC LIMIT ?)",
+            (num_to_evict,),
+        )
+        logger.debug(f"Evicted {num_to_evict} entries from the embedding cache")
+
+
+_EMBEDDING_CACHE: EmbeddingCache | None = None
+_EMBEDDING_CACHE_LOCK = threading.Lock()
+
+
+def get_default_embedding_cache() -> EmbeddingCache | None:
+    """Returns the process wide embedding cache configured via EMBEDDING_CACHE_BACKEND,
+    or None if caching is disabled."""
+    global _EMBEDDING_CACHE
+
+    if not EMBEDDING_CACHE_BACKEND:
+        return None
+
+    with _EMBEDDING_CACHE_LOCK:
+        if _EMBEDDING_CACHE is not None:
+            return _EMBEDDING_CACHE
+
+        if EMBEDDING_CACHE_BACKEND == "sqlite":
+            _EMBEDDING_CACHE = SqliteEmbeddingCache(
+                db_path=os.path.join(EMBEDDING_CACHE_DIR, _SQLITE_CACHE_FILENAME),
+                max_size_bytes=EMBEDDING_CACHE_MAX_SIZE_MB * 1024 * 1024,
+            )
+        else:
+            logger.error(
+                f"Unknown EMBEDDING_CACHE_BACKEND '{EMBEDDING_CACHE_BACKEND}', "
+                "embedding cache is disabled"
+            )
+            return None
+
+        return _EMBEDDING_CACHE
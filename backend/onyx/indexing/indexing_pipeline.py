@@ -1,5 +1,7 @@
+import time
 from collections import defaultdict
 from collections.abc import Callable
+from collections.abc import Iterator
 from typing import Protocol
 
 from pydantic import BaseModel
@@ -8,8 +10,11 @@ from sqlalchemy.orm import Session
 
 from onyx.access.access import get_access_for_documents
 from onyx.access.models import DocumentAccess
+from onyx.configs.app_configs import CHUNKING_PROCESS_POOL_SIZE
+from onyx.configs.app_configs import CHUNKING_STREAM_MIN_CHUNKS
 from onyx.configs.app_configs import DEFAULT_CONTEXTUAL_RAG_LLM_NAME
 from onyx.configs.app_configs import DEFAULT_CONTEXTUAL_RAG_LLM_PROVIDER
+from onyx.configs.app_configs import ENABLE_CONTENT_FINGERPRINT_SKIP
 from onyx.configs.app_configs import ENABLE_CONTEXTUAL_RAG
 from onyx.configs.app_configs import MAX_DOCUMENT_CHARS
 from onyx.configs.app_configs import MAX_TOKENS_FOR_FULL_INCLUSION
@@ -32,9 +37,11 @@ from onyx.connectors.models import Section
 from onyx.connectors.models import TextSection
 from onyx.db.chunk import update_chunk_boost_components__no_commit
 from onyx.db.document import fetch_chunk_counts_for_documents
+from onyx.db.document import fetch_content_fingerprints
 from onyx.db.document import get_documents_by_ids
 from onyx.db.document import mark_document_as_indexed_for_cc_pair__no_commit
 from onyx.db.document import prepare_to_modify_documents
+from onyx.db.document import update_content_fingerprints__no_commit
 from onyx.db.document import update_docs_chunk_count__no_commit
 from onyx.db.document import update_docs_last_modified__no_commit
 from onyx.db.document import update_docs_updated_at__no_commit
@@ -54,10 +61,16 @@ from onyx.document_index.document_index_utils import (
 from onyx.document_index.interfaces import DocumentIndex
 from onyx.document_index.interfaces import DocumentMetadata
 from onyx.document_index.interfaces import IndexBatchParams
+from onyx.document_index.interfaces import MinimalDocumentIndexingInfo
+from onyx.document_index.interfaces import UpdateRequest
 from onyx.file_processing.image_summarization import summarize_image_with_error_handling
 from onyx.file_store.file_store import get_default_file_store
 from onyx.file_store.utils import store_user_file_plaintext
 from onyx.indexing.chunker import Chunker
+from onyx.indexing.content_fingerprint import build_pipeline_signature
+from onyx.indexing.content_fingerprint import compute_chunk_fingerprints
+from onyx.indexing.content_fingerprint import compute_document_fingerprint
+from onyx.indexing.content_fingerprint import get_chunk_key
 from onyx.indexing.embedder import embed_chunks_with_failure_handling
 from onyx.indexing.embedder import IndexingEmbedder
 from onyx.indexing.models import DocAwareChunk
@@ -99,6 +112,24 @@ class DocumentBatchPrepareContext(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
 
+class ChunkedDocumentBatch(BaseModel):
+    """A document batch that went through the DB prepare step, passed between the
+    chunking, embedding and writing steps of the indexing pipeline."""
+
+    filtered_documents: list[Document]
+    ctx: DocumentBatchPrepareContext
+    changed_docs: list[Document]
+    unchanged_docs: list[Document]
+    pipeline_signature: str
+    doc_id_to_content_hash: dict[str, str]
+    # chunk fingerprints stored for the search settings being indexed
+    doc_id_to_stored_chunk_hashes: dict[str, dict[str, str]] = {}
+    # all chunks of the changed documents, not only the ones that have to be embedded
+    chunks: list[DocAwareChunk] = []
+    doc_id_to_chunk_hashes: dict[str, dict[str, str]] = {}
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
 class IndexingPipelineResult(BaseModel):
     # number of documents that are completely new (e.g. did
     # not exist as a part of this OR any other connector)
@@ -111,6 +142,19 @@ class IndexingPipelineResult(BaseModel):
 
     failures: list[ConnectorFailure]
 
+    # number of texts (chunks, mini-chunks, titles) whose embedding was
+    # served from / missing in the embedding cache
+    embedding_cache_hits: int = 0
+    embedding_cache_misses: int = 0
+
+    # time spent in the chunking (including the DB prepare step), embedding and
+    # document index writing steps, these overlap when the batch is pipelined so
+    # stage seconds / total_seconds gives the utilization of each stage
+    chunking_seconds: float = 0.0
+    embedding_seconds: float = 0.0
+    vector_db_write_seconds: float = 0.0
+    total_seconds: float = 0.0
+
 
 class IndexingPipelineProtocol(Protocol):
     def __call__(
@@ -281,32 +325,38 @@ def index_doc_batch_with_handler(
         logger.warning("Connector stop signal detected in index_doc_batch_with_handler")
         raise e
     except Exception as e:
-        # don't log the batch directly, it's too much text
-        document_ids = [doc.id for doc in document_batch]
-        logger.exception(f"Failed to index document batch: {document_ids}")
-
-        index_pipeline_result = IndexingPipelineResult(
-            new_docs=0,
-            total_docs=len(document_batch),
-            total_chunks=0,
-            failures=[
-                ConnectorFailure(
-                    failed_document=DocumentFailure(
-                        document_id=document.id,
-                        document_link=(
-                            document.sections[0].link if document.sections else None
-                        ),
-                    ),
-                    failure_message=str(e),
-                    exception=e,
-                )
-                for document in document_batch
-            ],
-        )
+        index_pipeline_result = build_failed_batch_result(document_batch, e)
 
     return index_pipeline_result
 
 
+def build_failed_batch_result(
+    document_batch: list[Document], e: Exception
+) -> IndexingPipelineResult:
+    # don't log the batch directly, it's too much text
+    document_ids = [doc.id for doc in document_batch]
+    logger.exception(f"Failed to index document batch: {document_ids}")
+
+    return IndexingPipelineResult(
+        new_docs=0,
+        total_docs=len(document_batch),
+        total_chunks=0,
+        failures=[
+            ConnectorFailure(
+                failed_document=DocumentFailure(
+                    document_id=document.id,
+                    document_link=(
+                        document.sections[0].link if document.sections else None
+                    ),
+                ),
+                failure_message=str(e),
+                exception=e,
+            )
+            for document in document_batch
+        ],
+    )
+
+
 def index_doc_batch_prepare(
     documents: list[Document],
     index_attempt_metadata: IndexAttemptMetadata,
@@ -673,37 +723,131 @@ def add_contextual_summaries(
     return chunks
 
 
-@log_function_time(debug_only=True)
-def index_doc_batch(
+def _group_document_chunks(
+    document_chunks: Iterator[list[DocAwareChunk]], min_chunks: int | None
+) -> Iterator[list[DocAwareChunk]]:
+    """Combines the chunks of consecutive documents into groups of at least min_chunks
+    chunks (except for the last group), documents are never split across groups.
+    Without min_chunks, everything ends up in a single group."""
+    group: list[DocAwareChunk] = []
+    for chunks in document_chunks:
+        group.extend(chunks)
+        if min_chunks is not None and len(group) >= min_chunks:
+            yield group
+            group = []
+
+    if group:
+        yield group
+
+
+def _filter_unchanged_chunks(
+    chunks: list[DocAwareChunk],
+    doc_id_to_chunk_hashes: dict[str, dict[str, str]],
+    doc_id_to_stored_chunk_hashes: dict[str, dict[str, str]],
+    id_to_db_doc_map: dict[str, DBDocument],
+) -> list[DocAwareChunk]:
+    """Drops the chunks whose fingerprint matches the one stored for the chunk with the
+    same id from the previous successful indexing of the document. Those are already
+    present in the document index with exactly this content."""
+    changed_chunks: list[DocAwareChunk] = []
+    for chunk in chunks:
+        doc_id = chunk.source_document.id
+        db_doc = id_to_db_doc_map.get(doc_id)
+        stored_chunk_hashes = doc_id_to_stored_chunk_hashes.get(doc_id)
+        # without a chunk count the document may use the old chunk id scheme
+        if db_doc is None or db_doc.chunk_count is None or not stored_chunk_hashes:
+            changed_chunks.append(chunk)
+            continue
+
+        chunk_key = get_chunk_key(chunk)
+        if (
+            stored_chunk_hashes.get(chunk_key)
+            != doc_id_to_chunk_hashes[doc_id][chunk_key]
+        ):
+            changed_chunks.append(chunk)
+
+    return changed_chunks
+
+
+def _update_metadata_of_unwritten_chunks(
+    document_index: DocumentIndex,
+    docs: list[Document],
+    doc_id_to_chunk_cnt: dict[str, int],
+    doc_id_to_access_info: dict[str, DocumentAccess],
+    doc_id_to_document_set: dict[str, list[str]],
+    id_to_db_doc_map: dict[str, DBDocument],
+    tenant_id: str,
+) -> list[ConnectorFailure]:
+    """Chunks whose content did not change are not rewritten, but the access, document
+    sets, boost and update time of their document may have changed since they were
+    indexed. Updates these for all chunks of the given documents. Tries to update all
+    documents at once, if that fails goes document by document to isolate the
+    failure(s)."""
+    if not docs:
+        return []
+
+    update_requests = [
+        UpdateRequest(
+            minimal_document_indexing_info=[
+                MinimalDocumentIndexingInfo(
+                    doc_id=doc.id,
+                    chunk_start_index=doc_id_to_chunk_cnt.get(doc.id, 0),
+                )
+            ],
+            access=doc_id_to_access_info.get(doc.id),
+            document_sets=set(doc_id_to_document_set.get(doc.id, [])),
+            boost=(
+                id_to_db_doc_map[doc.id].boost
+                if doc.id in id_to_db_doc_map
+                else DEFAULT_BOOST
+            ),
+            doc_updated_at=doc.doc_updated_at,
+        )
+        for doc in docs
+    ]
+
+    try:
+        document_index.update(update_requests, tenant_id=tenant_id)
+        return []
+    except Exception:
+        logger.exception(
+            "Failed to update metadata of unchanged chunks. Trying individual docs."
+        )
+
+    failures: list[ConnectorFailure] = []
+    for doc, update_request in zip(docs, update_requests):
+        try:
+            document_index.update([update_request], tenant_id=tenant_id)
+        except Exception as e:
+            logger.exception(f"Failed to update metadata for document '{doc.id}'")
+            failures.append(
+                ConnectorFailure(
+                    failed_document=DocumentFailure(
+                        document_id=doc.id,
+                        document_link=doc.sections[0].link if doc.sections else None,
+                    ),
+                    failure_message=str(e),
+                    exception=e,
+                )
+            )
+
+    return failures
+
+
+def prepare_doc_batch_for_chunking(
     *,
     document_batch: list[Document],
     chunker: Chunker,
     embedder: IndexingEmbedder,
-    information_content_classification_model: InformationContentClassificationModel,
     document_index: DocumentIndex,
     index_attempt_metadata: IndexAttemptMetadata,
     db_session: Session,
-    tenant_id: str,
-    enable_contextual_rag: bool = False,
-    llm: LLM | None = None,
     ignore_time_skip: bool = False,
     filter_fnc: Callable[[list[Document]], list[Document]] = filter_documents,
-) -> IndexingPipelineResult:
-    """Takes different pieces of the indexing pipeline and applies it to a batch of documents
-    Note that the documents should already be batched at this point so that it does not inflate the
-    memory requirements
-
-    Returns a tuple where the first element is the number of new docs and the
-    second element is the number of chunks."""
-
-    no_access = DocumentAccess.build(
-        user_emails=[],
-        user_groups=[],
-        external_user_emails=[],
-        external_user_group_ids=[],
-        is_public=False,
-    )
-
+) -> ChunkedDocumentBatch | IndexingPipelineResult:
+    """First step of indexing a batch: upserts the documents into the DB and works out
+    which of them have to be chunked. Returns the final result of the batch directly if
+    there is nothing to index."""
     filtered_documents = filter_fnc(document_batch)
 
     ctx = index_doc_batch_prepare(
@@ -730,9 +874,50 @@ def index_doc_batch(
             failures=[],
         )
 
+    # Documents whose content is identical to what was last indexed (e.g. the source
+    # only bumped the timestamp) skip chunking / embedding and only get their metadata
+    # updated in the document index
+    pipeline_signature = build_pipeline_signature(chunker=chunker, embedder=embedder)
+    doc_id_to_content_hash = {
+        doc.id: compute_document_fingerprint(doc, pipeline_signature)
+        for doc in ctx.updatable_docs
+    }
+    # fingerprints are stored per search settings since the primary and the secondary
+    # index are written by independent attempts during an index swap
+    search_settings_id = index_attempt_metadata.search_settings_id
+    stored_fingerprints = (
+        fetch_content_fingerprints(
+            document_ids=[doc.id for doc in ctx.updatable_docs],
+            search_settings_id=search_settings_id,
+            db_session=db_session,
+        )
+        if ENABLE_CONTENT_FINGERPRINT_SKIP and search_settings_id is not None
+        else {}
+    )
+    unchanged_docs: list[Document] = []
+    changed_docs: list[Document] = []
+    for doc in ctx.updatable_docs:
+        db_doc = ctx.id_to_db_doc_map.get(doc.id)
+        stored_fingerprint = stored_fingerprints.get(doc.id)
+        if (
+            db_doc is not None
+            and db_doc.chunk_count is not None
+            and stored_fingerprint is not None
+            and stored_fingerprint.content_hash == doc_id_to_content_hash[doc.id]
+        ):
+            unchanged_docs.append(doc)
+        else:
+            changed_docs.append(doc)
+
+    if unchanged_docs:
+        logger.info(
+            f"Skipping chunking and embedding for {len(unchanged_docs)} documents "
+            f"with unchanged content out of {len(ctx.updatable_docs)} updatable docs"
+        )
+
     # Convert documents to IndexingDocument objects with processed section
     # logger.debug("Processing image sections")
-    ctx.indexable_docs = process_image_sections(ctx.updatable_docs)
+    ctx.indexable_docs = process_image_sections(changed_docs)
 
     doc_descriptors = [
         {
@@ -743,19 +928,48 @@ def index_doc_batch(
     ]
     logger.debug(f"Starting indexing process for documents: {doc_descriptors}")
 
-    logger.debug("Starting chunking")
-    # NOTE: no special handling for failures here, since the chunker is not
-    # a common source of failure for the indexing pipeline
-    chunks: list[DocAwareChunk] = chunker.chunk(ctx.indexable_docs)
-    llm_tokenizer: BaseTokenizer | None = None
+    return ChunkedDocumentBatch(
+        filtered_documents=filtered_documents,
+        ctx=ctx,
+        changed_docs=changed_docs,
+        unchanged_docs=unchanged_docs,
+        pipeline_signature=pipeline_signature,
+        doc_id_to_content_hash=doc_id_to_content_hash,
+        doc_id_to_stored_chunk_hashes={
+            doc_id: fingerprint.chunk_content_hashes
+            for doc_id, fingerprint in stored_fingerprints.items()
+        },
+    )
+
+
+def get_contextual_rag_tokenizer(
+    enable_contextual_rag: bool, llm: LLM | None
+) -> BaseTokenizer | None:
+    if not enable_contextual_rag:
+        return None
+
+    assert llm is not None, "must provide an LLM for contextual RAG"
+    return get_tokenizer(
+        model_name=llm.config.model_name,
+        provider_type=llm.config.model_provider,
+    )
+
 
+def add_chunks_to_doc_batch(
+    batch: ChunkedDocumentBatch,
+    chunks: list[DocAwareChunk],
+    *,
+    chunker: Chunker,
+    enable_contextual_rag: bool = False,
+    llm: LLM | None = None,
+    llm_tokenizer: BaseTokenizer | None = None,
+) -> list[DocAwareChunk]:
+    """Adds the chunks of some of the batch's documents to the batch. Returns the ones
+    that have to be embedded, i.e. the ones that changed since they were last indexed.
+    """
     # contextual RAG
     if enable_contextual_rag:
-        assert llm is not None, "must provide an LLM for contextual RAG"
-        llm_tokenizer = get_tokenizer(
-            model_name=llm.config.model_name,
-            provider_type=llm.config.model_provider,
-        )
+        assert llm is not None and llm_tokenizer is not None
 
         # Because the chunker's tokens are different from the LLM's tokens,
         # We add a fudge factor to ensure we truncate prompts to the LLM's token limit
@@ -765,20 +979,30 @@ def index_doc_batch(
             tokenizer=llm_tokenizer,
             chunk_token_limit=chunker.chunk_token_limit * 2,
         )
+    batch.chunks.extend(chunks)
 
-    logger.debug("Starting embedding")
-    chunks_with_embeddings, embedding_failures = (
-        embed_chunks_with_failure_handling(
-            chunks=chunks,
-            embedder=embedder,
-            tenant_id=tenant_id,
-            request_id=index_attempt_metadata.request_id,
-        )
-        if chunks
-        else ([], [])
+    # Only the chunks that differ from what is already in the document index have to be
+    # embedded and written, the unchanged ones are left in place
+    doc_id_to_chunk_hashes = compute_chunk_fingerprints(
+        chunks, batch.pipeline_signature
     )
+    batch.doc_id_to_chunk_hashes.update(doc_id_to_chunk_hashes)
+    if not ENABLE_CONTENT_FINGERPRINT_SKIP:
+        return chunks
+
+    return _filter_unchanged_chunks(
+        chunks=chunks,
+        doc_id_to_chunk_hashes=doc_id_to_chunk_hashes,
+        doc_id_to_stored_chunk_hashes=batch.doc_id_to_stored_chunk_hashes,
+        id_to_db_doc_map=batch.ctx.id_to_db_doc_map,
+    )
+
 
-    chunk_content_scores = (
+def get_chunk_content_scores(
+    chunks_with_embeddings: list[IndexChunk],
+    information_content_classification_model: InformationContentClassificationModel,
+) -> list[float]:
+    return (
         _get_aggregated_chunk_boost_factor(
             chunks_with_embeddings, information_content_classification_model
         )
@@ -786,6 +1010,43 @@ def index_doc_batch(
         else [1.0] * len(chunks_with_embeddings)
     )
 
+
+def write_doc_batch(
+    batch: ChunkedDocumentBatch,
+    *,
+    chunks_with_embeddings: list[IndexChunk],
+    embedding_failures: list[ConnectorFailure],
+    chunk_content_scores: list[float],
+    chunker: Chunker,
+    document_index: DocumentIndex,
+    index_attempt_metadata: IndexAttemptMetadata,
+    db_session: Session,
+    tenant_id: str,
+) -> IndexingPipelineResult:
+    """Last step of indexing a batch: writes the embedded chunks to the document index
+    and records the results in the DB."""
+    ctx = batch.ctx
+    filtered_documents = batch.filtered_documents
+    changed_docs = batch.changed_docs
+    unchanged_docs = batch.unchanged_docs
+    chunks = batch.chunks
+    doc_id_to_content_hash = batch.doc_id_to_content_hash
+    doc_id_to_chunk_hashes = batch.doc_id_to_chunk_hashes
+
+    no_access = DocumentAccess.build(
+        user_emails=[],
+        user_groups=[],
+        external_user_emails=[],
+        external_user_group_ids=[],
+        is_public=False,
+    )
+
+    embedding_failed_doc_ids = {
+        failure.failed_document.document_id
+        for failure in embedding_failures
+        if failure.failed_document
+    }
+
     updatable_ids = [doc.id for doc in ctx.updatable_docs]
     updatable_chunk_data = [
         UpdatableChunkData(
@@ -827,15 +1088,16 @@ def index_doc_batch(
             )
         }
 
+        # NOTE: counts all chunks of the changed documents, including the ones that
+        # are unchanged and not rewritten, so that only the tail of removed chunks
+        # gets deleted. Documents that failed to embed lose all of their chunks.
         doc_id_to_new_chunk_cnt: dict[str, int] = {
-            document_id: len(
-                [
-                    chunk
-                    for chunk in chunks_with_embeddings
-                    if chunk.source_document.id == document_id
-                ]
+            doc.id: (
+                0
+                if doc.id in embedding_failed_doc_ids
+                else len(doc_id_to_chunk_hashes.get(doc.id, {}))
             )
-            for document_id in updatable_ids
+            for doc in changed_docs
         }
 
         try:
@@ -856,14 +1118,14 @@ def index_doc_batch(
             # Only calculate token counts for documents that have a user file ID
 
             user_file_id = doc_id_to_user_file_id.get(document_id)
-            if user_file_id is None:
+            if user_file_id is None or document_id not in doc_id_to_new_chunk_cnt:
                 continue
 
-            document_chunks = [
-                chunk
-                for chunk in chunks_with_embeddings
-                if chunk.source_document.id == document_id
-            ]
+            document_chunks = (
+                [chunk for chunk in chunks if chunk.source_document.id == document_id]
+                if document_id not in embedding_failed_doc_ids
+                else []
+            )
             if document_chunks:
                 combined_content = " ".join(
                     [chunk.content for chunk in document_chunks]
@@ -926,8 +1188,55 @@ def index_doc_batch(
             ),
         )
 
+        # changed documents where every remaining chunk was unchanged have nothing
+        # to write, their removed chunks (if any) were still deleted by the index call
+        doc_id_to_num_written_chunks: dict[str, int] = defaultdict(int)
+        for chunk in access_aware_chunks:
+            doc_id_to_num_written_chunks[chunk.source_document.id] += 1
+        doc_ids_without_writes = {
+            doc.id for doc in changed_docs if doc.id not in doc_id_to_num_written_chunks
+        } - embedding_failed_doc_ids
+
+        # the chunks of changed documents that were left in place still carry the
+        # access, document sets, boost and update time they were written with, so
+        # these are updated along with those of the unchanged documents
+        write_failed_doc_ids = {
+            failure.failed_document.document_id
+            for failure in vector_db_write_failures
+            if failure.failed_document
+        }
+        partially_written_docs = [
+            doc
+            for doc in changed_docs
+            if doc.id not in embedding_failed_doc_ids
+            and doc.id not in write_failed_doc_ids
+            and doc_id_to_num_written_chunks[doc.id] < doc_id_to_new_chunk_cnt[doc.id]
+        ]
+        metadata_update_failures = _update_metadata_of_unwritten_chunks(
+            document_index=document_index,
+            docs=unchanged_docs + partially_written_docs,
+            doc_id_to_chunk_cnt={
+                # the chunks last written to this index, the chunk count of the
+                # document may come from an attempt on the other index
+                **{
+                    doc.id: len(batch.doc_id_to_stored_chunk_hashes.get(doc.id, {}))
+                    for doc in unchanged_docs
+                },
+                **{
+                    doc.id: doc_id_to_new_chunk_cnt[doc.id]
+                    for doc in partially_written_docs
+                },
+            },
+            doc_id_to_access_info=doc_id_to_access_info,
+            doc_id_to_document_set=doc_id_to_document_set,
+            id_to_db_doc_map=ctx.id_to_db_doc_map,
+            tenant_id=tenant_id,
+        )
+
         all_returned_doc_ids = (
             {record.document_id for record in insertion_records}
+            .union(doc_ids_without_writes)
+            .union({doc.id for doc in unchanged_docs})
             .union(
                 {
                     record.failed_document.document_id
@@ -979,11 +1288,44 @@ def index_doc_batch(
         )
 
         update_docs_chunk_count__no_commit(
-            document_ids=updatable_ids,
+            document_ids=list(doc_id_to_new_chunk_cnt.keys()),
             doc_id_to_chunk_count=doc_id_to_new_chunk_cnt,
             db_session=db_session,
         )
 
+        # fingerprints are only kept for documents that are fully in sync with the
+        # document index, failed documents will be fully re-indexed next time
+        failed_doc_ids = {
+            failure.failed_document.document_id
+            for failure in vector_db_write_failures
+            + embedding_failures
+            + metadata_update_failures
+            if failure.failed_document
+        }
+        doc_id_to_new_content_hash: dict[str, str | None] = {}
+        doc_id_to_new_chunk_hashes: dict[str, dict[str, str] | None] = {}
+        for doc in changed_docs:
+            if doc.id in failed_doc_ids:
+                doc_id_to_new_content_hash[doc.id] = None
+                doc_id_to_new_chunk_hashes[doc.id] = None
+            else:
+                doc_id_to_new_content_hash[doc.id] = doc_id_to_content_hash[doc.id]
+                doc_id_to_new_chunk_hashes[doc.id] = doc_id_to_chunk_hashes.get(
+                    doc.id, {}
+                )
+        for doc in unchanged_docs:
+            if doc.id in failed_doc_ids:
+                doc_id_to_new_content_hash[doc.id] = None
+                doc_id_to_new_chunk_hashes[doc.id] = None
+
+        if index_attempt_metadata.search_settings_id is not None:
+            update_content_fingerprints__no_commit(
+                search_settings_id=index_attempt_metadata.search_settings_id,
+                doc_id_to_content_hash=doc_id_to_new_content_hash,
+                doc_id_to_chunk_content_hashes=doc_id_to_new_chunk_hashes,
+                db_session=db_session,
+            )
+
         update_user_file_token_count__no_commit(
             user_file_id_to_token_count=user_file_id_to_token_count,
             db_session=db_session,
@@ -1015,25 +1357,149 @@ def index_doc_batch(
         new_docs=len([r for r in insertion_records if not r.already_existed]),
         total_docs=len(filtered_documents),
         total_chunks=len(access_aware_chunks),
-        failures=vector_db_write_failures + embedding_failures,
+        failures=vector_db_write_failures
+        + embedding_failures
+        + metadata_update_failures,
     )
 
     return result
 
 
-def run_indexing_pipeline(
+@log_function_time(debug_only=True)
+def index_doc_batch(
     *,
     document_batch: list[Document],
-    index_attempt_metadata: IndexAttemptMetadata,
+    chunker: Chunker,
     embedder: IndexingEmbedder,
     information_content_classification_model: InformationContentClassificationModel,
     document_index: DocumentIndex,
+    index_attempt_metadata: IndexAttemptMetadata,
     db_session: Session,
     tenant_id: str,
-    chunker: Chunker | None = None,
+    enable_contextual_rag: bool = False,
+    llm: LLM | None = None,
     ignore_time_skip: bool = False,
+    filter_fnc: Callable[[list[Document]], list[Document]] = filter_documents,
 ) -> IndexingPipelineResult:
-    """Builds a pipeline which takes in a list (batch) of docs and indexes them."""
+    """Takes different pieces of the indexing pipeline and applies it to a batch of documents
+    Note that the documents should already be batched at this point so that it does not inflate the
+    memory requirements
+
+    Returns a tuple where the first element is the number of new docs and the
+    second element is the number of chunks."""
+    start_time = time.monotonic()
+
+    batch = prepare_doc_batch_for_chunking(
+        document_batch=document_batch,
+        chunker=chunker,
+        embedder=embedder,
+        document_index=document_index,
+        index_attempt_metadata=index_attempt_metadata,
+        db_session=db_session,
+        ignore_time_skip=ignore_time_skip,
+        filter_fnc=filter_fnc,
+    )
+    if isinstance(batch, IndexingPipelineResult):
+        batch.chunking_seconds = batch.total_seconds = time.monotonic() - start_time
+        return batch
+
+    llm_tokenizer = get_contextual_rag_tokenizer(enable_contextual_rag, llm)
+    chunking_seconds = time.monotonic() - start_time
+    embedding_seconds = 0.0
+
+    num_chunks_to_embed = 0
+    chunks_with_embeddings: list[IndexChunk] = []
+    embedding_failures: list[ConnectorFailure] = []
+    cache_hits_before = embedder.cache_hits
+    cache_misses_before = embedder.cache_misses
+
+    # When chunking in a process pool, the chunks of the documents that are done are
+    # embedded while the rest of the batch is still being chunked
+    # NOTE: no special handling for failures here, since the chunker is not
+    # a common source of failure for the indexing pipeline
+    logger.debug("Starting chunking")
+    chunk_groups = _group_document_chunks(
+        chunker.chunk_stream(batch.ctx.indexable_docs),
+        min_chunks=(
+            CHUNKING_STREAM_MIN_CHUNKS if chunker.process_pool_size > 0 else None
+        ),
+    )
+    while True:
+        step_start_time = time.monotonic()
+        chunk_group = next(chunk_groups, None)
+        if chunk_group is None:
+            chunking_seconds += time.monotonic() - step_start_time
+            break
+
+        chunks_to_embed = add_chunks_to_doc_batch(
+            batch,
+            chunk_group,
+            chunker=chunker,
+            enable_contextual_rag=enable_contextual_rag,
+            llm=llm,
+            llm_tokenizer=llm_tokenizer,
+        )
+        chunking_seconds += time.monotonic() - step_start_time
+        if not chunks_to_embed:
+            continue
+
+        logger.debug("Starting embedding")
+        step_start_time = time.monotonic()
+        num_chunks_to_embed += len(chunks_to_embed)
+        group_chunks_with_embeddings, group_embedding_failures = (
+            embed_chunks_with_failure_handling(
+                chunks=chunks_to_embed,
+                embedder=embedder,
+                tenant_id=tenant_id,
+                request_id=index_attempt_metadata.request_id,
+            )
+        )
+        chunks_with_embeddings.extend(group_chunks_with_embeddings)
+        embedding_failures.extend(group_embedding_failures)
+        embedding_seconds += time.monotonic() - step_start_time
+
+    if num_chunks_to_embed != len(batch.chunks):
+        logger.info(
+            f"Rewrote {num_chunks_to_embed} changed chunks out of {len(batch.chunks)} "
+            f"chunks for {len(batch.changed_docs)} changed documents"
+        )
+
+    step_start_time = time.monotonic()
+    chunk_content_scores = get_chunk_content_scores(
+        chunks_with_embeddings, information_content_classification_model
+    )
+    embedding_seconds += time.monotonic() - step_start_time
+
+    step_start_time = time.monotonic()
+    result = write_doc_batch(
+        batch,
+        chunks_with_embeddings=chunks_with_embeddings,
+        embedding_failures=embedding_failures,
+        chunk_content_scores=chunk_content_scores,
+        chunker=chunker,
+        document_index=document_index,
+        index_attempt_metadata=index_attempt_metadata,
+        db_session=db_session,
+        tenant_id=tenant_id,
+    )
+    result.embedding_cache_hits = embedder.cache_hits - cache_hits_before
+    result.embedding_cache_misses = embedder.cache_misses - cache_misses_before
+    result.chunking_seconds = chunking_seconds
+    result.embedding_seconds = embedding_seconds
+    result.vector_db_write_seconds = time.monotonic() - step_start_time
+    result.total_seconds = time.monotonic() - start_time
+
+    return result
+
+
+def build_indexing_chunker(
+    *,
+    embedder: IndexingEmbedder,
+    db_session: Session,
+    chunker: Chunker | None = None,
+) -> tuple[Chunker, bool, LLM | None]:
+    """Returns the chunker, whether contextual RAG is enabled and the LLM to use for it
+    based on the search settings that are currently being indexed."""
     all_search_settings = get_active_search_settings(db_session)
     if (
         all_search_settings.secondary
@@ -1061,9 +1527,30 @@ def run_indexing_pipeline(
         enable_multipass=multipass_config.multipass_indexing,
         enable_large_chunks=multipass_config.enable_large_chunks,
         enable_contextual_rag=enable_contextual_rag,
+        process_pool_size=CHUNKING_PROCESS_POOL_SIZE,
         # after every doc, update status in case there are a bunch of really long docs
     )
 
+    return chunker, enable_contextual_rag, llm
+
+
+def run_indexing_pipeline(
+    *,
+    document_batch: list[Document],
+    index_attempt_metadata: IndexAttemptMetadata,
+    embedder: IndexingEmbedder,
+    information_content_classification_model: InformationContentClassificationModel,
+    document_index: DocumentIndex,
+    db_session: Session,
+    tenant_id: str,
+    chunker: Chunker | None = None,
+    ignore_time_skip: bool = False,
+) -> IndexingPipelineResult:
+    """Builds a pipeline which takes in a list (batch) of docs and indexes them."""
+    chunker, enable_contextual_rag, llm = build_indexing_chunker(
+        embedder=embedder, db_session=db_session, chunker=chunker
+    )
+
     return index_doc_batch_with_handler(
         chunker=chunker,
         embedder=embedder,
@@ -0,0 +1,361 @@
+"""Runs the indexing pipeline over a document batch as a three stage pipeline of
+sub-batches: while one sub-batch is written to the document index, the next one is
+embedded and the one after that is chunked, so that the CPU, the model server and the
+document index are busy at the same time.
+
+The stages are connected by bounded queues, a stage blocks once the next one falls
+behind by more than the queue size. Failures are handled per sub-batch the same way
+index_doc_batch_with_handler handles them for a whole batch."""
+
+import queue
+import threading
+import time
+from collections.abc import Callable
+from typing import Generic
+from typing import TypeVar
+
+from pydantic import BaseModel
+from pydantic import ConfigDict
+from sqlalchemy.orm import Session
+
+from onyx.configs.app_configs import DOCPROCESSING_PIPELINE_QUEUE_SIZE
+from onyx.connectors.models import ConnectorFailure
+from onyx.connectors.models import ConnectorStopSignal
+from onyx.connectors.models import Document
+from onyx.connectors.models import IndexAttemptMetadata
+from onyx.db.engine.sql_engine import get_session_with_current_tenant
+from onyx.document_index.interfaces import DocumentIndex
+from onyx.indexing.chunker import Chunker
+from onyx.indexing.embedder import embed_chunks_with_failure_handling
+from onyx.indexing.embedder import IndexingEmbedder
+from onyx.indexing.indexing_pipeline import add_chunks_to_doc_batch
+from onyx.indexing.indexing_pipeline import build_failed_batch_result
+from onyx.indexing.indexing_pipeline import build_indexing_chunker
+from onyx.indexing.indexing_pipeline import ChunkedDocumentBatch
+from onyx.indexing.indexing_pipeline import get_chunk_content_scores
+from onyx.indexing.indexing_pipeline import get_contextual_rag_tokenizer
+from onyx.indexing.indexing_pipeline import IndexingPipelineResult
+from onyx.indexing.indexing_pipeline import prepare_doc_batch_for_chunking
+from onyx.indexing.indexing_pipeline import write_doc_batch
+from onyx.indexing.models import DocAwareChunk
+from onyx.indexing.models import IndexChunk
+from onyx.llm.interfaces import LLM
+from onyx.natural_language_processing.search_nlp_models import (
+    InformationContentClassificationModel,
+)
+from onyx.utils.logger import setup_logger
+from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
+
+logger = setup_logger()
+
+# how often a stage blocked on a queue checks whether another stage failed
+_QUEUE_POLL_INTERVAL = 1.0
+
+T = TypeVar("T")
+
+
+class _PipelineAborted(Exception):
+    """Raised in a stage when another stage failed"""
+
+
+class _StageQueue(Generic[T]):
+    """Bounded queue between two stages, None marks the end of the input."""
+
+    def __init__(self, maxsize: int, abort_event: threading.Event) -> None:
+        self._queue: queue.Queue[T | None] = queue.Queue(maxsize=maxsize)
+        self._abort_event = abort_event
+
+    def put(self, item: T | None) -> None:
+        while True:
+            if self._abort_event.is_set():
+                raise _PipelineAborted()
+            try:
+                self._queue.put(item, timeout=_QUEUE_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def get(self) -> T | None:
+        while True:
+            if self._abort_event.is_set():
+                raise _PipelineAborted()
+            try:
+                return self._queue.get(timeout=_QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+
+class _SubBatch(BaseModel):
+    documents: list[Document]
+    # None if the sub-batch finished (or failed) early, then result is set
+    batch: ChunkedDocumentBatch | None = None
+    result: IndexingPipelineResult | None = None
+
+    chunks_to_embed: list[DocAwareChunk] = []
+    chunks_with_embeddings: list[IndexChunk] = []
+    embedding_failures: list[ConnectorFailure] = []
+    chunk_content_scores: list[float] = []
+    embedding_cache_hits: int = 0
+    embedding_cache_misses: int = 0
+
+    chunking_seconds: float = 0.0
+    embedding_seconds: float = 0.0
+    vector_db_write_seconds: float = 0.0
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+def split_into_sub_batches(
+    documents: list[Document], sub_batch_size: int
+) -> list[list[Document]]:
+    """Splits the documents into sub-batches of at least sub_batch_size documents (except
+    for the last one). All documents with the same id end up in the same sub-batch so
+    that the sub-batches never touch the same document concurrently."""
+    doc_id_to_documents: dict[str, list[Document]] = {}
+    for document in documents:
+        doc_id_to_documents.setdefault(document.id, []).append(document)
+
+    sub_batches: list[list[Document]] = []
+    sub_batch: list[Document] = []
+    for same_id_documents in doc_id_to_documents.values():
+        sub_batch.extend(same_id_documents)
+        if len(sub_batch) >= sub_batch_size:
+            sub_batches.append(sub_batch)
+            sub_batch = []
+
+    if sub_batch:
+        sub_batches.append(sub_batch)
+    return sub_batches
+
+
+class _IndexingStages:
+    def __init__(
+        self,
+        *,
+        chunker: Chunker,
+        enable_contextual_rag: bool,
+        llm: LLM | None,
+        embedder: IndexingEmbedder,
+        information_content_classification_model: InformationContentClassificationModel,
+        document_index: DocumentIndex,
+        index_attempt_metadata: IndexAttemptMetadata,
+        tenant_id: str,
+        ignore_time_skip: bool,
+        sub_batches: list[list[Document]],
+        queue_size: int,
+    ) -> None:
+        self.sub_batches = sub_batches
+        self.chunker = chunker
+        self.enable_contextual_rag = enable_contextual_rag
+        self.llm = llm
+        self.llm_tokenizer = get_contextual_rag_tokenizer(enable_contextual_rag, llm)
+        self.embedder = embedder
+        self.information_content_classification_model = (
+            information_content_classification_model
+        )
+        self.document_index = document_index
+        self.index_attempt_metadata = index_attempt_metadata
+        self.tenant_id = tenant_id
+        self.ignore_time_skip = ignore_time_skip
+
+        self.abort_event = threading.Event()
+        self.errors: list[BaseException] = []
+        self.embed_queue: _StageQueue[_SubBatch] = _StageQueue(
+            queue_size, self.abort_event
+        )
+        self.write_queue: _StageQueue[_SubBatch] = _StageQueue(
+            queue_size, self.abort_event
+        )
+        self.results: list[IndexingPipelineResult] = []
+
+    def _run_stage(self, stage_name: str, stage: Callable[[], None]) -> None:
+        try:
+            stage()
+        except _PipelineAborted:
+            logger.info(f"Indexing pipeline {stage_name} stage aborted")
+        except BaseException as e:
+            self.errors.append(e)
+            self.abort_event.set()
+
+    def _chunk_stage(self) -> None:
+        for documents in self.sub_batches:
+            sub_batch = _SubBatch(documents=documents)
+            start_time = time.monotonic()
+            try:
+                with get_session_with_current_tenant() as db_session:
+                    batch = prepare_doc_batch_for_chunking(
+                        document_batch=documents,
+                        chunker=self.chunker,
+                        embedder=self.embedder,
+                        document_index=self.document_index,
+                        index_attempt_metadata=self.index_attempt_metadata,
+                        db_session=db_session,
+                        ignore_time_skip=self.ignore_time_skip,
+                    )
+
+                if isinstance(batch, IndexingPipelineResult):
+                    sub_batch.result = batch
+                else:
+                    sub_batch.chunks_to_embed = add_chunks_to_doc_batch(
+                        batch,
+                        self.chunker.chunk(batch.ctx.indexable_docs),
+                        chunker=self.chunker,
+                        enable_contextual_rag=self.enable_contextual_rag,
+                        llm=self.llm,
+                        llm_tokenizer=self.llm_tokenizer,
+                    )
+                    sub_batch.batch = batch
+            except ConnectorStopSignal:
+                raise
+            except Exception as e:
+                sub_batch.result = build_failed_batch_result(documents, e)
+            sub_batch.chunking_seconds = time.monotonic() - start_time
+
+            self.embed_queue.put(sub_batch)
+        self.embed_queue.put(None)
+
+    def _embed_stage(self) -> None:
+        while (sub_batch := self.embed_queue.get()) is not None:
+            if sub_batch.batch is not None:
+                start_time = time.monotonic()
+                cache_hits_before = self.embedder.cache_hits
+                cache_misses_before = self.embedder.cache_misses
+                try:
+                    if sub_batch.chunks_to_embed:
+                        (
+                            sub_batch.chunks_with_embeddings,
+                            sub_batch.embedding_failures,
+                        ) = embed_chunks_with_failure_handling(
+                            chunks=sub_batch.chunks_to_embed,
+                            embedder=self.embedder,
+                            tenant_id=self.tenant_id,
+                            request_id=self.index_attempt_metadata.request_id,
+                        )
+                    sub_batch.chunk_content_scores = get_chunk_content_scores(
+                        sub_batch.chunks_with_embeddings,
+                        self.information_content_classification_model,
+                    )
+                except ConnectorStopSignal:
+                    raise
+                except Exception as e:
+                    sub_batch.batch = None
+                    sub_batch.result = build_failed_batch_result(sub_batch.documents, e)
+                # only this stage uses the embedder, so the counters are not shared
+                sub_batch.embedding_cache_hits = (
+                    self.embedder.cache_hits - cache_hits_before
+                )
+                sub_batch.embedding_cache_misses = (
+                    self.embedder.cache_misses - cache_misses_before
+                )
+                sub_batch.embedding_seconds = time.monotonic() - start_time
+
+            self.write_queue.put(sub_batch)
+        self.write_queue.put(None)
+
+    def _write_stage(self) -> None:
+        while (sub_batch := self.write_queue.get()) is not None:
+            result = sub_batch.result
+            if sub_batch.batch is not None:
+                start_time = time.monotonic()
+                try:
+                    with get_session_with_current_tenant() as db_session:
+                        result = write_doc_batch(
+                            sub_batch.batch,
+                            chunks_with_embeddings=sub_batch.chunks_with_embeddings,
+                            embedding_failures=sub_batch.embedding_failures,
+                            chunk_content_scores=sub_batch.chunk_content_scores,
+                            chunker=self.chunker,
+                            document_index=self.document_index,
+                            index_attempt_metadata=self.index_attempt_metadata,
+                            db_session=db_session,
+                            tenant_id=self.tenant_id,
+                        )
+                except ConnectorStopSignal:
+                    raise
+                except Exception as e:
+                    result = build_failed_batch_result(sub_batch.documents, e)
+                sub_batch.vector_db_write_seconds = time.monotonic() - start_time
+
+            if result is None:
+                raise RuntimeError("Sub-batch finished without a result")
+
+            result.embedding_cache_hits = sub_batch.embedding_cache_hits
+            result.embedding_cache_misses = sub_batch.embedding_cache_misses
+            result.chunking_seconds = sub_batch.chunking_seconds
+            result.embedding_seconds = sub_batch.embedding_seconds
+            result.vector_db_write_seconds = sub_batch.vector_db_write_seconds
+            self.results.append(result)
+
+    def run(self) -> list[IndexingPipelineResult]:
+        run_functions_tuples_in_parallel(
+            [
+                (self._run_stage, ("chunk", self._chunk_stage)),
+                (self._run_stage, ("embed", self._embed_stage)),
+                (self._run_stage, ("write", self._write_stage)),
+            ]
+        )
+        if self.errors:
+            raise self.errors[0]
+        return self.results
+
+
+def _combine_results(
+    results: list[IndexingPipelineResult], total_seconds: float
+) -> IndexingPipelineResult:
+    return IndexingPipelineResult(
+        new_docs=sum(result.new_docs for result in results),
+        total_docs=sum(result.total_docs for result in results),
+        total_chunks=sum(result.total_chunks for result in results),
+        failures=[failure for result in results for failure in result.failures],
+        embedding_cache_hits=sum(result.embedding_cache_hits for result in results),
+        embedding_cache_misses=sum(result.embedding_cache_misses for result in results),
+        chunking_seconds=sum(result.chunking_seconds for result in results),
+        embedding_seconds=sum(result.embedding_seconds for result in results),
+        vector_db_write_seconds=sum(
+            result.vector_db_write_seconds for result in results
+        ),
+        total_seconds=total_seconds,
+    )
+
+
+def run_pipelined_indexing_pipeline(
+    *,
+    document_batch: list[Document],
+    index_attempt_metadata: IndexAttemptMetadata,
+    embedder: IndexingEmbedder,
+    information_content_classification_model: InformationContentClassificationModel,
+    document_index: DocumentIndex,
+    db_session: Session,
+    tenant_id: str,
+    sub_batch_size: int,
+    chunker: Chunker | None = None,
+    ignore_time_skip: bool = False,
+    queue_size: int = DOCPROCESSING_PIPELINE_QUEUE_SIZE,
+) -> IndexingPipelineResult:
+    """Same as run_indexing_pipeline, but indexes the batch as a pipeline of sub-batches.
+    db_session is only used for the setup, every stage uses its own sessions."""
+    start_time = time.monotonic()
+    chunker, enable_contextual_rag, llm = build_indexing_chunker(
+        embedder=embedder, db_session=db_session, chunker=chunker
+    )
+
+    sub_batches = split_into_sub_batches(document_batch, sub_batch_size)
+    logger.info(
+        f"Indexing {len(document_batch)} documents as a pipeline of "
+        f"{len(sub_batches)} sub-batches"
+    )
+
+    results = _IndexingStages(
+        chunker=chunker,
+        enable_contextual_rag=enable_contextual_rag,
+        llm=llm,
+        embedder=embedder,
+        information_content_classification_model=information_content_classification_model,
+        document_index=document_index,
+        index_attempt_metadata=index_attempt_metadata,
+        tenant_id=tenant_id,
+        ignore_time_skip=ignore_time_skip,
+        sub_batches=sub_batches,
+        queue_size=queue_size,
+    ).run()
+
+    return _combine_results(results, time.monotonic() - start_time)
@@ -2,13 +2,25 @@ import time
 from collections.abc import Generator
 from typing import cast
 
+import numpy as np
 from rapidfuzz.fuzz import ratio
+from rapidfuzz.process import cdist
+from rapidfuzz.process import cpdist
 from redis.lock import Lock as RedisLock
+from sqlalchemy import and_
+from sqlalchemy import Boolean
+from sqlalchemy import column
 from sqlalchemy import func
+from sqlalchemy import Integer
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy import String
 from sqlalchemy import text
+from sqlalchemy import values
 
 from onyx.background.celery.tasks.kg_processing.utils import extend_lock
 from onyx.configs.constants import CELERY_GENERIC_BEAT_LOCK_TIMEOUT
+from onyx.configs.kg_configs import KG_CLUSTERING_BATCH_SIZE
 from onyx.configs.kg_configs import KG_CLUSTERING_RETRIEVE_THRESHOLD
 from onyx.configs.kg_configs import KG_CLUSTERING_THRESHOLD
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
@@ -30,6 +42,9 @@ from onyx.document_index.vespa.kg_interactions import (
     get_kg_vespa_info_update_requests_for_document,
 )
 from onyx.document_index.vespa.kg_interactions import update_kg_chunks_vespa_info
+from onyx.kg.clustering.normalization_index import (
+    invalidate_kg_entity_normalization_index,
+)
 from onyx.kg.models import KGGroundingType
 from onyx.kg.utils.formatting_utils import make_relationship_id
 from onyx.utils.logger import setup_logger
@@ -55,6 +70,11 @@ def _get_batch_untransferred_grounded_entities(
                     KGEntityType.grounding == KGGroundingType.GROUNDED,
                     KGEntityExtractionStaging.transferred_id_name.is_(None),
                 )
+                # entities of the same type are clustered together
+                .order_by(
+                    KGEntityExtractionStaging.entity_type_id_name,
+                    KGEntityExtractionStaging.id_name,
+                )
                 .limit(batch_size)
                 .all()
             )
@@ -144,79 +164,201 @@ def _get_batch_kg_processed_documents(
             offset += batch_size
 
 
-def _cluster_one_grounded_entity(
-    entity: KGEntityExtractionStaging,
-) -> tuple[KGEntity, bool]:
+def _has_digit(name: str) -> bool:
+    # entities with numbers aren't clustered so we don't merge version1 and version2
+    return any(char.isdigit() for char in name)
+
+
+def _plan_grounded_entity_clustering(
+    entities: list[KGEntityExtractionStaging],
+    entity_names: list[str],
+    similar_entities: list[tuple[int, KGEntity]],
+) -> list[str | int | None]:
+    """
+    Decides what each entity of the batch is clustered into, the same way clustering
+    them one by one in order would: the id_name of the existing entity it is merged
+    with, the index of an earlier entity of the batch that becomes a new entity and
+    it is merged with, or None if it becomes a new entity itself.
+
+    similar_entities are (index of the entity in the batch, existing entity) pairs
+    found by the trigram search. Earlier entities of the batch are compared with the
+    threshold alone, as they aren't in the trigram index yet.
+    """
+    threshold = KG_CLUSTERING_THRESHOLD * 100
+
+    # score all existing entities found by the trigram search in one call
+    similar_scores = (
+        cpdist(
+            [entity_names[i] for i, _ in similar_entities],
+            [similar.name for _, similar in similar_entities],
+            scorer=ratio,
+            workers=-1,
+        )
+        if similar_entities
+        else []
+    )
+    candidates: list[list[tuple[float, str | int, str | None]]] = [
+        [] for _ in entities
+    ]
+    for (i, similar), score in zip(similar_entities, similar_scores):
+        if score >= threshold and not _has_digit(similar.name):
+            candidates[i].append((float(score), similar.id_name, similar.document_id))
+
+    # and every entity of the batch with the stored names of the others
+    stored_names = [entity.name.casefold() for entity in entities]
+    batch_scores = cdist(entity_names, stored_names, scorer=ratio, workers=-1)
+
+    plan: list[str | int | None] = []
+    # document ids set by the merges earlier in the batch
+    document_ids: dict[str | int, str | None] = {}
+    for i, entity in enumerate(entities):
+        if _has_digit(entity_names[i]):
+            plan.append(None)
+            document_ids[i] = entity.document_id
+            continue
+
+        for j in np.flatnonzero(batch_scores[i, :i] >= threshold):
+            if (
+                plan[j] is None
+                and entities[j].entity_type_id_name == entity.entity_type_id_name
+                and not _has_digit(stored_names[j])
+            ):
+                candidates[i].append(
+                    (float(batch_scores[i, j]), int(j), entities[j].document_id)
+                )
+
+        best_score = -1.0
+        best_target: str | int | None = None
+        for score, target, document_id in candidates[i]:
+            document_id = document_ids.get(target, document_id)
+            # entities of documents are only merged with entities without one
+            if entity.document_id is not None and document_id is not None:
+                continue
+            if score > best_score:
+                best_score = score
+                best_target = target
+
+        plan.append(best_target)
+        if best_target is None:
+            document_ids[i] = entity.document_id
+        elif entity.document_id is not None:
+            # the parent had no document, and gets the one of the entity
+            document_ids[best_target] = entity.document_id
+
+    return plan
+
+
+def _cluster_grounded_entity_batch(
+    entities: list[KGEntityExtractionStaging],
+) -> None:
     """
-    Cluster a single grounded entity.
+    Cluster a batch of grounded entities in one transaction, with one trigram search
+    for the similar existing entities of the whole batch.
     """
     with get_session_with_current_tenant() as db_session:
-        # get entity name and filtering conditions
-        if entity.document_id is not None:
-            entity_name = cast(
-                str,
-                db_session.query(Document.semantic_id)
-                .filter(Document.id == entity.document_id)
-                .scalar(),
+        # entities of documents are matched by the document's semantic id
+        document_ids = {
+            entity.document_id for entity in entities if entity.document_id is not None
+        }
+        semantic_ids: dict[str, str] = (
+            dict(
+                db_session.query(Document.id, Document.semantic_id)
+                .filter(Document.id.in_(document_ids))
+                .all()
+            )
+            if document_ids
+            else {}
+        )
+        entity_names = [
+            (
+                semantic_ids[entity.document_id]
+                if entity.document_id is not None
+                else entity.name
             ).lower()
-            filtering = [KGEntity.document_id.is_(None)]
-        else:
-            entity_name = entity.name.lower()
-            filtering = []
+            for entity in entities
+        ]
 
-        # skip those with numbers so we don't cluster version1 and version2, etc.
-        similar_entities: list[KGEntity] = []
-        if not any(char.isdigit() for char in entity_name):
-            # find similar entities, uses GIN index, very efficient
+        similar_entities: list[tuple[int, KGEntity]] = []
+        searched = [i for i, name in enumerate(entity_names) if not _has_digit(name)]
+        if searched:
+            # find similar entities of all entities at once, uses GIN index
             db_session.execute(
                 text(
                     "SET pg_trgm.similarity_threshold = "
                     + str(KG_CLUSTERING_RETRIEVE_THRESHOLD)
                 )
             )
-            similar_entities = (
-                db_session.query(KGEntity)
-                .filter(
-                    # find entities of the same type with a similar name
-                    *filtering,
-                    KGEntity.entity_type_id_name == entity.entity_type_id_name,
-                    getattr(func, POSTGRES_DEFAULT_SCHEMA).similarity_op(
-                        KGEntity.name, entity_name
-                    ),
-                )
-                .all()
+            searches = values(
+                column("i", Integer),
+                column("name", String),
+                column("entity_type_id_name", String),
+                column("has_document", Boolean),
+                name="searches",
+            ).data(
+                [
+                    (
+                        i,
+                        entity_names[i],
+                        entities[i].entity_type_id_name,
+                        entities[i].document_id is not None,
+                    )
+                    for i in searched
+                ]
             )
+            similar_entities = [
+                (i, similar)
+                for i, similar in db_session.execute(
+                    select(searches.c.i, KGEntity)
+                    .select_from(searches)
+                    .join(
+                        KGEntity,
+                        and_(
+                            # find entities of the same type with a similar name
+                            KGEntity.entity_type_id_name
+                            == searches.c.entity_type_id_name,
+                            or_(
+                                searches.c.has_document.is_(False),
+                                KGEntity.document_id.is_(None),
+                            ),
+                            getattr(func, POSTGRES_DEFAULT_SCHEMA).similarity_op(
+                                KGEntity.name, searches.c.name
+                            ),
+                        ),
+                    )
+                ).all()
+            ]
 
-    # find best match
-    best_score = -1.0
-    best_entity = None
-    for similar in similar_entities:
-        # skip those with numbers so we don't cluster version1 and version2, etc.
-        if any(char.isdigit() for char in similar.name):
-            continue
-        score = ratio(similar.name, entity_name)
-        if score >= KG_CLUSTERING_THRESHOLD * 100 and score > best_score:
-            best_score = score
-            best_entity = similar
+        plan = _plan_grounded_entity_clustering(
+            entities=entities,
+            entity_names=entity_names,
+            similar_entities=similar_entities,
+        )
 
-    # if there is a match, update the entity, otherwise create a new one
-    with get_session_with_current_tenant() as db_session:
-        if best_entity:
-            logger.debug(f"Merged {entity.name} with {best_entity.name}")
-            update_vespa = (
-                best_entity.document_id is None and entity.document_id is not None
-            )
-            transferred_entity = merge_entities(
-                db_session=db_session, parent=best_entity, child=entity
-            )
-        else:
-            update_vespa = entity.document_id is not None
-            transferred_entity = transfer_entity(db_session=db_session, entity=entity)
+        # if there is a match, update the entity, otherwise create a new one
+        parents: dict[str | int, KGEntity] = {
+            similar.id_name: similar for _, similar in similar_entities
+        }
+        written_id_names: set[str] = set()
+        for i, (entity, target) in enumerate(zip(entities, plan)):
+            if target is None:
+                transferred_entity = transfer_entity(
+                    db_session=db_session, entity=entity
+                )
+                parents[i] = transferred_entity
+            else:
+                parent = parents[target]
+                if parent.id_name in written_id_names:
+                    # pick up the changes of the earlier merges into the parent
+                    db_session.refresh(parent)
+                logger.debug(f"Merged {entity.name} with {parent.name}")
+                transferred_entity = merge_entities(
+                    db_session=db_session, parent=parent, child=entity
+                )
+                parents[target] = transferred_entity
+            written_id_names.add(transferred_entity.id_name)
 
         db_session.commit()
 
-    return transferred_entity, update_vespa
-
 
 def _create_one_parent_child_relationship(entity: KGEntityExtractionStaging) -> None:
     """
@@ -319,16 +461,15 @@ def kg_clustering(
 
     last_lock_time = time.monotonic()
 
-    # Cluster and transfer grounded entities sequentially
+    # Cluster and transfer grounded entities in batches
     start_time = time.monotonic()
+    num_entities = 0
     i_batch = 0
     for i_batch, untransferred_grounded_entities in enumerate(
-        _get_batch_untransferred_grounded_entities(
-            batch_size=processing_chunk_batch_size
-        )
+        _get_batch_untransferred_grounded_entities(batch_size=KG_CLUSTERING_BATCH_SIZE)
     ):
-        for entity in untransferred_grounded_entities:
-            _cluster_one_grounded_entity(entity)
+        _cluster_grounded_entity_batch(untransferred_grounded_entities)
+        num_entities += len(untransferred_grounded_entities)
         last_lock_time = extend_lock(
             lock, CELERY_GENERIC_BEAT_LOCK_TIMEOUT, last_lock_time
         )
@@ -336,8 +477,10 @@ def kg_clustering(
     # NOTE: we assume every entity is transferred, as we currently only have grounded entities
     time_delta = time.monotonic() - start_time
     logger.info(
-        f"Finished transferring {i_batch+1} entity batches in {time_delta:.2f}s"
+        f"Finished transferring {num_entities} entities in {i_batch+1} batches in "
+        f"{time_delta:.2f}s ({num_entities / max(time_delta, 1e-6):.1f} entities/s)"
     )
+    invalidate_kg_entity_normalization_index()
 
     # Create parent-child relationships in parallel
     for _ in range(kg_config_settings.KG_MAX_PARENT_RECURSION_DEPTH):
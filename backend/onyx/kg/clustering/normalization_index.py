@@ -0,0 +1,438 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from collections import OrderedDict
+from datetime import datetime
+from datetime import timedelta
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy import select
+
+from onyx.configs.constants import OnyxRedisConstants
+from onyx.db.engine.sql_engine import get_session_with_current_tenant
+from onyx.db.models import KGEntity
+from onyx.redis.redis_pool import get_redis_client
+from onyx.utils.logger import setup_logger
+from shared_configs.contextvars import get_current_tenant_id
+
+logger = setup_logger()
+
+# the index is rebuilt at least this often, e.g. to drop deleted entities and to
+# pick up names changed by the document triggers
+_MAX_INDEX_AGE_SECONDS = 60 * 60
+# entities written shortly before a refresh are fetched again by the next one, in
+# case the transaction that wrote them hadn't committed yet
+_REFRESH_OVERLAP = timedelta(minutes=10)
+_MAX_CACHED_TENANTS = 64
+_FETCH_BATCH_SIZE = 10_000
+
+_word_regex = re.compile(r"[^\W_]+")
+
+
+def make_trigrams(name: str) -> set[str]:
+    """
+    Trigrams of a name, as pg_trgm's show_trgm makes them (and stores them in
+    kg_entity.name_trigrams): every alphanumeric word is lowercased and padded with
+    two spaces in front and one behind.
+    """
+    trigrams: set[str] = set()
+    for word in _word_regex.findall(name.lower()):
+        padded = f"  {word} "
+        trigrams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+class IndexedKGEntity(NamedTuple):
+    id_name: str
+    name: str
+    entity_type_id_name: str
+    document_id: str | None
+    subtype: str | None
+    trigrams: list[str]
+
+
+class KGEntityCandidate(NamedTuple):
+    id_name: str
+    name: str
+    document_id: str | None
+    # | Q ∩ E | / min(|Q|, |E|) of the trigrams of the query Q and the entity E
+    score: float
+
+
+class _EntityTypeIndex:
+    """
+    Trigram posting lists of the entities of one type, over compact arrays of their
+    names. Updated entities are appended and their old positions marked as dead,
+    which are dropped once they make up half of the index.
+    """
+
+    def __init__(self) -> None:
+        self.id_names: list[str] = []
+        self.names: list[str] = []
+        self.document_ids: list[str | None] = []
+        # subtypes are stored as ids, so they can be filtered on with numpy
+        self.subtype_ids: dict[str | None, int] = {}
+        self.entity_subtype_ids = np.zeros(0, dtype=np.int32)
+        self.has_document = np.zeros(0, dtype=bool)
+        self.num_trigrams = np.zeros(0, dtype=np.int32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.positions: dict[str, int] = {}
+        # trigram -> positions of the entities with the trigram
+        self.postings: dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add(self, entities: list[IndexedKGEntity]) -> None:
+        # the last version of an entity wins
+        entities = list({entity.id_name: entity for entity in entities}.values())
+        start = len(self.id_names)
+        new_postings: dict[str, list[int]] = defaultdict(list)
+        for position, entity in enumerate(entities, start=start):
+            old_position = self.positions.get(entity.id_name)
+            if old_position is not None:
+                self.alive[old_position] = False
+            self.positions[entity.id_name] = position
+            self.id_names.append(entity.id_name)
+            self.names.append(entity.name)
+            self.document_ids.append(entity.document_id)
+            for trigram in entity.trigrams:
+                new_postings[trigram].append(position)
+
+        for entity in entities:
+            self.subtype_ids.setdefault(entity.subtype, len(self.subtype_ids))
+        self.entity_subtype_ids = np.concatenate(
+            [
+                self.entity_subtype_ids,
+                np.array(
+                    [self.subtype_ids[entity.subtype] for entity in entities],
+                    dtype=np.int32,
+                ),
+            ]
+        )
+        self.has_document = np.concatenate(
+            [
+                self.has_document,
+                np.array(
+                    [entity.document_id is not None for entity in entities], dtype=bool
+                ),
+            ]
+        )
+        self.num_trigrams = np.concatenate(
+            [
+                self.num_trigrams,
+                np.array([len(entity.trigrams) for entity in entities], dtype=np.int32),
+            ]
+        )
+        self.alive = np.concatenate([self.alive, np.ones(len(entities), dtype=bool)])
+        for trigram, positions in new_postings.items():
+            new_positions = np.array(positions, dtype=np.int32)
+            old_positions = self.postings.get(trigram)
+            self.postings[trigram] = (
+                new_positions
+                if old_positions is None
+                else np.concatenate([old_positions, new_positions])
+            )
+
+        if len(self.positions) * 2 < len(self.id_names):
+            self._compact()
+
+    def _compact(self) -> None:
+        kept = np.flatnonzero(self.alive)
+        new_positions = np.full(len(self.alive), -1, dtype=np.int32)
+        new_positions[kept] = np.arange(len(kept), dtype=np.int32)
+
+        self.id_names = [self.id_names[i] for i in kept]
+        self.names = [self.names[i] for i in kept]
+        self.document_ids = [self.document_ids[i] for i in kept]
+        self.entity_subtype_ids = self.entity_subtype_ids[kept]
+        self.has_document = self.has_document[kept]
+        self.num_trigrams = self.num_trigrams[kept]
+        self.positions = {id_name: i for i, id_name in enumerate(self.id_names)}
+        postings: dict[str, np.ndarray] = {}
+        for trigram, positions in self.postings.items():
+            positions = new_positions[positions[self.alive[positions]]]
+            if len(positions):
+                postings[trigram] = positions
+        self.postings = postings
+        self.alive = np.ones(len(kept), dtype=bool)
+
+    def search(
+        self,
+        trigrams: set[str],
+        subtype: str | None,
+        limit: int,
+        max_document_entities: int,
+    ) -> list[KGEntityCandidate]:
+        """
+        Entities sharing a trigram with the query, best first. Entities of documents
+        still need to be checked against the documents the user can access, so beyond
+        the best `limit` entities without a document, the best `max_document_entities`
+        entities of documents that could still make it into the best `limit` are
+        returned.
+        """
+        posting_lists = [
+            self.postings[trigram] for trigram in trigrams if trigram in self.postings
+        ]
+        if not posting_lists:
+            return []
+
+        overlaps = np.bincount(
+            np.concatenate(posting_lists), minlength=len(self.id_names)
+        )
+        overlaps[~self.alive] = 0
+        matches = np.flatnonzero(overlaps)
+        if subtype is not None:
+            subtype_id = self.subtype_ids.get(subtype)
+            if subtype_id is None:
+                return []
+            matches = matches[self.entity_subtype_ids[matches] == subtype_id]
+        scores = overlaps[matches] / np.minimum(
+            len(trigrams), self.num_trigrams[matches]
+        )
+
+        order = np.argsort(-scores, kind="stable")
+        has_document = self.has_document[matches[order]]
+        without_document = np.flatnonzero(~has_document)[:limit]
+        with_document = np.flatnonzero(has_document)
+        if limit and len(without_document) == limit:
+            # nothing after the last of these can beat them
+            with_document = with_document[with_document < without_document[-1]]
+        selected = order[
+            np.sort(
+                np.concatenate(
+                    [without_document, with_document[:max_document_entities]]
+                )
+            )
+        ]
+
+        return [
+            KGEntityCandidate(
+                id_name=self.id_names[position],
+                name=self.names[position],
+                document_id=self.document_ids[position],
+                score=float(score),
+            )
+            for position, score in zip(
+                matches[selected].tolist(), scores[selected].tolist()
+            )
+        ]
+
+
+class _TenantEntityIndex:
+    def __init__(self, version: bytes | None) -> None:
+        self.version = version
+        self.built = time.monotonic()
+        # entities written from this time on weren't fetched yet
+        self.fetched_until: datetime | None = None
+        self.types: dict[str, _EntityTypeIndex] = {}
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(type_index) for type_index in self.types.values())
+
+    def is_current(self, version: bytes | None) -> bool:
+        return (
+            self.version == version
+            and time.monotonic() - self.built < _MAX_INDEX_AGE_SECONDS
+        )
+
+    def add(self, entities: list[IndexedKGEntity]) -> None:
+        entities_by_type: dict[str, list[IndexedKGEntity]] = defaultdict(list)
+        for entity in entities:
+            entities_by_type[entity.entity_type_id_name].append(entity)
+        with self.lock:
+            for entity_type, type_entities in entities_by_type.items():
+                self.types.setdefault(entity_type, _EntityTypeIndex()).add(
+                    type_entities
+                )
+
+    def search(
+        self,
+        entity_type: str,
+        trigrams: set[str],
+        subtype: str | None,
+        limit: int,
+        max_document_entities: int,
+    ) -> list[KGEntityCandidate]:
+        with self.lock:
+            type_index = self.types.get(entity_type)
+            if type_index is None:
+                return []
+            return type_index.search(trigrams, subtype, limit, max_document_entities)
+
+
+class KGEntityNormalizationIndex:
+    """
+    Process local, per tenant index of the names of the KG entities, used to find the
+    candidates of the entities of KG questions without querying the database.
+
+    Every lookup reads the KG entity version of the tenant from Redis, which is bumped
+    by invalidate_kg_entity_normalization_index after kg_clustering. On a new version
+    only the entities written since the last refresh are fetched, unless entities
+    were deleted, in which case the index is rebuilt. If Redis can't be reached, the
+    index is only rebuilt when it gets too old.
+    """
+
+    def __init__(self) -> None:
+        # tenant id -> index of the tenant, least recently used first
+        self._tenants: OrderedDict[str, _TenantEntityIndex] = OrderedDict()
+        self._lock = threading.Lock()
+        # held while refreshing, so concurrent questions don't all refresh
+        self._refresh_locks: dict[str, threading.Lock] = {}
+
+    def search(
+        self,
+        entity_type: str,
+        name: str,
+        subtype: str | None,
+        limit: int,
+        max_document_entities: int,
+    ) -> list[KGEntityCandidate]:
+        trigrams = make_trigrams(name)
+        if not trigrams:
+            return []
+        return self._get_tenant_index().search(
+            entity_type, trigrams, subtype, limit, max_document_entities
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tenants.clear()
+
+    def _get_tenant_index(self) -> _TenantEntityIndex:
+        tenant_id = get_current_tenant_id()
+        with self._lock:
+            tenant_index = self._tenants.get(tenant_id)
+            if tenant_index is not None:
+                self._tenants.move_to_end(tenant_id)
+            refresh_lock = self._refresh_locks.setdefault(tenant_id, threading.Lock())
+
+        try:
+            version = get_redis_client(tenant_id=tenant_id).get(
+                OnyxRedisConstants.KG_ENTITY_VERSION
+            )
+        except Exception:
+            logger.exception("Failed to read the KG entity version from Redis")
+            # without the version, the index is only rebuilt once it gets too old
+            version = tenant_index.version if tenant_index is not None else None
+
+        if tenant_index is not None and tenant_index.is_current(version):
+            return tenant_index
+
+        # only one thread refreshes the index, the others wait for it
+        with refresh_lock:
+            with self._lock:
+                tenant_index = self._tenants.get(tenant_id)
+            if tenant_index is not None and tenant_index.is_current(version):
+                return tenant_index
+
+            if (
+                tenant_index is None
+                or time.monotonic() - tenant_index.built > _MAX_INDEX_AGE_SECONDS
+                # the version was read before the entities, so entities written in
+                # between bump the version again and are fetched on the next lookup
+                or not self._refresh(tenant_index, version)
+            ):
+                tenant_index = self._build(version)
+
+            with self._lock:
+                self._tenants[tenant_id] = tenant_index
+                self._tenants.move_to_end(tenant_id)
+                while len(self._tenants) > _MAX_CACHED_TENANTS:
+                    evicted_tenant_id, _ = self._tenants.popitem(last=False)
+                    self._refresh_locks.pop(evicted_tenant_id, None)
+            return tenant_index
+
+    @staticmethod
+    def _build(version: bytes | None) -> _TenantEntityIndex:
+        start_time = time.monotonic()
+        tenant_index = _TenantEntityIndex(version)
+        _fetch_entities(tenant_index, since=None)
+        logger.info(
+            f"Built the KG entity normalization index of {len(tenant_index)} "
+            f"entities in {time.monotonic() - start_time:.2f}s"
+        )
+        return tenant_index
+
+    @staticmethod
+    def _refresh(tenant_index: _TenantEntityIndex, version: bytes | None) -> bool:
+        """Adds the entities written since the last refresh. Returns False if entities
+        were deleted since, and the index needs to be rebuilt instead."""
+        if tenant_index.fetched_until is None:
+            return False
+        num_entities = _fetch_entities(
+            tenant_index, since=tenant_index.fetched_until - _REFRESH_OVERLAP
+        )
+        tenant_index.version = version
+        return num_entities == len(tenant_index)
+
+
+def _fetch_entities(tenant_index: _TenantEntityIndex, since: datetime | None) -> int:
+    """Adds the entities written since `since` (all if None) to the index, and returns
+    the number of entities in the database."""
+    with get_session_with_current_tenant() as db_session:
+        # the start of the transaction, entities committed later are written later
+        fetched_until = db_session.scalar(select(func.now()))
+        query = select(
+            KGEntity.id_name,
+            KGEntity.name,
+            KGEntity.entity_type_id_name,
+            KGEntity.document_id,
+            KGEntity.attributes["subtype"].astext,
+            KGEntity.name_trigrams,
+        )
+        if since is not None:
+            query = query.where(KGEntity.time_updated >= since)
+
+        for rows in db_session.execute(
+            query.execution_options(yield_per=_FETCH_BATCH_SIZE)
+        ).partitions():
+            tenant_index.add(
+                [
+                    IndexedKGEntity(
+                        id_name=id_name,
+                        name=name,
+                        entity_type_id_name=entity_type_id_name,
+                        document_id=document_id,
+                        subtype=subtype,
+                        trigrams=trigrams or [],
+                    )
+                    for (
+                        id_name,
+                        name,
+                        entity_type_id_name,
+                        document_id,
+                        subtype,
+                        trigrams,
+                    ) in rows
+                ]
+            )
+
+        num_entities = (
+            db_session.scalar(select(func.count()).select_from(KGEntity)) or 0
+        )
+
+    tenant_index.fetched_until = fetched_until
+    return num_entities
+
+
+_KG_ENTITY_NORMALIZATION_INDEX = KGEntityNormalizationIndex()
+
+
+def get_kg_entity_normalization_index() -> KGEntityNormalizationIndex:
+    """Returns the process wide KG entity normalization index."""
+    return _KG_ENTITY_NORMALIZATION_INDEX
+
+
+def invalidate_kg_entity_normalization_index() -> None:
+    """Makes every process refresh the KG entity normalization index of the current
+    tenant. Call after the changes to the entities were committed."""
+    try:
+        get_redis_client().incr(OnyxRedisConstants.KG_ENTITY_VERSION)
+    except Exception:
+        # the index is rebuilt on its own after a while
+        logger.exception("Failed to bump the KG entity version in Redis")
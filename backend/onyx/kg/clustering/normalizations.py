@@ -1,26 +1,19 @@
 import re
 from collections import defaultdict
-from typing import cast
 
 import numpy as np
 from nltk import ngrams  # type: ignore
 from rapidfuzz.distance.DamerauLevenshtein import normalized_similarity
-from sqlalchemy import desc
-from sqlalchemy import Float
-from sqlalchemy import func
-from sqlalchemy import MetaData
-from sqlalchemy import select
-from sqlalchemy import String
-from sqlalchemy import Table
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import text
 
 from onyx.configs.kg_configs import KG_NORMALIZATION_RERANK_LEVENSHTEIN_WEIGHT
 from onyx.configs.kg_configs import KG_NORMALIZATION_RERANK_NGRAM_WEIGHTS
 from onyx.configs.kg_configs import KG_NORMALIZATION_RERANK_THRESHOLD
 from onyx.configs.kg_configs import KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
-from onyx.db.models import KGEntity
 from onyx.db.relationships import get_relationships_for_entity_type_pairs
+from onyx.kg.clustering.normalization_index import get_kg_entity_normalization_index
+from onyx.kg.clustering.normalization_index import KGEntityCandidate
 from onyx.kg.models import NormalizedEntities
 from onyx.kg.models import NormalizedRelationships
 from onyx.kg.utils.embeddings import encode_string_batch
@@ -32,8 +25,6 @@ from onyx.kg.utils.formatting_utils import make_relationship_id
 from onyx.kg.utils.formatting_utils import split_entity_id
 from onyx.kg.utils.formatting_utils import split_relationship_id
 from onyx.utils.logger import setup_logger
-from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
-from shared_configs.configs import POSTGRES_DEFAULT_SCHEMA
 
 logger = setup_logger()
 
@@ -41,6 +32,10 @@ logger = setup_logger()
 alphanum_regex = re.compile(r"[^a-z0-9]+")
 rem_email_regex = re.compile(r"(?<=\S)@([a-z0-9-]+)\.([a-z]{2,6})$")
 
+# entities of documents looked at per candidate, the first time around and every time
+# too few of them belong to documents the user can see
+_DOCUMENT_CANDIDATES_FACTOR = 4
+
 
 def _clean_name(entity_name: str) -> str:
     """
@@ -54,96 +49,51 @@ def _clean_name(entity_name: str) -> str:
     )
 
 
+def _get_allowed_document_ids(
+    allowed_docs_temp_view_name: str | None, document_ids: set[str]
+) -> set[str]:
+    """
+    Get the documents, out of the given ones, that the user is allowed to see.
+    """
+    if not document_ids:
+        return set()
+    if allowed_docs_temp_view_name is None:
+        raise ValueError("allowed_docs_temp_view_name is not available")
+
+    with get_session_with_current_tenant() as db_session:
+        return set(
+            db_session.execute(
+                text(
+                    f"SELECT allowed_doc_id FROM {allowed_docs_temp_view_name} "
+                    "WHERE allowed_doc_id = ANY(:document_ids)"
+                ),
+                {"document_ids": list(document_ids)},
+            ).scalars()
+        )
+
+
 def _normalize_one_entity(
     entity: str,
-    attributes: dict[str, str],
-    allowed_docs_temp_view_name: str | None = None,
+    candidates: list[KGEntityCandidate],
+    allowed_document_ids: set[str],
 ) -> str | None:
     """
     Matches a single entity to the best matching entity of the same type.
     """
-    entity_type, entity_name = split_entity_id(entity)
+    _, entity_name = split_entity_id(entity)
     if entity_name == "*":
         return entity
 
     cleaned_entity = _clean_name(entity_name)
 
-    # narrow filter to subtype if requested
-    type_filters = [KGEntity.entity_type_id_name == entity_type]
-    if "subtype" in attributes:
-        type_filters.append(
-            KGEntity.attributes.op("@>")({"subtype": attributes["subtype"]})
-        )
-
-    # step 1: find entities containing the entity_name or something similar
-    with get_session_with_current_tenant() as db_session:
-
-        # get allowed documents
-        metadata = MetaData()
-        if allowed_docs_temp_view_name is None:
-            raise ValueError("allowed_docs_temp_view_name is not available")
-
-        effective_schema_allowed_docs_temp_view_name = (
-            allowed_docs_temp_view_name.split(".")[-1]
-        )
-
-        allowed_docs_temp_view = Table(
-            effective_schema_allowed_docs_temp_view_name,
-            metadata,
-            autoload_with=db_session.get_bind(),
-        )
-
-        # generate trigrams of the queried entity Q
-        query_trigrams = db_session.query(
-            getattr(func, POSTGRES_DEFAULT_SCHEMA)
-            .show_trgm(cleaned_entity)
-            .cast(ARRAY(String(3)))
-            .label("trigrams")
-        ).cte("query")
-
-        candidates = cast(
-            list[tuple[str, str, float]],
-            db_session.query(
-                KGEntity.id_name,
-                KGEntity.name,
-                (
-                    # for each entity E, compute score = | Q ∩ E | / min(|Q|, |E|)
-                    func.cardinality(
-                        func.array(
-                            select(func.unnest(KGEntity.name_trigrams))
-                            .correlate(KGEntity)
-                            .intersect(
-                                select(
-                                    func.unnest(query_trigrams.c.trigrams)
-                                ).correlate(query_trigrams)
-                            )
-                            .scalar_subquery()
-                        )
-                    ).cast(Float)
-                    / func.least(
-                        func.cardinality(query_trigrams.c.trigrams),
-                        func.cardinality(KGEntity.name_trigrams),
-                    )
-                ).label("score"),
-            )
-            .select_from(KGEntity, query_trigrams)
-            .outerjoin(
-                allowed_docs_temp_view,
-                KGEntity.document_id == allowed_docs_temp_view.c.allowed_doc_id,
-            )
-            .filter(
-                *type_filters,
-                KGEntity.name_trigrams.overlap(query_trigrams.c.trigrams),
-                # Add filter for allowed docs - either document_id is NULL or it's in allowed_docs
-                (
-                    KGEntity.document_id.is_(None)
-                    | allowed_docs_temp_view.c.allowed_doc_id.isnot(None)
-                ),
-            )
-            .order_by(desc("score"))
-            .limit(KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT)
-            .all(),
-        )
+    # step 1: keep the best entities containing the entity_name or something similar,
+    # that are either not from a document or from a document the user can see
+    candidates = [
+        candidate
+        for candidate in candidates
+        if candidate.document_id is None
+        or candidate.document_id in allowed_document_ids
+    ][:KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT]
     if not candidates:
         return None
 
@@ -153,8 +103,9 @@ def _normalize_one_entity(
         set(ngrams(cleaned_entity, 2)),
         set(ngrams(cleaned_entity, 3)),
     )
-    for i, (candidate_id_name, candidate_name, _) in enumerate(candidates):
-        cleaned_candidate = _clean_name(candidate_name)
+    scored_candidates: list[tuple[str, float]] = []
+    for candidate in candidates:
+        cleaned_candidate = _clean_name(candidate.name)
         h_n1, h_n2, h_n3 = (
             set(ngrams(cleaned_candidate, 1)),
             set(ngrams(cleaned_candidate, 2)),
@@ -177,18 +128,20 @@ def _normalize_one_entity(
 
         # combine scores
         score = (1.0 - W_leven) * ngram_score + W_leven * leven_score
-        candidates[i] = (candidate_id_name, candidate_name, score)
-    candidates = list(
+        scored_candidates.append((candidate.id_name, score))
+    scored_candidates = list(
         sorted(
-            filter(lambda x: x[2] > KG_NORMALIZATION_RERANK_THRESHOLD, candidates),
-            key=lambda x: x[2],
+            filter(
+                lambda x: x[1] > KG_NORMALIZATION_RERANK_THRESHOLD, scored_candidates
+            ),
+            key=lambda x: x[1],
             reverse=True,
         )
     )
-    if not candidates:
+    if not scored_candidates:
         return None
 
-    return candidates[0][0]
+    return scored_candidates[0][0]
 
 
 def _get_existing_normalized_relationships(
@@ -248,12 +201,63 @@ def normalize_entities(
         get_attributes(attr_entity) for attr_entity in raw_entities_w_attributes
     ]
 
-    mapping: list[str | None] = run_functions_tuples_in_parallel(
-        [
-            (_normalize_one_entity, (entity, attributes, allowed_docs_temp_view_name))
-            for entity, attributes in zip(raw_entities, entity_attributes)
-        ]
+    # find the candidates of all entities in the in-memory index, and check the
+    # documents of all candidates against the allowed documents at once
+    index = get_kg_entity_normalization_index()
+    entity_candidates: list[list[KGEntityCandidate]] = [[] for _ in raw_entities]
+    allowed_document_ids: set[str] = set()
+    checked_document_ids: set[str] = set()
+    max_document_entities = (
+        KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT * _DOCUMENT_CANDIDATES_FACTOR
     )
+    entities_to_search = [
+        i for i, entity in enumerate(raw_entities) if split_entity_id(entity)[1] != "*"
+    ]
+    while entities_to_search:
+        for i in entities_to_search:
+            entity_type, entity_name = split_entity_id(raw_entities[i])
+            entity_candidates[i] = index.search(
+                entity_type=entity_type,
+                name=_clean_name(entity_name),
+                # narrow filter to subtype if requested
+                subtype=entity_attributes[i].get("subtype"),
+                limit=KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT,
+                max_document_entities=max_document_entities,
+            )
+        document_ids = {
+            candidate.document_id
+            for i in entities_to_search
+            for candidate in entity_candidates[i]
+            if candidate.document_id is not None
+        } - checked_document_ids
+        allowed_document_ids |= _get_allowed_document_ids(
+            allowed_docs_temp_view_name, document_ids
+        )
+        checked_document_ids |= document_ids
+
+        # search again with more entities of documents for the entities where those
+        # were cut off and too few of them could be seen
+        entities_to_search = [
+            i
+            for i in entities_to_search
+            if sum(
+                candidate.document_id is not None
+                for candidate in entity_candidates[i]
+            )
+            == max_document_entities
+            and sum(
+                candidate.document_id is None
+                or candidate.document_id in allowed_document_ids
+                for candidate in entity_candidates[i]
+            )
+            < KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT
+        ]
+        max_document_entities *= _DOCUMENT_CANDIDATES_FACTOR
+
+    mapping = [
+        _normalize_one_entity(entity, candidates, allowed_document_ids)
+        for entity, candidates in zip(raw_entities, entity_candidates)
+    ]
     for entity, attributes, normalized_entity in zip(
         raw_entities, entity_attributes, mapping
     ):
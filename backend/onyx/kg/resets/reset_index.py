@@ -9,6 +9,9 @@ from onyx.db.models import KGRelationship
 from onyx.db.models import KGRelationshipExtractionStaging
 from onyx.db.models import KGRelationshipType
 from onyx.db.models import KGRelationshipTypeExtractionStaging
+from onyx.kg.clustering.normalization_index import (
+    invalidate_kg_entity_normalization_index,
+)
 
 
 def reset_full_kg_index__commit(db_session: Session) -> None:
@@ -33,3 +36,4 @@ def reset_full_kg_index__commit(db_session: Session) -> None:
     reset_all_document_kg_stages(db_session)
 
     db_session.commit()
+    invalidate_kg_entity_normalization_index()
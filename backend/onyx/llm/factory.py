@@ -5,15 +5,14 @@ from onyx.configs.app_configs import DISABLE_GENERATIVE_AI
 from onyx.configs.model_configs import GEN_AI_MODEL_FALLBACK_MAX_TOKENS
 from onyx.configs.model_configs import GEN_AI_TEMPERATURE
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
-from onyx.db.llm import fetch_default_provider
 from onyx.db.llm import fetch_default_vision_provider
 from onyx.db.llm import fetch_existing_llm_providers
-from onyx.db.llm import fetch_llm_provider_view
 from onyx.db.models import Persona
 from onyx.llm.chat_llm import DefaultMultiLLM
 from onyx.llm.exceptions import GenAIDisabledException
 from onyx.llm.interfaces import LLM
 from onyx.llm.override_models import LLMOverride
+from onyx.llm.provider_cache import get_llm_provider_cache
 from onyx.llm.utils import get_max_input_tokens_from_llm_provider
 from onyx.llm.utils import model_supports_image_input
 from onyx.server.manage.llm.models import LLMProviderView
@@ -61,9 +60,7 @@ def get_llms_for_persona(
             long_term_logger=long_term_logger,
         )
 
-    with get_session_with_current_tenant() as db_session:
-        llm_provider = fetch_llm_provider_view(db_session, provider_name)
-
+    llm_provider = get_llm_provider_cache().get_provider_view(provider_name)
     if not llm_provider:
         raise ValueError("No LLM provider found")
 
@@ -209,8 +206,7 @@ def llm_from_provider(
 
 
 def get_llm_for_contextual_rag(model_name: str, model_provider: str) -> LLM:
-    with get_session_with_current_tenant() as db_session:
-        llm_provider = fetch_llm_provider_view(db_session, model_provider)
+    llm_provider = get_llm_provider_cache().get_provider_view(model_provider)
     if not llm_provider:
         raise ValueError("No LLM provider with name {} found".format(model_provider))
     return llm_from_provider(
@@ -228,9 +224,7 @@ def get_default_llms(
     if DISABLE_GENERATIVE_AI:
         raise GenAIDisabledException()
 
-    with get_session_with_current_tenant() as db_session:
-        llm_provider = fetch_default_provider(db_session)
-
+    llm_provider = get_llm_provider_cache().get_default_provider()
     if not llm_provider:
         raise ValueError("No default LLM provider found")
 
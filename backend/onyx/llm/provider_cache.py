@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter
+
+from onyx.configs.constants import OnyxRedisConstants
+from onyx.db.engine.sql_engine import get_session_with_current_tenant
+from onyx.db.llm import fetch_default_provider
+from onyx.db.llm import fetch_llm_provider_view
+from onyx.redis.redis_pool import get_redis_client
+from onyx.server.manage.llm.models import LLMProviderView
+from onyx.utils.logger import setup_logger
+from shared_configs.contextvars import get_current_tenant_id
+
+logger = setup_logger()
+
+# views are refetched at least this often, in case the version key was lost
+_MAX_ENTRY_AGE_SECONDS = 10 * 60
+_MAX_CACHED_TENANTS = 1024
+
+llm_provider_cache_lookups = Counter(
+    "llm_provider_cache_lookups",
+    "LLM provider view cache lookups by result (hit / miss)",
+    ["result"],
+)
+
+
+class _TenantLLMProviders:
+    def __init__(self, version: bytes | None) -> None:
+        self.version = version
+        self.created = time.monotonic()
+        # provider name (None for the default provider) -> view
+        self.views: dict[str | None, LLMProviderView] = {}
+
+    def is_current(self, version: bytes | None) -> bool:
+        return (
+            self.version == version
+            and time.monotonic() - self.created < _MAX_ENTRY_AGE_SECONDS
+        )
+
+
+class LLMProviderCache:
+    """Process local cache of the LLM provider views used to build the LLMs of every
+    chat message, Slack answer and agent step, so that building them doesn't need a
+    database session.
+
+    Every lookup reads the LLM provider version of the tenant from Redis, which is
+    bumped by invalidate_llm_provider_cache whenever providers are edited, and drops
+    the views cached under an older version. Missing providers are not cached. If
+    Redis can't be reached, providers are read from the database."""
+
+    def __init__(self) -> None:
+        # tenant id -> views of the tenant, least recently used first
+        self._tenants: OrderedDict[str, _TenantLLMProviders] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_provider_view(self, provider_name: str) -> LLMProviderView | None:
+        return self._get(provider_name)
+
+    def get_default_provider(self) -> LLMProviderView | None:
+        return self._get(None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tenants.clear()
+
+    def _get(self, provider_name: str | None) -> LLMProviderView | None:
+        tenant_id = get_current_tenant_id()
+        try:
+            version = get_redis_client(tenant_id=tenant_id).get(
+                OnyxRedisConstants.LLM_PROVIDER_VERSION
+            )
+        except Exception:
+            logger.exception("Failed to read the LLM provider version from Redis")
+            return self._fetch(provider_name)
+
+        with self._lock:
+            tenant_providers = self._tenants.get(tenant_id)
+            if tenant_providers is not None and tenant_providers.is_current(version):
+                self._tenants.move_to_end(tenant_id)
+                view = tenant_providers.views.get(provider_name)
+                if view is not None:
+                    llm_provider_cache_lookups.labels(result="hit").inc()
+                    return view
+
+        llm_provider_cache_lookups.labels(result="miss").inc()
+        # the version was read before the providers, so an edit committed in between
+        # bumps the version again and the views are refetched on the next lookup
+        view = self._fetch(provider_name)
+        if view is None:
+            return None
+
+        with self._lock:
+            tenant_providers = self._tenants.get(tenant_id)
+            if tenant_providers is None or not tenant_providers.is_current(version):
+                tenant_providers = _TenantLLMProviders(version)
+                self._tenants[tenant_id] = tenant_providers
+            tenant_providers.views[provider_name] = view
+            self._tenants.move_to_end(tenant_id)
+            while len(self._tenants) > _MAX_CACHED_TENANTS:
+                self._tenants.popitem(last=False)
+        return view
+
+    @staticmethod
+    def _fetch(provider_name: str | None) -> LLMProviderView | None:
+        with get_session_with_current_tenant() as db_session:
+            if provider_name is None:
+                return fetch_default_provider(db_session)
+            return fetch_llm_provider_view(db_session, provider_name)
+
+
+_LLM_PROVIDER_CACHE = LLMProviderCache()
+
+
+def get_llm_provider_cache() -> LLMProviderCache:
+    """Returns the process wide LLM provider cache."""
+    return _LLM_PROVIDER_CACHE
+
+
+def invalidate_llm_provider_cache() -> None:
+    """Makes every process refetch the LLM providers of the current tenant. Call after
+    the edit of the providers was committed."""
+    try:
+        get_redis_client().incr(OnyxRedisConstants.LLM_PROVIDER_VERSION)
+    except Exception:
+        # the cached views expire on their own after a while
+        logger.exception("Failed to bump the LLM provider version in Redis")
@@ -0,0 +1,158 @@
+import hashlib
+import time
+from enum import Enum
+
+from langchain.schema.language_model import LanguageModelInput
+from prometheus_client import Counter
+from pydantic import BaseModel
+
+from onyx.configs.chat_configs import LLM_RESPONSE_CACHE_FLOWS
+from onyx.configs.chat_configs import LLM_RESPONSE_CACHE_SIZE
+from onyx.configs.chat_configs import LLM_RESPONSE_CACHE_TTL_SECONDS
+from onyx.configs.chat_configs import LLM_RESPONSE_CACHE_USE_REDIS
+from onyx.llm.interfaces import LLM
+from onyx.llm.utils import check_number_of_tokens
+from onyx.llm.utils import convert_lm_input_to_basic_string
+from onyx.llm.utils import message_to_string
+from onyx.utils.logger import setup_logger
+from onyx.utils.tenant_ttl_cache import TenantTTLCache
+
+logger = setup_logger()
+
+llm_response_cache_lookups = Counter(
+    "llm_response_cache_lookups",
+    "LLM response cache lookups by flow and result (hit / miss)",
+    ["flow", "result"],
+)
+llm_response_cache_saved_seconds = Counter(
+    "llm_response_cache_saved_seconds",
+    "LLM call latency saved by the LLM response cache, by flow",
+    ["flow"],
+)
+llm_response_cache_saved_tokens = Counter(
+    "llm_response_cache_saved_tokens",
+    "Prompt and response tokens saved by the LLM response cache, by flow",
+    ["flow"],
+)
+
+
+class LLMResponseCacheFlow(str, Enum):
+    """Secondary LLM flows that can opt in to the response cache through
+    LLM_RESPONSE_CACHE_FLOWS."""
+
+    QUERY_EXPANSION = "query_expansion"
+    QUERY_REPHRASE = "query_rephrase"
+    CHOOSE_SEARCH = "choose_search"
+    SOURCE_FILTER = "source_filter"
+    TIME_FILTER = "time_filter"
+    QUERY_VALIDATION = "query_validation"
+    CHAT_SESSION_NAMING = "chat_session_naming"
+
+
+class CachedLLMResponse(BaseModel):
+    content: str
+    # what the LLM call that produced the response cost, saved by every hit
+    latency_seconds: float
+    num_tokens: int
+
+
+def build_llm_response_cache_key(
+    flow: LLMResponseCacheFlow,
+    llm: LLM,
+    prompt_str: str,
+    max_tokens: int | None = None,
+) -> str:
+    """Key of the response of the flow's LLM call. The full prompt (with the prompt
+    template filled in) is part of the key, so changing the template or any of its
+    inputs never serves a stale response."""
+    prompt_hash = hashlib.sha256(prompt_str.encode("utf-8")).hexdigest()
+    config = llm.config
+    return (
+        f"{flow.value}|{config.model_provider}|{config.model_name}|"
+        f"{config.api_base or ''}|{config.deployment_name or ''}|{max_tokens or ''}|"
+        f"{prompt_hash}"
+    )
+
+
+class LLMResponseCache(TenantTTLCache[CachedLLMResponse]):
+    """Cache of the responses of secondary LLM flows, with Redis they are stored as
+    JSON."""
+
+    REDIS_KEY_PREFIX = "llm_response:"
+
+    def serialize(self, value: CachedLLMResponse) -> str:
+        return value.model_dump_json()
+
+    def deserialize(self, blob: bytes) -> CachedLLMResponse:
+        return CachedLLMResponse.model_validate_json(blob)
+
+
+_LLM_RESPONSE_CACHE: LLMResponseCache | None = (
+    LLMResponseCache(
+        max_size=LLM_RESPONSE_CACHE_SIZE,
+        ttl_seconds=LLM_RESPONSE_CACHE_TTL_SECONDS,
+        use_redis=LLM_RESPONSE_CACHE_USE_REDIS,
+    )
+    if LLM_RESPONSE_CACHE_SIZE > 0
+    else None
+)
+
+
+def get_llm_response_cache() -> LLMResponseCache | None:
+    """Returns the process wide LLM response cache, or None if it is disabled."""
+    return _LLM_RESPONSE_CACHE
+
+
+def invoke_llm_with_response_cache(
+    llm: LLM,
+    prompt: LanguageModelInput,
+    flow: LLMResponseCacheFlow,
+    timeout_override: int | None = None,
+    max_tokens: int | None = None,
+) -> str:
+    """Invokes the LLM and returns the content of its response. If the flow opted in
+    to the response cache and the LLM is deterministic (temperature 0), the response
+    of the same call made earlier is returned instead of calling the LLM again."""
+    cache = get_llm_response_cache()
+    if (
+        cache is None
+        or flow.value not in LLM_RESPONSE_CACHE_FLOWS
+        or llm.config.temperature != 0
+    ):
+        return message_to_string(
+            llm.invoke(prompt, timeout_override=timeout_override, max_tokens=max_tokens)
+        )
+
+    prompt_str = convert_lm_input_to_basic_string(prompt)
+    key = build_llm_response_cache_key(flow, llm, prompt_str, max_tokens)
+    cached_response = cache.get(key)
+    if cached_response is not None:
+        llm_response_cache_lookups.labels(flow=flow.value, result="hit").inc()
+        llm_response_cache_saved_seconds.labels(flow=flow.value).inc(
+            cached_response.latency_seconds
+        )
+        llm_response_cache_saved_tokens.labels(flow=flow.value).inc(
+            cached_response.num_tokens
+        )
+        logger.debug(
+            f"LLM response cache hit for {flow.value}, saved "
+            f"{cached_response.latency_seconds:.2f}s and "
+            f"{cached_response.num_tokens} tokens"
+        )
+        return cached_response.content
+
+    llm_response_cache_lookups.labels(flow=flow.value, result="miss").inc()
+    start = time.monotonic()
+    content = message_to_string(
+        llm.invoke(prompt, timeout_override=timeout_override, max_tokens=max_tokens)
+    )
+    cache.put(
+        key,
+        CachedLLMResponse(
+            content=content,
+            latency_seconds=time.monotonic() - start,
+            num_tokens=check_number_of_tokens(prompt_str)
+            + check_number_of_tokens(content),
+        ),
+    )
+    return content
@@ -2,3 +2,9 @@ class ModelServerRateLimitError(Exception):
     """
     Exception raised for rate limiting errors from the model server.
     """
+
+
+class EmbeddingRateLimitError(Exception):
+    """
+    Exception raised when an embedding provider rate limits a request.
+    """
@@ -1,5 +1,6 @@
 import asyncio
 import json
+import logging
 import threading
 import time
 from collections.abc import Callable
@@ -21,10 +22,15 @@ from cohere import AsyncClient as CohereAsyncClient
 from google.oauth2 import service_account  # type: ignore
 from httpx import HTTPError
 from litellm import aembedding
+from litellm.exceptions import RateLimitError
 from requests import JSONDecodeError
 from requests import RequestException
 from requests import Response
 from retry import retry
+from tenacity import retry as tenacity_retry
+from tenacity import retry_if_not_exception_type
+from tenacity import stop_after_attempt
+from tenacity import wait_fixed
 from vertexai.language_models import TextEmbeddingInput  # type: ignore
 from vertexai.language_models import TextEmbeddingModel  # type: ignore
 
@@ -35,6 +41,10 @@ from onyx.configs.model_configs import BATCH_SIZE_ENCODE_CHUNKS
 from onyx.configs.model_configs import (
     BATCH_SIZE_ENCODE_CHUNKS_FOR_API_EMBEDDING_SERVICES,
 )
+from onyx.configs.model_configs import BATCH_TOKEN_BUDGET_ENCODE_CHUNKS
+from onyx.configs.model_configs import (
+    BATCH_TOKEN_BUDGET_ENCODE_CHUNKS_FOR_API_EMBEDDING_SERVICES,
+)
 from onyx.configs.model_configs import DOC_EMBEDDING_CONTEXT_SIZE
 from onyx.connectors.models import ConnectorStopSignal
 from onyx.db.models import SearchSettings
@@ -44,6 +54,7 @@ from onyx.natural_language_processing.constants import DEFAULT_OPENAI_MODEL
 from onyx.natural_language_processing.constants import DEFAULT_VERTEX_MODEL
 from onyx.natural_language_processing.constants import DEFAULT_VOYAGE_MODEL
 from onyx.natural_language_processing.constants import EmbeddingModelTextType
+from onyx.natural_language_processing.exceptions import EmbeddingRateLimitError
 from onyx.natural_language_processing.exceptions import (
     ModelServerRateLimitError,
 )
@@ -92,6 +103,10 @@ _AUTH_ERROR_UNAUTHORIZED = "unauthorized"
 _AUTH_ERROR_INVALID_API_KEY = "invalid api key"
 _AUTH_ERROR_PERMISSION = "permission"
 
+# Rate limit error string constants
+_RATE_LIMIT_ERROR_RATE_LIMIT = "rate limit"
+_RATE_LIMIT_ERROR_TOO_MANY_REQUESTS = "too many requests"
+
 
 WARM_UP_STRINGS = [
     "Onyx is amazing!",
@@ -136,6 +151,89 @@ def is_authentication_error(error: Exception) -> bool:
     )
 
 
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check if an exception means that the provider rate limited the request.
+
+    Args:
+        error: The exception to check
+
+    Returns:
+        bool: True if the error appears to be a rate limit error
+    """
+    if isinstance(error, (openai.RateLimitError, RateLimitError)):
+        return True
+    # the errors of the provider SDKs carry the HTTP status under different names
+    for status_attr in ("status_code", "http_status", "code"):
+        if getattr(error, status_attr, None) == 429:
+            return True
+
+    error_str = str(error).lower()
+    return (
+        _RATE_LIMIT_ERROR_RATE_LIMIT in error_str
+        or _RATE_LIMIT_ERROR_TOO_MANY_REQUESTS in error_str
+    )
+
+
+def build_token_budgeted_batches(
+    token_counts: list[int],
+    max_batch_size: int,
+    token_budget: int,
+    pad_to_longest: bool = False,
+) -> list[list[int]]:
+    """Groups the indices of texts into batches of at most max_batch_size texts and
+    token_budget tokens. Texts are sorted from longest to shortest so that texts of
+    similar length end up in the same batch.
+
+    If pad_to_longest is set, a batch counts as its longest text times its number of
+    texts (what a local model pads the batch to), otherwise as the sum of its texts.
+    A text that exceeds the budget on its own gets a batch to itself."""
+    batches: list[list[int]] = []
+    batch: list[int] = []
+    batch_tokens = 0
+    for idx in sorted(range(len(token_counts)), key=lambda i: -token_counts[i]):
+        num_tokens = token_counts[idx]
+        if pad_to_longest:
+            longest = token_counts[batch[0]] if batch else num_tokens
+            new_batch_tokens = longest * (len(batch) + 1)
+        else:
+            new_batch_tokens = batch_tokens + num_tokens
+
+        if batch and (len(batch) >= max_batch_size or new_batch_tokens > token_budget):
+            batches.append(batch)
+            batch = []
+            new_batch_tokens = num_tokens
+
+        batch.append(idx)
+        batch_tokens = new_batch_tokens
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class AdaptiveBatchSize:
+    """Batch size for API embedding providers. Halves whenever the provider rate
+    limits a request and grows back by a quarter after every successful request."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._size = max_size
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def on_rate_limit(self, failed_batch_size: int) -> int:
+        with self._lock:
+            self._size = max(1, min(self._size, failed_batch_size // 2))
+            return self._size
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._size = min(self.max_size, self._size + max(1, self._size // 4))
+
+
 def format_embedding_error(
     error: Exception,
     service_name: str,
@@ -321,7 +419,18 @@ class CloudEmbedding:
         result = response.json()
         return [embedding["embedding"] for embedding in result["data"]]
 
-    @retry(tries=_RETRY_TRIES, delay=_RETRY_DELAY)
+    # retry (unlike tenacity) returns the coroutine of an async function without
+    # awaiting it, so it would never see an error. Rate limited batches are not
+    # retried here but shrunk by _embed_with_adaptive_batch_size, rejected
+    # credentials are not worth retrying.
+    @tenacity_retry(
+        retry=retry_if_not_exception_type(
+            (EmbeddingRateLimitError, AuthenticationError)
+        ),
+        stop=stop_after_attempt(_RETRY_TRIES),
+        wait=wait_fixed(_RETRY_DELAY),
+        reraise=True,
+    )
     async def embed(
         self,
         *,
@@ -353,6 +462,8 @@ class CloudEmbedding:
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 401:
                 raise AuthenticationError(provider=str(self.provider))
+            if e.response.status_code == 429:
+                raise EmbeddingRateLimitError(str(e)) from e
 
             error_string = format_embedding_error(
                 e,
@@ -369,6 +480,8 @@ class CloudEmbedding:
         except Exception as e:
             if is_authentication_error(e):
                 raise AuthenticationError(provider=str(self.provider))
+            if is_rate_limit_error(e):
+                raise EmbeddingRateLimitError(str(e)) from e
 
             error_string = format_embedding_error(
                 e,
@@ -522,6 +635,8 @@ class EmbeddingModel:
             model_name=model_name, provider_type=provider_type
         )
         self.callback = callback
+        # shrinks on rate limit errors from API providers, shared across encode calls
+        self._api_batch_size: AdaptiveBatchSize | None = None
 
         # Only build model server endpoint for local models
         if self.provider_type is None:
@@ -666,6 +781,39 @@ class EmbeddingModel:
         except requests.RequestException as e:
             raise HTTPError(f"Request failed: {str(e)}") from e
 
+    def _embed_with_adaptive_batch_size(
+        self,
+        texts: list[str],
+        embed_func: Callable[[list[str]], list[Embedding]],
+        batch_size: AdaptiveBatchSize,
+    ) -> list[Embedding]:
+        """Embeds the texts in batches of the current adaptive batch size, retrying
+        with a smaller batch size whenever the provider rate limits a request."""
+        embeddings: list[Embedding] = []
+        rate_limited_tries = 0
+        while len(embeddings) < len(texts):
+            text_batch = texts[len(embeddings) : len(embeddings) + batch_size.size]
+            try:
+                batch_embeddings = embed_func(text_batch)
+            except EmbeddingRateLimitError:
+                rate_limited_tries += 1
+                if rate_limited_tries >= _RETRY_TRIES:
+                    raise
+
+                new_size = batch_size.on_rate_limit(len(text_batch))
+                logger.warning(
+                    f"Embedding provider rate limited a batch of {len(text_batch)} texts, "
+                    f"retrying in {_RETRY_DELAY}s with batches of {new_size} texts"
+                )
+                time.sleep(_RETRY_DELAY)
+                continue
+
+            rate_limited_tries = 0
+            batch_size.on_success()
+            embeddings.extend(batch_embeddings)
+
+        return embeddings
+
     def _batch_encode_texts(
         self,
         texts: list[str],
@@ -675,26 +823,46 @@ class EmbeddingModel:
         num_threads: int = INDEXING_EMBEDDING_MODEL_NUM_THREADS,
         tenant_id: str | None = None,
         request_id: str | None = None,
+        token_budget: int = 0,
     ) -> list[Embedding]:
-        text_batches = batch_list(texts, batch_size)
+        encode_start_time = time.monotonic()
+
+        adaptive_batch_size: AdaptiveBatchSize | None = None
+        if self.provider_type is not None:
+            if (
+                self._api_batch_size is None
+                or self._api_batch_size.max_size != batch_size
+            ):
+                self._api_batch_size = AdaptiveBatchSize(batch_size)
+            adaptive_batch_size = self._api_batch_size
+            batch_size = adaptive_batch_size.size
+
+        # batches hold the indices of the texts so that the embeddings can be put back
+        # in the original order when the texts are reordered to fit the token budget
+        token_counts: list[int] | None = None
+        if token_budget > 0:
+            token_counts = [
+                min(len(self.tokenizer.encode(text)), max_seq_length) for text in texts
+            ]
+            index_batches = build_token_budgeted_batches(
+                token_counts=token_counts,
+                max_batch_size=batch_size,
+                token_budget=token_budget,
+                pad_to_longest=self.provider_type is None,
+            )
+        else:
+            index_batches = batch_list(list(range(len(texts))), batch_size)
+        text_batches = [[texts[idx] for idx in batch] for batch in index_batches]
 
         logger.debug(f"Encoding {len(texts)} texts in {len(text_batches)} batches")
 
-        embeddings: list[Embedding] = []
+        embeddings: list[Embedding | None] = [None] * len(texts)
 
-        def process_batch(
-            batch_idx: int,
-            batch_len: int,
+        def embed_texts(
             text_batch: list[str],
             tenant_id: str | None = None,
             request_id: str | None = None,
-        ) -> tuple[int, list[Embedding]]:
-            if self.callback:
-                if self.callback.should_stop():
-                    raise ConnectorStopSignal(
-                        "_batch_encode_texts detected stop signal"
-                    )
-
+        ) -> list[Embedding]:
             embed_request = EmbedRequest(
                 model_name=self.model_name,
                 texts=text_batch,
@@ -711,8 +879,6 @@ class EmbeddingModel:
                 reduced_dimension=self.reduced_dimension,
             )
 
-            start_time = time.monotonic()
-
             # Route between direct API calls and model server calls
             if self.provider_type is not None:
                 # For API providers, make direct API call
@@ -732,6 +898,33 @@ class EmbeddingModel:
                     embed_request, tenant_id=tenant_id, request_id=request_id
                 )
 
+            return response.embeddings
+
+        def process_batch(
+            batch_idx: int,
+            batch_len: int,
+            text_batch: list[str],
+            tenant_id: str | None = None,
+            request_id: str | None = None,
+        ) -> tuple[int, list[Embedding]]:
+            if self.callback:
+                if self.callback.should_stop():
+                    raise ConnectorStopSignal(
+                        "_batch_encode_texts detected stop signal"
+                    )
+
+            start_time = time.monotonic()
+
+            embed_func = partial(
+                embed_texts, tenant_id=tenant_id, request_id=request_id
+            )
+            if adaptive_batch_size is not None:
+                batch_embeddings = self._embed_with_adaptive_batch_size(
+                    text_batch, embed_func, adaptive_batch_size
+                )
+            else:
+                batch_embeddings = embed_func(text_batch)
+
             end_time = time.monotonic()
 
             processing_time = end_time - start_time
@@ -739,7 +932,11 @@ class EmbeddingModel:
                 f"EmbeddingModel.process_batch: Batch {batch_idx}/{batch_len} processing time: {processing_time:.2f} seconds"
             )
 
-            return batch_idx, response.embeddings
+            return batch_idx, batch_embeddings
+
+        def collect_batch(batch_idx: int, batch_embeddings: list[Embedding]) -> None:
+            for idx, embedding in zip(index_batches[batch_idx - 1], batch_embeddings):
+                embeddings[idx] = embedding
 
         # only multi thread if:
         #   1. num_threads is greater than 1
@@ -761,33 +958,44 @@ class EmbeddingModel:
                     for idx, batch in enumerate(text_batches, start=1)
                 }
 
-                # Collect results in order
-                batch_results: list[tuple[int, list[Embedding]]] = []
                 for future in as_completed(future_to_batch):
                     try:
-                        result = future.result()
-                        batch_results.append(result)
+                        collect_batch(*future.result())
                     except Exception as e:
                         logger.exception("Embedding model failed to process batch")
                         raise e
-
-                # Sort by batch index and extend embeddings
-                batch_results.sort(key=lambda x: x[0])
-                for _, batch_embeddings in batch_results:
-                    embeddings.extend(batch_embeddings)
         else:
             # Original sequential processing
             for idx, text_batch in enumerate(text_batches, start=1):
-                _, batch_embeddings = process_batch(
-                    idx,
-                    len(text_batches),
-                    text_batch,
-                    tenant_id=tenant_id,
-                    request_id=request_id,
+                collect_batch(
+                    *process_batch(
+                        idx,
+                        len(text_batches),
+                        text_batch,
+                        tenant_id=tenant_id,
+                        request_id=request_id,
+                    )
                 )
-                embeddings.extend(batch_embeddings)
 
-        return embeddings
+        elapsed = time.monotonic() - encode_start_time
+        throughput = f"texts={len(texts)} texts_per_sec={len(texts) / elapsed:.1f} "
+        if token_counts is not None:
+            total_tokens = sum(token_counts)
+            throughput += (
+                f"tokens={total_tokens} tokens_per_sec={total_tokens / elapsed:.1f} "
+            )
+        log_level = (
+            logging.INFO if text_type == EmbedTextType.PASSAGE else logging.DEBUG
+        )
+        logger.log(
+            log_level,
+            f"event=embedding_batch_encode "
+            f"batches={len(text_batches)} "
+            f"{throughput}"
+            f"elapsed={elapsed:.2f}",
+        )
+
+        return cast(list[Embedding], embeddings)
 
     def encode(
         self,
@@ -796,6 +1004,8 @@ class EmbeddingModel:
         large_chunks_present: bool = False,
         local_embedding_batch_size: int = BATCH_SIZE_ENCODE_CHUNKS,
         api_embedding_batch_size: int = BATCH_SIZE_ENCODE_CHUNKS_FOR_API_EMBEDDING_SERVICES,
+        local_embedding_token_budget: int = BATCH_TOKEN_BUDGET_ENCODE_CHUNKS,
+        api_embedding_token_budget: int = BATCH_TOKEN_BUDGET_ENCODE_CHUNKS_FOR_API_EMBEDDING_SERVICES,
         max_seq_length: int = DOC_EMBEDDING_CONTEXT_SIZE,
         tenant_id: str | None = None,
         request_id: str | None = None,
@@ -824,6 +1034,11 @@ class EmbeddingModel:
             if self.provider_type
             else local_embedding_batch_size
         )
+        token_budget = (
+            api_embedding_token_budget
+            if self.provider_type
+            else local_embedding_token_budget
+        )
 
         return self._batch_encode_texts(
             texts=texts,
@@ -832,6 +1047,7 @@ class EmbeddingModel:
             max_seq_length=max_seq_length,
             tenant_id=tenant_id,
             request_id=request_id,
+            token_budget=token_budget,
         )
 
     @classmethod
@@ -23,6 +23,8 @@ os.environ["TRANSFORMERS_NO_ADVISORY_WARNINGS"] = "1"
 
 
 class BaseTokenizer(ABC):
+    model_name: str
+
     @abstractmethod
     def encode(self, string: str) -> list[int]:
         pass
@@ -35,6 +37,11 @@ class BaseTokenizer(ABC):
     def decode(self, tokens: list[int]) -> str:
         pass
 
+    def encode_with_offsets(self, string: str) -> list[tuple[int, int]]:
+        """Returns the (start, end) character offsets into `string` of every token, in
+        order. Not every tokenizer can provide these."""
+        raise NotImplementedError
+
 
 class TiktokenTokenizer(BaseTokenizer):
     _instances: dict[str, "TiktokenTokenizer"] = {}
@@ -48,8 +55,13 @@ class TiktokenTokenizer(BaseTokenizer):
         if not hasattr(self, "encoder"):
             import tiktoken
 
+            self.model_name = model_name
             self.encoder = tiktoken.encoding_for_model(model_name)
 
+    def __reduce__(self) -> tuple[type["TiktokenTokenizer"], tuple[str]]:
+        # rebuilt (from the per process instances) when sent to another process
+        return (TiktokenTokenizer, (self.model_name,))
+
     def encode(self, string: str) -> list[int]:
         # this ignores special tokens that the model is trained on, see encode_ordinary for details
         return self.encoder.encode_ordinary(string)
@@ -68,9 +80,18 @@ class TiktokenTokenizer(BaseTokenizer):
     def decode(self, tokens: list[int]) -> str:
         return self.encoder.decode(tokens)
 
+    def encode_with_offsets(self, string: str) -> list[tuple[int, int]]:
+        decoded, starts = self.encoder.decode_with_offsets(self.encode(string))
+        if decoded != string:
+            raise ValueError("Tokens do not decode back to the original string")
+
+        ends = starts[1:] + [len(decoded)]
+        return list(zip(starts, ends))
+
 
 class HuggingFaceTokenizer(BaseTokenizer):
     def __init__(self, model_name: str):
+        self.model_name = model_name
         self.encoder: Tokenizer = Tokenizer.from_pretrained(model_name)
 
     def _safer_encode(self, string: str) -> Encoding:
@@ -96,6 +117,11 @@ class HuggingFaceTokenizer(BaseTokenizer):
     def decode(self, tokens: list[int]) -> str:
         return self.encoder.decode(tokens)
 
+    def encode_with_offsets(self, string: str) -> list[tuple[int, int]]:
+        # NOTE: no ascii fallback as in _safer_encode, the offsets have to refer to
+        # the original string
+        return self.encoder.encode(string, add_special_tokens=False).offsets
+
 
 _TOKENIZER_CACHE: dict[tuple[EmbeddingProvider | None, str | None], BaseTokenizer] = {}
 
@@ -1,11 +1,16 @@
 from abc import ABC
 from abc import abstractmethod
+from typing import cast
+from uuid import uuid4
 
 from celery import Celery
 from redis import Redis
 from redis.lock import Lock as RedisLock
 from sqlalchemy.orm import Session
 
+from onyx.configs.constants import OnyxCeleryPriority
+from onyx.configs.constants import OnyxCeleryQueues
+from onyx.configs.constants import OnyxCeleryTask
 from onyx.redis.redis_pool import get_redis_client
 
 
@@ -33,6 +38,51 @@ class RedisObjectHelper(ABC):
         # example: documentset_taskset_1
         return f"{self.TASKSET_PREFIX}_{self._id}"
 
+    def get_remaining(self) -> int:
+        """Number of documents the pending tasks of the taskset still have to sync. The
+        taskset maps each task id to the number of documents of the task."""
+        num_docs = cast(list[bytes], self.redis.hvals(self.taskset_key))
+        return sum(int(n) for n in num_docs)
+
+    def remove_from_taskset(self, task_id: str) -> None:
+        self.redis.hdel(self.taskset_key, task_id)
+
+    def send_vespa_metadata_sync_task(
+        self,
+        celery_app: Celery,
+        redis_client: Redis,
+        document_ids: list[str],
+        tenant_id: str,
+    ) -> None:
+        """Sends a task syncing the Vespa metadata of document_ids, one batch task for
+        several documents."""
+        # celery's default task id format is "dd32ded3-00aa-4884-8b21-42f8332e7fac"
+        # the key for the result is "celery-task-meta-dd32ded3-00aa-4884-8b21-42f8332e7fac"
+        # we prefix the task id so it's easier to keep track of who created the task
+        # aka "documentset_1_6dd32ded3-00aa-4884-8b21-42f8332e7fac"
+        custom_task_id = f"{self.task_id_prefix}_{uuid4()}"
+
+        # add to the taskset BEFORE creating the task.
+        redis_client.hset(self.taskset_key, custom_task_id, len(document_ids))
+
+        if len(document_ids) == 1:
+            celery_app.send_task(
+                OnyxCeleryTask.VESPA_METADATA_SYNC_TASK,
+                kwargs=dict(document_id=document_ids[0], tenant_id=tenant_id),
+                queue=OnyxCeleryQueues.VESPA_METADATA_SYNC,
+                task_id=custom_task_id,
+                priority=OnyxCeleryPriority.MEDIUM,
+            )
+            return
+
+        celery_app.send_task(
+            OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK,
+            kwargs=dict(document_ids=document_ids, tenant_id=tenant_id),
+            queue=OnyxCeleryQueues.VESPA_METADATA_SYNC,
+            task_id=custom_task_id,
+            priority=OnyxCeleryPriority.MEDIUM,
+        )
+
     @staticmethod
     def get_id_from_fence_key(key: str) -> str | None:
         """
@@ -1,6 +1,5 @@
 import time
 from typing import cast
-from uuid import uuid4
 
 import redis
 from celery import Celery
@@ -9,10 +8,8 @@ from redis.lock import Lock as RedisLock
 from sqlalchemy.orm import Session
 
 from onyx.configs.app_configs import DB_YIELD_PER_DEFAULT
+from onyx.configs.app_configs import VESPA_SYNC_BATCH_SIZE
 from onyx.configs.constants import CELERY_VESPA_SYNC_BEAT_LOCK_TIMEOUT
-from onyx.configs.constants import OnyxCeleryPriority
-from onyx.configs.constants import OnyxCeleryQueues
-from onyx.configs.constants import OnyxCeleryTask
 from onyx.configs.constants import OnyxRedisConstants
 from onyx.redis.redis_object_helper import RedisObjectHelper
 from onyx.utils.variable_functionality import fetch_versioned_implementation
@@ -60,12 +57,17 @@ class RedisUserGroup(RedisObjectHelper):
         redis_client: Redis,
         lock: RedisLock,
         tenant_id: str,
+        batch_size: int = VESPA_SYNC_BATCH_SIZE,
     ) -> tuple[int, int] | None:
         """Max tasks is ignored for now until we can build the logic to mark the
         user group up to date over multiple batches.
+
+        Each task syncs up to batch_size documents. Returns the number of tasks and
+        the number of documents, the taskset tracks the progress in documents.
         """
         last_lock_time = time.monotonic()
         num_tasks_sent = 0
+        num_docs = 0
 
         if not global_version.is_ee_version():
             return 0, 0
@@ -79,6 +81,7 @@ class RedisUserGroup(RedisObjectHelper):
             return 0, 0
 
         stmt = construct_document_id_select_by_usergroup(int(self._id))
+        doc_id_batch: list[str] = []
         for doc_id in db_session.scalars(stmt).yield_per(DB_YIELD_PER_DEFAULT):
             doc_id = cast(str, doc_id)
             current_time = time.monotonic()
@@ -88,26 +91,24 @@ class RedisUserGroup(RedisObjectHelper):
                 lock.reacquire()
                 last_lock_time = current_time
 
-            # celery's default task id format is "dd32ded3-00aa-4884-8b21-42f8332e7fac"
-            # the key for the result is "celery-task-meta-dd32ded3-00aa-4884-8b21-42f8332e7fac"
-            # we prefix the task id so it's easier to keep track of who created the task
-            # aka "documentset_1_6dd32ded3-00aa-4884-8b21-42f8332e7fac"
-            custom_task_id = f"{self.task_id_prefix}_{uuid4()}"
-
-            # add to the set BEFORE creating the task.
-            redis_client.sadd(self.taskset_key, custom_task_id)
-
-            celery_app.send_task(
-                OnyxCeleryTask.VESPA_METADATA_SYNC_TASK,
-                kwargs=dict(document_id=doc_id, tenant_id=tenant_id),
-                queue=OnyxCeleryQueues.VESPA_METADATA_SYNC,
-                task_id=custom_task_id,
-                priority=OnyxCeleryPriority.MEDIUM,
+            num_docs += 1
+            doc_id_batch.append(doc_id)
+            if len(doc_id_batch) < batch_size:
+                continue
+
+            self.send_vespa_metadata_sync_task(
+                celery_app, redis_client, doc_id_batch, tenant_id
             )
+            doc_id_batch = []
+            num_tasks_sent += 1
 
+        if doc_id_batch:
+            self.send_vespa_metadata_sync_task(
+                celery_app, redis_client, doc_id_batch, tenant_id
+            )
             num_tasks_sent += 1
 
-        return num_tasks_sent, num_tasks_sent
+        return num_tasks_sent, num_docs
 
     def reset(self) -> None:
         self.redis.srem(OnyxRedisConstants.ACTIVE_FENCES, self.fence_key)
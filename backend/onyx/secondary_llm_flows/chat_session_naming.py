@@ -4,8 +4,9 @@ from onyx.configs.model_configs import GEN_AI_HISTORY_CUTOFF
 from onyx.db.models import ChatMessage
 from onyx.db.search_settings import get_multilingual_expansion
 from onyx.llm.interfaces import LLM
+from onyx.llm.response_cache import invoke_llm_with_response_cache
+from onyx.llm.response_cache import LLMResponseCacheFlow
 from onyx.llm.utils import dict_based_prompt_to_langchain_prompt
-from onyx.llm.utils import message_to_string
 from onyx.prompts.chat_prompts import CHAT_NAMING
 from onyx.utils.logger import setup_logger
 
@@ -36,7 +37,9 @@ def get_renamed_conversation_name(
     ]
 
     filled_llm_prompt = dict_based_prompt_to_langchain_prompt(prompt_msgs)
-    new_name_raw = message_to_string(llm.invoke(filled_llm_prompt))
+    new_name_raw = invoke_llm_with_response_cache(
+        llm, filled_llm_prompt, flow=LLMResponseCacheFlow.CHAT_SESSION_NAMING
+    )
 
     new_name = new_name_raw.strip().strip(' "')
 
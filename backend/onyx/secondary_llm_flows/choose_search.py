@@ -10,8 +10,9 @@ from onyx.context.search.enums import SearchType
 from onyx.db.models import ChatMessage
 from onyx.llm.interfaces import LLM
 from onyx.llm.models import PreviousMessage
+from onyx.llm.response_cache import invoke_llm_with_response_cache
+from onyx.llm.response_cache import LLMResponseCacheFlow
 from onyx.llm.utils import dict_based_prompt_to_langchain_prompt
-from onyx.llm.utils import message_to_string
 from onyx.prompts.chat_prompts import AggressiveSearchTemplateParams
 from onyx.prompts.chat_prompts import build_aggressive_search_template
 from onyx.prompts.chat_prompts import NO_SEARCH
@@ -40,7 +41,9 @@ def check_if_need_search_multi_message(
 
     prompt_msgs.append(HumanMessage(content=f"{last_query}\n\n{REQUIRE_SEARCH_HINT}"))
 
-    model_out = message_to_string(llm.invoke(prompt_msgs))
+    model_out = invoke_llm_with_response_cache(
+        llm, prompt_msgs, flow=LLMResponseCacheFlow.CHOOSE_SEARCH
+    )
 
     if (NO_SEARCH.split()[0] + " ").lower() in model_out.lower():
         return False
@@ -92,7 +95,9 @@ def check_if_need_search(
     ]
 
     filled_llm_prompt = dict_based_prompt_to_langchain_prompt(prompt_msgs)
-    search_output = message_to_string(llm.invoke(filled_llm_prompt))
+    search_output = invoke_llm_with_response_cache(
+        llm, filled_llm_prompt, flow=LLMResponseCacheFlow.CHOOSE_SEARCH
+    )
 
     logger.debug(f"{log_message}: {search_output}")
 
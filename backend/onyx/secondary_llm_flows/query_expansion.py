@@ -8,8 +8,9 @@ from onyx.llm.exceptions import GenAIDisabledException
 from onyx.llm.factory import get_default_llms
 from onyx.llm.interfaces import LLM
 from onyx.llm.models import PreviousMessage
+from onyx.llm.response_cache import invoke_llm_with_response_cache
+from onyx.llm.response_cache import LLMResponseCacheFlow
 from onyx.llm.utils import dict_based_prompt_to_langchain_prompt
-from onyx.llm.utils import message_to_string
 from onyx.prompts.chat_prompts import HISTORY_QUERY_REPHRASE
 from onyx.prompts.miscellaneous_prompts import LANGUAGE_REPHRASE_PROMPT
 from onyx.utils.logger import setup_logger
@@ -42,7 +43,9 @@ def llm_multilingual_query_expansion(query: str, language: str) -> str:
 
     messages = _get_rephrase_messages()
     filled_llm_prompt = dict_based_prompt_to_langchain_prompt(messages)
-    model_output = message_to_string(fast_llm.invoke(filled_llm_prompt))
+    model_output = invoke_llm_with_response_cache(
+        fast_llm, filled_llm_prompt, flow=LLMResponseCacheFlow.QUERY_EXPANSION
+    )
     logger.debug(model_output)
 
     return model_output
@@ -124,7 +127,9 @@ def history_based_query_rephrase(
     )
 
     filled_llm_prompt = dict_based_prompt_to_langchain_prompt(prompt_msgs)
-    rephrased_query = message_to_string(llm.invoke(filled_llm_prompt))
+    rephrased_query = invoke_llm_with_response_cache(
+        llm, filled_llm_prompt, flow=LLMResponseCacheFlow.QUERY_REPHRASE
+    )
 
     logger.debug(f"Rephrased combined query: {rephrased_query}")
 
@@ -159,7 +164,9 @@ def thread_based_query_rephrase(
     )
 
     filled_llm_prompt = dict_based_prompt_to_langchain_prompt(prompt_msgs)
-    rephrased_query = message_to_string(llm.invoke(filled_llm_prompt))
+    rephrased_query = invoke_llm_with_response_cache(
+        llm, filled_llm_prompt, flow=LLMResponseCacheFlow.QUERY_REPHRASE
+    )
 
     logger.debug(f"Rephrased combined query: {rephrased_query}")
 
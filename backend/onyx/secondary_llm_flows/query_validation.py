@@ -6,9 +6,10 @@ from onyx.chat.models import OnyxAnswerPiece
 from onyx.chat.models import StreamingError
 from onyx.llm.exceptions import GenAIDisabledException
 from onyx.llm.factory import get_default_llms
+from onyx.llm.response_cache import invoke_llm_with_response_cache
+from onyx.llm.response_cache import LLMResponseCacheFlow
 from onyx.llm.utils import dict_based_prompt_to_langchain_prompt
 from onyx.llm.utils import message_generator_to_string_generator
-from onyx.llm.utils import message_to_string
 from onyx.prompts.constants import ANSWERABLE_PAT
 from onyx.prompts.constants import THOUGHT_PAT
 from onyx.prompts.query_validation import ANSWERABLE_PROMPT
@@ -58,7 +59,9 @@ def get_query_answerability(
 
     messages = get_query_validation_messages(user_query)
     filled_llm_prompt = dict_based_prompt_to_langchain_prompt(messages)
-    model_output = message_to_string(llm.invoke(filled_llm_prompt))
+    model_output = invoke_llm_with_response_cache(
+        llm, filled_llm_prompt, flow=LLMResponseCacheFlow.QUERY_VALIDATION
+    )
 
     reasoning = extract_answerability_reasoning(model_output)
     answerable = extract_answerability_bool(model_output)
@@ -8,8 +8,9 @@ from onyx.configs.constants import DocumentSource
 from onyx.db.connector import fetch_unique_document_sources
 from onyx.db.engine.sql_engine import get_sqlalchemy_engine
 from onyx.llm.interfaces import LLM
+from onyx.llm.response_cache import invoke_llm_with_response_cache
+from onyx.llm.response_cache import LLMResponseCacheFlow
 from onyx.llm.utils import dict_based_prompt_to_langchain_prompt
-from onyx.llm.utils import message_to_string
 from onyx.natural_language_processing.search_nlp_models import (
     ConnectorClassificationModel,
 )
@@ -179,7 +180,9 @@ def extract_source_filter(
 
     messages = _get_source_filter_messages(query=query, valid_sources=valid_sources)
     filled_llm_prompt = dict_based_prompt_to_langchain_prompt(messages)
-    model_output = message_to_string(llm.invoke(filled_llm_prompt))
+    model_output = invoke_llm_with_response_cache(
+        llm, filled_llm_prompt, flow=LLMResponseCacheFlow.SOURCE_FILTER
+    )
     logger.debug(model_output)
 
     return _extract_source_filters_from_llm_out(model_output)
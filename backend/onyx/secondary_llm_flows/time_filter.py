@@ -6,8 +6,9 @@ from datetime import timezone
 from dateutil.parser import parse
 
 from onyx.llm.interfaces import LLM
+from onyx.llm.response_cache import invoke_llm_with_response_cache
+from onyx.llm.response_cache import LLMResponseCacheFlow
 from onyx.llm.utils import dict_based_prompt_to_langchain_prompt
-from onyx.llm.utils import message_to_string
 from onyx.prompts.filter_extration import TIME_FILTER_PROMPT
 from onyx.prompts.prompt_utils import get_current_llm_day_time
 from onyx.utils.logger import setup_logger
@@ -148,7 +149,9 @@ def extract_time_filter(query: str, llm: LLM) -> tuple[datetime | None, bool]:
 
     messages = _get_time_filter_messages(query)
     filled_llm_prompt = dict_based_prompt_to_langchain_prompt(messages)
-    model_output = message_to_string(llm.invoke(filled_llm_prompt))
+    model_output = invoke_llm_with_response_cache(
+        llm, filled_llm_prompt, flow=LLMResponseCacheFlow.TIME_FILTER
+    )
     logger.debug(model_output)
 
     return _extract_time_filter_from_llm_out(model_output)
@@ -24,6 +24,7 @@ from onyx.llm.factory import get_llm
 from onyx.llm.factory import get_max_input_tokens_from_llm_provider
 from onyx.llm.llm_provider_options import fetch_available_well_known_llms
 from onyx.llm.llm_provider_options import WellKnownLLMProviderDescriptor
+from onyx.llm.provider_cache import invalidate_llm_provider_cache
 from onyx.llm.utils import get_llm_contextual_cost
 from onyx.llm.utils import litellm_exception_to_error_msg
 from onyx.llm.utils import model_supports_image_input
@@ -238,7 +239,7 @@ def put_llm_provider(
         llm_provider_upsert_request.api_key = existing_provider.api_key
 
     try:
-        return upsert_llm_provider(
+        llm_provider = upsert_llm_provider(
             llm_provider_upsert_request=llm_provider_upsert_request,
             db_session=db_session,
         )
@@ -246,6 +247,9 @@ def put_llm_provider(
         logger.exception("Failed to upsert LLM Provider")
         raise HTTPException(status_code=400, detail=str(e))
 
+    invalidate_llm_provider_cache()
+    return llm_provider
+
 
 @admin_router.delete("/provider/{provider_id}")
 def delete_llm_provider(
@@ -254,6 +258,7 @@ def delete_llm_provider(
     db_session: Session = Depends(get_session),
 ) -> None:
     remove_llm_provider(db_session, provider_id)
+    invalidate_llm_provider_cache()
 
 
 @admin_router.post("/provider/{provider_id}/default")
@@ -263,6 +268,7 @@ def set_provider_as_default(
     db_session: Session = Depends(get_session),
 ) -> None:
     update_default_provider(provider_id=provider_id, db_session=db_session)
+    invalidate_llm_provider_cache()
 
 
 @admin_router.post("/provider/{provider_id}/default-vision")
@@ -277,6 +283,7 @@ def set_provider_as_default_vision(
     update_default_vision_provider(
         provider_id=provider_id, vision_model=vision_model, db_session=db_session
     )
+    invalidate_llm_provider_cache()
 
 
 @admin_router.get("/vision-providers")
@@ -124,6 +124,7 @@ def upsert_ingestion_doc(
         index_attempt_metadata=IndexAttemptMetadata(
             connector_id=cc_pair.connector_id,
             credential_id=cc_pair.credential_id,
+            search_settings_id=search_settings.id,
         ),
     )
 
@@ -156,6 +157,7 @@ def upsert_ingestion_doc(
             index_attempt_metadata=IndexAttemptMetadata(
                 connector_id=cc_pair.connector_id,
                 credential_id=cc_pair.credential_id,
+                search_settings_id=sec_search_settings.id,
             ),
         )
 
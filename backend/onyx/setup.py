@@ -43,6 +43,7 @@ from onyx.indexing.models import IndexingSetting
 from onyx.key_value_store.factory import get_kv_store
 from onyx.key_value_store.interface import KvKeyNotFoundError
 from onyx.llm.llm_provider_options import OPEN_AI_MODEL_NAMES
+from onyx.llm.provider_cache import invalidate_llm_provider_cache
 from onyx.natural_language_processing.search_nlp_models import EmbeddingModel
 from onyx.natural_language_processing.search_nlp_models import warm_up_bi_encoder
 from onyx.natural_language_processing.search_nlp_models import warm_up_cross_encoder
@@ -322,6 +323,7 @@ def setup_postgres(db_session: Session) -> None:
             llm_provider_upsert_request=model_req, db_session=db_session
         )
         update_default_provider(provider_id=new_llm_provider.id, db_session=db_session)
+        invalidate_llm_provider_cache()
 
 
 def update_default_multipass_indexing(db_session: Session) -> None:
@@ -0,0 +1,92 @@
+import heapq
+import json
+import os
+import tempfile
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import IO
+
+
+class ExternalSortedStrings:
+    """Collects strings and gives them back sorted and deduplicated while holding at most
+    max_in_memory of them in memory. Whenever the buffer is full it is sorted and written
+    to a temporary file (a sorted run), the runs are then merged on iteration.
+
+    Strings are compared by code point, which matches Postgres' "C" collation for UTF-8
+    text. Use as a context manager so the temporary files are always removed."""
+
+    def __init__(self, max_in_memory: int, tmp_dir: str | None = None) -> None:
+        if max_in_memory <= 0:
+            raise ValueError("max_in_memory must be positive")
+
+        self.max_in_memory = max_in_memory
+        self._tmp_dir = tempfile.TemporaryDirectory(
+            prefix="onyx_external_sort_", dir=tmp_dir
+        )
+        self._buffer: set[str] = set()
+        self._run_paths: list[str] = []
+
+    def __enter__(self) -> "ExternalSortedStrings":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.cleanup()
+
+    @property
+    def num_runs(self) -> int:
+        return len(self._run_paths)
+
+    def add_many(self, values: Iterable[str]) -> None:
+        for value in values:
+            self._buffer.add(value)
+            if len(self._buffer) >= self.max_in_memory:
+                self._spill()
+
+    def _spill(self) -> None:
+        path = os.path.join(self._tmp_dir.name, f"run_{len(self._run_paths)}")
+        with open(path, "w", encoding="utf-8") as f:
+            for value in sorted(self._buffer):
+                # json escapes newlines so that each value is exactly one line
+                f.write(json.dumps(value))
+                f.write("\n")
+        self._run_paths.append(path)
+        self._buffer = set()
+
+    @staticmethod
+    def _read_run(f: IO[str]) -> Iterator[str]:
+        for line in f:
+            yield json.loads(line)
+
+    def __iter__(self) -> Iterator[str]:
+        """Yields all added strings in sorted order, without duplicates."""
+        files = [open(path, encoding="utf-8") for path in self._run_paths]
+        try:
+            runs: list[Iterable[str]] = [self._read_run(f) for f in files]
+            runs.append(sorted(self._buffer))
+
+            previous: str | None = None
+            for value in heapq.merge(*runs):
+                if value != previous:
+                    yield value
+                previous = value
+        finally:
+            for f in files:
+                f.close()
+
+    def cleanup(self) -> None:
+        self._buffer = set()
+        self._run_paths = []
+        self._tmp_dir.cleanup()
+
+
+def sorted_difference(left: Iterable[str], right: Iterable[str]) -> Iterator[str]:
+    """Yields the strings of left that are not in right. Both inputs must be sorted
+    (by code point) and without duplicates. Runs in a single merge pass."""
+    right_iter = iter(right)
+    right_value = next(right_iter, None)
+    for left_value in left:
+        while right_value is not None and right_value < left_value:
+            right_value = next(right_iter, None)
+
+        if right_value != left_value:
+            yield left_value
@@ -0,0 +1,141 @@
+import abc
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic
+from typing import TypeVar
+
+from onyx.redis.redis_pool import get_shared_redis_client
+from onyx.utils.logger import setup_logger
+from shared_configs.contextvars import get_current_tenant_id
+
+logger = setup_logger()
+
+V = TypeVar("V")
+
+
+class TenantTTLCache(abc.ABC, Generic[V]):
+    """Bounded LRU with a TTL, shared by all threads of the process. Entries are scoped
+    to the current tenant. With use_redis, misses fall back to Redis (shared by all
+    replicas) and new entries are written there too. Redis failures are logged and
+    treated as misses.
+
+    Subclasses define how values are stored in Redis and the prefix of their Redis
+    keys."""
+
+    REDIS_KEY_PREFIX: str
+
+    def __init__(self, max_size: int, ttl_seconds: int, use_redis: bool) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        # maps (tenant id, key) to (expiry, value)
+        self._entries: OrderedDict[tuple[str, str], tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def serialize(self, value: V) -> bytes | str:
+        """The value as stored in Redis"""
+
+    @abc.abstractmethod
+    def deserialize(self, blob: bytes) -> V:
+        """The value stored in Redis as blob"""
+
+    def record_lookups(self, tier: str, num_hits: int, num_misses: int) -> None:
+        """Called after each lookup of the local and the Redis tier, e.g. for
+        metrics."""
+
+    def get(self, key: str) -> V | None:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: list[str]) -> dict[str, V]:
+        tenant_id = get_current_tenant_id()
+        now = time.monotonic()
+
+        found: dict[str, V] = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get((tenant_id, key))
+                if entry is None:
+                    continue
+                expiry, value = entry
+                if expiry < now:
+                    del self._entries[(tenant_id, key)]
+                    continue
+                self._entries.move_to_end((tenant_id, key))
+                found[key] = value
+        self.record_lookups("local", len(found), len(keys) - len(found))
+
+        missing_keys = [key for key in keys if key not in found]
+        if self.use_redis and missing_keys:
+            redis_found = self._get_many_from_redis(missing_keys, tenant_id)
+            self.record_lookups(
+                "redis", len(redis_found), len(missing_keys) - len(redis_found)
+            )
+            self._put_many_local(redis_found, tenant_id)
+            found.update(redis_found)
+
+        return found
+
+    def put(self, key: str, value: V) -> None:
+        self.put_many({key: value})
+
+    def put_many(self, key_to_value: dict[str, V]) -> None:
+        if not key_to_value:
+            return
+
+        tenant_id = get_current_tenant_id()
+        self._put_many_local(key_to_value, tenant_id)
+        if self.use_redis:
+            self._put_many_in_redis(key_to_value, tenant_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _put_many_local(self, key_to_value: dict[str, V], tenant_id: str) -> None:
+        expiry = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, value in key_to_value.items():
+                self._entries[(tenant_id, key)] = (expiry, value)
+                self._entries.move_to_end((tenant_id, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _redis_key(self, key: str, tenant_id: str) -> str:
+        # mget and pipelines of the shared redis client are not tenant prefixed
+        return f"{self.REDIS_KEY_PREFIX}{tenant_id}:{key}"
+
+    def _get_many_from_redis(self, keys: list[str], tenant_id: str) -> dict[str, V]:
+        try:
+            blobs = get_shared_redis_client().mget(
+                [self._redis_key(key, tenant_id) for key in keys]
+            )
+        except Exception:
+            logger.exception(f"{type(self).__name__}: failed to read from Redis")
+            return {}
+
+        found: dict[str, V] = {}
+        for key, blob in zip(keys, blobs):  # type: ignore
+            if not blob:
+                continue
+            try:
+                found[key] = self.deserialize(blob)
+            except Exception:
+                logger.exception(
+                    f"{type(self).__name__}: failed to parse a value cached in Redis"
+                )
+        return found
+
+    def _put_many_in_redis(self, key_to_value: dict[str, V], tenant_id: str) -> None:
+        try:
+            pipeline = get_shared_redis_client().pipeline(transaction=False)
+            for key, value in key_to_value.items():
+                pipeline.set(
+                    self._redis_key(key, tenant_id),
+                    self.serialize(value),
+                    ex=self.ttl_seconds,
+                )
+            pipeline.execute()
+        except Exception:
+            logger.exception(f"{type(self).__name__}: failed to write to Redis")
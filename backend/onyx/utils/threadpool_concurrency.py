@@ -2,6 +2,7 @@ import collections.abc
 import contextvars
 import copy
 import threading
+import time
 import uuid
 from collections.abc import Callable
 from collections.abc import Iterator
@@ -226,6 +227,74 @@ def run_functions_tuples_in_parallel(
     return [result for index, result in results]
 
 
+def run_functions_tuples_with_deadline(
+    functions_with_args: Sequence[tuple[CallableProtocol, tuple[Any, ...]]],
+    deadline: float | None,
+    required_indices: set[int] | None = None,
+    on_late_result: Callable[[int, Any], None] | None = None,
+) -> Iterator[tuple[int, Any]]:
+    """
+    Executes multiple functions in parallel and yields (index, result) for each function as
+    soon as it finishes. Like run_functions_tuples_in_parallel, contextvars are preserved
+    across threads and a failing function raises.
+
+    Once `deadline` seconds have passed (if set), only the functions in `required_indices` are still
+    waited on, the others are dropped. Dropped functions keep running in the background,
+    when they finish on_late_result is called with their index and result.
+    """
+    if not functions_with_args:
+        return
+
+    required = required_indices or set()
+    executor = ThreadPoolExecutor(max_workers=len(functions_with_args))
+    try:
+        future_to_index = {
+            executor.submit(contextvars.copy_context().run, func, *args): i
+            for i, (func, args) in enumerate(functions_with_args)
+        }
+
+        end_time = time.monotonic() + deadline if deadline is not None else None
+        pending = set(future_to_index)
+        while pending:
+            remaining = end_time - time.monotonic() if end_time is not None else None
+            if (
+                remaining is not None
+                and remaining <= 0
+                and not any(future_to_index[future] in required for future in pending)
+            ):
+                break
+
+            done, pending = wait(
+                pending,
+                timeout=remaining if remaining is not None and remaining > 0 else None,
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                index = future_to_index[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.exception(f"Function at index {index} failed due to {e}")
+                    raise
+                yield index, result
+
+        if pending:
+            logger.info(
+                f"Dropped {len(pending)} functions that did not finish within {deadline} seconds"
+            )
+        if on_late_result is not None:
+            callback = on_late_result
+            for future in pending:
+                future.add_done_callback(
+                    lambda f, i=future_to_index[future]: (
+                        callback(i, f.result()) if f.exception() is None else None
+                    )
+                )
+    finally:
+        # do not wait on the dropped functions
+        executor.shutdown(wait=False)
+
+
 class FunctionCall(Generic[R]):
     """
     Container for run_functions_in_parallel, fetch the results from the output of
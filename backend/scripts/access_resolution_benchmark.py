@@ -0,0 +1,116 @@
+"""Benchmarks bulk document access resolution (get_access_for_documents on a whole batch)
+against resolving the access of one document at a time, reporting the number of SQL
+queries and the wall time of each. Uses the EE implementation if EE is enabled.
+
+Basic Usage (from the backend directory, against a populated database):
+
+python scripts/access_resolution_benchmark.py --batch-sizes 1000 10000
+
+Document ids are taken from the Document table. Resolving one document at a time is only
+run on the first --per-doc-sample documents of each batch (default 1000) and extrapolated
+to the full batch size, since it takes a few queries per document.
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Any
+
+# Ensure PYTHONPATH is set up for direct script execution
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+# flake8: noqa: E402
+from sqlalchemy import event
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from onyx.access.access import get_access_for_documents
+from onyx.db.engine.sql_engine import get_session_with_current_tenant
+from onyx.db.engine.sql_engine import SqlEngine
+from onyx.db.models import Document
+from onyx.utils.variable_functionality import global_version
+
+
+class _QueryCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args: Any, **kwargs: Any) -> None:
+        self.count += 1
+
+
+def _measure(
+    db_session: Session, counter: _QueryCounter, document_ids: list[str], bulk: bool
+) -> tuple[int, float]:
+    """Returns the number of queries and the wall time to resolve the access."""
+    counter.count = 0
+    start = time.monotonic()
+    if bulk:
+        get_access_for_documents(document_ids=document_ids, db_session=db_session)
+    else:
+        for document_id in document_ids:
+            get_access_for_documents(document_ids=[document_id], db_session=db_session)
+    return counter.count, time.monotonic() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1000, 10000], help="Batch sizes"
+    )
+    parser.add_argument(
+        "--per-doc-sample",
+        type=int,
+        default=1000,
+        help="Max documents resolved one at a time per batch",
+    )
+    parser.add_argument("--ee", action="store_true", help="Use the EE implementation")
+    args = parser.parse_args()
+
+    if args.ee:
+        global_version.set_ee()
+
+    SqlEngine.init_engine(pool_size=5, max_overflow=0)
+    counter = _QueryCounter()
+    event.listen(SqlEngine.get_engine(), "before_cursor_execute", counter)
+
+    with get_session_with_current_tenant() as db_session:
+        all_document_ids = list(
+            db_session.scalars(
+                select(Document.id).limit(max(args.batch_sizes))
+            ).all()
+        )
+        print(f"Loaded {len(all_document_ids)} document ids")
+
+        # warm up connections and caches
+        _measure(db_session, counter, all_document_ids[:10], bulk=True)
+
+        print(
+            f"{'batch':>8} {'mode':>8} {'queries':>10} {'seconds':>10} {'docs/sec':>10}"
+        )
+        for batch_size in args.batch_sizes:
+            document_ids = all_document_ids[:batch_size]
+            if len(document_ids) < batch_size:
+                print(f"Only {len(document_ids)} documents available for {batch_size}")
+
+            queries, elapsed = _measure(db_session, counter, document_ids, bulk=True)
+            print(
+                f"{len(document_ids):>8} {'bulk':>8} {queries:>10} {elapsed:>10.3f} "
+                f"{len(document_ids) / max(elapsed, 1e-9):>10.0f}"
+            )
+
+            sample = document_ids[: args.per_doc_sample]
+            queries, elapsed = _measure(db_session, counter, sample, bulk=False)
+            scale = len(document_ids) / max(len(sample), 1)
+            print(
+                f"{len(document_ids):>8} {'per-doc':>8} {int(queries * scale):>10} "
+                f"{elapsed * scale:>10.3f} "
+                f"{len(sample) / max(elapsed, 1e-9):>10.0f}"
+                + (" (extrapolated)" if scale > 1 else "")
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Benchmarks the default Chunker against the token offset chunking mode
+(CHUNK_WITH_TOKEN_OFFSETS) and checks that both produce the same chunks.
+
+Basic Usage (from the backend directory):
+
+python scripts/chunker_benchmark.py
+
+By default a large mixed corpus (prose, code, markdown tables, non-ASCII text, many
+short sections and very long sections) is generated. To benchmark on real data, point
+the script at a directory of text files, each file becomes one document and blank lines
+separate sections:
+
+python scripts/chunker_benchmark.py --corpus-dir <dir> --model intfloat/e5-base-v2
+
+Tolerance: for WordPiece / SentencePiece tokenizers (the HuggingFace models used for
+local embedding) chunk, blurb and mini chunk boundaries are identical. Byte-level BPE
+tokenizers (tiktoken) merge whitespace with the following word, so tokenizing each
+sentence on its own (default mode) counts about one extra token per sentence compared
+to slicing the token offsets of the whole section. The token offset mode therefore packs
+slightly more text into a chunk and boundaries shift after the first such difference,
+but chunks stay within the token limit up to the tokens that merge across the chunk
+edges. The script reports the fraction of identical chunks and the largest chunk (in
+tokens) of each mode, and exits non-zero if the token offset mode produces a chunk more
+than --tolerance tokens (default 3) larger than the largest chunk of the default mode.
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# flake8: noqa: E402
+from onyx.configs.constants import DocumentSource
+from onyx.connectors.models import Document
+from onyx.connectors.models import IndexingDocument
+from onyx.connectors.models import TextSection
+from onyx.indexing.chunker import Chunker
+from onyx.indexing.indexing_pipeline import process_image_sections
+from onyx.indexing.models import DocAwareChunk
+from onyx.natural_language_processing.utils import BaseTokenizer
+from onyx.natural_language_processing.utils import get_tokenizer
+
+_WORDS = (
+    "index retrieval vector search document connector embedding latency the of and "
+    "a to in is that for on with as by this from at be are it an or which pipeline"
+).split()
+_NON_ASCII_WORDS = "naïve café Zürich 日本語の文章 검색 поиск البحث 🚀 façade".split()
+_CODE = '''def chunk(self, documents):
+    """Chunks the documents."""
+    for doc in documents:
+        yield [s.text for s in doc.sections if s.text]
+
+'''
+_TABLE_ROW = "| {} | {} | {:.3f} |\n"
+
+
+def _sentence(rng: random.Random, non_ascii: bool = False) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(5, 25))
+    if non_ascii:
+        words += rng.choices(_NON_ASCII_WORDS, k=rng.randint(1, 5))
+        rng.shuffle(words)
+    return " ".join(words).capitalize() + rng.choice([".", ".", ".", "?", "!"])
+
+
+def _paragraph(rng: random.Random, num_sentences: int, non_ascii: bool = False) -> str:
+    return " ".join(_sentence(rng, non_ascii) for _ in range(num_sentences))
+
+
+def _generate_section(rng: random.Random) -> str:
+    kind = rng.choice(["prose", "long_prose", "code", "table", "non_ascii", "short"])
+    if kind == "prose":
+        return _paragraph(rng, rng.randint(3, 15))
+    if kind == "long_prose":
+        return "\n".join(_paragraph(rng, 20) for _ in range(rng.randint(5, 20)))
+    if kind == "code":
+        return _CODE * rng.randint(1, 30)
+    if kind == "table":
+        return "| name | owner | score |\n|---|---|---|\n" + "".join(
+            _TABLE_ROW.format(rng.choice(_WORDS), rng.choice(_WORDS), rng.random())
+            for _ in range(rng.randint(5, 200))
+        )
+    if kind == "non_ascii":
+        return _paragraph(rng, rng.randint(3, 30), non_ascii=True)
+    return _sentence(rng)
+
+
+def generate_corpus(num_docs: int, seed: int) -> list[Document]:
+    rng = random.Random(seed)
+    return [
+        Document(
+            id=f"doc_{i}",
+            source=DocumentSource.FILE,
+            semantic_identifier=f"Document {i}",
+            metadata={"tags": rng.choices(_WORDS, k=3)},
+            sections=[
+                TextSection(text=_generate_section(rng), link=f"link_{i}_{j}")
+                for j in range(rng.randint(1, 40))
+            ],
+        )
+        for i in range(num_docs)
+    ]
+
+
+def load_corpus(corpus_dir: Path) -> list[Document]:
+    documents = []
+    for path in sorted(p for p in corpus_dir.rglob("*") if p.is_file()):
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        sections = [s for s in text.split("\n\n") if s.strip()]
+        if not sections:
+            continue
+        documents.append(
+            Document(
+                id=str(path),
+                source=DocumentSource.FILE,
+                semantic_identifier=path.name,
+                metadata={},
+                sections=[
+                    TextSection(text=section, link=str(path)) for section in sections
+                ],
+            )
+        )
+    return documents
+
+
+def run_chunker(
+    tokenizer: BaseTokenizer,
+    documents: list[IndexingDocument],
+    use_token_offsets: bool,
+    enable_multipass: bool,
+) -> tuple[list[DocAwareChunk], float]:
+    chunker = Chunker(
+        tokenizer=tokenizer,
+        enable_multipass=enable_multipass,
+        use_token_offsets=use_token_offsets,
+    )
+    if use_token_offsets and not chunker.use_token_offsets:
+        raise RuntimeError("Tokenizer does not support chunking with token offsets")
+
+    start = time.monotonic()
+    chunks = chunker.chunk(documents)
+    return chunks, time.monotonic() - start
+
+
+def compare_chunks(
+    tokenizer: BaseTokenizer,
+    default_chunks: list[DocAwareChunk],
+    offset_chunks: list[DocAwareChunk],
+) -> tuple[int, int, int]:
+    """Returns the number of default chunks that the token offset mode reproduced
+    exactly (content, blurb and mini chunks) and the largest chunk size in tokens for
+    each mode."""
+    offset_chunk_texts = Counter(
+        (chunk.content, chunk.blurb, tuple(chunk.mini_chunk_texts or []))
+        for chunk in offset_chunks
+    )
+    default_chunk_texts = Counter(
+        (chunk.content, chunk.blurb, tuple(chunk.mini_chunk_texts or []))
+        for chunk in default_chunks
+    )
+    num_identical = sum((default_chunk_texts & offset_chunk_texts).values())
+
+    default_max_tokens, offset_max_tokens = (
+        max((len(tokenizer.encode(chunk.content)) for chunk in chunks), default=0)
+        for chunks in (default_chunks, offset_chunks)
+    )
+    return num_identical, default_max_tokens, offset_max_tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus-dir", type=Path, default=None)
+    parser.add_argument("--num-docs", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", default="intfloat/e5-base-v2")
+    parser.add_argument("--provider", default=None)
+    parser.add_argument("--no-multipass", action="store_true")
+    parser.add_argument("--tolerance", type=int, default=3)
+    args = parser.parse_args()
+
+    documents = (
+        load_corpus(args.corpus_dir)
+        if args.corpus_dir
+        else generate_corpus(args.num_docs, args.seed)
+    )
+    indexing_documents = process_image_sections(documents)
+    tokenizer = get_tokenizer(model_name=args.model, provider_type=args.provider)
+    total_tokens = sum(
+        len(tokenizer.encode(section.text or ""))
+        for document in indexing_documents
+        for section in document.processed_sections
+    )
+    print(f"Corpus: {len(documents)} documents, {total_tokens} tokens")
+
+    results = {}
+    for use_token_offsets in (False, True):
+        chunks, elapsed = run_chunker(
+            tokenizer,
+            indexing_documents,
+            use_token_offsets=use_token_offsets,
+            enable_multipass=not args.no_multipass,
+        )
+        results[use_token_offsets] = (chunks, elapsed)
+        print(
+            f"{'token offsets' if use_token_offsets else 'default':>13}: "
+            f"{len(chunks)} chunks in {elapsed:.2f}s "
+            f"({total_tokens / elapsed:,.0f} tokens/s)"
+        )
+
+    print(f"Speedup: {results[False][1] / results[True][1]:.2f}x")
+
+    num_identical, default_max_tokens, offset_max_tokens = compare_chunks(
+        tokenizer, results[False][0], results[True][0]
+    )
+    print(
+        f"Identical chunks: {num_identical}/{len(results[False][0])}, "
+        f"largest chunk: {default_max_tokens} tokens (default) vs "
+        f"{offset_max_tokens} tokens (token offsets)"
+    )
+    if offset_max_tokens - default_max_tokens > args.tolerance:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
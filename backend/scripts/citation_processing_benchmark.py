@@ -0,0 +1,386 @@
+"""Benchmarks the incremental stream processors of citation_processing
+(CitationProcessor, CitationProcessorGraph and StreamExtractionProcessor) against their
+previous versions, which recounted the code fences of the whole answer and searched the
+whole held segment for every token, and checks that both produce identical output.
+
+Basic Usage (from the backend directory):
+
+python scripts/citation_processing_benchmark.py --num-tokens 50000
+
+A synthetic answer with citations (also split over several tokens), code blocks, inline
+code and extraction tags is streamed token by token through each implementation. The
+script exits with an error if any of the outputs differ.
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from collections.abc import Callable
+from collections.abc import Generator
+from datetime import datetime
+from typing import Any
+
+# Ensure PYTHONPATH is set up for direct script execution
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+# flake8: noqa: E402
+from onyx.chat.models import LlmDoc
+from onyx.chat.models import OnyxAnswerPiece
+from onyx.chat.stream_processing.citation_processing import CitationProcessor
+from onyx.chat.stream_processing.citation_processing import CitationProcessorGraph
+from onyx.chat.stream_processing.citation_processing import in_code_block
+from onyx.chat.stream_processing.citation_processing import StreamExtractionProcessor
+from onyx.chat.stream_processing.utils import DocumentIdOrderMapping
+from onyx.configs.constants import DocumentSource
+from onyx.server.query_and_chat.streaming_models import CitationInfo
+
+_EXTRACTION_PATTERN = "answer"
+
+
+class _LegacyCitationProcessor(CitationProcessor):
+    """CitationProcessor.process_token before it was made incremental."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.llm_out = ""
+
+    def process_token(
+        self, token: str | None
+    ) -> Generator[OnyxAnswerPiece | CitationInfo, None, None]:
+        if token is None:
+            yield OnyxAnswerPiece(answer_piece=self.curr_segment)
+            return
+
+        if self.stop_stream:
+            next_hold = self.hold + token
+            if self.stop_stream in next_hold:
+                return
+            if next_hold == self.stop_stream[: len(next_hold)]:
+                self.hold = next_hold
+                return
+            token = next_hold
+            self.hold = ""
+
+        self.curr_segment += token
+        self.llm_out += token
+
+        if "`" in self.curr_segment:
+            if self.curr_segment.endswith("`"):
+                pass
+            elif "```" in self.curr_segment:
+                piece_that_comes_after = self.curr_segment.split("```")[1][0]
+                if piece_that_comes_after == "\n" and in_code_block(self.llm_out):
+                    self.curr_segment = self.curr_segment.replace("```", "```plaintext")
+
+        citation_matches = list(self.citation_pattern.finditer(self.curr_segment))
+        possible_citation_found = bool(
+            re.search(self.possible_citation_pattern, self.curr_segment)
+        )
+
+        result = ""
+        if citation_matches and not in_code_block(self.llm_out):
+            match_idx = 0
+            for match in citation_matches:
+                match_span = match.span()
+                intermatch_str = self.curr_segment[match_idx : match_span[0]]
+                self.non_citation_count += len(intermatch_str)
+                match_idx = match_span[1]
+                result += intermatch_str
+                if self.non_citation_count > 5:
+                    self.recent_cited_documents.clear()
+                res, citation_info = self.process_citation(match)
+                result += res
+                for citation in citation_info:
+                    yield citation
+                self.non_citation_count = 0
+            self.curr_segment = self.curr_segment[match_idx:]
+            self.non_citation_count = len(self.curr_segment)
+
+        if not possible_citation_found:
+            result += self.curr_segment
+            self.non_citation_count += len(self.curr_segment)
+            self.curr_segment = ""
+
+        if result:
+            yield OnyxAnswerPiece(answer_piece=result)
+
+
+class _LegacyCitationProcessorGraph(CitationProcessorGraph):
+    """CitationProcessorGraph.process_token before it was made incremental."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.llm_out = ""
+
+    def process_token(
+        self, token: str | None
+    ) -> str | tuple[str, list[CitationInfo]] | None:
+        if token is None:
+            return None
+
+        if self.stop_stream:
+            next_hold = self.hold + token
+            if self.stop_stream in next_hold:
+                return None
+            if next_hold == self.stop_stream[: len(next_hold)]:
+                self.hold = next_hold
+                return None
+            token = next_hold
+            self.hold = ""
+
+        self.curr_segment += token
+        self.llm_out += token
+
+        if "`" in self.curr_segment:
+            if self.curr_segment.endswith("`"):
+                pass
+            elif "```" in self.curr_segment:
+                piece_that_comes_after = self.curr_segment.split("```")[1][0]
+                if piece_that_comes_after == "\n" and in_code_block(self.llm_out):
+                    self.curr_segment = self.curr_segment.replace("```", "```plaintext")
+
+        citation_matches = list(self.citation_pattern.finditer(self.curr_segment))
+        possible_citation_found = bool(
+            re.search(self.possible_citation_pattern, self.curr_segment)
+        )
+
+        result = ""
+        if citation_matches and not in_code_block(self.llm_out):
+            match_idx = 0
+            citation_infos = []
+            for match in citation_matches:
+                match_span = match.span()
+                intermatch_str = self.curr_segment[match_idx : match_span[0]]
+                self.non_citation_count += len(intermatch_str)
+                match_idx = match_span[1]
+                result += intermatch_str
+                if self.non_citation_count > 5:
+                    self.recent_cited_documents.clear()
+                res, citation_info = self.process_citation(match)
+                result += res
+                citation_infos.extend(citation_info)
+                self.non_citation_count = 0
+            self.curr_segment = self.curr_segment[match_idx:]
+            self.non_citation_count = len(self.curr_segment)
+            return result, citation_infos
+
+        if not possible_citation_found:
+            result += self.curr_segment
+            self.non_citation_count += len(self.curr_segment)
+            self.curr_segment = ""
+
+        if result:
+            return result
+
+        return None
+
+
+class _LegacyStreamExtractionProcessor(StreamExtractionProcessor):
+    """StreamExtractionProcessor.process_token before it was made incremental."""
+
+    def process_token(self, token: str | None) -> bool | None:
+        if token is None:
+            return None
+
+        self.buffer += token
+
+        if self.start_tag in self.buffer and not self.inside_extraction:
+            start_pos = self.buffer.find(self.start_tag)
+            after_tag = self.buffer[start_pos + len(self.start_tag) :]
+            self.buffer = after_tag
+            self.inside_extraction = True
+            if after_tag:
+                return self.process_token("")
+            return self.inside_extraction
+
+        if self.end_tag in self.buffer and self.inside_extraction:
+            end_pos = self.buffer.find(self.end_tag)
+            after_tag = self.buffer[end_pos + len(self.end_tag) :]
+            self.inside_extraction = False
+            self.buffer = after_tag
+            if after_tag:
+                return self.process_token("")
+            return self.inside_extraction
+
+        if self._legacy_might_be_partial_tag(self.buffer):
+            return self.inside_extraction
+
+        self.buffer = ""
+        return self.inside_extraction
+
+    def _legacy_might_be_partial_tag(self, text: str) -> bool:
+        for i in range(1, len(self.start_tag) + 1):
+            if text.endswith(self.start_tag[:i]):
+                return True
+        for i in range(1, len(self.end_tag) + 1):
+            if text.endswith(self.end_tag[:i]):
+                return True
+        return False
+
+
+def _make_docs(num_docs: int) -> list[LlmDoc]:
+    return [
+        LlmDoc(
+            document_id=f"doc_{ind // 2}",
+            content="Document is a doc",
+            blurb=f"Document #{ind}",
+            semantic_identifier=f"Doc {ind}",
+            source_type=DocumentSource.WEB,
+            metadata={},
+            updated_at=datetime.now(),
+            link=f"https://{ind // 2}.com" if ind % 3 else None,
+            source_links=None,
+            match_highlights=[],
+        )
+        for ind in range(num_docs)
+    ]
+
+
+def _make_tokens(num_tokens: int, num_docs: int, seed: int) -> list[str]:
+    """A synthetic answer, tokens are roughly what an LLM streams."""
+    rng = random.Random(seed)
+    words = ["The", " answer", " is", " in", " the", " docs", ",", ".", "\n", " a"]
+    tokens: list[str] = []
+    while len(tokens) < num_tokens:
+        kind = rng.random()
+        if kind < 0.6:
+            tokens.append(rng.choice(words))
+        elif kind < 0.75:
+            # citations, in one token or split over several
+            nums = [str(rng.randint(1, num_docs + 2)) for _ in range(rng.randint(1, 3))]
+            citation = rng.choice(
+                [
+                    f"[{', '.join(nums)}]",
+                    f"[{','.join(nums)}]",
+                    f"[[{nums[0]}]]",
+                ]
+            )
+            split = rng.randint(1, len(citation))
+            tokens.extend([citation[:split], citation[split:]])
+        elif kind < 0.8:
+            # code blocks, with and without language tags, with citation like text
+            tokens.extend(
+                rng.choice(
+                    [
+                        ["```", "\n", "x = a[1]", "\n", "```"],
+                        ["``", "`python", "\n", "print([2])", "\n", "`", "``", "\n"],
+                        ["```\n", "[3, 4]", "\n```", " done"],
+                    ]
+                )
+            )
+        elif kind < 0.85:
+            tokens.extend(rng.choice([["`x`"], ["``", "y", "``"], ["`[1]`"]]))
+        elif kind < 0.9:
+            tag = rng.choice([f"<{_EXTRACTION_PATTERN}>", f"</{_EXTRACTION_PATTERN}>"])
+            split = rng.randint(1, len(tag))
+            tokens.extend([tag[:split], tag[split:]])
+        else:
+            tokens.append(rng.choice(["<", "</", " <b>", "[", "[[", " [1", "\n[", " [D"]))
+    return tokens[:num_tokens]
+
+
+def _run_citation_processor(
+    processor_cls: type[CitationProcessor], docs: list[LlmDoc], tokens: list[str]
+) -> list[Any]:
+    mapping = DocumentIdOrderMapping(
+        order_mapping={doc.document_id: ind + 1 for ind, doc in enumerate(docs)}
+    )
+    processor = processor_cls(
+        context_docs=docs,
+        final_doc_id_to_rank_map=mapping,
+        display_doc_id_to_rank_map=mapping,
+        stop_stream=None,
+    )
+    packets: list[Any] = []
+    for token in [*tokens, None]:
+        packets.extend(processor.process_token(token))
+    return packets
+
+
+def _run_citation_processor_graph(
+    processor_cls: type[CitationProcessorGraph], docs: list[LlmDoc], tokens: list[str]
+) -> list[Any]:
+    processor = processor_cls(context_docs=docs, stop_stream=None)
+    return [processor.process_token(token) for token in [*tokens, None]]
+
+
+def _run_stream_extraction_processor(
+    processor_cls: type[StreamExtractionProcessor],
+    docs: list[LlmDoc],
+    tokens: list[str],
+) -> list[Any]:
+    processor = processor_cls(extraction_pattern=_EXTRACTION_PATTERN)
+    return [processor.process_token(token) for token in [*tokens, None]]
+
+
+def _time(
+    run: Callable[[type, list[LlmDoc], list[str]], list[Any]],
+    processor_cls: type,
+    docs: list[LlmDoc],
+    tokens: list[str],
+) -> tuple[list[Any], float]:
+    start = time.monotonic()
+    packets = run(processor_cls, docs, tokens)
+    return packets, time.monotonic() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--num-tokens", type=int, default=50000, help="Tokens in the answer"
+    )
+    parser.add_argument("--num-docs", type=int, default=10, help="Context documents")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the answer")
+    args = parser.parse_args()
+
+    docs = _make_docs(args.num_docs)
+    tokens = _make_tokens(args.num_tokens, args.num_docs, args.seed)
+    print(f"Streaming {len(tokens)} tokens ({sum(map(len, tokens))} characters)")
+
+    benchmarks: list[tuple[str, Callable, type, type]] = [
+        (
+            "citation",
+            _run_citation_processor,
+            _LegacyCitationProcessor,
+            CitationProcessor,
+        ),
+        (
+            "graph",
+            _run_citation_processor_graph,
+            _LegacyCitationProcessorGraph,
+            CitationProcessorGraph,
+        ),
+        (
+            "extraction",
+            _run_stream_extraction_processor,
+            _LegacyStreamExtractionProcessor,
+            StreamExtractionProcessor,
+        ),
+    ]
+
+    print(
+        f"{'processor':>12} {'legacy s':>10} {'new s':>10} {'speedup':>8} "
+        f"{'packets':>8}"
+    )
+    mismatches = []
+    for name, run, legacy_cls, new_cls in benchmarks:
+        legacy_packets, legacy_elapsed = _time(run, legacy_cls, docs, tokens)
+        new_packets, new_elapsed = _time(run, new_cls, docs, tokens)
+        print(
+            f"{name:>12} {legacy_elapsed:>10.3f} {new_elapsed:>10.3f} "
+            f"{legacy_elapsed / max(new_elapsed, 1e-9):>7.1f}x {len(new_packets):>8}"
+        )
+        if new_packets != legacy_packets:
+            mismatches.append(name)
+
+    if mismatches:
+        sys.exit(f"Output differs from the legacy implementation: {mismatches}")
+    print("Outputs are identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Compares the ONNX Runtime backends of the model server (onnx, onnx-int8) against the
+PyTorch backend for a local embedding model and, optionally, a local reranking model.
+
+Run it where the model server requirements are installed (from the backend directory):
+
+python scripts/onnx_backend_benchmark.py --model nomic-ai/nomic-embed-text-v1 \
+    --cross-encoder mixedbread-ai/mxbai-rerank-xsmall-v1
+
+For every backend the script reports the single text latency (p50 / p95, as for query
+embeddings), the batched throughput (as for indexing) and how closely the embeddings
+agree with the PyTorch embeddings (mean / min cosine similarity) on a fixed, seeded
+text set. For the reranker it reports the latency of scoring all texts against a query
+and the largest absolute score difference to PyTorch. Exported models are cached in
+ONNX_MODEL_CACHE_DIR so only the first run pays for the export.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from sentence_transformers import CrossEncoder  # type: ignore
+from sentence_transformers import SentenceTransformer  # type: ignore
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# flake8: noqa: E402
+from model_server.onnx_backend import InferenceBackend
+from model_server.onnx_backend import load_onnx_model
+
+_WORDS = (
+    "index retrieval vector search document connector embedding latency the of and "
+    "a to in is that for on with as by this from at be are it an or which pipeline "
+    "quarterly report customer onboarding incident postmortem deployment kubernetes"
+).split()
+
+
+def generate_texts(num_texts: int, seed: int) -> list[str]:
+    """Mix of query sized, mini chunk sized and full chunk sized texts."""
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choices(_WORDS, k=rng.choice([8, 40, 120, 350])))
+        for _ in range(num_texts)
+    ]
+
+
+def load_model(model_cls: Any, model_name: str, backend: InferenceBackend) -> Any:
+    kwargs = {"trust_remote_code": True} if model_cls is SentenceTransformer else {}
+    if backend == InferenceBackend.TORCH:
+        return model_cls(model_name, **kwargs)
+    return load_onnx_model(
+        model_cls,
+        model_name,
+        quantize=backend == InferenceBackend.ONNX_INT8,
+        **kwargs,
+    )
+
+
+def benchmark_embedding_model(
+    model: SentenceTransformer, texts: list[str], num_queries: int
+) -> tuple[float, float, float, np.ndarray]:
+    """Returns the p50 and p95 single text latency in ms, the batched throughput in
+    texts/s and the normalized embeddings of the texts."""
+    model.encode(texts[:8])  # warm up
+
+    latencies = []
+    for text in texts[:num_queries]:
+        start = time.monotonic()
+        model.encode([text])
+        latencies.append((time.monotonic() - start) * 1000)
+
+    start = time.monotonic()
+    embeddings = model.encode(texts, normalize_embeddings=True)
+    throughput = len(texts) / (time.monotonic() - start)
+
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    return statistics.median(latencies), p95, throughput, np.asarray(embeddings)
+
+
+def benchmark_cross_encoder(
+    model: CrossEncoder, query: str, texts: list[str]
+) -> tuple[float, np.ndarray]:
+    """Returns the latency in ms of scoring all texts and the scores."""
+    model.predict([(query, text) for text in texts[:8]])  # warm up
+    start = time.monotonic()
+    scores = model.predict([(query, text) for text in texts])
+    return (time.monotonic() - start) * 1000, np.asarray(scores)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="nomic-ai/nomic-embed-text-v1")
+    parser.add_argument("--cross-encoder", default=None)
+    parser.add_argument("--num-texts", type=int, default=512)
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        type=InferenceBackend,
+        default=[InferenceBackend.ONNX, InferenceBackend.ONNX_INT8],
+    )
+    args = parser.parse_args()
+
+    texts = generate_texts(args.num_texts, args.seed)
+    backends = [InferenceBackend.TORCH] + [
+        backend for backend in args.backends if backend != InferenceBackend.TORCH
+    ]
+
+    print(f"Embedding model {args.model}, {len(texts)} texts")
+    reference_embeddings: np.ndarray | None = None
+    for backend in backends:
+        model = load_model(SentenceTransformer, args.model, backend)
+        p50, p95, throughput, embeddings = benchmark_embedding_model(
+            model, texts, args.num_queries
+        )
+        if reference_embeddings is None:
+            reference_embeddings = embeddings
+        cosine = np.sum(embeddings * reference_embeddings, axis=1)
+        print(
+            f"{backend.value:>10}: latency p50 {p50:.1f}ms p95 {p95:.1f}ms, "
+            f"throughput {throughput:.1f} texts/s, "
+            f"cosine vs torch mean {cosine.mean():.4f} min {cosine.min():.4f}"
+        )
+
+    if not args.cross_encoder:
+        return
+
+    print(f"Reranking model {args.cross_encoder}, {len(texts)} texts")
+    query = texts[0]
+    reference_scores: np.ndarray | None = None
+    for backend in backends:
+        cross_encoder = load_model(CrossEncoder, args.cross_encoder, backend)
+        latency, scores = benchmark_cross_encoder(cross_encoder, query, texts)
+        if reference_scores is None:
+            reference_scores = scores
+        print(
+            f"{backend.value:>10}: latency {latency:.1f}ms, "
+            f"max score diff vs torch {np.abs(scores - reference_scores).max():.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Benchmarks the per chunk Vespa feed (batch_index_vespa_chunks, one request per chunk
+on a thread pool) against the streaming feed (streaming_feed.stream_index_vespa_chunks,
+concurrent requests of an asyncio client) and reports chunks/sec for both, along with
+the HTTP version the streaming feed negotiated. Against the local container this is
+HTTP/1.1 unless VESPA_STREAMING_FEED_H2C is set.
+
+Basic Usage (from the backend directory, with the local Vespa container running and an
+index deployed, e.g. after the api server started once):
+
+python scripts/vespa_feed_benchmark.py --index-name danswer_chunk_nomic_ai_nomic_embed_text_v1 --dim 768
+
+Synthetic chunks with random embeddings are written to the given index and deleted
+again afterwards. --jsonl-out also writes the streamed operations as a Vespa JSONL feed
+file, which can be fed with `vespa feed` for comparison.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Ensure PYTHONPATH is set up for direct script execution
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+# flake8: noqa: E402
+from onyx.access.models import default_public_access
+from onyx.configs.constants import DEFAULT_BOOST
+from onyx.configs.constants import DocumentSource
+from onyx.connectors.models import Document
+from onyx.connectors.models import TextSection
+from onyx.document_index.document_index_utils import get_uuid_from_chunk
+from onyx.document_index.vespa.deletion import delete_vespa_chunks
+from onyx.document_index.vespa.feed_client import get_vespa_feed_client
+from onyx.document_index.vespa.indexing_utils import batch_index_vespa_chunks
+from onyx.document_index.vespa.streaming_feed import iter_vespa_feed_jsonl
+from onyx.document_index.vespa.streaming_feed import stream_index_vespa_chunks
+from onyx.document_index.vespa_constants import BATCH_SIZE
+from onyx.indexing.models import ChunkEmbedding
+from onyx.indexing.models import DocMetadataAwareIndexChunk
+from onyx.utils.batching import batch_generator
+from shared_configs.configs import POSTGRES_DEFAULT_SCHEMA
+
+
+def _make_chunks(
+    num_docs: int, chunks_per_doc: int, dim: int, run_id: str
+) -> list[DocMetadataAwareIndexChunk]:
+    rng = random.Random(run_id)
+    chunks: list[DocMetadataAwareIndexChunk] = []
+    for doc_num in range(num_docs):
+        document = Document(
+            id=f"feed_benchmark_{run_id}_{doc_num}",
+            sections=[TextSection(text="benchmark", link=None)],
+            source=DocumentSource.FILE,
+            semantic_identifier=f"Feed benchmark {doc_num}",
+            metadata={},
+        )
+        for chunk_id in range(chunks_per_doc):
+            content = " ".join(
+                rng.choice(["vespa", "feed", "chunk", "onyx", "benchmark", "index"])
+                for _ in range(200)
+            )
+            chunks.append(
+                DocMetadataAwareIndexChunk(
+                    chunk_id=chunk_id,
+                    blurb=content[:100],
+                    content=content,
+                    source_links={0: ""},
+                    section_continuation=False,
+                    source_document=document,
+                    title_prefix="",
+                    metadata_suffix_semantic="",
+                    metadata_suffix_keyword="",
+                    mini_chunk_texts=None,
+                    large_chunk_reference_ids=[],
+                    doc_summary="",
+                    chunk_context="",
+                    contextual_rag_reserved_tokens=0,
+                    embeddings=ChunkEmbedding(
+                        full_embedding=[rng.random() for _ in range(dim)],
+                        mini_chunk_embeddings=[],
+                    ),
+                    title_embedding=[rng.random() for _ in range(dim)],
+                    tenant_id=POSTGRES_DEFAULT_SCHEMA,
+                    access=default_public_access,
+                    document_sets=set(),
+                    user_file=None,
+                    user_folder=None,
+                    boost=DEFAULT_BOOST,
+                    large_chunk_id=None,
+                    image_file_id=None,
+                    aggregated_chunk_boost_factor=1.0,
+                )
+            )
+    return chunks
+
+
+def _delete_chunks(chunks: list[DocMetadataAwareIndexChunk], index_name: str) -> None:
+    feed_client = get_vespa_feed_client()
+    delete_vespa_chunks(
+        doc_chunk_ids=[get_uuid_from_chunk(chunk) for chunk in chunks],
+        index_name=index_name,
+        http_client=feed_client.http_client,
+    )
+
+
+def _bench_per_chunk(
+    chunks: list[DocMetadataAwareIndexChunk], index_name: str
+) -> float:
+    feed_client = get_vespa_feed_client()
+    start = time.monotonic()
+    for chunk_batch in batch_generator(chunks, BATCH_SIZE):
+        batch_index_vespa_chunks(
+            chunks=chunk_batch,
+            index_name=index_name,
+            http_client=feed_client.http_client,
+            multitenant=False,
+        )
+    return time.monotonic() - start
+
+
+def _bench_streaming(
+    chunks: list[DocMetadataAwareIndexChunk], index_name: str, concurrency: int
+) -> float:
+    start = time.monotonic()
+    results = stream_index_vespa_chunks(
+        chunks=chunks,
+        index_name=index_name,
+        multitenant=False,
+        concurrency=concurrency,
+    )
+    elapsed = time.monotonic() - start
+
+    http_versions = sorted({str(result.http_version) for result in results})
+    print(f"streaming feed ({concurrency}) used {', '.join(http_versions)}")
+    failures = [result for result in results if not result.success]
+    if failures:
+        print(f"{len(failures)} streamed operations failed, first: {failures[0]}")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--index-name", required=True, help="Vespa index (schema)")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--num-docs", type=int, default=500)
+    parser.add_argument("--chunks-per-doc", type=int, default=10)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[64, 256],
+        help="Streaming feed concurrencies to benchmark",
+    )
+    parser.add_argument("--jsonl-out", help="Also write the feed operations to a file")
+    args = parser.parse_args()
+
+    run_id = str(int(time.time()))
+    chunks = _make_chunks(args.num_docs, args.chunks_per_doc, args.dim, run_id)
+    print(f"Generated {len(chunks)} chunks ({args.num_docs} documents)")
+
+    if args.jsonl_out:
+        with open(args.jsonl_out, "w") as f:
+            for line in iter_vespa_feed_jsonl(chunks, args.index_name, False):
+                f.write(line + "\n")
+        print(f"Wrote feed operations to {args.jsonl_out}")
+
+    print(f"{'mode':>20} {'seconds':>10} {'chunks/sec':>12}")
+    try:
+        elapsed = _bench_per_chunk(chunks, args.index_name)
+        print(f"{'per-chunk':>20} {elapsed:>10.2f} {len(chunks) / elapsed:>12.0f}")
+        _delete_chunks(chunks, args.index_name)
+
+        for concurrency in args.concurrency:
+            elapsed = _bench_streaming(chunks, args.index_name, concurrency)
+            mode = f"streaming ({concurrency})"
+            print(f"{mode:>20} {elapsed:>10.2f} {len(chunks) / elapsed:>12.0f}")
+            _delete_chunks(chunks, args.index_name)
+    finally:
+        _delete_chunks(chunks, args.index_name)
+
+
+if __name__ == "__main__":
+    main()
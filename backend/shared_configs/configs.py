@@ -50,6 +50,39 @@ DISABLE_RERANK_FOR_STREAMING = (
 # model. If torch finds more threads on its own, this value is not used.
 MIN_THREADS_ML_MODELS = int(os.environ.get("MIN_THREADS_ML_MODELS") or 1)
 
+# Inference backend of the local embedding and reranking models, as a comma separated
+# list of <model name>=<backend> where backend is torch, onnx or onnx-int8 (ONNX Runtime
+# with int8 quantized weights, for CPU only deployments). Models that are not listed use
+# MODEL_SERVER_DEFAULT_INFERENCE_BACKEND.
+MODEL_SERVER_INFERENCE_BACKENDS = (
+    os.environ.get("MODEL_SERVER_INFERENCE_BACKENDS") or ""
+)
+MODEL_SERVER_DEFAULT_INFERENCE_BACKEND = (
+    os.environ.get("MODEL_SERVER_DEFAULT_INFERENCE_BACKEND") or "torch"
+)
+# Threads per ONNX Runtime session, 0 lets ONNX Runtime use one per physical core
+ONNX_NUM_THREADS = int(os.environ.get("ONNX_NUM_THREADS") or 0)
+# One of arm64, avx2, avx512 or avx512_vnni, should match the CPU of the model server
+ONNX_QUANTIZATION_CONFIG = os.environ.get("ONNX_QUANTIZATION_CONFIG") or "avx2"
+ONNX_MODEL_CACHE_DIR = os.environ.get("ONNX_MODEL_CACHE_DIR") or ".cache/onnx"
+
+# If set, the model server groups the texts of an embedding request into buckets of
+# similar token length and encodes each bucket with a batch size of about this many
+# tokens, so short texts are not padded to the length of long ones. 0 disables it.
+EMBEDDING_LENGTH_BUCKET_TOKEN_BUDGET = int(
+    os.environ.get("EMBEDDING_LENGTH_BUCKET_TOKEN_BUDGET") or 0
+)
+
+# If set, embedding requests with fewer than EMBEDDING_MICRO_BATCH_MAX_TEXTS texts for
+# the same model that arrive within this many milliseconds of each other (e.g. query
+# embeddings from many users) are merged into one forward pass. 0 disables it.
+EMBEDDING_MICRO_BATCH_WINDOW_MS = int(
+    os.environ.get("EMBEDDING_MICRO_BATCH_WINDOW_MS") or 0
+)
+EMBEDDING_MICRO_BATCH_MAX_TEXTS = int(
+    os.environ.get("EMBEDDING_MICRO_BATCH_MAX_TEXTS") or 32
+)
+
 # Model server that has indexing only set will throw exception if used for reranking
 # or intent classification
 INDEXING_ONLY = os.environ.get("INDEXING_ONLY", "").lower() == "true"
@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from ee.onyx.access.access import _get_access_for_documents
+from onyx.access.models import DocumentAccess
+from onyx.configs.constants import DocumentSource
+
+
+def _access(user_emails: list[str], is_public: bool) -> DocumentAccess:
+    return DocumentAccess.build(
+        user_emails=user_emails,
+        user_groups=[],
+        external_user_emails=[],
+        external_user_group_ids=[],
+        is_public=is_public,
+    )
+
+
+def test_get_access_for_documents_covers_every_document() -> None:
+    """Documents that are missing from the db or have no source still get (the least
+    permissive) access instead of being dropped from the result."""
+    indexed_doc = MagicMock(
+        id="indexed",
+        is_public=False,
+        external_user_emails=["ext@example.com"],
+        external_user_group_ids=["ext_group"],
+    )
+    no_source_doc = MagicMock(id="no_source", is_public=True)
+
+    with (
+        patch(
+            "ee.onyx.access.access.get_access_for_documents_without_groups",
+            return_value={
+                "indexed": _access(["user@example.com"], False),
+                "no_source": _access(["user@example.com"], True),
+                "missing": _access([], False),
+            },
+        ),
+        patch(
+            "ee.onyx.access.access.fetch_user_groups_for_documents",
+            return_value=[("indexed", ["group"])],
+        ),
+        patch(
+            "ee.onyx.access.access.get_documents_by_ids",
+            return_value=[indexed_doc, no_source_doc],
+        ),
+        patch(
+            "ee.onyx.access.access.get_document_sources",
+            return_value={"indexed": DocumentSource.WEB},
+        ),
+        patch(
+            "ee.onyx.access.access.fetch_public_external_group_ids",
+            return_value=[],
+        ),
+        patch(
+            "ee.onyx.access.access.get_source_perm_sync_config",
+            return_value=None,
+        ),
+    ):
+        access_map = _get_access_for_documents(
+            ["indexed", "no_source", "missing"], MagicMock()
+        )
+
+    assert set(access_map) == {"indexed", "no_source", "missing"}
+    assert access_map["indexed"].user_groups == {"group"}
+    assert access_map["indexed"].external_user_emails == {"ext@example.com"}
+    assert not access_map["no_source"].is_public
+    assert not access_map["no_source"].user_emails
+    assert not access_map["missing"].is_public
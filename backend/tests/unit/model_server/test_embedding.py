@@ -7,7 +7,9 @@ from unittest.mock import patch
 
 import pytest
 
+from model_server.encoders import _concurrent_embedding
 from model_server.encoders import embed_text
+from model_server.encoders import EmbeddingMicroBatcher
 from model_server.encoders import local_rerank
 from model_server.encoders import process_embed_request
 from shared_configs.enums import EmbedTextType
@@ -103,3 +105,44 @@ async def test_concurrent_embeddings() -> None:
         # However, the developer may still introduce unnecessary blocking above the mock and this test will
         # still pass as long as it's less than (7 - 5) / 5 seconds
         assert end_time - start_time < 7
+
+
+def test_length_bucketed_embedding_restores_order() -> None:
+    texts = ["a " * 300, "b", "c " * 40, "d " * 2]
+    mock_model = MagicMock()
+    mock_model.max_seq_length = 512
+    mock_model.tokenizer.side_effect = lambda texts, **kwargs: {
+        "input_ids": [text.split() for text in texts]
+    }
+    mock_model.encode.side_effect = lambda texts, **kwargs: [
+        [float(len(text.split()))] for text in texts
+    ]
+
+    with patch("model_server.encoders.EMBEDDING_LENGTH_BUCKET_TOKEN_BUDGET", 1024):
+        embeddings = _concurrent_embedding(texts, mock_model, True)
+
+    assert embeddings == [[300.0], [1.0], [40.0], [2.0]]
+    # short texts share a bucket, each bucket gets a batch size that fits the budget
+    assert [
+        (call.args[0], call.kwargs["batch_size"])
+        for call in mock_model.encode.call_args_list
+    ] == [(["b", "d " * 2], 32), (["c " * 40], 16), (["a " * 300], 2)]
+
+
+@pytest.mark.asyncio
+async def test_micro_batcher_merges_concurrent_requests() -> None:
+    batcher = EmbeddingMicroBatcher(window_seconds=0.05, max_texts=8)
+    encoded_batches: list[list[str]] = []
+
+    def encode(texts: list[str]) -> list[list[float]]:
+        encoded_batches.append(texts)
+        return [[float(ord(text[0]))] for text in texts]
+
+    results = await asyncio.gather(
+        batcher.embed(("model",), ["a"], encode),
+        batcher.embed(("model",), ["b", "c"], encode),
+        batcher.embed(("other_model",), ["d"], encode),
+    )
+
+    assert results == [[[97.0]], [[98.0], [99.0]], [[100.0]]]
+    assert sorted(encoded_batches) == [["a", "b", "c"], ["d"]]
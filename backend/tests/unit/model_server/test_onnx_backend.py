@@ -0,0 +1,17 @@
+import pytest
+
+from model_server.onnx_backend import InferenceBackend
+from model_server.onnx_backend import parse_inference_backends
+
+
+def test_parse_inference_backends() -> None:
+    assert parse_inference_backends(
+        "nomic-ai/nomic-embed-text-v1=onnx-int8, mixedbread-ai/mxbai-rerank-xsmall-v1=onnx,"
+    ) == {
+        "nomic-ai/nomic-embed-text-v1": InferenceBackend.ONNX_INT8,
+        "mixedbread-ai/mxbai-rerank-xsmall-v1": InferenceBackend.ONNX,
+    }
+    assert parse_inference_backends("") == {}
+
+    with pytest.raises(ValueError):
+        parse_inference_backends("intfloat/e5-base-v2=tensorrt")
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from onyx.chat.stream_processing.citation_processing import CodeBlockTracker
+from onyx.chat.stream_processing.citation_processing import in_code_block
+from onyx.chat.stream_processing.citation_processing import StreamExtractionProcessor
+
+
+@pytest.mark.parametrize(
+    "tokens",
+    [
+        ["```", "python\n", "x = 1\n", "```"],
+        ["``", "`\n", "code", "\n`", "``", " done"],
+        ["`", "`", "`", "`", "`", "`"],
+        ["a````b", "``", "``c```"],
+        ["`inline`", " text ", "``also``"],
+    ],
+)
+def test_code_block_tracker_matches_in_code_block(tokens: list[str]) -> None:
+    tracker = CodeBlockTracker()
+    llm_out = ""
+    for token in tokens:
+        tracker.feed(token)
+        llm_out += token
+        assert tracker.in_code_block == in_code_block(llm_out)
+
+
+def test_code_block_tracker_matches_in_code_block_on_random_streams() -> None:
+    rng = random.Random(0)
+    for _ in range(500):
+        tracker = CodeBlockTracker()
+        llm_out = ""
+        for _ in range(rng.randint(1, 20)):
+            token = "".join(rng.choice("```a\n") for _ in range(rng.randint(0, 6)))
+            tracker.feed(token)
+            llm_out += token
+            assert tracker.in_code_block == in_code_block(llm_out)
+
+
+def test_stream_extraction_processor_tags_split_over_tokens() -> None:
+    processor = StreamExtractionProcessor(extraction_pattern="answer")
+    tokens = ["Thinking", " <", "ans", "wer", ">The", " answer", "</answ", "er>", "<b>"]
+
+    states = [processor.process_token(token) for token in tokens]
+
+    assert states == [False, False, False, False, True, True, True, False, False]
+    assert processor.buffer == ""
+
+
+def test_stream_extraction_processor_holds_only_partial_tag() -> None:
+    processor = StreamExtractionProcessor(extraction_pattern="answer")
+
+    processor.process_token("a long text before <answ")
+
+    assert processor.buffer == "<answ"
+    assert processor.process_token("er>") is True
@@ -0,0 +1,48 @@
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from onyx.context.search.query_embedding_cache import build_query_embedding_cache_key
+from onyx.context.search.query_embedding_cache import QueryEmbeddingCache
+
+
+def _make_search_settings(settings_id: int) -> Mock:
+    search_settings = Mock()
+    search_settings.id = settings_id
+    search_settings.provider_type = None
+    search_settings.model_name = "model"
+    search_settings.normalize = True
+    search_settings.reduced_dimension = None
+    search_settings.query_prefix = "query: "
+    return search_settings
+
+
+def test_query_embedding_cache_key() -> None:
+    search_settings = _make_search_settings(1)
+
+    key = build_query_embedding_cache_key("what is  onyx?\n", search_settings)
+    assert key == build_query_embedding_cache_key("what is onyx?", search_settings)
+    assert key != build_query_embedding_cache_key("what is onyx", search_settings)
+    # a search settings switch must not reuse the old embeddings
+    assert key != build_query_embedding_cache_key(
+        "what is onyx?", _make_search_settings(2)
+    )
+
+
+def test_query_embedding_cache_lru_and_ttl() -> None:
+    cache = QueryEmbeddingCache(max_size=2, ttl_seconds=10, use_redis=False)
+
+    with patch("onyx.utils.tenant_ttl_cache.time") as mock_time:
+        mock_time.monotonic.return_value = 0.0
+        cache.put_many({"a": [1.0], "b": [2.0]})
+        assert cache.get_many(["a"]) == {"a": [1.0]}
+
+        # "b" is the least recently used entry
+        cache.put_many({"c": [3.0]})
+        assert cache.get_many(["a", "b", "c"]) == {"a": [1.0], "c": [3.0]}
+
+        mock_time.monotonic.return_value = 11.0
+        assert cache.get_many(["a", "c"]) == {}
+
+    cache.put_many({"a": [1.0]})
+    cache.clear()
+    assert cache.get_many(["a"]) == {}
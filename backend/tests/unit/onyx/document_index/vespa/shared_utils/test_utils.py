@@ -1,3 +1,6 @@
+import pytest
+
+from onyx.document_index.vespa.shared_utils.utils import binarize_embedding
 from onyx.document_index.vespa.shared_utils.utils import remove_invalid_unicode_chars
 
 
@@ -18,3 +21,12 @@ def test_remove_invalid_unicode_chars() -> None:
     sanitized = remove_invalid_unicode_chars(text_with_multiple_illegal)
     assert all(c not in sanitized for c in ["\x00", "\ufddb", "\ufffe"])
     assert sanitized == "Hello World!"
+
+
+def test_binarize_embedding() -> None:
+    # first dimension is the most significant bit, positive values are 1
+    assert binarize_embedding([1, -1, 0, 0, 0, 0, 0, 0.5]) == [-127]
+    assert binarize_embedding([-0.1] * 7 + [0.2] + [0.3] * 8) == [1, -1]
+
+    with pytest.raises(ValueError):
+        binarize_embedding([1.0] * 12)
@@ -0,0 +1,95 @@
+import threading
+from typing import Any
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from onyx.document_index.vespa.chunk_retrieval import visit_vespa_chunks
+
+_PAGES_PER_SLICE = 3
+
+
+def _document(slice_id: int, page: int) -> dict:
+    return {
+        "id": f"id:default:test_index::{slice_id}-{page}",
+        "fields": {"document_id": f"doc_{slice_id}"},
+    }
+
+
+def _sliced_visit_transport(
+    requests: list[httpx.Request], pages_per_slice: int = _PAGES_PER_SLICE
+) -> httpx.MockTransport:
+    lock = threading.Lock()
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        with lock:
+            requests.append(request)
+        slice_id = int(request.url.params["sliceId"])
+        page = int(request.url.params.get("continuation", 0))
+        response: dict = {"documents": [_document(slice_id, page)]}
+        if page + 1 < pages_per_slice:
+            response["continuation"] = str(page + 1)
+        return httpx.Response(200, json=response)
+
+    return httpx.MockTransport(_handler)
+
+
+def _patch_http_client(transport: httpx.MockTransport) -> Any:
+    return patch(
+        "onyx.document_index.vespa.chunk_retrieval.get_vespa_http_client",
+        side_effect=lambda: httpx.Client(transport=transport),
+    )
+
+
+def test_visit_scans_all_slices() -> None:
+    requests: list[httpx.Request] = []
+    transport = _sliced_visit_transport(requests)
+
+    with _patch_http_client(transport):
+        batches = list(
+            visit_vespa_chunks(
+                index_name="test_index",
+                tenant_id=None,
+                selection="test_index.source_type=='slack'",
+                field_names=["document_id"],
+                slices=4,
+            )
+        )
+
+    visited_ids = sorted(chunk["id"] for batch in batches for chunk in batch)
+    assert visited_ids == sorted(
+        _document(slice_id, page)["id"]
+        for slice_id in range(4)
+        for page in range(_PAGES_PER_SLICE)
+    )
+    assert len(requests) == 4 * _PAGES_PER_SLICE
+    for request in requests:
+        assert request.url.params["slices"] == "4"
+        assert request.url.params["selection"] == "(test_index.source_type=='slack')"
+        assert request.url.params["fieldSet"] == "test_index:document_id"
+
+
+def test_visit_raises_failures_of_a_slice() -> None:
+    def _handler(request: httpx.Request) -> httpx.Response:
+        if request.url.params["sliceId"] == "1":
+            return httpx.Response(500)
+        return httpx.Response(200, json={"documents": []})
+
+    with _patch_http_client(httpx.MockTransport(_handler)):
+        with pytest.raises(httpx.HTTPError):
+            list(visit_vespa_chunks(index_name="test_index", tenant_id=None, slices=2))
+
+
+def test_visit_stops_when_closed_early() -> None:
+    requests: list[httpx.Request] = []
+    transport = _sliced_visit_transport(requests, pages_per_slice=100)
+
+    with _patch_http_client(transport):
+        visitor = visit_vespa_chunks(index_name="test_index", tenant_id=None, slices=1)
+        first_batch = next(visitor)
+        visitor.close()
+
+    assert first_batch == [_document(0, 0)]
+    # at most one page waiting in the queue and one waiting to be queued
+    assert len(requests) <= 3
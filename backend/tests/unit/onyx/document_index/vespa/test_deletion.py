@@ -0,0 +1,48 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from onyx.document_index.vespa.deletion import delete_vespa_chunks
+from onyx.document_index.vespa.feed_client import VespaFeedClient
+
+
+def _delete(feed_client: VespaFeedClient, http_client: MagicMock) -> None:
+    with (
+        patch(
+            "onyx.document_index.vespa.deletion.get_vespa_feed_client",
+            return_value=feed_client,
+        ),
+        patch("onyx.document_index.vespa.feed_client.time.sleep"),
+        patch("retry.api.time.sleep"),
+    ):
+        delete_vespa_chunks([uuid4()], "test_index", http_client)
+
+
+def test_delete_does_not_retry_throttled_requests_again() -> None:
+    feed_client = VespaFeedClient(max_workers=2, max_in_flight=4, throttle_retries=2)
+    http_client = MagicMock()
+    http_client.request.return_value = httpx.Response(
+        429, request=httpx.Request("DELETE", "http://vespa/doc")
+    )
+
+    with pytest.raises(httpx.HTTPStatusError):
+        _delete(feed_client, http_client)
+
+    # only the feed client's own retries
+    assert http_client.request.call_count == 3
+
+
+def test_delete_retries_transport_errors() -> None:
+    feed_client = VespaFeedClient(max_workers=2, max_in_flight=4, throttle_retries=2)
+    http_client = MagicMock()
+    http_client.request.side_effect = [
+        httpx.ConnectError("connection refused"),
+        httpx.Response(200, request=httpx.Request("DELETE", "http://vespa/doc")),
+    ]
+
+    _delete(feed_client, http_client)
+
+    assert http_client.request.call_count == 2
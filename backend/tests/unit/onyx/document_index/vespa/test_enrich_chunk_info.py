@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from onyx.document_index.vespa.index import VespaIndex
+
+
+def test_enrich_basic_chunk_info_batch_only_probes_unknown_chunk_counts() -> None:
+    with (
+        patch(
+            "onyx.document_index.vespa.index.check_for_final_chunk_existence",
+            return_value=7,
+        ) as mock_probe,
+        ThreadPoolExecutor(max_workers=4) as executor,
+    ):
+        enriched = VespaIndex.enrich_basic_chunk_info_batch(
+            index_name="test_index",
+            http_client=MagicMock(),
+            doc_id_to_previous_chunk_cnt={  # type: ignore
+                "known": 3,
+                "legacy_a": None,
+                "legacy_b": None,
+            },
+            doc_id_to_new_chunk_cnt={
+                "legacy_a": 2,
+                "known": 1,
+                "legacy_b": 0,
+                "new": 4,
+            },
+            executor=executor,
+        )
+
+    assert mock_probe.call_count == 2
+    assert [info.doc_id for info in enriched] == ["legacy_a", "known", "legacy_b", "new"]
+    assert [info.chunk_end_index for info in enriched] == [7, 3, 7, 0]
+    assert [info.old_version for info in enriched] == [True, False, True, False]
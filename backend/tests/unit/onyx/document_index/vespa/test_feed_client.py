@@ -0,0 +1,90 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import httpx
+
+from onyx.document_index.vespa.feed_client import AdaptiveConcurrencyLimiter
+from onyx.document_index.vespa.feed_client import get_vespa_feed_client
+from onyx.document_index.vespa.feed_client import VespaFeedClient
+
+
+def _response(status_code: int, headers: dict[str, str] | None = None) -> httpx.Response:
+    return httpx.Response(status_code, headers=headers)
+
+
+def test_limiter_halves_on_throttle_and_recovers() -> None:
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8)
+
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 2
+
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release(throttled=False)
+    assert limiter.limit == 8
+    assert limiter.in_flight == 0
+
+
+def test_limiter_never_drops_below_one() -> None:
+    limiter = AdaptiveConcurrencyLimiter(max_limit=2)
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(throttled=True)
+    assert limiter.limit == 1
+
+
+def test_request_retries_throttled_responses() -> None:
+    feed_client = VespaFeedClient(max_workers=2, max_in_flight=4, throttle_retries=3)
+    http_client = MagicMock()
+    http_client.request.side_effect = [
+        _response(429),
+        _response(503, headers={"Retry-After": "0"}),
+        _response(200),
+    ]
+
+    with patch("onyx.document_index.vespa.feed_client.time.sleep") as mock_sleep:
+        response = feed_client.request("update", http_client, "PUT", "http://vespa/doc")
+
+    assert response.status_code == 200
+    assert http_client.request.call_count == 3
+    assert mock_sleep.call_count == 2
+    assert feed_client.limiter.in_flight == 0
+
+
+def test_request_returns_last_response_after_retries() -> None:
+    feed_client = VespaFeedClient(max_workers=2, max_in_flight=4, throttle_retries=1)
+    http_client = MagicMock()
+    http_client.request.return_value = _response(429)
+
+    with patch("onyx.document_index.vespa.feed_client.time.sleep"):
+        response = feed_client.request("delete", http_client, "DELETE", "http://x")
+
+    assert response.status_code == 429
+    assert http_client.request.call_count == 2
+
+
+def test_request_does_not_retry_other_errors() -> None:
+    feed_client = VespaFeedClient(max_workers=2, max_in_flight=4, throttle_retries=3)
+    http_client = MagicMock()
+    http_client.request.return_value = _response(400)
+
+    response = feed_client.request("index", http_client, "POST", "http://x")
+
+    assert response.status_code == 400
+    assert http_client.request.call_count == 1
+
+
+def test_feed_client_is_per_process() -> None:
+    feed_client = get_vespa_feed_client()
+    assert get_vespa_feed_client() is feed_client
+    assert feed_client.executor is feed_client.executor
+
+    with patch(
+        "onyx.document_index.vespa.feed_client.os.getpid", return_value=-1
+    ):
+        assert get_vespa_feed_client() is not feed_client
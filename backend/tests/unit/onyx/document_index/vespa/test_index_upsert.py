@@ -0,0 +1,116 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from onyx.document_index.document_index_utils import get_uuid_from_chunk_info
+from onyx.document_index.document_index_utils import get_uuid_from_chunk_info_old
+from onyx.document_index.interfaces import EnrichedDocumentIndexingInfo
+from onyx.document_index.interfaces import IndexBatchParams
+from onyx.document_index.vespa.index import VespaIndex
+
+
+def _chunk(doc_id: str) -> MagicMock:
+    chunk = MagicMock()
+    chunk.source_document.id = doc_id
+    return chunk
+
+
+def test_index_writes_before_deleting_only_stale_chunks() -> None:
+    vespa_index = MagicMock(
+        index_name="test_index", multitenant=False, streaming_feed=False
+    )
+    calls: list[str] = []
+    deleted_ids: list = []
+
+    def _enrich(
+        index_name: str,
+        http_client: MagicMock,
+        document_id: str,
+        previous_chunk_count: int | None = None,
+        new_chunk_count: int = 0,
+    ) -> EnrichedDocumentIndexingInfo:
+        return EnrichedDocumentIndexingInfo(
+            doc_id=document_id,
+            chunk_start_index=new_chunk_count,
+            chunk_end_index=previous_chunk_count or 4,
+            old_version=previous_chunk_count is None,
+        )
+
+    def _delete(doc_chunk_ids: list, **kwargs: object) -> None:
+        calls.append("delete")
+        deleted_ids.extend(doc_chunk_ids)
+
+    with (
+        patch(
+            "onyx.document_index.vespa.index.clean_chunk_id_copy",
+            side_effect=lambda chunk: chunk,
+        ),
+        patch.object(VespaIndex, "enrich_basic_chunk_info", side_effect=_enrich),
+        patch(
+            "onyx.document_index.vespa.index.batch_index_vespa_chunks",
+            side_effect=lambda **kwargs: calls.append("write"),
+        ),
+        patch(
+            "onyx.document_index.vespa.index.delete_vespa_chunks", side_effect=_delete
+        ),
+    ):
+        VespaIndex.index(
+            vespa_index,
+            chunks=[_chunk("shrunk"), _chunk("shrunk"), _chunk("old")],
+            index_batch_params=IndexBatchParams(
+                doc_id_to_previous_chunk_cnt={"shrunk": 5, "old": None},  # type: ignore
+                doc_id_to_new_chunk_cnt={"shrunk": 2, "old": 1},
+                tenant_id="tenant",
+                large_chunks_enabled=False,
+            ),
+        )
+
+    assert calls == ["write", "delete"]
+    # only the tail of the new format document, all of the old format document
+    assert set(deleted_ids) == {
+        get_uuid_from_chunk_info(document_id="shrunk", chunk_id=i, tenant_id="tenant")
+        for i in range(2, 5)
+    } | {get_uuid_from_chunk_info_old(document_id="old", chunk_id=i) for i in range(4)}
+
+
+def test_index_new_document_issues_no_deletes() -> None:
+    vespa_index = MagicMock(
+        index_name="test_index", multitenant=False, streaming_feed=False
+    )
+
+    def _enrich(
+        index_name: str,
+        http_client: MagicMock,
+        document_id: str,
+        previous_chunk_count: int | None = None,
+        new_chunk_count: int = 0,
+    ) -> EnrichedDocumentIndexingInfo:
+        # no old format chunks were found beyond the new chunks
+        return EnrichedDocumentIndexingInfo(
+            doc_id=document_id,
+            chunk_start_index=new_chunk_count,
+            chunk_end_index=new_chunk_count,
+            old_version=True,
+        )
+
+    with (
+        patch(
+            "onyx.document_index.vespa.index.clean_chunk_id_copy",
+            side_effect=lambda chunk: chunk,
+        ),
+        patch.object(VespaIndex, "enrich_basic_chunk_info", side_effect=_enrich),
+        patch("onyx.document_index.vespa.index.batch_index_vespa_chunks"),
+        patch("onyx.document_index.vespa.index.delete_vespa_chunks") as mock_delete,
+    ):
+        VespaIndex.index(
+            vespa_index,
+            chunks=[_chunk("new"), _chunk("new")],
+            index_batch_params=IndexBatchParams(
+                # documents that were never indexed have no chunk count
+                doc_id_to_previous_chunk_cnt={"new": None},  # type: ignore
+                doc_id_to_new_chunk_cnt={"new": 2},
+                tenant_id="tenant",
+                large_chunks_enabled=True,
+            ),
+        )
+
+    mock_delete.assert_not_called()
@@ -0,0 +1,175 @@
+import math
+from typing import Any
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from onyx.db.enums import EmbeddingPrecision
+from onyx.db.models import SearchSettings
+from onyx.document_index.vespa.reprojection import build_reprojected_put_operation
+from onyx.document_index.vespa.reprojection import can_reproject_embeddings
+from onyx.document_index.vespa.reprojection import project_embedding
+from onyx.document_index.vespa.reprojection import reproject_documents
+from onyx.document_index.vespa_constants import DOCUMENT_ID
+from onyx.document_index.vespa_constants import EMBEDDINGS
+from onyx.document_index.vespa_constants import TITLE_EMBEDDING
+from shared_configs.enums import EmbeddingProvider
+
+
+def _search_settings(**kwargs: Any) -> SearchSettings:
+    settings: dict[str, Any] = dict(
+        model_name="text-embedding-3-small",
+        model_dim=1536,
+        normalize=False,
+        query_prefix="",
+        passage_prefix="",
+        provider_type=EmbeddingProvider.OPENAI,
+        embedding_precision=EmbeddingPrecision.FLOAT,
+        reduced_dimension=None,
+        multipass_indexing=False,
+        enable_contextual_rag=False,
+        contextual_rag_llm_name=None,
+        contextual_rag_llm_provider=None,
+    )
+    settings.update(kwargs)
+    return SearchSettings(**settings)
+
+
+def test_project_embedding_truncates_and_renormalizes() -> None:
+    projected = project_embedding([3.0, 4.0, 12.0], 2)
+
+    assert projected == pytest.approx([0.6, 0.8])
+    assert math.isclose(sum(value * value for value in projected), 1.0)
+
+
+def test_project_embedding_keeps_same_dimension() -> None:
+    assert project_embedding([3.0, 4.0], 2) == [3.0, 4.0]
+
+
+def test_project_embedding_cannot_grow() -> None:
+    with pytest.raises(ValueError):
+        project_embedding([1.0, 0.0], 3)
+
+
+def test_can_reproject_to_smaller_matryoshka_dimension() -> None:
+    assert can_reproject_embeddings(
+        _search_settings(), _search_settings(reduced_dimension=512)
+    )
+    assert not can_reproject_embeddings(
+        _search_settings(reduced_dimension=512), _search_settings()
+    )
+
+
+def test_cannot_reproject_dimension_of_other_models() -> None:
+    local_model = dict(model_name="nomic-ai/nomic-embed-text-v1", provider_type=None)
+    current = _search_settings(**local_model)
+    new = _search_settings(**local_model, reduced_dimension=256)
+
+    assert not can_reproject_embeddings(current, new)
+
+
+def test_can_reproject_precision_changes() -> None:
+    assert can_reproject_embeddings(
+        _search_settings(),
+        _search_settings(embedding_precision=EmbeddingPrecision.BINARY),
+    )
+    assert can_reproject_embeddings(
+        _search_settings(),
+        _search_settings(embedding_precision=EmbeddingPrecision.BFLOAT16),
+    )
+    # the full precision embeddings are gone
+    assert not can_reproject_embeddings(
+        _search_settings(embedding_precision=EmbeddingPrecision.BFLOAT16),
+        _search_settings(),
+    )
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"model_name": "text-embedding-3-large"},
+        {"passage_prefix": "passage: "},
+        {"multipass_indexing": True},
+        {"enable_contextual_rag": True},
+    ],
+)
+def test_cannot_reproject_other_changes(changes: dict[str, Any]) -> None:
+    assert not can_reproject_embeddings(
+        _search_settings(), _search_settings(reduced_dimension=512, **changes)
+    )
+
+
+def test_cannot_reproject_without_changes() -> None:
+    # a full reindex with the same settings was asked for
+    assert not can_reproject_embeddings(_search_settings(), _search_settings())
+
+
+@pytest.mark.parametrize(
+    "embeddings,title_embedding",
+    [
+        (
+            {"type": "tensor<float>(t{},x[3])", "blocks": {"full_chunk": [3, 4, 12]}},
+            {"type": "tensor<float>(x[3])", "values": [0, 5, 1]},
+        ),
+        (
+            {"full_chunk": [3, 4, 12]},
+            [0, 5, 1],
+        ),
+        (
+            {
+                "cells": [
+                    {"address": {"t": "full_chunk", "x": "2"}, "value": 12},
+                    {"address": {"t": "full_chunk", "x": "0"}, "value": 3},
+                    {"address": {"t": "full_chunk", "x": "1"}, "value": 4},
+                ]
+            },
+            {
+                "cells": [
+                    {"address": {"x": "1"}, "value": 5},
+                    {"address": {"x": "0"}, "value": 0},
+                    {"address": {"x": "2"}, "value": 1},
+                ]
+            },
+        ),
+    ],
+)
+def test_build_reprojected_put_operation(
+    embeddings: dict, title_embedding: dict | list
+) -> None:
+    document = {
+        "id": "id:default:danswer_chunk_old::chunk-uuid",
+        "fields": {
+            DOCUMENT_ID: "doc",
+            EMBEDDINGS: embeddings,
+            TITLE_EMBEDDING: title_embedding,
+        },
+    }
+
+    operation = build_reprojected_put_operation(document, "danswer_chunk_new", dim=2)
+
+    assert operation["put"] == "id:default:danswer_chunk_new::chunk-uuid"
+    assert operation["fields"][DOCUMENT_ID] == "doc"
+    assert operation["fields"][EMBEDDINGS]["full_chunk"] == pytest.approx([0.6, 0.8])
+    assert operation["fields"][TITLE_EMBEDDING] == pytest.approx([0.0, 1.0])
+    # the visited document is left as is
+    assert document["fields"][EMBEDDINGS] is embeddings
+
+
+def test_reproject_documents_visits_cleaned_document_ids() -> None:
+    with patch(
+        "onyx.document_index.vespa.reprojection.get_chunks_via_visit_api",
+        Mock(return_value=[]),
+    ) as mock_visit, patch(
+        "onyx.document_index.vespa.reprojection.stream_feed_operations",
+        side_effect=list,
+    ):
+        reproject_documents(
+            document_ids=["o'brien"],
+            source_index_name="danswer_chunk_old",
+            target_index_name="danswer_chunk_new",
+            dim=2,
+            tenant_id="tenant",
+        )
+
+    assert mock_visit.call_args.args[0].document_id == "o_brien"
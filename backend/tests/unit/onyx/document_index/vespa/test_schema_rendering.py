@@ -0,0 +1,66 @@
+import os
+
+import jinja2
+import pytest
+
+from onyx.db.enums import EmbeddingPrecision
+from onyx.document_index.vespa import index as vespa_index_module
+from onyx.document_index.vespa.index import _render_schema
+from onyx.document_index.vespa.index import VespaIndex
+
+
+def _template() -> jinja2.Template:
+    schema_path = os.path.join(
+        os.path.dirname(vespa_index_module.__file__),
+        "app_config",
+        "schemas",
+        VespaIndex.VESPA_SCHEMA_JINJA_FILENAME,
+    )
+    with open(schema_path) as f:
+        return jinja2.Environment().from_string(f.read())
+
+
+@pytest.mark.parametrize(
+    "precision", [EmbeddingPrecision.FLOAT, EmbeddingPrecision.BFLOAT16]
+)
+def test_render_schema_without_binary_quantization(
+    precision: EmbeddingPrecision,
+) -> None:
+    schema = _render_schema(
+        _template(), schema_name="test_index", dim=768, embedding_precision=precision
+    )
+
+    assert f"tensor<{precision.value}>(t{{}},x[768])" in schema
+    assert "embeddings_binary" not in schema
+    assert "attribute: paged" not in schema
+    assert "nearestNeighbor" not in schema
+    assert "closeness(field, embeddings)" in schema
+
+
+def test_render_schema_with_binary_quantization() -> None:
+    schema = _render_schema(
+        _template(),
+        schema_name="test_index",
+        dim=768,
+        embedding_precision=EmbeddingPrecision.BINARY,
+    )
+
+    # full precision embeddings are kept on disk to rescore
+    assert "tensor<float>(t{},x[768])" in schema
+    assert schema.count("attribute: paged") == 2
+    # and binarized copies are used for the nearest neighbor search
+    assert "field embeddings_binary type tensor<int8>(t{},x[96])" in schema
+    assert "field title_embedding_binary type tensor<int8>(x[96])" in schema
+    assert "query(query_embedding_binary) tensor<int8>(x[96])" in schema
+    assert "closeness(field, embeddings_binary)" in schema
+    assert "normalize_linear(content_closeness)" in schema
+
+
+def test_render_schema_binary_requires_dim_multiple_of_8() -> None:
+    with pytest.raises(ValueError):
+        _render_schema(
+            _template(),
+            schema_name="test_index",
+            dim=100,
+            embedding_precision=EmbeddingPrecision.BINARY,
+        )
@@ -0,0 +1,219 @@
+import socket
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from unittest.mock import patch
+
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+
+from onyx.document_index.vespa.streaming_feed import stream_feed_operations
+from onyx.document_index.vespa_constants import DOCUMENT_ID
+from onyx.document_index.vespa_constants import DOCUMENT_ID_ENDPOINT
+
+
+def _operation(document_id: str, chunk_uuid: str) -> dict:
+    return {
+        "put": f"id:default:test_index::{chunk_uuid}",
+        "fields": {DOCUMENT_ID: document_id},
+    }
+
+
+def test_stream_feed_reports_each_operation() -> None:
+    requested_urls: list[str] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        requested_urls.append(str(request.url))
+        if request.url.path.endswith("bad"):
+            return httpx.Response(400, text="invalid field")
+        return httpx.Response(200, json={})
+
+    operations = [
+        _operation("doc_a", "uuid-1"),
+        _operation("doc_a", "uuid-2"),
+        _operation("doc_b", "uuid-bad"),
+    ]
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+    results = stream_feed_operations(
+        iter(operations), concurrency=2, throttle_retries=0, http_client=client
+    )
+
+    assert sorted(requested_urls) == sorted(
+        f"{DOCUMENT_ID_ENDPOINT.format(index_name='test_index')}/{chunk_uuid}"
+        for chunk_uuid in ["uuid-1", "uuid-2", "uuid-bad"]
+    )
+    by_vespa_id = {result.vespa_document_id: result for result in results}
+    assert len(by_vespa_id) == 3
+    assert by_vespa_id["id:default:test_index::uuid-1"].success
+    assert by_vespa_id["id:default:test_index::uuid-2"].success
+    failed = by_vespa_id["id:default:test_index::uuid-bad"]
+    assert not failed.success
+    assert failed.document_id == "doc_b"
+    assert failed.status_code == 400
+    assert failed.error == "invalid field"
+
+
+def test_stream_feed_retries_throttled_operations() -> None:
+    attempts: list[int] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(1)
+        if len(attempts) < 3:
+            return httpx.Response(429)
+        return httpx.Response(200, json={})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+    with patch(
+        "onyx.document_index.vespa.streaming_feed.get_backoff_seconds", return_value=0
+    ):
+        results = stream_feed_operations(
+            [_operation("doc", "uuid")],
+            concurrency=4,
+            throttle_retries=5,
+            http_client=client,
+        )
+
+    assert len(attempts) == 3
+    assert len(results) == 1
+    assert results[0].success
+    assert results[0].status_code == 200
+
+
+def test_stream_feed_reports_transport_errors() -> None:
+    def _handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused")
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+    results = stream_feed_operations(
+        [_operation("doc", "uuid")],
+        concurrency=1,
+        throttle_retries=0,
+        http_client=client,
+    )
+
+    assert len(results) == 1
+    assert not results[0].success
+    assert results[0].status_code is None
+
+
+@contextmanager
+def _http1_server(delay: float) -> Iterator[tuple[str, dict[str, int]]]:
+    """A local HTTP/1.1 server answering every request after `delay`, keeps track of
+    the max number of requests it handled concurrently."""
+    lock = threading.Lock()
+    stats = {"in_flight": 0, "max_in_flight": 0}
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers["Content-Length"]))
+            with lock:
+                stats["in_flight"] += 1
+                stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+            time.sleep(delay)
+            with lock:
+                stats["in_flight"] -= 1
+            body = b"{}"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}", stats
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _serve_h2c_connection(sock: socket.socket) -> None:
+    connection = h2.connection.H2Connection(
+        config=h2.config.H2Configuration(client_side=False)
+    )
+    connection.initiate_connection()
+    sock.sendall(connection.data_to_send())
+    with sock:
+        while data := sock.recv(65536):
+            for event in connection.receive_data(data):
+                if isinstance(event, h2.events.DataReceived):
+                    connection.acknowledge_received_data(
+                        event.flow_controlled_length, event.stream_id
+                    )
+                elif isinstance(event, h2.events.StreamEnded):
+                    connection.send_headers(
+                        event.stream_id, [(":status", "200")], end_stream=False
+                    )
+                    connection.send_data(event.stream_id, b"{}", end_stream=True)
+            sock.sendall(connection.data_to_send())
+
+
+@contextmanager
+def _h2c_server() -> Iterator[tuple[str, list[socket.socket]]]:
+    """A local server speaking HTTP/2 over plain http (prior knowledge only), like the
+    Vespa container, keeps track of the connections it accepted."""
+    server_sock = socket.create_server(("127.0.0.1", 0))
+    connections: list[socket.socket] = []
+
+    def _serve() -> None:
+        while True:
+            try:
+                sock, _ = server_sock.accept()
+            except OSError:
+                return
+            connections.append(sock)
+            threading.Thread(
+                target=_serve_h2c_connection, args=(sock,), daemon=True
+            ).start()
+
+    threading.Thread(target=_serve, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server_sock.getsockname()[1]}", connections
+    finally:
+        server_sock.close()
+
+
+def _local_operations(num_operations: int) -> list[dict]:
+    return [_operation(f"doc_{i}", f"uuid-{i}") for i in range(num_operations)]
+
+
+def test_stream_feed_over_http1_keeps_operations_concurrent() -> None:
+    with _http1_server(delay=0.2) as (url, stats), patch(
+        "onyx.document_index.vespa.streaming_feed.DOCUMENT_ID_ENDPOINT",
+        f"{url}/document/v1/default/{{index_name}}/docid",
+    ):
+        results = stream_feed_operations(
+            _local_operations(16), concurrency=8, throttle_retries=0
+        )
+
+    assert all(result.success for result in results)
+    # plain http negotiates no HTTP/2, every operation in flight needs its own
+    # HTTP/1.1 connection rather than waiting for a single one
+    assert {result.http_version for result in results} == {"HTTP/1.1"}
+    assert stats["max_in_flight"] == 8
+
+
+def test_stream_feed_multiplexes_operations_over_h2c() -> None:
+    with _h2c_server() as (url, connections), patch(
+        "onyx.document_index.vespa.streaming_feed.DOCUMENT_ID_ENDPOINT",
+        f"{url}/document/v1/default/{{index_name}}/docid",
+    ), patch("onyx.document_index.vespa.streaming_feed.VESPA_STREAMING_FEED_H2C", True):
+        results = stream_feed_operations(
+            _local_operations(16), concurrency=8, throttle_retries=0
+        )
+
+    assert all(result.success for result in results)
+    assert {result.http_version for result in results} == {"HTTP/2"}
+    assert len(connections) == 1
@@ -105,3 +105,87 @@ def test_chunker_heartbeat(
 
     assert mock_heartbeat.call_count == 1
     assert len(chunks) > 0
+
+
+@pytest.mark.parametrize("chunk_overlap", [0, 32])
+@pytest.mark.parametrize("enable_multipass", [True, False])
+def test_chunk_with_token_offsets_matches_default(
+    embedder: DefaultIndexingEmbedder, enable_multipass: bool, chunk_overlap: int
+) -> None:
+    document = Document(
+        id="test_doc",
+        source=DocumentSource.WEB,
+        semantic_identifier="Test Document",
+        metadata={"tags": ["tag1", "tag2"]},
+        doc_updated_at=None,
+        sections=[
+            TextSection(text="This is a short section.", link="link1"),
+            TextSection(
+                text="This is a long section that should be split into chunks. " * 100,
+                link="link2",
+            ),
+            TextSection(text="Another short section. With two sentences.", link="3"),
+            TextSection(text="Final short section.", link="link4"),
+        ],
+    )
+    indexing_documents = process_image_sections([document])
+
+    chunks_by_mode = [
+        Chunker(
+            tokenizer=embedder.embedding_model.tokenizer,
+            enable_multipass=enable_multipass,
+            chunk_overlap=chunk_overlap,
+            use_token_offsets=use_token_offsets,
+        ).chunk(indexing_documents)
+        for use_token_offsets in (False, True)
+    ]
+
+    default_chunks, offset_chunks = (
+        [chunk.model_dump(exclude={"source_document"}) for chunk in chunks]
+        for chunks in chunks_by_mode
+    )
+    assert len(default_chunks) > 2
+    assert offset_chunks == default_chunks
+
+
+def test_chunk_in_process_pool_matches_default(
+    embedder: DefaultIndexingEmbedder, mock_heartbeat: MockHeartbeat
+) -> None:
+    documents = [
+        Document(
+            id=f"test_doc_{i}",
+            source=DocumentSource.WEB,
+            semantic_identifier=f"Test Document {i}",
+            metadata={"tags": ["tag1", "tag2"]},
+            doc_updated_at=None,
+            sections=[
+                TextSection(text=f"Short section of document {i}.", link="link1"),
+                TextSection(
+                    text="This is a long section that should be split. " * (20 * i),
+                    link="link2",
+                ),
+            ],
+        )
+        for i in range(6)
+    ]
+    indexing_documents = process_image_sections(documents)
+
+    default_chunks = Chunker(
+        tokenizer=embedder.embedding_model.tokenizer, enable_multipass=True
+    ).chunk(indexing_documents)
+    pool_chunker = Chunker(
+        tokenizer=embedder.embedding_model.tokenizer,
+        enable_multipass=True,
+        callback=mock_heartbeat,
+        process_pool_size=2,
+    )
+    document_chunks = list(pool_chunker.chunk_stream(indexing_documents))
+
+    # one yield per document, in order, with the same chunks as chunking in process
+    assert [chunks[0].source_document.id for chunks in document_chunks] == [
+        document.id for document in documents
+    ]
+    assert mock_heartbeat.call_count == len(documents)
+    assert [chunk.model_dump() for chunks in document_chunks for chunk in chunks] == [
+        chunk.model_dump() for chunk in default_chunks
+    ]
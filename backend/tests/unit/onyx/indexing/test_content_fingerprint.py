@@ -0,0 +1,213 @@
+from datetime import datetime
+from datetime import timezone
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from onyx.access.models import DocumentAccess
+from onyx.access.models import ExternalAccess
+from onyx.configs.constants import DocumentSource
+from onyx.connectors.models import Document
+from onyx.connectors.models import IndexAttemptMetadata
+from onyx.connectors.models import TextSection
+from onyx.db.models import Document as DBDocument
+from onyx.db.models import DocumentContentFingerprint
+from onyx.indexing.chunker import Chunker
+from onyx.indexing.content_fingerprint import build_pipeline_signature
+from onyx.indexing.content_fingerprint import compute_chunk_fingerprints
+from onyx.indexing.content_fingerprint import compute_document_fingerprint
+from onyx.indexing.embedder import DefaultIndexingEmbedder
+from onyx.indexing.indexing_pipeline import _filter_unchanged_chunks
+from onyx.indexing.indexing_pipeline import _update_metadata_of_unwritten_chunks
+from onyx.indexing.indexing_pipeline import ChunkedDocumentBatch
+from onyx.indexing.indexing_pipeline import DocumentBatchPrepareContext
+from onyx.indexing.indexing_pipeline import prepare_doc_batch_for_chunking
+from onyx.indexing.indexing_pipeline import process_image_sections
+
+
+def _make_document(sections: list[str], **kwargs: object) -> Document:
+    return Document(
+        id="test_doc",
+        source=DocumentSource.WEB,
+        semantic_identifier="Test Document",
+        metadata={"tags": ["tag1", "tag2"]},
+        sections=[
+            TextSection(text=text, link=f"link{ind}")
+            for ind, text in enumerate(sections)
+        ],
+        **kwargs,  # type: ignore
+    )
+
+
+def test_document_fingerprint_ignores_timestamp_and_access(
+    embedder: DefaultIndexingEmbedder,
+) -> None:
+    signature = build_pipeline_signature(
+        chunker=Chunker(tokenizer=embedder.embedding_model.tokenizer),
+        embedder=embedder,
+    )
+    document = _make_document(["Some text."])
+    fingerprint = compute_document_fingerprint(document, signature)
+
+    bumped_document = _make_document(
+        ["Some text."],
+        doc_updated_at=datetime.now(timezone.utc),
+        external_access=ExternalAccess(
+            external_user_emails={"a@b.com"},
+            external_user_group_ids=set(),
+            is_public=False,
+        ),
+    )
+    assert compute_document_fingerprint(bumped_document, signature) == fingerprint
+
+    edited_document = _make_document(["Some other text."])
+    assert compute_document_fingerprint(edited_document, signature) != fingerprint
+
+    other_signature = build_pipeline_signature(
+        chunker=Chunker(
+            tokenizer=embedder.embedding_model.tokenizer, enable_large_chunks=True
+        ),
+        embedder=embedder,
+    )
+    assert compute_document_fingerprint(document, other_signature) != fingerprint
+
+
+def test_only_changed_chunks_are_rewritten(embedder: DefaultIndexingEmbedder) -> None:
+    chunker = Chunker(
+        tokenizer=embedder.embedding_model.tokenizer, enable_large_chunks=True
+    )
+    signature = build_pipeline_signature(chunker=chunker, embedder=embedder)
+    long_section = "This is a long section that should be split into chunks. " * 100
+
+    old_chunks = chunker.chunk(process_image_sections([_make_document([long_section])]))
+    old_hashes = compute_chunk_fingerprints(old_chunks, signature)["test_doc"]
+    assert len(old_chunks) > 2
+
+    db_doc = Mock(chunk_count=len(old_chunks))
+
+    # appending a section only changes the last chunk (and the large chunk covering it)
+    new_chunks = chunker.chunk(
+        process_image_sections([_make_document([long_section, "A new section."])])
+    )
+    new_hashes = compute_chunk_fingerprints(new_chunks, signature)
+    changed_chunks = _filter_unchanged_chunks(
+        chunks=new_chunks,
+        doc_id_to_chunk_hashes=new_hashes,
+        doc_id_to_stored_chunk_hashes={"test_doc": old_hashes},
+        id_to_db_doc_map={"test_doc": db_doc},
+    )
+
+    assert 0 < len(changed_chunks) < len(new_chunks)
+    assert [chunk.chunk_id for chunk in changed_chunks if chunk.large_chunk_id is None]
+    old_chunk_dumps = [
+        chunk.model_dump(exclude={"source_document"}) for chunk in old_chunks
+    ]
+    for chunk in new_chunks:
+        if chunk not in changed_chunks:
+            assert chunk.model_dump(exclude={"source_document"}) in old_chunk_dumps
+
+    # documents without fingerprints for the search settings being indexed (e.g. only
+    # indexed into the other index so far) are always fully rewritten
+    assert (
+        _filter_unchanged_chunks(
+            chunks=new_chunks,
+            doc_id_to_chunk_hashes=new_hashes,
+            doc_id_to_stored_chunk_hashes={},
+            id_to_db_doc_map={"test_doc": db_doc},
+        )
+        == new_chunks
+    )
+
+
+def test_unwritten_chunks_get_document_metadata() -> None:
+    document_index = Mock()
+    access = DocumentAccess.build(
+        user_emails=["a@b.com"],
+        user_groups=[],
+        external_user_emails=[],
+        external_user_group_ids=[],
+        is_public=False,
+    )
+    updated_at = datetime.now(timezone.utc)
+
+    failures = _update_metadata_of_unwritten_chunks(
+        document_index=document_index,
+        docs=[_make_document(["Some text."], doc_updated_at=updated_at)],
+        doc_id_to_chunk_cnt={"test_doc": 3},
+        doc_id_to_access_info={"test_doc": access},
+        doc_id_to_document_set={"test_doc": ["set"]},
+        id_to_db_doc_map={"test_doc": Mock(boost=2)},
+        tenant_id="tenant",
+    )
+
+    assert failures == []
+    [update_request] = document_index.update.call_args.args[0]
+    # all chunks of the document, the rewritten ones included
+    assert update_request.minimal_document_indexing_info[0].chunk_start_index == 3
+    assert update_request.access == access
+    assert update_request.document_sets == {"set"}
+    assert update_request.boost == 2
+    assert update_request.doc_updated_at == updated_at
+
+
+def test_fingerprints_are_looked_up_per_search_settings(
+    embedder: DefaultIndexingEmbedder,
+) -> None:
+    chunker = Chunker(tokenizer=embedder.embedding_model.tokenizer)
+    signature = build_pipeline_signature(chunker=chunker, embedder=embedder)
+    document = _make_document(["Some text."])
+    stored_fingerprint = DocumentContentFingerprint(
+        document_id="test_doc",
+        search_settings_id=1,
+        content_hash=compute_document_fingerprint(document, signature),
+        chunk_content_hashes={"0": "hash"},
+    )
+
+    def _prepare(search_settings_id: int | None) -> tuple[ChunkedDocumentBatch, Mock]:
+        ctx = DocumentBatchPrepareContext(
+            updatable_docs=[document],
+            id_to_db_doc_map={"test_doc": DBDocument(id="test_doc", chunk_count=1)},
+        )
+        with (
+            patch(
+                "onyx.indexing.indexing_pipeline.index_doc_batch_prepare",
+                return_value=ctx,
+            ),
+            patch(
+                "onyx.indexing.indexing_pipeline.fetch_content_fingerprints",
+                side_effect=lambda document_ids, search_settings_id, db_session: (
+                    {"test_doc": stored_fingerprint}
+                    if search_settings_id == stored_fingerprint.search_settings_id
+                    else {}
+                ),
+            ) as mock_fetch,
+        ):
+            batch = prepare_doc_batch_for_chunking(
+                document_batch=[document],
+                chunker=chunker,
+                embedder=embedder,
+                document_index=Mock(),
+                index_attempt_metadata=IndexAttemptMetadata(
+                    connector_id=1,
+                    credential_id=1,
+                    search_settings_id=search_settings_id,
+                ),
+                db_session=Mock(),
+                filter_fnc=lambda documents: documents,
+            )
+        assert isinstance(batch, ChunkedDocumentBatch)
+        return batch, mock_fetch
+
+    # the search settings the fingerprint was stored for skip the document
+    batch, _ = _prepare(search_settings_id=1)
+    assert batch.unchanged_docs == [document]
+    assert batch.doc_id_to_stored_chunk_hashes == {"test_doc": {"0": "hash"}}
+
+    # the other index (e.g. the secondary one during an index swap) does not
+    batch, _ = _prepare(search_settings_id=2)
+    assert batch.changed_docs == [document]
+    assert batch.doc_id_to_stored_chunk_hashes == {}
+
+    # without search settings, fingerprints are not used at all
+    batch, mock_fetch = _prepare(search_settings_id=None)
+    assert batch.changed_docs == [document]
+    mock_fetch.assert_not_called()
@@ -0,0 +1,140 @@
+from collections.abc import Generator
+from pathlib import Path
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from onyx.configs.constants import DocumentSource
+from onyx.connectors.models import Document
+from onyx.connectors.models import TextSection
+from onyx.indexing.embedder import DefaultIndexingEmbedder
+from onyx.indexing.embedding_cache import build_embedding_cache_key
+from onyx.indexing.embedding_cache import SqliteEmbeddingCache
+from onyx.indexing.models import DocAwareChunk
+from shared_configs.enums import EmbeddingProvider
+
+
+@pytest.fixture
+def mock_embedding_model() -> Generator[Mock, None, None]:
+    with patch("onyx.indexing.embedder.EmbeddingModel") as mock:
+        yield mock
+
+
+def _make_chunk(doc_id: str, content: str) -> DocAwareChunk:
+    source_doc = Document(
+        id=doc_id,
+        source=DocumentSource.WEB,
+        semantic_identifier=f"Title {doc_id}",
+        metadata={},
+        doc_updated_at=None,
+        sections=[TextSection(text=content, link="link")],
+    )
+    return DocAwareChunk(
+        chunk_id=0,
+        blurb=content,
+        content=content,
+        source_links={0: "link"},
+        section_continuation=False,
+        source_document=source_doc,
+        title_prefix="",
+        metadata_suffix_semantic="",
+        metadata_suffix_keyword="",
+        mini_chunk_texts=None,
+        large_chunk_reference_ids=[],
+        large_chunk_id=None,
+        image_file_id=None,
+        chunk_context="",
+        doc_summary="",
+        contextual_rag_reserved_tokens=0,
+    )
+
+
+def test_sqlite_embedding_cache_round_trip(tmp_path: Path) -> None:
+    cache = SqliteEmbeddingCache(
+        db_path=str(tmp_path / "cache.sqlite3"), max_size_bytes=1024 * 1024
+    )
+    cache.put_many({"a": [1.0, 2.0], "b": [3.0, 4.0]})
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": [1.0, 2.0], "b": [3.0, 4.0]}
+
+
+def test_sqlite_embedding_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    # room for exactly two 2-dim float32 vectors
+    cache = SqliteEmbeddingCache(
+        db_path=str(tmp_path / "cache.sqlite3"), max_size_bytes=16
+    )
+    cache.put_many({"a": [1.0, 1.0]})
+    cache.put_many({"b": [2.0, 2.0]})
+    # touch "a" so that "b" becomes the least recently used entry
+    cache.get_many(["a"])
+    cache.put_many({"c": [3.0, 3.0]})
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+
+
+def test_embedding_cache_key_depends_on_model_settings() -> None:
+    base_args = dict(
+        text="some text",
+        model_name="model",
+        normalize=True,
+        reduced_dimension=None,
+        passage_prefix=None,
+        provider_type=None,
+        max_seq_length=512,
+    )
+    base_key = build_embedding_cache_key(**base_args)  # type: ignore
+
+    assert base_key == build_embedding_cache_key(**base_args)  # type: ignore
+    for override in [
+        {"text": "other text"},
+        {"model_name": "other-model"},
+        {"normalize": False},
+        {"reduced_dimension": 256},
+        {"passage_prefix": "passage: "},
+        {"provider_type": EmbeddingProvider.OPENAI},
+        {"max_seq_length": 1024},
+    ]:
+        assert base_key != build_embedding_cache_key(**{**base_args, **override})  # type: ignore
+
+
+def test_embedder_only_encodes_cache_misses(
+    mock_embedding_model: Mock, tmp_path: Path
+) -> None:
+    embedder = DefaultIndexingEmbedder(
+        model_name="test-model",
+        normalize=True,
+        query_prefix=None,
+        passage_prefix=None,
+        provider_type=EmbeddingProvider.OPENAI,
+        embedding_cache=SqliteEmbeddingCache(
+            db_path=str(tmp_path / "cache.sqlite3"), max_size_bytes=1024 * 1024
+        ),
+    )
+    encode = mock_embedding_model.return_value.encode
+    encode.side_effect = lambda texts, **kwargs: [
+        [float(len(text)), 0.0] for text in texts
+    ]
+
+    first = embedder.embed_chunks([_make_chunk("doc1", "first chunk")])
+    assert embedder.cache_hits == 0
+    assert embedder.cache_misses == 2  # chunk + title
+
+    encode.reset_mock()
+    second = embedder.embed_chunks(
+        [_make_chunk("doc1", "first chunk"), _make_chunk("doc2", "second chunk")]
+    )
+
+    # only the new chunk and the new title have to be embedded
+    encoded_texts = [
+        text
+        for call in encode.call_args_list
+        for text in (call.kwargs["texts"] if "texts" in call.kwargs else call.args[0])
+    ]
+    assert sorted(encoded_texts) == ["Title doc2", "second chunk"]
+    assert embedder.cache_hits == 2
+    assert embedder.cache_misses == 4
+
+    assert second[0].embeddings == first[0].embeddings
+    assert second[0].title_embedding == first[0].title_embedding
+    assert second[1].embeddings.full_embedding == [12.0, 0.0]
@@ -0,0 +1,118 @@
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from onyx.connectors.models import ConnectorStopSignal
+from onyx.connectors.models import Document
+from onyx.connectors.models import DocumentSource
+from onyx.connectors.models import TextSection
+from onyx.indexing.indexing_pipeline import IndexingPipelineResult
+from onyx.indexing.pipelined_indexing import run_pipelined_indexing_pipeline
+from onyx.indexing.pipelined_indexing import split_into_sub_batches
+
+_MODULE = "onyx.indexing.pipelined_indexing"
+
+
+def _make_document(doc_id: str) -> Document:
+    return Document(
+        id=doc_id,
+        semantic_identifier=doc_id,
+        sections=[TextSection(text="Test content", link="test_link")],
+        source=DocumentSource.FILE,
+        metadata={},
+    )
+
+
+def test_split_into_sub_batches_keeps_duplicates_together() -> None:
+    documents = [_make_document(doc_id) for doc_id in ["a", "b", "a", "c", "d", "e"]]
+
+    sub_batches = split_into_sub_batches(documents, sub_batch_size=2)
+
+    assert [[doc.id for doc in sub_batch] for sub_batch in sub_batches] == [
+        ["a", "a"],
+        ["b", "c"],
+        ["d", "e"],
+    ]
+
+
+def _write_doc_batch(batch: Any, **kwargs: Any) -> IndexingPipelineResult:
+    if any(doc.id == "doc_3" for doc in batch.documents):
+        raise ValueError("Vespa is down")
+    return IndexingPipelineResult(
+        new_docs=len(batch.documents),
+        total_docs=len(batch.documents),
+        total_chunks=len(batch.documents),
+        failures=[],
+    )
+
+
+def _run_pipeline(documents: list[Document]) -> IndexingPipelineResult:
+    return run_pipelined_indexing_pipeline(
+        document_batch=documents,
+        index_attempt_metadata=Mock(),
+        embedder=Mock(cache_hits=0, cache_misses=0),
+        information_content_classification_model=Mock(),
+        document_index=Mock(),
+        db_session=Mock(),
+        tenant_id="tenant",
+        sub_batch_size=2,
+        queue_size=1,
+    )
+
+
+@patch(f"{_MODULE}.get_chunk_content_scores", return_value=[])
+@patch(f"{_MODULE}.add_chunks_to_doc_batch", return_value=[Mock()])
+@patch(f"{_MODULE}.get_session_with_current_tenant", return_value=MagicMock())
+@patch(f"{_MODULE}.build_indexing_chunker", return_value=(Mock(), False, None))
+def test_pipeline_failures_are_per_sub_batch(*_: Mock) -> None:
+    documents = [_make_document(f"doc_{i}") for i in range(6)]
+    embed = Mock(return_value=([], []))
+
+    with (
+        patch(
+            f"{_MODULE}.prepare_doc_batch_for_chunking",
+            side_effect=lambda document_batch, **kwargs: Mock(documents=document_batch),
+        ),
+        patch(f"{_MODULE}.embed_chunks_with_failure_handling", embed),
+        patch(f"{_MODULE}.write_doc_batch", side_effect=_write_doc_batch),
+    ):
+        result = _run_pipeline(documents)
+
+    # the sub-batch that failed to be written fails as a whole, the others succeed
+    assert embed.call_count == 3
+    assert result.total_docs == 6
+    assert result.new_docs == 4
+    assert sorted(
+        failure.failed_document.document_id
+        for failure in result.failures
+        if failure.failed_document
+    ) == ["doc_2", "doc_3"]
+    assert result.total_seconds >= result.vector_db_write_seconds
+
+
+@patch(f"{_MODULE}.get_chunk_content_scores", return_value=[])
+@patch(f"{_MODULE}.add_chunks_to_doc_batch", return_value=[Mock()])
+@patch(f"{_MODULE}.get_session_with_current_tenant", return_value=MagicMock())
+@patch(f"{_MODULE}.build_indexing_chunker", return_value=(Mock(), False, None))
+def test_pipeline_stop_signal_aborts_all_stages(*_: Mock) -> None:
+    documents = [_make_document(f"doc_{i}") for i in range(6)]
+    write_doc_batch = Mock(side_effect=_write_doc_batch)
+
+    with (
+        patch(
+            f"{_MODULE}.prepare_doc_batch_for_chunking",
+            side_effect=lambda document_batch, **kwargs: Mock(documents=document_batch),
+        ),
+        patch(
+            f"{_MODULE}.embed_chunks_with_failure_handling",
+            side_effect=ConnectorStopSignal("stop"),
+        ),
+        patch(f"{_MODULE}.write_doc_batch", write_doc_batch),
+    ):
+        with pytest.raises(ConnectorStopSignal):
+            _run_pipeline(documents)
+
+    write_doc_batch.assert_not_called()
@@ -0,0 +1,78 @@
+from onyx.db.models import KGEntity
+from onyx.db.models import KGEntityExtractionStaging
+from onyx.kg.clustering.clustering import _plan_grounded_entity_clustering
+
+
+def _staged(
+    name: str, entity_type: str = "ACCOUNT", document_id: str | None = None
+) -> KGEntityExtractionStaging:
+    return KGEntityExtractionStaging(
+        id_name=f"{entity_type}::{name}",
+        name=name,
+        entity_type_id_name=entity_type,
+        document_id=document_id,
+    )
+
+
+def _existing(id_name: str, name: str, document_id: str | None = None) -> KGEntity:
+    return KGEntity(
+        id_name=id_name,
+        name=name,
+        entity_type_id_name="ACCOUNT",
+        document_id=document_id,
+    )
+
+
+def test_plan_merges_with_best_existing_entity() -> None:
+    entities = [_staged("Acme Corporation"), _staged("Globex")]
+    similar_entities = [
+        (0, _existing("ACCOUNT::1", "acme corporations")),
+        (0, _existing("ACCOUNT::2", "acme corporation")),
+        (1, _existing("ACCOUNT::3", "globe")),
+    ]
+
+    plan = _plan_grounded_entity_clustering(
+        entities=entities,
+        entity_names=["acme corporation", "globex"],
+        similar_entities=similar_entities,
+    )
+
+    assert plan == ["ACCOUNT::2", None]
+
+
+def test_plan_merges_with_earlier_entities_of_the_batch() -> None:
+    entities = [
+        _staged("Acme Corporation"),
+        _staged("acme corporation"),
+        _staged("Acme Corporation", entity_type="VENDOR"),
+        _staged("Acme Corporation 2"),
+    ]
+
+    plan = _plan_grounded_entity_clustering(
+        entities=entities,
+        entity_names=[entity.name.lower() for entity in entities],
+        similar_entities=[],
+    )
+
+    # different types and names with numbers are never merged
+    assert plan == [None, 0, None, None]
+
+
+def test_plan_merges_one_document_entity_per_entity() -> None:
+    entities = [
+        _staged("acme", document_id="doc1"),
+        _staged("acme", document_id="doc2"),
+        _staged("acme", document_id="doc3"),
+    ]
+
+    existing = _existing("ACCOUNT::1", "acme")
+
+    plan = _plan_grounded_entity_clustering(
+        entities=entities,
+        entity_names=["acme", "acme", "acme"],
+        similar_entities=[(i, existing) for i in range(3)],
+    )
+
+    # the first merge gives the existing entity a document, the second document
+    # entity becomes a new entity, which can't take another document either
+    assert plan == ["ACCOUNT::1", None, None]
@@ -0,0 +1,185 @@
+from datetime import datetime
+from datetime import timezone
+from typing import Any
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from onyx.kg.clustering.normalization_index import _EntityTypeIndex
+from onyx.kg.clustering.normalization_index import _TenantEntityIndex
+from onyx.kg.clustering.normalization_index import IndexedKGEntity
+from onyx.kg.clustering.normalization_index import (
+    invalidate_kg_entity_normalization_index,
+)
+from onyx.kg.clustering.normalization_index import KGEntityCandidate
+from onyx.kg.clustering.normalization_index import KGEntityNormalizationIndex
+from onyx.kg.clustering.normalization_index import make_trigrams
+
+
+def _entity(
+    id_name: str,
+    name: str,
+    document_id: str | None = None,
+    subtype: str | None = None,
+) -> IndexedKGEntity:
+    return IndexedKGEntity(
+        id_name=id_name,
+        name=name,
+        entity_type_id_name="ACCOUNT",
+        document_id=document_id,
+        subtype=subtype,
+        trigrams=sorted(make_trigrams(name)),
+    )
+
+
+def _search(
+    type_index: _EntityTypeIndex,
+    name: str,
+    subtype: str | None = None,
+    limit: int = 10,
+    max_document_entities: int = 40,
+) -> list[KGEntityCandidate]:
+    return type_index.search(make_trigrams(name), subtype, limit, max_document_entities)
+
+
+def test_make_trigrams_matches_show_trgm() -> None:
+    assert make_trigrams("cat") == {"  c", " ca", "cat", "at "}
+    assert make_trigrams("A b") == {"  a", " a ", "  b", " b "}
+    assert make_trigrams("--") == set()
+
+
+def test_entity_type_index_search() -> None:
+    type_index = _EntityTypeIndex()
+    type_index.add(
+        [
+            _entity("ACCOUNT::1", "acme"),
+            _entity("ACCOUNT::2", "acmecorp", document_id="doc1"),
+            _entity("ACCOUNT::3", "globex"),
+            _entity("ACCOUNT::4", "acme", subtype="customer"),
+        ]
+    )
+
+    candidates = _search(type_index, "acme")
+    assert [candidate.id_name for candidate in candidates] == [
+        "ACCOUNT::1",
+        "ACCOUNT::4",
+        "ACCOUNT::2",
+    ]
+    # | Q ∩ E | / min(|Q|, |E|)
+    assert [candidate.score for candidate in candidates] == [1.0, 1.0, 0.8]
+
+    candidates = _search(type_index, "acme", subtype="customer")
+    assert [candidate.id_name for candidate in candidates] == ["ACCOUNT::4"]
+
+
+def test_entity_type_index_search_limit_keeps_document_entities() -> None:
+    type_index = _EntityTypeIndex()
+    type_index.add(
+        [
+            _entity("ACCOUNT::1", "acme", document_id="doc1"),
+            _entity("ACCOUNT::2", "acme"),
+            _entity("ACCOUNT::3", "acmecorp"),
+            _entity("ACCOUNT::4", "acmecorp", document_id="doc2"),
+        ]
+    )
+
+    candidates = _search(type_index, "acme", limit=1)
+
+    # the entity of doc1 may be filtered out by the access check, those after the
+    # best entity without a document can't make it into the best one either way
+    assert [candidate.id_name for candidate in candidates] == [
+        "ACCOUNT::1",
+        "ACCOUNT::2",
+    ]
+
+
+def test_entity_type_index_search_bounds_document_entities() -> None:
+    type_index = _EntityTypeIndex()
+    type_index.add(
+        [
+            _entity(f"ACCOUNT::{i}", f"acme {i}", document_id=f"doc{i}")
+            for i in range(10_000)
+        ]
+        + [_entity("ACCOUNT::other", "acme other", subtype="customer")]
+    )
+
+    candidates = _search(type_index, "acme", limit=10, max_document_entities=40)
+    assert len(candidates) == 41
+    assert sum(candidate.document_id is None for candidate in candidates) == 1
+    # still best first
+    scores = [candidate.score for candidate in candidates]
+    assert scores == sorted(scores, reverse=True)
+
+    [candidate] = _search(type_index, "acme", subtype="customer")
+    assert candidate.id_name == "ACCOUNT::other"
+    assert _search(type_index, "acme", subtype="partner") == []
+
+
+def test_entity_type_index_updates_and_compacts() -> None:
+    type_index = _EntityTypeIndex()
+    type_index.add([_entity("ACCOUNT::1", "acme"), _entity("ACCOUNT::2", "globex")])
+
+    type_index.add([_entity("ACCOUNT::1", "initech", document_id="doc1")])
+    assert len(type_index) == 2
+    assert _search(type_index, "acme") == []
+    [candidate] = _search(type_index, "initech")
+    assert candidate.id_name == "ACCOUNT::1"
+    assert candidate.document_id == "doc1"
+
+    # more dead than live positions
+    type_index.add([_entity("ACCOUNT::1", "acme"), _entity("ACCOUNT::2", "umbrella")])
+    assert len(type_index.id_names) == 2
+    [candidate] = _search(type_index, "acme")
+    assert candidate.id_name == "ACCOUNT::1"
+    [candidate] = _search(type_index, "umbrella")
+    assert candidate.id_name == "ACCOUNT::2"
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, int] = {}
+
+    def get(self, key: str) -> bytes | None:
+        value = self.values.get(key)
+        return None if value is None else str(value).encode()
+
+    def incr(self, key: str) -> int:
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+
+def test_normalization_index_refreshes_after_invalidation() -> None:
+    index = KGEntityNormalizationIndex()
+    entities = [_entity("ACCOUNT::1", "acme")]
+    num_db_entities = 1
+
+    def fetch_entities(tenant_index: _TenantEntityIndex, since: Any) -> int:
+        tenant_index.fetched_until = datetime.now(timezone.utc)
+        tenant_index.add(entities)
+        return num_db_entities
+
+    with patch(
+        "onyx.kg.clustering.normalization_index.get_redis_client",
+        Mock(return_value=_FakeRedis()),
+    ), patch(
+        "onyx.kg.clustering.normalization_index._fetch_entities",
+        Mock(side_effect=fetch_entities),
+    ) as mock_fetch:
+        assert len(index.search("ACCOUNT", "acme", None, 10, 40)) == 1
+        assert len(index.search("ACCOUNT", "acme", None, 10, 40)) == 1
+        assert mock_fetch.call_count == 1
+
+        # new entities are fetched after kg_clustering
+        entities = [_entity("ACCOUNT::2", "acmecorp")]
+        num_db_entities = 2
+        invalidate_kg_entity_normalization_index()
+        assert len(index.search("ACCOUNT", "acme", None, 10, 40)) == 2
+        assert mock_fetch.call_count == 2
+        assert mock_fetch.call_args.kwargs["since"] is not None
+
+        # deleted entities make the index rebuild
+        entities = [_entity("ACCOUNT::2", "acmecorp")]
+        num_db_entities = 1
+        invalidate_kg_entity_normalization_index()
+        assert len(index.search("ACCOUNT", "acme", None, 10, 40)) == 1
+        assert mock_fetch.call_count == 4
+        assert mock_fetch.call_args.kwargs["since"] is None
@@ -0,0 +1,67 @@
+from typing import Any
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from onyx.llm.provider_cache import invalidate_llm_provider_cache
+from onyx.llm.provider_cache import LLMProviderCache
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, int] = {}
+
+    def get(self, key: str) -> bytes | None:
+        value = self.values.get(key)
+        return None if value is None else str(value).encode()
+
+    def incr(self, key: str) -> int:
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+
+def _patch_redis(redis: Any) -> Any:
+    return patch("onyx.llm.provider_cache.get_redis_client", Mock(return_value=redis))
+
+
+def test_llm_provider_cache_hits_until_invalidated() -> None:
+    cache = LLMProviderCache()
+    views = {"openai": Mock(), None: Mock()}
+
+    with _patch_redis(_FakeRedis()), patch.object(
+        LLMProviderCache, "_fetch", side_effect=lambda name: views[name]
+    ) as mock_fetch:
+        assert cache.get_provider_view("openai") is views["openai"]
+        assert cache.get_provider_view("openai") is views["openai"]
+        assert cache.get_default_provider() is views[None]
+        assert cache.get_default_provider() is views[None]
+        assert mock_fetch.call_count == 2
+
+        # an edit of the providers in any process drops the cached views
+        invalidate_llm_provider_cache()
+        views["openai"] = Mock()
+        assert cache.get_provider_view("openai") is views["openai"]
+        assert mock_fetch.call_count == 3
+
+
+def test_llm_provider_cache_does_not_cache_missing_providers() -> None:
+    cache = LLMProviderCache()
+
+    with _patch_redis(_FakeRedis()), patch.object(
+        LLMProviderCache, "_fetch", return_value=None
+    ) as mock_fetch:
+        assert cache.get_provider_view("missing") is None
+        assert cache.get_provider_view("missing") is None
+        assert mock_fetch.call_count == 2
+
+
+def test_llm_provider_cache_reads_database_without_redis() -> None:
+    cache = LLMProviderCache()
+    redis = Mock()
+    redis.get.side_effect = ConnectionError()
+
+    with _patch_redis(redis), patch.object(
+        LLMProviderCache, "_fetch", return_value=Mock()
+    ) as mock_fetch:
+        cache.get_provider_view("openai")
+        cache.get_provider_view("openai")
+        assert mock_fetch.call_count == 2
@@ -0,0 +1,110 @@
+from typing import Any
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage
+
+from onyx.llm.response_cache import build_llm_response_cache_key
+from onyx.llm.response_cache import CachedLLMResponse
+from onyx.llm.response_cache import invoke_llm_with_response_cache
+from onyx.llm.response_cache import LLMResponseCache
+from onyx.llm.response_cache import LLMResponseCacheFlow
+
+
+def _make_llm(model_name: str = "gpt-4o", temperature: float = 0) -> Mock:
+    llm = Mock()
+    llm.config.model_provider = "openai"
+    llm.config.model_name = model_name
+    llm.config.api_base = None
+    llm.config.deployment_name = None
+    llm.config.temperature = temperature
+    llm.invoke.return_value = AIMessage(content="response")
+    return llm
+
+
+def _response(content: str) -> CachedLLMResponse:
+    return CachedLLMResponse(content=content, latency_seconds=1.0, num_tokens=10)
+
+
+def test_llm_response_cache_key() -> None:
+    llm = _make_llm()
+    flow = LLMResponseCacheFlow.TIME_FILTER
+
+    key = build_llm_response_cache_key(flow, llm, "prompt")
+    assert key == build_llm_response_cache_key(flow, llm, "prompt")
+    assert key != build_llm_response_cache_key(flow, llm, "other prompt")
+    assert key != build_llm_response_cache_key(
+        LLMResponseCacheFlow.SOURCE_FILTER, llm, "prompt"
+    )
+    assert key != build_llm_response_cache_key(
+        flow, _make_llm(model_name="gpt-4o-mini"), "prompt"
+    )
+    assert key != build_llm_response_cache_key(flow, llm, "prompt", max_tokens=10)
+
+
+def test_llm_response_cache_lru_and_ttl() -> None:
+    cache = LLMResponseCache(max_size=2, ttl_seconds=10, use_redis=False)
+
+    with patch("onyx.utils.tenant_ttl_cache.time") as mock_time:
+        mock_time.monotonic.return_value = 0.0
+        cache.put("a", _response("a"))
+        cache.put("b", _response("b"))
+        assert cache.get("a") == _response("a")
+
+        # "b" is the least recently used entry
+        cache.put("c", _response("c"))
+        assert cache.get("b") is None
+        assert cache.get("c") == _response("c")
+
+        mock_time.monotonic.return_value = 11.0
+        assert cache.get("a") is None
+
+    cache.put("a", _response("a"))
+    cache.clear()
+    assert cache.get("a") is None
+
+
+def _patch_cache(cache: LLMResponseCache, flows: list[str]) -> Any:
+    return patch.multiple(
+        "onyx.llm.response_cache",
+        get_llm_response_cache=Mock(return_value=cache),
+        LLM_RESPONSE_CACHE_FLOWS=flows,
+        check_number_of_tokens=Mock(return_value=5),
+    )
+
+
+def test_invoke_llm_with_response_cache_hit() -> None:
+    cache = LLMResponseCache(max_size=10, ttl_seconds=10, use_redis=False)
+    llm = _make_llm()
+    flow = LLMResponseCacheFlow.QUERY_REPHRASE
+
+    with _patch_cache(cache, [flow.value]):
+        assert invoke_llm_with_response_cache(llm, "prompt", flow) == "response"
+        assert invoke_llm_with_response_cache(llm, "prompt", flow) == "response"
+        assert llm.invoke.call_count == 1
+
+        cached_response = cache.get(build_llm_response_cache_key(flow, llm, "prompt"))
+        assert cached_response is not None
+        assert cached_response.num_tokens == 10
+
+        invoke_llm_with_response_cache(llm, "other prompt", flow)
+        assert llm.invoke.call_count == 2
+
+
+def test_invoke_llm_with_response_cache_opt_in_and_temperature() -> None:
+    cache = LLMResponseCache(max_size=10, ttl_seconds=10, use_redis=False)
+    flow = LLMResponseCacheFlow.QUERY_REPHRASE
+
+    # the flow did not opt in
+    llm = _make_llm()
+    with _patch_cache(cache, [LLMResponseCacheFlow.TIME_FILTER.value]):
+        invoke_llm_with_response_cache(llm, "prompt", flow)
+        invoke_llm_with_response_cache(llm, "prompt", flow)
+    assert llm.invoke.call_count == 2
+
+    # the responses of the LLM are not deterministic
+    llm = _make_llm(temperature=0.7)
+    with _patch_cache(cache, [flow.value]):
+        invoke_llm_with_response_cache(llm, "prompt", flow)
+        invoke_llm_with_response_cache(llm, "prompt", flow)
+    assert llm.invoke.call_count == 2
@@ -6,9 +6,16 @@ from unittest.mock import patch
 
 import pytest
 from httpx import AsyncClient
+from httpx import ConnectError
 from litellm.exceptions import RateLimitError
 
+from onyx.natural_language_processing.exceptions import EmbeddingRateLimitError
+from onyx.natural_language_processing.search_nlp_models import (
+    build_token_budgeted_batches,
+)
 from onyx.natural_language_processing.search_nlp_models import CloudEmbedding
+from onyx.natural_language_processing.search_nlp_models import EmbeddingModel
+from onyx.natural_language_processing.search_nlp_models import is_rate_limit_error
 from shared_configs.enums import EmbeddingProvider
 from shared_configs.enums import EmbedTextType
 
@@ -81,3 +88,109 @@ async def test_rate_limit_handling() -> None:
                 model_name="fake-model",
                 text_type=EmbedTextType.QUERY,
             )
+
+
+def test_is_rate_limit_error() -> None:
+    assert is_rate_limit_error(
+        RateLimitError("Slow down", llm_provider="openai", model="fake-model")
+    )
+
+    status_error = Exception("Request failed")
+    status_error.status_code = 429  # type: ignore[attr-defined]
+    assert is_rate_limit_error(status_error)
+
+    assert is_rate_limit_error(Exception("Too Many Requests"))
+    # a 429 elsewhere in the message is not a rate limit
+    assert not is_rate_limit_error(
+        ValueError("Input of 4290 tokens exceeds the context length")
+    )
+
+
+def test_token_budgeted_batches() -> None:
+    token_counts = [10, 500, 20, 480, 10, 30]
+
+    # summed budget, longest texts first and similar lengths batched together
+    assert build_token_budgeted_batches(
+        token_counts, max_batch_size=3, token_budget=600
+    ) == [[1], [3, 5, 2], [0, 4]]
+
+    # padded budget counts a batch as its longest text times its size
+    assert build_token_budgeted_batches(
+        token_counts, max_batch_size=8, token_budget=100, pad_to_longest=True
+    ) == [[1], [3], [5, 2, 0], [4]]
+
+
+def test_encode_shrinks_batches_on_rate_limit() -> None:
+    embedding_model = EmbeddingModel(
+        server_host="localhost",
+        server_port=9000,
+        model_name="text-embedding-3-small",
+        normalize=True,
+        query_prefix=None,
+        passage_prefix=None,
+        api_key="fake-key",
+        api_url=None,
+        provider_type=EmbeddingProvider.OPENAI,
+    )
+    request_sizes: list[int] = []
+
+    async def fake_embed_openai(
+        texts: list[str], model_name: str | None, reduced_dimension: int | None
+    ) -> list[list[float]]:
+        request_sizes.append(len(texts))
+        if len(texts) > 2:
+            raise RateLimitError(
+                "Rate limit exceeded", llm_provider="openai", model="fake-model"
+            )
+        return [[float(len(text))] for text in texts]
+
+    texts = ["a" * length for length in [1, 40, 3, 20, 5]]
+    # through the retries of CloudEmbedding.embed
+    with (
+        patch.object(CloudEmbedding, "_embed_openai", side_effect=fake_embed_openai),
+        patch("onyx.natural_language_processing.search_nlp_models._RETRY_DELAY", 0),
+    ):
+        embeddings = embedding_model.encode(
+            texts,
+            text_type=EmbedTextType.PASSAGE,
+            api_embedding_batch_size=8,
+            api_embedding_token_budget=1000,
+        )
+
+    # the embeddings come back in the original order despite the length sorting
+    assert embeddings == [[float(len(text))] for text in texts]
+    # halves on rate limits, without retrying the rate limited batch first, and
+    # grows back after successful requests
+    assert request_sizes == [5, 2, 3, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_cloud_embedding_retries_other_errors() -> None:
+    async with CloudEmbedding("fake-key", EmbeddingProvider.OPENAI) as embedding:
+        with patch.object(
+            embedding,
+            "_embed_openai",
+            side_effect=[ConnectError("connection reset"), [[0.1, 0.2]]],
+        ) as mock_embed_openai:
+            result = await embedding.embed(
+                texts=["test"], model_name="fake-model", text_type=EmbedTextType.QUERY
+            )
+
+        assert result == [[0.1, 0.2]]
+        assert mock_embed_openai.call_count == 2
+
+        with patch.object(
+            embedding,
+            "_embed_openai",
+            side_effect=RateLimitError(
+                "Rate limit exceeded", llm_provider="openai", model="fake-model"
+            ),
+        ) as mock_embed_openai:
+            with pytest.raises(EmbeddingRateLimitError):
+                await embedding.embed(
+                    texts=["test"],
+                    model_name="fake-model",
+                    text_type=EmbedTextType.QUERY,
+                )
+
+        assert mock_embed_openai.call_count == 1
@@ -0,0 +1,68 @@
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from onyx.configs.constants import OnyxCeleryTask
+from onyx.redis.redis_document_set import RedisDocumentSet
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict[str, bytes]] = {}
+
+    def hset(self, key: str, field: str, value: int) -> int:
+        self.hashes.setdefault(key, {})[field] = str(value).encode()
+        return 1
+
+    def hdel(self, key: str, field: str) -> int:
+        return int(self.hashes.get(key, {}).pop(field, None) is not None)
+
+    def hvals(self, key: str) -> list[bytes]:
+        return list(self.hashes.get(key, {}).values())
+
+
+def test_generate_tasks_batches_documents_and_tracks_them() -> None:
+    r = _FakeRedis()
+    doc_ids = [f"doc_{i}" for i in range(7)]
+    db_session = MagicMock()
+    db_session.scalars.return_value.yield_per.return_value = doc_ids
+    celery_app = MagicMock()
+
+    with (
+        patch("onyx.redis.redis_object_helper.get_redis_client", return_value=r),
+        patch("onyx.redis.redis_document_set.construct_document_id_select_by_docset"),
+    ):
+        rds = RedisDocumentSet("tenant", 1)
+        result = rds.generate_tasks(
+            max_tasks=100,
+            celery_app=celery_app,
+            db_session=db_session,
+            redis_client=r,  # type: ignore
+            lock=MagicMock(),
+            tenant_id="tenant",
+            batch_size=3,
+        )
+
+    assert result == (3, 7)
+    sent: list[tuple[Any, ...]] = [
+        (call.args[0], call.kwargs["kwargs"], call.kwargs["task_id"])
+        for call in celery_app.send_task.call_args_list
+    ]
+    assert [name for name, _, _ in sent] == [
+        OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK,
+        OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK,
+        OnyxCeleryTask.VESPA_METADATA_SYNC_TASK,
+    ]
+    assert [kwargs.get("document_ids") for _, kwargs, _ in sent[:2]] == [
+        doc_ids[:3],
+        doc_ids[3:6],
+    ]
+    assert sent[2][1]["document_id"] == "doc_6"
+
+    # the taskset tracks the documents left to sync, not the tasks
+    assert rds.get_remaining() == 7
+    rds.remove_from_taskset(sent[0][2])
+    assert rds.get_remaining() == 4
+    for _, _, task_id in sent[1:]:
+        rds.remove_from_taskset(task_id)
+    assert rds.get_remaining() == 0
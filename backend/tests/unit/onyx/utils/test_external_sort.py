@@ -0,0 +1,32 @@
+import os
+import random
+
+from onyx.utils.external_sort import ExternalSortedStrings
+from onyx.utils.external_sort import sorted_difference
+
+
+def test_external_sorted_strings_spills_and_merges() -> None:
+    rng = random.Random(0)
+    values = [f"doc_{rng.randint(0, 500)}" for _ in range(1000)]
+    values += ["line\nbreak", "naïve café", "日本語", "", "🚀"]
+
+    with ExternalSortedStrings(max_in_memory=64) as sorted_strings:
+        sorted_strings.add_many(values)
+        assert sorted_strings.num_runs > 1
+
+        assert list(sorted_strings) == sorted(set(values))
+        # can be iterated more than once
+        assert list(sorted_strings) == sorted(set(values))
+
+        tmp_dir = sorted_strings._tmp_dir.name
+
+    assert not os.path.exists(tmp_dir)
+
+
+def test_sorted_difference() -> None:
+    left = sorted({"a", "b", "c", "e", "g"})
+    right = sorted({"b", "d", "e", "h"})
+
+    assert list(sorted_difference(left, right)) == ["a", "c", "g"]
+    assert list(sorted_difference(left, [])) == left
+    assert list(sorted_difference([], right)) == []
@@ -0,0 +1,91 @@
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from onyx.utils.tenant_ttl_cache import TenantTTLCache
+from shared_configs.contextvars import CURRENT_TENANT_ID_CONTEXTVAR
+from shared_configs.contextvars import get_current_tenant_id
+
+
+class _StrCache(TenantTTLCache[str]):
+    REDIS_KEY_PREFIX = "test_cache:"
+
+    def __init__(self, max_size: int, ttl_seconds: int, use_redis: bool) -> None:
+        super().__init__(max_size, ttl_seconds, use_redis)
+        self.lookups: list[tuple[str, int, int]] = []
+
+    def serialize(self, value: str) -> str:
+        return value
+
+    def deserialize(self, blob: bytes) -> str:
+        if blob == b"corrupt":
+            raise ValueError("corrupt")
+        return blob.decode()
+
+    def record_lookups(self, tier: str, num_hits: int, num_misses: int) -> None:
+        self.lookups.append((tier, num_hits, num_misses))
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+
+    def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction: bool = True) -> Mock:
+        pipeline = Mock()
+        pipeline.set.side_effect = lambda key, value, ex: self.values.__setitem__(
+            key, value.encode()
+        )
+        return pipeline
+
+
+def test_tenant_ttl_cache_scopes_entries_to_the_tenant() -> None:
+    cache = _StrCache(max_size=10, ttl_seconds=10, use_redis=False)
+
+    token = CURRENT_TENANT_ID_CONTEXTVAR.set("tenant_a")
+    try:
+        cache.put("key", "a")
+        assert cache.get("key") == "a"
+    finally:
+        CURRENT_TENANT_ID_CONTEXTVAR.reset(token)
+
+    token = CURRENT_TENANT_ID_CONTEXTVAR.set("tenant_b")
+    try:
+        assert cache.get("key") is None
+    finally:
+        CURRENT_TENANT_ID_CONTEXTVAR.reset(token)
+
+
+def test_tenant_ttl_cache_falls_back_to_redis() -> None:
+    redis_client = _FakeRedis()
+    writer = _StrCache(max_size=10, ttl_seconds=10, use_redis=True)
+    reader = _StrCache(max_size=10, ttl_seconds=10, use_redis=True)
+
+    with patch(
+        "onyx.utils.tenant_ttl_cache.get_shared_redis_client",
+        return_value=redis_client,
+    ):
+        writer.put_many({"a": "1", "b": "2"})
+        assert all(key.startswith("test_cache:") for key in redis_client.values)
+
+        # misses of the local tier are looked up in redis and then kept locally
+        assert reader.get_many(["a", "c"]) == {"a": "1"}
+        assert reader.lookups == [("local", 0, 2), ("redis", 1, 1)]
+        assert reader.get("a") == "1"
+        assert reader.lookups[-1] == ("local", 1, 0)
+
+        # values that can't be parsed are misses
+        redis_client.values[reader._redis_key("d", get_current_tenant_id())] = (
+            b"corrupt"
+        )
+        assert reader.get("d") is None
+
+    # redis failures are misses
+    with patch(
+        "onyx.utils.tenant_ttl_cache.get_shared_redis_client",
+        side_effect=ConnectionError("redis is down"),
+    ):
+        assert reader.get("b") is None
+        writer.put("e", "5")
+        assert writer.get("e") == "5"
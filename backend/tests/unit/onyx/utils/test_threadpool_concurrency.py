@@ -8,6 +8,7 @@ from concurrent.futures import ThreadPoolExecutor
 import pytest
 
 from onyx.utils.threadpool_concurrency import parallel_yield
+from onyx.utils.threadpool_concurrency import run_functions_tuples_with_deadline
 from onyx.utils.threadpool_concurrency import run_in_background
 from onyx.utils.threadpool_concurrency import run_with_timeout
 from onyx.utils.threadpool_concurrency import ThreadSafeDict
@@ -389,3 +390,49 @@ def test_parallel_yield_non_blocking() -> None:
     # Verify no values are missing
     assert len(results) == 300  # Should have all values from 0 to 299
     assert sorted(results) == list(range(300))
+
+
+def test_run_functions_tuples_with_deadline_drops_slow_functions() -> None:
+    """Test that optional functions missing the deadline are dropped while required
+    ones are still waited on"""
+    late_results: list[tuple[int, str]] = []
+    late_result_event = threading.Event()
+
+    def on_late_result(index: int, result: str) -> None:
+        late_results.append((index, result))
+        late_result_event.set()
+
+    def sleep_and_return(duration: float, value: str) -> str:
+        time.sleep(duration)
+        return value
+
+    start = time.time()
+    results = list(
+        run_functions_tuples_with_deadline(
+            [
+                (sleep_and_return, (0.3, "required")),
+                (sleep_and_return, (0.0, "fast")),
+                (sleep_and_return, (0.6, "slow")),
+            ],
+            deadline=0.1,
+            required_indices={0},
+            on_late_result=on_late_result,
+        )
+    )
+    elapsed = time.time() - start
+
+    assert sorted(results) == [(0, "required"), (1, "fast")]
+    assert elapsed < 0.5
+
+    assert late_result_event.wait(timeout=2)
+    assert late_results == [(2, "slow")]
+
+
+def test_run_functions_tuples_with_deadline_no_deadline() -> None:
+    """Test that without a deadline every result is yielded"""
+    results = list(
+        run_functions_tuples_with_deadline(
+            [(lambda x: x * 2, (i,)) for i in range(5)], deadline=None
+        )
+    )
+    assert sorted(results) == [(i, i * 2) for i in range(5)]
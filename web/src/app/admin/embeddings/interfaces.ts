@@ -24,6 +24,7 @@ export enum RerankerProvider {
 export enum EmbeddingPrecision {
   FLOAT = "float",
   BFLOAT16 = "bfloat16",
+  BINARY = "binary",
 }
 
 export interface LLMContextualCost {
@@ -41,6 +41,7 @@ interface AdvancedEmbeddingFormPageProps {
 const embeddingPrecisionOptions: StringOrNumberOption[] = [
   { name: EmbeddingPrecision.BFLOAT16, value: EmbeddingPrecision.BFLOAT16 },
   { name: EmbeddingPrecision.FLOAT, value: EmbeddingPrecision.FLOAT },
+  { name: EmbeddingPrecision.BINARY, value: EmbeddingPrecision.BINARY },
 ];
 
 const AdvancedEmbeddingFormPage = forwardRef<
@@ -342,7 +343,7 @@ const AdvancedEmbeddingFormPage = forwardRef<
                 name="embedding_precision"
                 label="Embedding Precision"
                 options={embeddingPrecisionOptions}
-                subtext="Select the precision for embedding vectors. Lower precision uses less storage but may reduce accuracy."
+                subtext="Select the precision for embedding vectors. Lower precision uses less storage but may reduce accuracy. Binary searches 1 bit per dimension vectors held in memory and rescores the top results with full precision vectors kept on disk."
               />
 
               <NumberInput